@@ -2,24 +2,157 @@
 Base Agent class for Agent-Camel V2.
 Agent-Camel V2的基础Agent类
 """
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple, Type
 from abc import ABC, abstractmethod
+from functools import lru_cache
+import json
 import logging
-from agents.model_provider import ModelProviderFactory
+import sys
+import threading
+from agents.model_provider import ModelProviderFactory, ModelProvider
+from memory.factory import MemoryManagerFactory
 from memory.manager import MemoryManager
+from memory.summarizer import ContextSummarizer
+from memory.retrieval import RetrievalMemory
+from memory.records import Message
+from config.settings import settings
 from tools.library import ToolLibrary
+from tools.validation import ToolArgumentError
 
 # 设置日志记录
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=4096)
+def _compile_prompt_prefix(role: str) -> str:
+    """Build the role-dependent prompt prefix once per distinct role text.
+    每种角色文本只构建一次与角色相关的提示前缀"""
+    return (f"You are {role}. "
+            f"Your goal is to help the user with their request.\n\n")
+
+
+class AgentProfile:
+    """
+    Immutable state shared by all agents of the same class and model provider (flyweight).
+    同一类Agent且使用相同模型提供商时共享的不可变状态（享元）
+    
+    Holds the model provider, the tool library and the pre-rendered tool
+    catalog so that creating an agent does not rebuild any of them. The
+    catalog comes from the library's ToolView, which profiles with the same
+    tools share.
+    持有模型提供商、工具库以及预先渲染的工具目录，创建Agent时无需重新构建。
+    目录来自工具库的ToolView，工具相同的共享配置会共用同一个视图。
+    """
+    
+    __slots__ = ("agent_class", "model_provider", "model", "tools", "tool_catalog", "tool_block")
+    
+    _profiles: Dict[Tuple[Type["BaseAgent"], str], "AgentProfile"] = {}
+    _lock = threading.RLock()
+    
+    def __init__(self, agent_class: Type["BaseAgent"], model_provider: str):
+        self.agent_class = agent_class
+        self.model_provider = model_provider
+        self.model: ModelProvider = ModelProviderFactory.get_shared_provider(model_provider)
+        self.tools = ToolLibrary()
+        self.tool_catalog: List[Dict[str, str]] = []
+        self.tool_block = ""
+    
+    @classmethod
+    def for_agent(cls, agent: "BaseAgent") -> "AgentProfile":
+        """
+        Get (or build on first use) the shared profile for an agent.
+        获取Agent的共享配置（首次使用时构建）
+        
+        Args:
+            agent: Agent being initialized
+               正在初始化的Agent
+            
+        Returns:
+            Shared AgentProfile
+            共享的AgentProfile
+        """
+        key = (type(agent), agent.model_provider)
+        profile = cls._profiles.get(key)
+        if profile is None:
+            with cls._lock:
+                profile = cls._profiles.get(key)
+                if profile is None:
+                    profile = cls(type(agent), agent.model_provider)
+                    # Role specific tools are registered once per profile
+                    # 角色特有工具在每个共享配置上只注册一次
+                    agent._profile = profile
+                    agent._register_role_specific_tools()
+                    profile.refresh_catalog()
+                    cls._profiles[key] = profile
+                    print(f"Built shared profile for {type(agent).__name__} using {agent.model_provider} model provider")
+        return profile
+    
+    @classmethod
+    def clear(cls) -> None:
+        """Drop all cached profiles.
+        清除所有缓存的共享配置"""
+        with cls._lock:
+            cls._profiles.clear()
+    
+    def refresh_catalog(self) -> None:
+        """Re-render the tool catalog after the tool library changed.
+        工具库变化后重新渲染工具目录"""
+        view = self.tools.view
+        self.tool_catalog = view.catalog
+        self.tool_block = view.tool_block
+    
+    def render_tools(self, tools: List[Dict[str, str]]) -> str:
+        """Render the "Available tools" block, reusing the cached one when possible.
+        渲染"可用工具"段落，尽可能复用缓存结果"""
+        if tools is self.tool_catalog and self.tool_block:
+            return self.tool_block
+        view = self.tools.view
+        if tools is view.catalog:
+            return view.tool_block
+        if self.tool_block and tools == self.tool_catalog:
+            return self.tool_block
+        block = "Available tools:\n"
+        for tool in tools:
+            block += f"- {tool['name']}: {tool['description']}\n"
+        return block
+
+
+class AgentState:
+    """
+    Mutable per-agent state, created lazily on the first message.
+    每个Agent的可变状态，在处理第一条消息时延迟创建
+    """
+    
+    __slots__ = ("memory", "prompt_prefix")
+    
+    def __init__(self, agent_id: str, role: str, model: ModelProvider):
+        self.memory = MemoryManagerFactory.get_manager(agent_id)
+        if settings.CONTEXT_SUMMARY_ENABLED:
+            # One background summarizer per model provider, shared by all agents
+            # 每个模型提供商一个后台摘要器，由所有Agent共享
+            self.memory.summarizer = ContextSummarizer.shared(model, settings.CONTEXT_SUMMARY_TOKENS)
+        if settings.RETRIEVAL_ENABLED:
+            self.memory.retrieval = RetrievalMemory(
+                agent_id, settings.RETRIEVAL_EMBEDDING_DIM,
+                settings.CHROMA_DB_PATH if settings.RETRIEVAL_PERSIST else None
+            )
+        self.prompt_prefix = _compile_prompt_prefix(role)
+
+
 class BaseAgent(ABC):
     """
     Base class for all agents in the system.
     系统中所有Agent的基类
+    
+    Immutable parts (model provider, tools, tool catalog) live in a shared
+    AgentProfile; memory lives in an AgentState created on first use.
+    不可变部分（模型提供商、工具、工具目录）保存在共享的AgentProfile中；
+    记忆保存在首次使用时创建的AgentState中。
     """
     
+    __slots__ = ("agent_id", "role", "model_provider", "_profile", "_state", "__weakref__")
+    
     def __init__(self, agent_id: str, role: str, model_provider: str = "openai"):
         """
         Initialize the base agent.
@@ -34,13 +167,56 @@ class BaseAgent(ABC):
                         语言模型提供商（默认："openai"）
         """
         self.agent_id = agent_id
-        self.role = role
-        self.model_provider = model_provider
-        self.memory = MemoryManager(agent_id)
-        self.tools = ToolLibrary()
-        self.model = ModelProviderFactory.get_provider(model_provider)
+        self.role = sys.intern(role)
+        self.model_provider = sys.intern(model_provider)
+        self._state: Optional[AgentState] = None
+        self._profile = AgentProfile.for_agent(self)
         print(f"Initialized agent {agent_id} with role: {role} using {model_provider} model provider")
     
+    @property
+    def tools(self) -> ToolLibrary:
+        """Tool library shared by all agents of this kind.
+        同类Agent共享的工具库"""
+        return self._profile.tools
+    
+    @property
+    def model(self) -> ModelProvider:
+        """Model provider shared by all agents of this kind.
+        同类Agent共享的模型提供商"""
+        return self._profile.model
+    
+    @property
+    def memory(self) -> MemoryManager:
+        """Memory manager of this agent, created on first access.
+        此Agent的记忆管理器，首次访问时创建"""
+        return self._get_state().memory
+    
+    @property
+    def has_state(self) -> bool:
+        """Whether the per-agent state has been created yet.
+        是否已创建此Agent的独立状态"""
+        return self._state is not None
+    
+    def _get_state(self) -> AgentState:
+        """Get the per-agent state, creating it lazily.
+        获取Agent的独立状态，必要时延迟创建"""
+        state = self._state
+        if state is None:
+            state = AgentState(self.agent_id, self.role, self._profile.model)
+            self._state = state
+        return state
+    
+    def _register_role_specific_tools(self) -> None:
+        """
+        Register tools specific to this agent class.
+        注册此Agent类特有的工具
+        
+        Called once per shared profile, so implementations must only touch
+        self.tools and not depend on per-instance attributes.
+        每个共享配置只调用一次，实现中只能操作self.tools，不能依赖实例属性。
+        """
+        pass
+    
     @abstractmethod
     def process_message(self, message: Dict[str, Any], session_id: str) -> Dict[str, Any]:
         """
@@ -114,8 +290,18 @@ class BaseAgent(ABC):
             规划提示
         """
         print(f"Creating planning prompt for agent {self.agent_id}")
-        prompt = f"You are {self.role}. "
-        prompt += f"Your goal is to help the user with their request.\n\n"
+        prompt = self._get_state().prompt_prefix
+        
+        summary = getattr(context, "summary", "")
+        if summary:
+            prompt += f"Summary of the earlier conversation:\n{summary}\n\n"
+        relevant = getattr(context, "relevant", ())
+        if relevant:
+            prompt += "Relevant earlier messages:\n"
+            for ctx in relevant:
+                prompt += f"- {ctx.get('content', '')}\n"
+            prompt += "\n"
+        context = getattr(context, "recent", context)
         
         prompt += "Conversation context:\n"
         for i, ctx in enumerate(context[-5:], 1):  # Last 5 messages
@@ -123,15 +309,13 @@ class BaseAgent(ABC):
         
         prompt += f"\nUser message: {message.get('content', '')}\n\n"
         
-        prompt += "Available tools:\n"
-        for tool in tools:
-            prompt += f"- {tool['name']}: {tool['description']}\n"
+        prompt += self._profile.render_tools(tools)
         
         prompt += "\nPlease provide your plan in a structured format. You can use available tools if needed."
         print(f"Planning prompt created for agent {self.agent_id}")
         return prompt
     
-    def _generate_response(self, content: str) -> Dict[str, Any]:
+    def _generate_response(self, content: str) -> Message:
         """
         Generate a standardized response.
         生成标准化响应
@@ -141,15 +325,11 @@ class BaseAgent(ABC):
                  响应内容
             
         Returns:
-            Standardized response dictionary
-            标准化响应字典
+            Immutable response message (use to_dict() for a mutable copy)
+            不可变的响应消息（使用to_dict()获取可变副本）
         """
         print(f"Generating response for agent {self.agent_id}")
-        response = {
-            "role": "assistant",
-            "content": content,
-            "agent_id": self.agent_id
-        }
+        response = Message("assistant", content, self.agent_id)
         print(f"Response generated for agent {self.agent_id}")
         return response
     
@@ -170,11 +350,60 @@ class BaseAgent(ABC):
         """
         print(f"Agent {self.agent_id} using tool: {tool_name}")
         try:
-            result = self.tools.execute(tool_name, parameters)
+            try:
+                result = self.tools.execute(tool_name, parameters)
+            except ToolArgumentError as e:
+                # Give the model the structured errors once and run its corrected call
+                # 将结构化错误反馈给模型一次，并执行其修正后的调用
+                corrected = self._repair_tool_call(tool_name, parameters, e)
+                if corrected is None:
+                    return e.feedback()
+                result = self.tools.execute(tool_name, corrected)
             print(f"Tool {tool_name} executed successfully by agent {self.agent_id}")
             return result
+        except ToolArgumentError as e:
+            logger.error(f"Invalid arguments for tool {tool_name} by agent {self.agent_id}: {str(e)}")
+            return e.feedback()
         except Exception as e:
             logger.error(f"Error executing tool {tool_name} by agent {self.agent_id}: {str(e)}")
             return {
                 "error": f"Error executing tool {tool_name}: {str(e)}"
-            }
\ No newline at end of file
+            }
+    
+    def _repair_tool_call(self, tool_name: str, parameters: Dict[str, Any],
+                          error: ToolArgumentError) -> Optional[Dict[str, Any]]:
+        """
+        Ask the model to correct a tool call that failed validation.
+        请模型修正未通过校验的工具调用
+        
+        Args:
+            tool_name: Name of the tool
+                   工具名称
+            parameters: Rejected parameters
+                    被拒绝的参数
+            error: Validation error with the structured problems
+               包含结构化问题的校验错误
+            
+        Returns:
+            Corrected parameters, or None if the model did not return a JSON object
+            修正后的参数；模型未返回JSON对象时为None
+        """
+        schema = self.tools.registry.schema(self.tools.tools[tool_name])
+        prompt = (f"{self._get_state().prompt_prefix}"
+                  f"Your call to the tool {tool_name} was rejected.\n"
+                  f"Arguments: {json.dumps(parameters, ensure_ascii=False, default=str)}\n"
+                  f"Errors: {json.dumps(error.errors, ensure_ascii=False)}\n"
+                  f"Parameter schema: {json.dumps(schema['parameters'], ensure_ascii=False, default=str)}\n\n"
+                  "Reply with only the corrected arguments as a JSON object.")
+        reply = self.model.generate(prompt, max_tokens=300)
+        start, end = reply.find("{"), reply.rfind("}")
+        if start < 0 or end < start:
+            return None
+        try:
+            corrected = json.loads(reply[start:end + 1])
+        except ValueError:
+            return None
+        if not isinstance(corrected, dict):
+            return None
+        print(f"Agent {self.agent_id} retrying tool {tool_name} with corrected arguments")
+        return corrected
\ No newline at end of file
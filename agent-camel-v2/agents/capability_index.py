@@ -0,0 +1,175 @@
+"""
+Capability index for agent discovery in Agent-Camel V2.
+Agent-Camel V2中用于发现Agent的能力索引
+
+An inverted index from capability to the agents that have it, with a
+weight per (capability, agent) for how good the agent is at it. Finding the
+agents that have every required capability is an intersection of their
+posting sets, starting from the rarest capability, so its cost depends on
+how many agents have that capability and not on how many agents exist.
+从能力到具备该能力的Agent的倒排索引，每个(能力, Agent)带有表示熟练程度的权重。
+查找具备全部所需能力的Agent即求各能力倒排集合的交集，从最稀有的能力开始，
+因此开销取决于具备该能力的Agent数量，而不是Agent总数。
+"""
+from typing import Dict, Iterable, List, Mapping, Tuple, Union
+import itertools
+import logging
+
+# 设置日志记录
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# Capabilities as a list (weight 1.0 each) or a mapping of capability to weight
+# 能力可以是列表（每项权重为1.0），也可以是能力到权重的映射
+Capabilities = Union[Iterable[str], Mapping[str, float]]
+
+
+def _weights(capabilities: Capabilities) -> Dict[str, float]:
+    if isinstance(capabilities, Mapping):
+        return {capability: float(weight) for capability, weight in capabilities.items()}
+    return {capability: 1.0 for capability in capabilities}
+
+
+class CapabilityIndex:
+    """
+    Inverted index: capability -> {agent_id: weight}.
+    倒排索引：能力 -> {agent_id: 权重}
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._agents: Dict[str, Dict[str, float]] = {}  # Forward index / 正排索引
+        self._order: Dict[str, int] = {}  # Registration order, for stable ranking / 注册顺序，用于稳定排序
+        self._sequence = itertools.count()
+        # Ranked agents per capability for single-capability queries, dropped when the capability changes
+        # 单能力查询按能力缓存的排序结果，该能力变化时丢弃
+        self._ranked: Dict[str, List[Tuple[str, float]]] = {}
+
+    def add(self, agent_id: str, capabilities: Capabilities) -> None:
+        """
+        Index an agent's capabilities, replacing any earlier entry for it.
+        索引Agent的能力，替换其之前的条目
+
+        Args:
+            agent_id: Agent identifier
+                  Agent标识符
+            capabilities: Capability names, or a mapping of capability to weight
+                      能力名称列表，或能力到权重的映射
+        """
+        if agent_id in self._agents:
+            self.remove(agent_id)
+        weights = _weights(capabilities)
+        self._agents[agent_id] = weights
+        self._order[agent_id] = next(self._sequence)
+        for capability, weight in weights.items():
+            self._ranked.pop(capability, None)
+            postings = self._postings.get(capability)
+            if postings is None:
+                postings = self._postings[capability] = {}
+            postings[agent_id] = weight
+
+    def remove(self, agent_id: str) -> None:
+        """Drop an agent from the index.
+        从索引中移除Agent"""
+        weights = self._agents.pop(agent_id, None)
+        if weights is None:
+            return
+        del self._order[agent_id]
+        for capability in weights:
+            self._ranked.pop(capability, None)
+            postings = self._postings[capability]
+            del postings[agent_id]
+            if not postings:
+                del self._postings[capability]
+
+    def capabilities(self, agent_id: str) -> Dict[str, float]:
+        """Capabilities of an agent with their weights.
+        Agent的能力及其权重"""
+        return self._agents.get(agent_id, {})
+
+    def agents_with(self, capability: str) -> Dict[str, float]:
+        """Agents that have a capability, with their weights.
+        具备某项能力的Agent及其权重"""
+        return self._postings.get(capability, {})
+
+    def match(self, required: Iterable[str] = (), preferred: Iterable[str] = ()) -> List[Tuple[str, float]]:
+        """
+        Find agents with all required capabilities, best first.
+        查找具备全部所需能力的Agent，按匹配程度从高到低排列
+
+        The score is the sum of the agent's weights for the required
+        capabilities and for whichever preferred ones it has. Ties keep
+        registration order. With no required capabilities every agent matches.
+        得分为Agent在所需能力及其具备的优选能力上的权重之和。得分相同时保持注册顺序。
+        没有所需能力时，所有Agent都匹配。
+
+        Args:
+            required: Capabilities an agent must all have
+                  Agent必须全部具备的能力
+            preferred: Capabilities that raise the score but are not required
+                   能提高得分但不是必需的能力
+
+        Returns:
+            (agent_id, score) pairs
+            (agent_id, 得分)对
+        """
+        required = list(dict.fromkeys(required))
+        preferred = [self._postings[capability] for capability in dict.fromkeys(preferred)
+                     if capability in self._postings]
+        order = self._order
+        if not required:
+            if not preferred:
+                return [(agent_id, 0.0) for agent_id in self._agents]
+            # Only agents with a preferred capability score above zero; the rest follow in registration order
+            # 只有具备优选能力的Agent得分大于零，其余按注册顺序排在后面
+            scores: Dict[str, float] = {}
+            for posting in preferred:
+                for agent_id, weight in posting.items():
+                    if weight:
+                        scores[agent_id] = scores.get(agent_id, 0.0) + weight
+            ranked = sorted((-score, order[agent_id], agent_id) for agent_id, score in scores.items())
+            return ([(agent_id, -score) for score, _, agent_id in ranked]
+                    + [(agent_id, 0.0) for agent_id in self._agents if agent_id not in scores])
+
+        if len(required) == 1 and not preferred:
+            cached = self._ranked.get(required[0])
+            if cached is not None:
+                return list(cached)
+        postings = [self._postings.get(capability) for capability in required]
+        if not all(postings):
+            return []
+        by_size = sorted(postings, key=len)
+        candidates = by_size[0].keys()
+        for other in by_size[1:]:
+            candidates = candidates & other.keys()  # C-level set intersection / C层面的集合交集
+            if not candidates:
+                return []
+        ranked = []
+        for agent_id in candidates:
+            score = 0.0
+            for posting in postings:
+                score += posting[agent_id]
+            for posting in preferred:
+                score += posting.get(agent_id, 0.0)
+            ranked.append((-score, order[agent_id], agent_id))
+        ranked.sort()
+        result = [(agent_id, -score) for score, _, agent_id in ranked]
+        if len(required) == 1 and not preferred:
+            self._ranked[required[0]] = result
+            return list(result)
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        """Get index statistics.
+        获取索引统计信息"""
+        return {
+            "agents": len(self._agents),
+            "capabilities": len(self._postings),
+            "postings": sum(len(postings) for postings in self._postings.values()),
+        }
+
+    def __len__(self) -> int:
+        return len(self._agents)
+
+    def __contains__(self, agent_id: str) -> bool:
+        return agent_id in self._agents
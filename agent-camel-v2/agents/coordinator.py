@@ -2,10 +2,19 @@
 Task Coordinator for Agent-Camel V2.
 Agent-Camel V2的任务协调器
 """
-from typing import Dict, Any, List, Optional
+from concurrent.futures import ThreadPoolExecutor, Future, TimeoutError as FutureTimeoutError
+from typing import Dict, Any, List, Optional, Tuple, Union
+import threading
+import time
 import uuid
 import logging
 from agents.base import BaseAgent
+from agents.capability_index import CapabilityIndex, Capabilities
+from agents.scheduler import TaskScheduler
+from agents.selection import AgentLoad, SelectionPolicy, make_policy
+from config.settings import settings
+from memory.records import Message
+from tools.calculator import extract_expression
 
 # 设置日志记录
 logging.basicConfig(level=logging.DEBUG)
@@ -16,6 +25,8 @@ class TravelPlannerAgent(BaseAgent):
     """Travel planner agent implementation.
     旅行规划Agent实现"""
     
+    __slots__ = ()
+    
     def __init__(self, agent_id: str, model_provider: str = "openai"):
         super().__init__(
             agent_id=agent_id,
@@ -30,6 +41,8 @@ class TravelPlannerAgent(BaseAgent):
         # 1. Update context
         # 1. 更新上下文
         print(f"Updating context for session {session_id}")
+        message = Message.from_dict(message)  # One record for the context and the interaction history
+                                              # 上下文和交互历史共用同一条记录
         self.memory.update_context(session_id, message)
         
         # 2. Plan next action
@@ -56,7 +69,7 @@ class TravelPlannerAgent(BaseAgent):
         """Plan the next action.
         规划下一个动作"""
         print(f"TravelPlannerAgent {self.agent_id} planning next action for session {session_id}")
-        context = self.memory.get_context(session_id)
+        context = self.memory.get_context(session_id, query=message.get("content", ""))
         tools = self.tools.get_available_tools()
         print(f"TravelPlannerAgent Retrieved context with {len(context)} messages and {len(tools)} tools for session {session_id}")
         
@@ -75,12 +88,13 @@ class TravelPlannerAgent(BaseAgent):
                     "query": message.get("content", "")
                 }
             }
-        elif "calculate" in plan_text.lower() or "budget" in plan_text.lower():
+        elif (("calculate" in plan_text.lower() or "budget" in plan_text.lower()) and
+              (expression := extract_expression(message.get("content", ""))) is not None):
             return {
                 "action": "use_tool",
                 "tool_name": "calculator",
                 "parameters": {
-                    "expression": "placeholder calculation"
+                    "expression": expression
                 }
             }
         else:
@@ -116,6 +130,8 @@ class LocalGuideAgent(BaseAgent):
     """Local guide agent implementation.
     当地向导Agent实现"""
     
+    __slots__ = ()
+    
     def __init__(self, agent_id: str, model_provider: str = "openai"):
         super().__init__(
             agent_id=agent_id,
@@ -130,6 +146,8 @@ class LocalGuideAgent(BaseAgent):
         # 1. Update context
         # 1. 更新上下文
         print(f"LocalGuideAgent Updating context for session {session_id}")
+        message = Message.from_dict(message)  # One record for the context and the interaction history
+                                              # 上下文和交互历史共用同一条记录
         self.memory.update_context(session_id, message)
         
         # 2. Plan next action
@@ -156,7 +174,7 @@ class LocalGuideAgent(BaseAgent):
         """Plan the next action.
         规划下一个动作"""
         print(f"LocalGuideAgent {self.agent_id} planning next action for session {session_id}")
-        context = self.memory.get_context(session_id)
+        context = self.memory.get_context(session_id, query=message.get("content", ""))
         tools = self.tools.get_available_tools()
         print(f"LocalGuideAgent Retrieved context with {len(context)} messages and {len(tools)} tools for session {session_id}")
         
@@ -208,6 +226,8 @@ class BudgetAdvisorAgent(BaseAgent):
     """Budget advisor agent implementation.
     预算顾问Agent实现"""
     
+    __slots__ = ()
+    
     def __init__(self, agent_id: str, model_provider: str = "openai"):
         super().__init__(
             agent_id=agent_id,
@@ -222,6 +242,8 @@ class BudgetAdvisorAgent(BaseAgent):
         # 1. Update context
         # 1. 更新上下文
         print(f"BudgetAdvisorAgent Updating context for session {session_id}")
+        message = Message.from_dict(message)  # One record for the context and the interaction history
+                                              # 上下文和交互历史共用同一条记录
         self.memory.update_context(session_id, message)
         
         # 2. Plan next action
@@ -248,7 +270,7 @@ class BudgetAdvisorAgent(BaseAgent):
         """Plan the next action.
         规划下一个动作"""
         print(f"BudgetAdvisorAgent {self.agent_id} planning next action for session {session_id}")
-        context = self.memory.get_context(session_id)
+        context = self.memory.get_context(session_id, query=message.get("content", ""))
         tools = self.tools.get_available_tools()
         print(f"BudgetAdvisorAgent Retrieved context with {len(context)} messages and {len(tools)} tools for session {session_id}")
         
@@ -259,12 +281,15 @@ class BudgetAdvisorAgent(BaseAgent):
         
         # Try to parse the plan to determine if tools should be used
         # 尝试解析计划以确定是否应使用工具
-        if "calculate" in plan_text.lower() or "budget" in message.get("content", "").lower():
+        # Calculate whenever the message contains an arithmetic expression
+        # 只要消息中包含算术表达式就进行计算
+        expression = extract_expression(message.get("content", ""))
+        if expression is not None:
             return {
                 "action": "use_tool",
                 "tool_name": "calculator",
                 "parameters": {
-                    "expression": "placeholder calculation for " + message.get("content", "")
+                    "expression": expression
                 }
             }
         elif "search" in plan_text.lower():
@@ -308,20 +333,60 @@ class TaskCoordinator:
     """
     Task coordinator responsible for assigning tasks and managing agent collaboration.
     任务协调器，负责分配任务和管理Agent协作
+    
+    Tasks given to different agents can run concurrently (execute_tasks);
+    tasks given to the same agent run one at a time, because an agent's
+    memory of a session must see its messages in order.
+    分配给不同Agent的任务可以并发执行（execute_tasks）；分配给同一Agent的任务
+    依次执行，因为Agent对会话的记忆必须按顺序看到消息。
     """
     
-    def __init__(self):
-        """Initialize the task coordinator.
-        初始化任务协调器"""
+    # Worker threads shared by all coordinators; tasks mostly wait on model calls
+    # 所有协调器共享的工作线程；任务大部分时间在等待模型调用
+    _shared_pool: Optional[ThreadPoolExecutor] = None
+    _shared_lock = threading.Lock()
+    
+    def __init__(self, selection_policy: Union[str, SelectionPolicy, None] = None):
+        """
+        Initialize the task coordinator.
+        初始化任务协调器
+        
+        Args:
+            selection_policy: How to choose among suitable agents: "first",
+                          "least_outstanding", "power_of_two", "session_affinity"
+                          or a SelectionPolicy (default: AGENT_SELECTION_POLICY)
+                          如何在合适的Agents中选择："first"、"least_outstanding"、
+                          "power_of_two"、"session_affinity"或SelectionPolicy实例
+                          （默认为AGENT_SELECTION_POLICY）
+        """
         self.agents: Dict[str, BaseAgent] = {}  # Registered agents
                                     # 已注册的Agents
         self.task_queue: List[Dict[str, Any]] = []   # Task queue
                                          # 任务队列
         self.sessions: Dict[str, Dict[str, Any]] = {}  # Session management
                                            # 会话管理
+        self._agent_locks: Dict[str, threading.Lock] = {}  # One task at a time per agent
+                                                # 每个Agent同一时间只执行一个任务
+        self.task_durations: Dict[str, float] = {}  # Average seconds per task type, for scheduling
+                                         # 每种任务类型的平均耗时（秒），用于调度
+        self.capability_index = CapabilityIndex()  # Capability -> agents, for discovery
+                                        # 能力 -> Agents，用于发现Agent
+        self.selection_policy = make_policy(selection_policy)
+        self.load = AgentLoad()  # Outstanding tasks and latency per agent
+                                 # 每个Agent的未完成任务数和耗时
         print("Initialized TaskCoordinator")
     
-    def register_agent(self, agent_id: str, agent_type: str, capabilities: List[str], 
+    @classmethod
+    def _pool(cls) -> ThreadPoolExecutor:
+        """Get the worker pool shared by all coordinators, creating it on first use.
+        获取所有协调器共享的工作线程池，首次使用时创建"""
+        with cls._shared_lock:
+            if cls._shared_pool is None:
+                cls._shared_pool = ThreadPoolExecutor(max_workers=settings.TASK_WORKERS,
+                                                      thread_name_prefix="task-coordinator")
+            return cls._shared_pool
+    
+    def register_agent(self, agent_id: str, agent_type: str, capabilities: Capabilities, 
                       model_provider: str = "openai") -> None:
         """
         Register an agent with the coordinator.
@@ -332,8 +397,9 @@ class TaskCoordinator:
                   Agent的唯一标识符
             agent_type: Type of the agent
                     Agent的类型
-            capabilities: List of agent capabilities
-                      Agent的能力列表
+            capabilities: List of agent capabilities, or a mapping of capability to
+                      weight (how good the agent is at it, default 1.0)
+                      Agent的能力列表，或能力到权重（熟练程度，默认为1.0）的映射
             model_provider: Model provider for the agent
                         Agent的模型提供商
         """
@@ -356,18 +422,27 @@ class TaskCoordinator:
             logger.warning(f"Unknown agent type {agent_type}, defaulting to TravelPlannerAgent")
         
         self.agents[agent_id] = agent
+        self._agent_locks[agent_id] = threading.Lock()
+        self.capability_index.add(agent_id, capabilities)
         print(f"Registered agent {agent_id} of type {agent_type}")
     
-    def assign_task(self, task: Dict[str, Any], requirements: Dict[str, Any]) -> Optional[str]:
+    def assign_task(self, task: Dict[str, Any], requirements: Dict[str, Any],
+                    session_id: Optional[str] = None) -> Optional[str]:
         """
         Assign a task to a suitable agent.
         将任务分配给合适的Agent
         
+        The task counts towards the agent's outstanding tasks until
+        execute_task finishes it.
+        在execute_task执行完之前，该任务计入Agent的未完成任务数。
+        
         Args:
             task: Task to be assigned
               要分配的任务
             requirements: Task requirements
                       任务需求
+            session_id: Session the task belongs to (used by session affinity)
+                    任务所属的会话（会话亲和策略使用）
             
         Returns:
             Agent ID if successfully assigned, None otherwise
@@ -386,7 +461,7 @@ class TaskCoordinator:
         
         # Select the best agent for the task
         # 为任务选择最佳的Agent
-        selected_agent = self._select_best_agent(suitable_agents, task)
+        selected_agent = self._select_best_agent(suitable_agents, task, session_id)
         print(f"Selected agent {selected_agent} for task")
         return self._dispatch_task(selected_agent, task)
     
@@ -399,69 +474,44 @@ class TaskCoordinator:
             requirements: Task requirements
                       任务需求
             
+        An agent is suitable if it has every capability in
+        requirements["capabilities"]; agents are ranked by their weights for
+        those and for requirements["preferred_capabilities"].
+        具备requirements["capabilities"]中全部能力的Agent才合适；按其在这些能力及
+        requirements["preferred_capabilities"]上的权重排序。
+        
         Returns:
-            List of suitable agent IDs
-            合适的Agent ID列表
+            List of suitable agent IDs, best match first
+            合适的Agent ID列表，最匹配的在前
         """
         print(f"Finding suitable agents for requirements: {requirements}")
-        suitable_agents = []
-        for agent_id, agent in self.agents.items():
-            # For simplicity, we're just checking if the agent exists
-            # 为简单起见，我们只是检查Agent是否存在
-            # In a more complex implementation, we would check capabilities
-            # 在更复杂的实现中，我们会检查能力
-            suitable_agents.append(agent_id)
-        print(f"Found suitable agents: {suitable_agents}")
+        ranked = self.capability_index.match(requirements.get('capabilities', ()),
+                                             requirements.get('preferred_capabilities', ()))
+        suitable_agents = [agent_id for agent_id, _ in ranked]
+        print(f"Found {len(suitable_agents)} suitable agents, best: {ranked[:3]}")
         return suitable_agents
     
-    def _matches_requirements(self, capabilities: List[str], requirements: Dict[str, Any]) -> bool:
+    def _select_best_agent(self, suitable_agents: List[str], task: Dict[str, Any],
+                           session_id: Optional[str] = None) -> str:
         """
-        Check if agent capabilities match the requirements.
-        检查Agent能力是否符合需求
+        Select the best agent from suitable agents with the coordinator's selection policy.
+        使用协调器的选择策略从合适的Agents中选择最佳的Agent
         
         Args:
-            capabilities: Agent capabilities
-                      Agent能力
-            requirements: Task requirements
-                      任务需求
-            
-        Returns:
-            True if capabilities match requirements, False otherwise
-            如果能力符合需求则返回True，否则返回False
-        """
-        print(f"Checking if capabilities {capabilities} match requirements {requirements}")
-        # Simple implementation - check if any required capability is in agent capabilities
-        # 简单实现 - 检查是否有任何所需能力在Agent能力中
-        required_capabilities = requirements.get('capabilities', [])
-        if not required_capabilities:
-            print("No specific capabilities required")
-            return True
-            
-        match = any(cap in capabilities for cap in required_capabilities)
-        print(f"Capabilities match: {match}")
-        return match
-    
-    def _select_best_agent(self, suitable_agents: List[str], task: Dict[str, Any]) -> str:
-        """
-        Select the best agent from suitable agents.
-        从合适的Agents中选择最佳的Agent
-        
-        Args:
-            suitable_agents: List of suitable agent IDs
-                         合适的Agent ID列表
+            suitable_agents: List of suitable agent IDs, best capability match first
+                         合适的Agent ID列表，能力最匹配的在前
             task: Task to be assigned
               要分配的任务
+            session_id: Session the task belongs to
+                    任务所属的会话
             
         Returns:
             Selected agent ID
             选定的Agent ID
         """
-        print(f"Selecting best agent from {suitable_agents} for task")
-        # Simple implementation - select the first suitable agent
-        # 简单实现 - 选择第一个合适的Agent
-        # In a more complex system, this could consider agent workload, expertise, etc.
-        # 在更复杂的系统中，这可以考虑Agent的工作负载、专业等
-        selected = suitable_agents[0] if suitable_agents else None
+        print(f"Selecting best agent from {len(suitable_agents)} suitable agents for task "
+              f"({self.selection_policy.name})")
+        selected = self.selection_policy.select(suitable_agents, self.load, session_id) if suitable_agents else None
         print(f"Selected agent: {selected}")
         return selected
     
@@ -490,6 +540,7 @@ class TaskCoordinator:
             'status': 'assigned'
         }
         self.task_queue.append(task_entry)
+        self.load.reserve(agent_id)
         print(f"Task added to queue with ID {task_entry['id']}")
         
         return agent_id
@@ -523,16 +574,19 @@ class TaskCoordinator:
         
         # Create a message from the task
         # 从任务创建消息
-        message = {
-            "role": "user",
-            "content": task.get("description", "Please help with this task")
-        }
+        message = Message("user", task.get("description", "Please help with this task"))
         print(f"Created message from task: {message['content']}")
         
         # Process the message with the agent
         # 使用Agent处理消息
         print(f"Processing message with agent {agent_id}")
-        result = agent.process_message(message, session_id)
+        self.load.begin(agent_id)
+        with self._agent_locks[agent_id]:
+            started = time.monotonic()
+            try:
+                result = agent.process_message(message, session_id)
+            finally:
+                self.load.finish(agent_id, time.monotonic() - started)
         print(f"Task execution completed with agent {agent_id} in session {session_id}")
         
         return {
@@ -542,6 +596,120 @@ class TaskCoordinator:
             "details": result
         }
     
+    def execute_tasks(self, tasks: List[Tuple[str, Dict[str, Any]]], session_id: str,
+                      timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Execute independent tasks concurrently and collect whatever finishes in time.
+        并发执行相互独立的任务，并收集按时完成的结果
+        
+        Each task gets its own deadline (task["timeout"], else `timeout`, else
+        TASK_TIMEOUT), counted from the call. A task that fails or misses its
+        deadline does not hold up the others: its entry carries "status"
+        "failed" or "timeout" and an "error" instead of a "result". A task
+        that times out keeps running in the background, but its result is
+        discarded.
+        每个任务有自己的截止时间（task["timeout"]，否则为timeout参数，再否则为TASK_TIMEOUT），
+        从调用时开始计算。失败或超时的任务不会拖住其他任务：其结果条目的"status"为
+        "failed"或"timeout"，并带有"error"而不是"result"。超时的任务仍会在后台运行完，
+        但其结果被丢弃。
+        
+        Args:
+            tasks: (agent_id, task) pairs, e.g. from assign_task
+               (agent_id, task)对，例如来自assign_task
+            session_id: Session identifier
+                    会话标识符
+            timeout: Default per-task timeout in seconds
+                 默认的单任务超时时间（秒）
+            
+        Returns:
+            One entry per task, in the order given, with "status" and "elapsed"
+            每个任务一个结果条目，顺序与输入一致，包含"status"和"elapsed"
+        """
+        print(f"Executing {len(tasks)} tasks concurrently in session {session_id}")
+        if timeout is None:
+            timeout = settings.TASK_TIMEOUT
+        started = time.monotonic()
+        pool = self._pool()
+        futures: List[Future] = [
+            pool.submit(self._run_task, agent_id, task, session_id, started)
+            for agent_id, task in tasks
+        ]
+        
+        results: List[Dict[str, Any]] = []
+        for (agent_id, task), future in zip(tasks, futures):
+            task_timeout = task.get("timeout", timeout)
+            remaining = None if task_timeout is None else max(0.0, started + task_timeout - time.monotonic())
+            try:
+                result = future.result(remaining)
+            except FutureTimeoutError:
+                if future.cancel():  # Only succeeds if the task has not started yet / 仅当任务尚未开始时才能取消
+                    self.load.release(agent_id)
+                logger.warning(f"Task {task.get('type')} on agent {agent_id} timed out after {task_timeout}s")
+                result = {
+                    "agent_id": agent_id,
+                    "task_type": task.get("type"),
+                    "status": "timeout",
+                    "error": f"Task timed out after {task_timeout}s",
+                    "elapsed": time.monotonic() - started,
+                }
+            except Exception as e:
+                logger.error(f"Task {task.get('type')} on agent {agent_id} failed: {str(e)}")
+                result = {
+                    "agent_id": agent_id,
+                    "task_type": task.get("type"),
+                    "status": "failed",
+                    "error": str(e),
+                    "elapsed": time.monotonic() - started,
+                }
+            results.append(result)
+        
+        completed = sum(result["status"] == "completed" for result in results)
+        print(f"Executed tasks in session {session_id}: {completed}/{len(tasks)} completed "
+              f"in {time.monotonic() - started:.2f}s")
+        return results
+    
+    def _run_task(self, agent_id: str, task: Dict[str, Any], session_id: str, started: float) -> Dict[str, Any]:
+        """Run one task on a worker thread for execute_tasks.
+        在工作线程上为execute_tasks执行一个任务"""
+        result = self.execute_task(agent_id, task, session_id)
+        if "error" in result:
+            raise RuntimeError(result["error"])
+        result["status"] = "completed"
+        result["elapsed"] = time.monotonic() - started
+        return result
+    
+    def execute_graph(self, tasks: List[Dict[str, Any]], session_id: str, timeout: Optional[float] = None,
+                      max_concurrency: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Execute tasks with dependencies, running every ready task concurrently.
+        执行带依赖关系的任务，所有就绪任务并发执行
+        
+        A task lists the ids (default: type) of the tasks it needs in
+        task["inputs"]; their results are passed into its prompt. When tasks
+        compete for workers or agents, those on the critical path go first.
+        See agents/scheduler.py.
+        任务在task["inputs"]中列出所需任务的ID（默认为type），这些任务的结果会传入其提示。
+        任务争用工作线程或Agent时，关键路径上的任务优先。详见agents/scheduler.py。
+        
+        Args:
+            tasks: Tasks, e.g. analyze_request(...)["tasks"]
+               任务列表，例如analyze_request(...)["tasks"]
+            session_id: Session identifier
+                    会话标识符
+            timeout: Default per-task timeout in seconds, counted from the task's start
+                 (default: TASK_TIMEOUT)
+                 默认的单任务超时时间（秒），从任务开始时计算（默认为TASK_TIMEOUT）
+            max_concurrency: Most tasks running at once (default: unlimited)
+                         同时运行的最大任务数（默认不限）
+            
+        Returns:
+            {"results": {task_id: result}, "timeline": [...], "critical_path": [...], "elapsed": seconds}
+            结果、执行时间线、关键路径和总耗时
+        """
+        if timeout is None:
+            timeout = settings.TASK_TIMEOUT
+        return TaskScheduler(self, max_concurrency).run(tasks, session_id, timeout)
+    
     def analyze_request(self, user_request: str) -> Dict[str, Any]:
         """
         Analyze user request and break it down into tasks.
@@ -572,6 +740,7 @@ class TaskCoordinator:
                 {
                     "type": "local_guidance",
                     "description": f"Provide local guidance for: {user_request}",
+                    "inputs": ["destination_planning"],
                     "requirements": {
                         "capabilities": ["local_knowledge"]
                     }
@@ -579,6 +748,7 @@ class TaskCoordinator:
                 {
                     "type": "budget_planning",
                     "description": f"Create a budget plan for: {user_request}",
+                    "inputs": ["destination_planning"],
                     "requirements": {
                         "capabilities": ["cost_estimation"]
                     }
@@ -7,7 +7,8 @@ Agent-Camel V2的模型提供商。
 import openai
 import requests
 import json
-from typing import Dict, Any, Optional
+import threading
+from typing import Dict, Any, Optional, Type
 from config.settings import settings
 
 # 导入comet监控器
@@ -132,6 +133,49 @@ class ModelProviderFactory:
     """Factory for creating model providers.
     创建模型提供商的工厂类"""
     
+    # Extra providers registered at runtime (e.g. stub providers for benchmarks)
+    # 运行时注册的额外提供商（例如基准测试使用的桩提供商）
+    _registry: Dict[str, Type[ModelProvider]] = {}
+    # Shared provider instances, one per provider name
+    # 共享的提供商实例，每个提供商名称一个
+    _shared: Dict[str, ModelProvider] = {}
+    _lock = threading.Lock()
+    
+    @classmethod
+    def register_provider(cls, provider_name: str, provider_class: Type[ModelProvider]) -> None:
+        """
+        Register an additional provider class under a name.
+        以指定名称注册额外的提供商类
+        
+        Args:
+            provider_name: Name used to look the provider up
+                       用于查找提供商的名称
+            provider_class: ModelProvider subclass to instantiate
+                        要实例化的ModelProvider子类
+        """
+        cls._registry[provider_name.lower()] = provider_class
+        cls._shared.pop(provider_name.lower(), None)
+    
+    @classmethod
+    def get_shared_provider(cls, provider_name: str) -> ModelProvider:
+        """
+        Get a process-wide shared provider instance by name.
+        根据名称获取进程内共享的提供商实例
+        
+        Providers hold only a client and configuration, so one instance can
+        serve every agent that uses the same provider.
+        提供商只持有客户端和配置，同一提供商的所有Agent可以共用一个实例。
+        """
+        key = provider_name.lower()
+        provider = cls._shared.get(key)
+        if provider is None:
+            with cls._lock:
+                provider = cls._shared.get(key)
+                if provider is None:
+                    provider = cls.get_provider(provider_name)
+                    cls._shared[key] = provider
+        return provider
+    
     @staticmethod
     def get_provider(provider_name: str) -> ModelProvider:
         """
@@ -146,6 +190,9 @@ class ModelProviderFactory:
             ModelProvider instance
             ModelProvider实例
         """
+        registered = ModelProviderFactory._registry.get(provider_name.lower())
+        if registered is not None:
+            return registered()
         if provider_name.lower() == "openai":
             return OpenAIProvider()
         elif provider_name.lower() == "ollama":
@@ -0,0 +1,326 @@
+"""
+Dependency-aware task scheduler for Agent-Camel V2.
+Agent-Camel V2的依赖感知任务调度器
+
+Tasks form a DAG: a task lists the ids of the upstream tasks whose results
+it needs in task["inputs"]. Every task whose inputs are done is ready, and
+ready tasks run concurrently. When more tasks are ready than can run (the
+concurrency limit, or their agent is busy), the one with the longest
+remaining path to the end of the plan goes first (critical-path / upward
+rank priority), so the plan's makespan is not stretched by side branches.
+Upstream results are appended to the downstream task's description, which
+becomes the prompt the agent sees.
+任务构成有向无环图：任务在task["inputs"]中列出所需上游任务的ID。所有输入都已完成的任务
+即为就绪任务，就绪任务并发执行。当就绪任务多于可运行的数量（并发上限，或其Agent正忙）时，
+到计划结束剩余路径最长的任务优先（关键路径/向上排名优先级），避免旁支拉长整个计划的完成时间。
+上游结果会附加到下游任务的描述中，即Agent看到的提示。
+"""
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+from typing import Dict, Any, List, Optional, Set, TYPE_CHECKING
+import heapq
+import itertools
+import logging
+import time
+
+if TYPE_CHECKING:
+    from agents.coordinator import TaskCoordinator
+
+# 设置日志记录
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# Longest upstream result passed into a downstream prompt, in characters
+# 传入下游提示的单个上游结果的最大长度（字符数）
+MAX_UPSTREAM_CHARS = 2000
+
+# Weight of the newest duration in the per-task-type moving average
+# 按任务类型统计的滑动平均中最新耗时的权重
+DURATION_EWMA_ALPHA = 0.3
+
+
+class TaskGraph:
+    """
+    A validated task DAG with critical-path priorities.
+    经过验证、带关键路径优先级的任务有向无环图
+    """
+
+    __slots__ = ("tasks", "order", "children", "rank")
+
+    def __init__(self, tasks: List[Dict[str, Any]], estimates: Optional[Dict[str, float]] = None):
+        """
+        Build and validate the graph.
+        构建并验证任务图
+
+        Args:
+            tasks: Tasks with an optional "id" (defaults to "type"), "inputs"
+               (upstream task ids) and "estimate" (expected seconds)
+               任务，可包含"id"（默认为"type"）、"inputs"（上游任务ID）和"estimate"（预计耗时秒数）
+            estimates: Expected seconds by task type, for tasks without "estimate"
+                   按任务类型给出的预计耗时，用于没有"estimate"的任务
+
+        Raises:
+            ValueError: Duplicate ids, unknown inputs or a dependency cycle
+                    ID重复、输入未知或存在循环依赖
+        """
+        self.tasks: Dict[str, Dict[str, Any]] = {}
+        for task in tasks:
+            task_id = task.get("id") or task.get("type")
+            if not task_id:
+                raise ValueError(f"Task has neither id nor type: {task}")
+            if task_id in self.tasks:
+                raise ValueError(f"Duplicate task id: {task_id}")
+            self.tasks[task_id] = task
+        self.children: Dict[str, List[str]] = {task_id: [] for task_id in self.tasks}
+        for task_id, task in self.tasks.items():
+            for upstream in task.get("inputs", ()):
+                if upstream not in self.tasks:
+                    raise ValueError(f"Task {task_id} depends on unknown task {upstream}")
+                self.children[upstream].append(task_id)
+
+        # Kahn's algorithm: a topological order, or a cycle
+        # Kahn算法：得到拓扑序，或发现循环
+        pending = {task_id: len(task.get("inputs", ())) for task_id, task in self.tasks.items()}
+        self.order: List[str] = [task_id for task_id, count in pending.items() if not count]
+        for task_id in self.order:
+            for child in self.children[task_id]:
+                pending[child] -= 1
+                if not pending[child]:
+                    self.order.append(child)
+        if len(self.order) != len(self.tasks):
+            cycle = sorted(task_id for task_id, count in pending.items() if count)
+            raise ValueError(f"Dependency cycle among tasks: {cycle}")
+
+        # Upward rank: own estimate plus the longest chain below it
+        # 向上排名：自身预计耗时加上其下游最长链
+        # Task types never seen before are assumed to take as long as the average known one
+        # 从未见过的任务类型，假定其耗时等于已知类型的平均值
+        estimates = estimates or {}
+        default = sum(estimates.values()) / len(estimates) if estimates else 1.0
+        self.rank: Dict[str, float] = {}
+        for task_id in reversed(self.order):
+            task = self.tasks[task_id]
+            cost = task.get("estimate", estimates.get(task.get("type"), default))
+            self.rank[task_id] = cost + max((self.rank[child] for child in self.children[task_id]), default=0.0)
+
+    def critical_path(self) -> List[str]:
+        """The chain of tasks that bounds the plan's duration.
+        决定整个计划耗时的任务链"""
+        path: List[str] = []
+        candidates = [task_id for task_id in self.order if not self.tasks[task_id].get("inputs")]
+        while candidates:
+            task_id = max(candidates, key=self.rank.__getitem__)
+            path.append(task_id)
+            candidates = self.children[task_id]
+        return path
+
+    def __len__(self) -> int:
+        return len(self.tasks)
+
+
+def with_upstream_results(task: Dict[str, Any], results: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Copy of a task whose description carries the results of its inputs.
+    复制任务，并在描述中附上其输入任务的结果
+    """
+    inputs = task.get("inputs", ())
+    if not inputs:
+        return task
+    sections = []
+    for upstream in inputs:
+        text = str(results[upstream].get("result", ""))
+        if len(text) > MAX_UPSTREAM_CHARS:
+            text = text[:MAX_UPSTREAM_CHARS] + "…"
+        sections.append(f"[{upstream}]\n{text}")
+    description = task.get("description", "Please help with this task")
+    return {**task, "description": f"{description}\n\n上游任务结果 / Results of upstream tasks:\n" + "\n\n".join(sections)}
+
+
+class TaskScheduler:
+    """
+    Runs a TaskGraph on a coordinator's agents.
+    在协调器的Agents上运行TaskGraph
+
+    An agent works on one task at a time, so a ready task waits while its
+    agent is busy and another ready task may overtake it.
+    Agent同一时间只处理一个任务，因此就绪任务在其Agent忙碌时等待，其他就绪任务可以先执行。
+    """
+
+    def __init__(self, coordinator: "TaskCoordinator", max_concurrency: Optional[int] = None):
+        self.coordinator = coordinator
+        self.max_concurrency = max_concurrency
+
+    def run(self, tasks: List[Dict[str, Any]], session_id: str,
+            timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Run the tasks in dependency order, ready tasks concurrently.
+        按依赖顺序运行任务，就绪任务并发执行
+
+        A task's timeout (task["timeout"], else `timeout`) counts from when it
+        starts. Tasks whose inputs failed or timed out are skipped.
+        任务的超时时间（task["timeout"]，否则为timeout参数）从其开始执行时计算。
+        输入任务失败或超时的任务会被跳过。
+
+        Args:
+            tasks: Task dicts, see TaskGraph; "agent_id" is optional and is
+               otherwise chosen with assign_task once the task is ready
+               任务字典，见TaskGraph；"agent_id"可选，否则在任务就绪时通过assign_task选择
+            session_id: Session identifier
+                    会话标识符
+            timeout: Default per-task timeout in seconds
+                 默认的单任务超时时间（秒）
+
+        Returns:
+            {"results": {task_id: result}, "timeline": [...], "critical_path": [...], "elapsed": seconds}
+            Timeline entries hold task_id, agent_id, status and ready/start/end
+            times in seconds since the run started.
+            时间线条目包含task_id、agent_id、status，以及相对运行开始时间的ready/start/end秒数。
+        """
+        coordinator = self.coordinator
+        graph = TaskGraph(tasks, coordinator.task_durations)
+        print(f"Scheduling {len(graph)} tasks in session {session_id}, critical path: {graph.critical_path()}")
+        started = time.monotonic()
+
+        def clock() -> float:
+            return time.monotonic() - started
+
+        # Tasks without an agent_id are assigned when they become ready, when the agents' load is known
+        # 没有agent_id的任务在就绪时才分配，此时Agents的负载已知
+        agents: Dict[str, Optional[str]] = {task_id: graph.tasks[task_id].get("agent_id") for task_id in graph.order}
+
+        results: Dict[str, Dict[str, Any]] = {}
+        timeline: Dict[str, Dict[str, Any]] = {
+            task_id: {"task_id": task_id, "agent_id": agents[task_id], "status": "pending",
+                      "ready": None, "start": None, "end": None}
+            for task_id in graph.order
+        }
+        waiting = {task_id: len(graph.tasks[task_id].get("inputs", ())) for task_id in graph.order}
+        ready: List[Any] = []  # heap of (-rank, sequence, task_id) / 堆：(-排名, 序号, 任务ID)
+        sequence = itertools.count()
+        running: Dict[Future, str] = {}
+        deadlines: Dict[str, float] = {}
+        busy: Set[str] = set()
+        # Timed-out tasks keep their agent busy until they actually return
+        # 超时的任务在真正返回之前仍占用其Agent
+        abandoned: Dict[Future, str] = {}
+        pool = coordinator._pool()
+
+        def finish(task_id: str, result: Dict[str, Any]) -> None:
+            results[task_id] = result
+            entry = timeline[task_id]
+            entry["status"], entry["end"] = result["status"], clock()
+            for child in graph.children[task_id]:
+                if result["status"] != "completed" and child not in results:
+                    finish(child, {"agent_id": agents[child], "task_type": graph.tasks[child].get("type"),
+                                   "status": "skipped", "error": f"Upstream task {task_id} did not complete"})
+                    continue
+                waiting[child] -= 1
+                if not waiting[child] and child not in results:
+                    make_ready(child)
+
+        def make_ready(task_id: str) -> None:
+            timeline[task_id]["ready"] = clock()
+            heapq.heappush(ready, (-graph.rank[task_id], next(sequence), task_id))
+
+        def dispatch() -> None:
+            deferred = []
+            while ready and (self.max_concurrency is None or len(running) < self.max_concurrency):
+                item = heapq.heappop(ready)
+                task_id = item[2]
+                agent_id = agents[task_id]
+                if agent_id is None:
+                    task = graph.tasks[task_id]
+                    agent_id = agents[task_id] = coordinator.assign_task(task, task.get("requirements", {}), session_id)
+                    timeline[task_id]["agent_id"] = agent_id
+                if agent_id is None or agent_id not in coordinator.agents:
+                    finish(task_id, {"agent_id": agent_id, "task_type": graph.tasks[task_id].get("type"),
+                                     "status": "failed", "error": f"No agent available for task {task_id}"})
+                    continue
+                if agent_id in busy:
+                    deferred.append(item)
+                    continue
+                busy.add(agent_id)
+                task = with_upstream_results(graph.tasks[task_id], results)
+                timeline[task_id]["start"] = clock()
+                timeline[task_id]["status"] = "running"
+                task_timeout = task.get("timeout", timeout)
+                if task_timeout is not None:
+                    deadlines[task_id] = time.monotonic() + task_timeout
+                running[pool.submit(coordinator.execute_task, agent_id, task, session_id)] = task_id
+            for item in deferred:
+                heapq.heappush(ready, item)
+
+        for task_id in graph.order:
+            if not waiting[task_id]:
+                make_ready(task_id)
+        dispatch()
+        # Wait for abandoned tasks only while a ready task needs their agent
+        # 只有当就绪任务需要被放弃任务占用的Agent时才等待它们
+        while running or (abandoned and ready):
+            pending_deadlines = [deadlines[task_id] for task_id in running.values() if task_id in deadlines]
+            wait_for = max(0.0, min(pending_deadlines) - time.monotonic()) if pending_deadlines else None
+            done, _ = wait(list(running) + list(abandoned), timeout=wait_for, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in abandoned:
+                    busy.discard(agents[abandoned.pop(future)])
+                    continue
+                task_id = running.pop(future)
+                busy.discard(agents[task_id])
+                try:
+                    result = future.result()
+                    if "error" in result:
+                        raise RuntimeError(result["error"])
+                    result["status"] = "completed"
+                    self._record_duration(graph.tasks[task_id], clock() - timeline[task_id]["start"])
+                except Exception as e:
+                    logger.error(f"Task {task_id} on agent {agents[task_id]} failed: {str(e)}")
+                    result = {"agent_id": agents[task_id], "task_type": graph.tasks[task_id].get("type"),
+                              "status": "failed", "error": str(e)}
+                finish(task_id, result)
+            now = time.monotonic()
+            for future, task_id in list(running.items()):
+                if task_id in deadlines and deadlines[task_id] <= now:
+                    logger.warning(f"Task {task_id} on agent {agents[task_id]} timed out")
+                    abandoned[running.pop(future)] = task_id
+                    finish(task_id, {"agent_id": agents[task_id], "task_type": graph.tasks[task_id].get("type"),
+                                     "status": "timeout", "error": "Task timed out"})
+            dispatch()
+
+        elapsed = clock()
+        completed = sum(result["status"] == "completed" for result in results.values())
+        print(f"Scheduled run in session {session_id}: {completed}/{len(graph)} completed in {elapsed:.2f}s")
+        return {
+            "results": {task_id: results[task_id] for task_id in graph.tasks},
+            "timeline": sorted(timeline.values(), key=lambda entry: (entry["start"] is None, entry["start"] or 0.0)),
+            "critical_path": graph.critical_path(),
+            "elapsed": elapsed,
+        }
+
+    def _record_duration(self, task: Dict[str, Any], seconds: float) -> None:
+        """Update the moving average duration of a task type, used as its future estimate.
+        更新任务类型的平均耗时（滑动平均），作为其后续的预计耗时"""
+        task_type = task.get("type")
+        if task_type is None:
+            return
+        durations = self.coordinator.task_durations
+        previous = durations.get(task_type)
+        durations[task_type] = seconds if previous is None else (
+            DURATION_EWMA_ALPHA * seconds + (1 - DURATION_EWMA_ALPHA) * previous)
+
+
+def format_timeline(run: Dict[str, Any], width: int = 40) -> str:
+    """
+    Render a run's timeline as a text Gantt chart.
+    将一次运行的时间线渲染为文本甘特图
+    """
+    elapsed = run["elapsed"] or 1e-9
+    lines = []
+    for entry in run["timeline"]:
+        if entry["start"] is None:
+            lines.append(f"{entry['task_id']:<24} {'':<{width}} {entry['status']}")
+            continue
+        begin = int(entry["start"] / elapsed * width)
+        end = max(begin + 1, int(entry["end"] / elapsed * width))
+        bar = " " * begin + "#" * (end - begin)
+        lines.append(f"{entry['task_id']:<24} {bar:<{width}} {entry['status']} "
+                     f"{entry['start']:.2f}-{entry['end']:.2f}s ({entry['agent_id']})")
+    return "\n".join(lines)
@@ -0,0 +1,231 @@
+"""
+Load-aware agent selection for Agent-Camel V2.
+Agent-Camel V2的负载感知Agent选择
+
+The coordinator tracks, per agent, how many tasks are outstanding (assigned
+and not yet finished) and a moving average of how long its tasks take.
+A selection policy uses these to pick one of the agents that can do a task:
+协调器为每个Agent记录未完成的任务数（已分配但尚未完成）以及任务耗时的滑动平均。
+选择策略据此从能完成任务的Agents中挑选一个：
+
+    first               best capability match, ignoring load (the old behaviour)
+                        能力最匹配的Agent，不考虑负载（旧行为）
+    least_outstanding   fewest outstanding tasks, ties by capability rank
+                        未完成任务最少的Agent，相同时按能力排名
+    power_of_two        the less loaded of two random candidates; O(1) and
+                        avoids every caller piling onto the same "least loaded" agent
+                        两个随机候选中负载较低的一个；O(1)，且避免所有调用方同时涌向同一个"最空闲"的Agent
+    session_affinity    the agent that served the session before, unless it is
+                        much busier than the alternative (keeps session memory on one agent)
+                        之前服务该会话的Agent，除非它比备选Agent忙得多（会话记忆保留在同一Agent上）
+"""
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Union
+import random
+import threading
+
+from config.settings import settings
+
+# Weight of the newest duration in an agent's latency moving average
+# Agent耗时滑动平均中最新一次耗时的权重
+LATENCY_EWMA_ALPHA = 0.2
+
+
+class AgentLoad:
+    """
+    Outstanding tasks and latency moving average per agent (thread-safe).
+    每个Agent的未完成任务数和耗时滑动平均（线程安全）
+
+    A task counts as outstanding from reserve() (when it is assigned) or
+    begin() (when it starts without having been assigned) until finish().
+    任务从reserve()（分配时）或begin()（未经分配直接开始时）起计为未完成，直到finish()。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, int] = {}
+        self._reserved: Dict[str, int] = {}
+        self._latency: Dict[str, float] = {}
+        self._completed: Dict[str, int] = {}
+
+    def reserve(self, agent_id: str) -> None:
+        """A task was assigned to the agent and will be run later.
+        任务已分配给该Agent，稍后执行"""
+        with self._lock:
+            self._in_flight[agent_id] = self._in_flight.get(agent_id, 0) + 1
+            self._reserved[agent_id] = self._reserved.get(agent_id, 0) + 1
+
+    def release(self, agent_id: str) -> None:
+        """An assigned task will not run after all.
+        已分配的任务最终不会执行"""
+        with self._lock:
+            if self._reserved.get(agent_id, 0) > 0:
+                self._reserved[agent_id] -= 1
+                self._in_flight[agent_id] -= 1
+
+    def begin(self, agent_id: str) -> None:
+        """A task starts on the agent, using up a reservation if there is one.
+        任务在该Agent上开始执行，如有预留则消耗一个预留"""
+        with self._lock:
+            if self._reserved.get(agent_id, 0) > 0:
+                self._reserved[agent_id] -= 1
+            else:
+                self._in_flight[agent_id] = self._in_flight.get(agent_id, 0) + 1
+
+    def finish(self, agent_id: str, seconds: float) -> None:
+        """A task finished on the agent after `seconds`.
+        任务在该Agent上执行完毕，耗时seconds秒"""
+        with self._lock:
+            self._in_flight[agent_id] = max(0, self._in_flight.get(agent_id, 0) - 1)
+            previous = self._latency.get(agent_id)
+            self._latency[agent_id] = seconds if previous is None else (
+                LATENCY_EWMA_ALPHA * seconds + (1 - LATENCY_EWMA_ALPHA) * previous)
+            self._completed[agent_id] = self._completed.get(agent_id, 0) + 1
+
+    def in_flight(self, agent_id: str) -> int:
+        """Outstanding tasks of an agent.
+        Agent的未完成任务数"""
+        return self._in_flight.get(agent_id, 0)
+
+    def latency(self, agent_id: str) -> Optional[float]:
+        """Moving average task duration of an agent in seconds (None before its first task).
+        Agent任务耗时的滑动平均（秒），完成第一个任务前为None"""
+        return self._latency.get(agent_id)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Load of every agent that has had a task.
+        每个执行过任务的Agent的负载"""
+        with self._lock:
+            return {
+                agent_id: {
+                    "in_flight": self._in_flight.get(agent_id, 0),
+                    "ewma_latency": self._latency.get(agent_id),
+                    "completed": self._completed.get(agent_id, 0),
+                }
+                for agent_id in self._in_flight
+            }
+
+
+class SelectionPolicy:
+    """Base class for agent selection policies.
+    Agent选择策略的基类"""
+
+    name = "first"
+
+    def select(self, candidates: List[str], load: AgentLoad, session_id: Optional[str] = None) -> str:
+        """
+        Pick one agent.
+        挑选一个Agent
+
+        Args:
+            candidates: Suitable agent IDs, best capability match first (never empty)
+                    合适的Agent ID，能力最匹配的在前（不会为空）
+            load: Current load of the agents
+              Agents当前的负载
+            session_id: Session the task belongs to, if known
+                    任务所属的会话（如已知）
+
+        Returns:
+            Selected agent ID
+            选定的Agent ID
+        """
+        return candidates[0]
+
+
+class LeastOutstandingPolicy(SelectionPolicy):
+    """Fewest outstanding tasks; ties go to the better capability match.
+    未完成任务最少的Agent；相同时选能力更匹配的"""
+
+    name = "least_outstanding"
+
+    def select(self, candidates: List[str], load: AgentLoad, session_id: Optional[str] = None) -> str:
+        best, best_load = candidates[0], load.in_flight(candidates[0])
+        for agent_id in candidates[1:]:
+            if not best_load:
+                break
+            in_flight = load.in_flight(agent_id)
+            if in_flight < best_load:
+                best, best_load = agent_id, in_flight
+        return best
+
+
+class PowerOfTwoChoicesPolicy(SelectionPolicy):
+    """The less loaded of two random candidates; ties go to the lower latency.
+    两个随机候选中负载较低的一个；相同时选耗时较低的"""
+
+    name = "power_of_two"
+
+    def __init__(self, seed: Optional[int] = None):
+        self._random = random.Random(seed)
+
+    def select(self, candidates: List[str], load: AgentLoad, session_id: Optional[str] = None) -> str:
+        if len(candidates) == 1:
+            return candidates[0]
+        first, second = self._random.sample(candidates, 2)
+
+        def key(agent_id: str):
+            latency = load.latency(agent_id)
+            return load.in_flight(agent_id), 0.0 if latency is None else latency
+        return first if key(first) <= key(second) else second
+
+
+class SessionAffinityPolicy(SelectionPolicy):
+    """
+    Keep a session on the agent that served it before, within a load margin.
+    在负载差距允许的范围内，让会话留在之前服务它的Agent上
+
+    The agent remembered for a session is chosen again if it is a candidate
+    and has at most `max_imbalance` more outstanding tasks than the agent
+    the fallback policy would pick; otherwise the session moves.
+    如果会话记住的Agent是候选之一，且其未完成任务数不超过备选策略所选Agent的
+    max_imbalance个以上，则再次选择它；否则会话迁移到新Agent。
+    """
+
+    name = "session_affinity"
+
+    def __init__(self, fallback: Optional[SelectionPolicy] = None, max_imbalance: int = 2,
+                 max_sessions: int = 100000):
+        self.fallback = fallback or PowerOfTwoChoicesPolicy()
+        self.max_imbalance = max_imbalance
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def select(self, candidates: List[str], load: AgentLoad, session_id: Optional[str] = None) -> str:
+        choice = self.fallback.select(candidates, load, session_id)
+        if session_id is None:
+            return choice
+        with self._lock:
+            previous = self._sessions.get(session_id)
+            if (previous is not None and previous != choice and previous in candidates
+                    and load.in_flight(previous) <= load.in_flight(choice) + self.max_imbalance):
+                choice = previous
+            self._sessions[session_id] = choice
+            self._sessions.move_to_end(session_id)
+            if len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return choice
+
+
+SELECTION_POLICIES = {
+    policy.name: policy
+    for policy in (SelectionPolicy, LeastOutstandingPolicy, PowerOfTwoChoicesPolicy, SessionAffinityPolicy)
+}
+
+
+def make_policy(policy: Union[str, SelectionPolicy, None] = None) -> SelectionPolicy:
+    """
+    Get a selection policy by name (default: AGENT_SELECTION_POLICY), or pass one through.
+    按名称获取选择策略（默认为AGENT_SELECTION_POLICY），或原样返回传入的策略
+
+    Raises:
+        ValueError: Unknown policy name
+                未知的策略名称
+    """
+    if isinstance(policy, SelectionPolicy):
+        return policy
+    name = policy or settings.AGENT_SELECTION_POLICY
+    policy_class = SELECTION_POLICIES.get(name)
+    if policy_class is None:
+        raise ValueError(f"Unknown agent selection policy: {name} (choose from {', '.join(SELECTION_POLICIES)})")
+    return policy_class()
@@ -0,0 +1,3 @@
+"""
+Benchmarks package for Agent-Camel V2.
+"""
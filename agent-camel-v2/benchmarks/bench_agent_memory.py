@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark: 100k student agents.
+内存基准测试：10万个学生Agent
+
+Usage / 用法:
+    python benchmarks/bench_agent_memory.py [agent_count]
+"""
+import gc
+import sys
+import tracemalloc
+from typing import Dict, Any
+
+from common import quiet, register_stub_provider, report
+
+from agents.base import BaseAgent
+from memory.manager import MemoryManager
+from tools.library import ToolLibrary
+
+
+class BenchStudentAgent(BaseAgent):
+    """Student agent shaped like the school system's StudentAgent.
+    与学校系统StudentAgent结构相同的学生Agent"""
+    
+    __slots__ = ("student_name",)
+    
+    def __init__(self, student_id: str, student_name: str, model_provider: str):
+        self.student_name = student_name
+        role = f"学生代理 - 为{student_name}提供学习伴侣、任务代办、统一接口和数据看板服务"
+        super().__init__(f"student_{student_id}", role, model_provider)
+    
+    def process_message(self, message: Dict[str, Any], session_id: str) -> Dict[str, Any]:
+        self.memory.update_context(session_id, message)
+        plan = self.plan_next_action(message, session_id)
+        response = self.execute_plan(plan, session_id)
+        self.memory.store_interaction(session_id, message, response, plan)
+        return response
+    
+    def plan_next_action(self, message: Dict[str, Any], session_id: str) -> Dict[str, Any]:
+        context = self.memory.get_context(session_id)
+        prompt = self._create_planning_prompt(message, context, self._profile.tool_catalog)
+        return {"action": "respond", "content": self.model.generate(prompt)}
+    
+    def execute_plan(self, plan: Dict[str, Any], session_id: str) -> Dict[str, Any]:
+        return self._generate_response(plan["content"])
+
+
+def measure(fn) -> int:
+    """Return the bytes still allocated after running fn (result kept alive).
+    返回运行fn后仍被占用的字节数（结果保持存活）"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    keep = fn()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del keep
+    return after - before
+
+
+def main(agent_count: int = 100_000) -> None:
+    provider = register_stub_provider()
+    sample = min(1_000, agent_count)
+    
+    with quiet():
+        # Warm the shared profile so it is not attributed to the agents
+        # 预热共享配置，避免计入Agent本身
+        BenchStudentAgent("warmup", "预热", provider)
+        
+        idle = measure(lambda: [BenchStudentAgent(f"S{i:06d}", f"学生{i}", provider)
+                                for i in range(agent_count)])
+        
+        def active_agents():
+            agents = [BenchStudentAgent(f"A{i:06d}", f"学生{i}", provider) for i in range(sample)]
+            for agent in agents:
+                agent.process_message({"role": "user", "content": "今天的作业是什么？"}, "s1")
+            return agents
+        active = measure(active_agents)
+        
+        # What every agent used to pay up front: its own memory manager and tool library
+        # 旧结构中每个Agent预先承担的开销：独立的记忆管理器和工具库
+        legacy = measure(lambda: [(MemoryManager(f"L{i}"), ToolLibrary(),
+                                   f"学生代理 - 为学生{i}提供学习伴侣、任务代办、统一接口和数据看板服务")
+                                  for i in range(sample)])
+    
+    per_idle = idle / agent_count
+    per_legacy = legacy / sample
+    report(f"Student agent memory ({agent_count:,} agents)", [
+        ("idle agents, total", f"{idle / 1024 / 1024:.1f} MiB"),
+        ("idle agent, per agent", f"{per_idle:.0f} B"),
+        ("active agent (1 message), per agent", f"{active / sample:.0f} B"),
+        ("eager per-agent state (old layout)", f"{per_legacy:.0f} B"),
+        ("old layout extrapolated to total", f"{per_legacy * agent_count / 1024 / 1024:.1f} MiB"),
+        ("reduction for idle agents", f"{per_legacy / max(per_idle, 1):.1f}x"),
+    ])
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Queueing simulation of the agent selection policies.
+Agent选择策略的排队仿真
+
+A discrete-event simulation of tasks arriving at a pool of replica agents
+(same capabilities; 12 fast and 4 three times slower, e.g. behind a slower
+model). Each agent works on one task at a time, like TaskCoordinator does,
+so a task waits in its agent's queue until the agent is free. Arrivals are
+Poisson, service times exponential, and every task belongs to one of 500
+sessions. The policies are the real ones from agents/selection.py, fed by a
+real AgentLoad.
+离散事件仿真：任务到达一组副本Agent（能力相同；12个快速、4个慢三倍，例如使用更慢的模型）。
+与TaskCoordinator一样，每个Agent同一时间只处理一个任务，因此任务在其Agent的队列中等待，
+直到该Agent空闲。到达服从泊松过程，服务时间服从指数分布，每个任务属于500个会话之一。
+所用策略即agents/selection.py中的真实实现，由真实的AgentLoad提供负载数据。
+
+Reported per policy: response time (queueing + service, in units of the
+fast agents' mean service time), the longest queue, and session locality
+(share of tasks served by the same agent as the session's previous task).
+每种策略报告：响应时间（排队+服务，以快速Agent的平均服务时间为单位）、最长队列，
+以及会话局部性（由与该会话上一个任务相同的Agent处理的任务比例）。
+
+Usage / 用法:
+    python benchmarks/bench_agent_selection.py [tasks]
+"""
+from collections import deque
+import heapq
+import random
+import sys
+
+from common import report
+
+from agents.selection import (AgentLoad, LeastOutstandingPolicy, PowerOfTwoChoicesPolicy, SelectionPolicy,
+                              SessionAffinityPolicy)
+
+SERVICE_TIMES = [1.0] * 12 + [3.0] * 4
+SESSIONS = 500
+
+
+def simulate(policy: SelectionPolicy, utilization: float, tasks: int, seed: int = 0):
+    rng = random.Random(seed)
+    agents = [f"replica_{i}" for i in range(len(SERVICE_TIMES))]
+    service = dict(zip(agents, SERVICE_TIMES))
+    arrival_rate = utilization * sum(1.0 / mean for mean in SERVICE_TIMES)
+    load = AgentLoad()
+    queues = {agent_id: deque() for agent_id in agents}
+    busy = set()
+    events = []  # (time, kind, agent_id, arrival, service time) / (时间, 类型, Agent ID, 到达时间, 服务时间)
+    last_agent = {}
+    responses, same_agent, longest = [], 0, 0
+
+    def start(agent_id: str, now: float) -> None:
+        arrival = queues[agent_id].popleft()
+        load.begin(agent_id)
+        busy.add(agent_id)
+        duration = rng.expovariate(1.0 / service[agent_id])
+        heapq.heappush(events, (now + duration, 1, agent_id, arrival, duration))
+
+    now = 0.0
+    for _ in range(tasks):
+        now += rng.expovariate(arrival_rate)
+        heapq.heappush(events, (now, 0, None, now, 0.0))
+    while events:
+        now, kind, agent_id, arrival, duration = heapq.heappop(events)
+        if kind == 0:
+            session_id = f"session_{rng.randrange(SESSIONS)}"
+            agent_id = policy.select(agents, load, session_id)
+            same_agent += last_agent.get(session_id) == agent_id
+            last_agent[session_id] = agent_id
+            load.reserve(agent_id)
+            queues[agent_id].append(arrival)
+            longest = max(longest, len(queues[agent_id]))
+            if agent_id not in busy:
+                start(agent_id, now)
+        else:
+            load.finish(agent_id, duration)
+            responses.append(now - arrival)
+            busy.discard(agent_id)
+            if queues[agent_id]:
+                start(agent_id, now)
+
+    responses.sort()
+    return {
+        "mean": sum(responses) / len(responses),
+        "p50": responses[len(responses) // 2],
+        "p99": responses[int(len(responses) * 0.99)],
+        "longest_queue": longest,
+        "locality": same_agent / tasks,
+    }
+
+
+def main() -> None:
+    tasks = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    policies = {
+        "first (old behaviour, 20k tasks)": lambda: SelectionPolicy(),
+        "least_outstanding": lambda: LeastOutstandingPolicy(),
+        "power_of_two": lambda: PowerOfTwoChoicesPolicy(seed=1),
+        "session_affinity (p2c fallback)": lambda: SessionAffinityPolicy(PowerOfTwoChoicesPolicy(seed=1)),
+    }
+    for utilization in (0.5, 0.7, 0.9):
+        rows = []
+        for name, build in policies.items():
+            # The old behaviour sends everything to one agent; its queue grows without bound
+            # 旧行为把所有任务都发给一个Agent，其队列无限增长
+            result = simulate(build(), utilization, tasks if "first" not in name else min(tasks, 20_000))
+            rows.append((name, f"mean {result['mean']:8.2f}  p50 {result['p50']:8.2f}  p99 {result['p99']:9.2f}  "
+                               f"max queue {result['longest_queue']:6,}  locality {result['locality']:.0%}"))
+        report(f"{len(SERVICE_TIMES)} replicas at {utilization:.0%} utilization ({tasks:,} tasks; response time)", rows)
+
+
+if __name__ == "__main__":
+    main()
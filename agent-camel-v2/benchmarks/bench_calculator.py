@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks for the calculator expression engine.
+计算器表达式引擎的微基准测试
+
+1. single evaluation: a budget formula with variables, compiled once and
+   cached vs. parsed and validated on every call
+   单次求值：带变量的预算公式，编译一次并缓存 vs. 每次调用都解析和验证
+2. batch evaluation: the same formula over many day/price scenarios with
+   one vectorized NumPy call vs. a Python loop of scalar evaluations
+   批量求值：同一公式在大量天数/价格情况下，一次向量化NumPy调用 vs. 逐个标量求值的Python循环
+
+Usage / 用法:
+    python benchmarks/bench_calculator.py [scenarios]
+"""
+import sys
+import time
+
+from common import report
+
+import numpy as np
+
+from tools import calculator
+
+FORMULA = "days * (hotel + meals) + flights + max(0, days - 5) * 0.1 * hotel"
+
+
+def per_call(fn, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n
+
+
+def single(n: int = 100_000):
+    variables = {"days": 4, "hotel": 450.0, "meals": 120.0, "flights": 1800.0}
+    compiled = calculator.compile_expression(FORMULA)
+    uncached = calculator.compile_expression.__wrapped__
+    return [
+        ("cached compile + evaluate", f"{per_call(lambda: calculator.evaluate(FORMULA, variables), n) * 1e6:.2f} us"),
+        ("precompiled evaluate", f"{per_call(lambda: compiled.evaluate(variables), n) * 1e6:.2f} us"),
+        ("parse + validate every call", f"{per_call(lambda: uncached(FORMULA).evaluate(variables), n // 10) * 1e6:.2f} us"),
+    ]
+
+
+def batch(scenarios: int):
+    rng = np.random.default_rng(0)
+    days = rng.integers(1, 15, scenarios)
+    hotel = rng.uniform(200, 900, scenarios)
+    meals = rng.uniform(60, 300, scenarios)
+    flights = rng.uniform(500, 4000, scenarios)
+    compiled = calculator.compile_expression(FORMULA)
+
+    start = time.perf_counter()
+    vector = compiled.evaluate_batch({"days": days, "hotel": hotel, "meals": meals, "flights": flights})
+    vector_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scalar = [compiled.evaluate({"days": int(d), "hotel": float(h), "meals": float(m), "flights": float(f)})
+              for d, h, m, f in zip(days, hotel, meals, flights)]
+    loop_seconds = time.perf_counter() - start
+    assert np.allclose(vector, scalar)
+    return [
+        ("vectorized evaluate_batch", f"{vector_seconds * 1000:.1f} ms ({vector_seconds / scenarios * 1e9:.0f} ns/scenario)"),
+        ("scalar loop", f"{loop_seconds * 1000:.1f} ms ({loop_seconds / scenarios * 1e9:.0f} ns/scenario)"),
+        ("speedup", f"{loop_seconds / vector_seconds:.0f}x"),
+    ]
+
+
+def main() -> None:
+    scenarios = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    report(f"Single evaluation: {FORMULA}", single())
+    report(f"Batch evaluation ({scenarios:,} scenarios)", batch(scenarios))
+
+
+if __name__ == "__main__":
+    main()
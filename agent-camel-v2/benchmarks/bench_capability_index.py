@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark for capability-based agent discovery.
+基于能力的Agent发现基准测试
+
+Registers 10k agents over 500 capabilities (popularity follows a Zipf law,
+so a few capabilities are shared by thousands of agents and most by a
+handful), then finds the agents for queries of 1-3 required and 0-2
+preferred capabilities: with the inverted index, and by scanning every
+agent's capabilities (what discovery costs without an index).
+在500项能力上注册1万个Agent（能力的流行度服从Zipf分布，少数能力由数千个Agent共有，
+大多数只有少数Agent具备），然后针对含1-3项所需能力和0-2项优选能力的查询查找Agent：
+分别使用倒排索引，以及逐个扫描所有Agent的能力（没有索引时发现Agent的开销）。
+
+Usage / 用法:
+    python benchmarks/bench_capability_index.py [agents] [capabilities] [queries]
+"""
+import random
+import sys
+import time
+
+from common import quiet, register_stub_provider, report
+
+from agents.capability_index import CapabilityIndex
+from agents.coordinator import TaskCoordinator
+
+
+def scan(agents, required, preferred):
+    """Discovery without an index: check and score every agent.
+    没有索引时的发现方式：逐个检查并计算每个Agent的得分"""
+    scored = []
+    for position, (agent_id, weights) in enumerate(agents.items()):
+        if all(capability in weights for capability in required):
+            score = sum(weights[capability] for capability in required)
+            for capability in preferred:
+                score += weights.get(capability, 0.0)
+            scored.append((-score, position, agent_id))
+    scored.sort()
+    return [(agent_id, -score) for score, _, agent_id in scored]
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return (samples[len(samples) // 2] * 1e6, samples[int(len(samples) * 0.99)] * 1e6)
+
+
+def main() -> None:
+    agent_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    capability_count = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    query_count = int(sys.argv[3]) if len(sys.argv) > 3 else 2000
+    rng = random.Random(0)
+    names = [f"capability_{i}" for i in range(capability_count)]
+    popularity = [1.0 / (rank + 1) for rank in range(capability_count)]
+
+    def draw(count):
+        return list(dict.fromkeys(rng.choices(names, popularity, k=count)))
+
+    agents = {f"agent_{i}": {capability: round(rng.uniform(0.5, 1.0), 2) for capability in draw(rng.randint(3, 12))}
+              for i in range(agent_count)}
+    queries = [(draw(rng.randint(1, 3)), draw(rng.randint(0, 2))) for _ in range(query_count)]
+
+    provider = register_stub_provider()
+    with quiet():
+        coordinator = TaskCoordinator()
+        start = time.perf_counter()
+        for agent_id, capabilities in agents.items():
+            coordinator.register_agent(agent_id, "travel_planner", capabilities, provider)
+        registration = time.perf_counter() - start
+    index: CapabilityIndex = coordinator.capability_index
+
+    indexed, scanned, sizes = [], [], []
+    for required, preferred in queries:
+        start = time.perf_counter()
+        result = index.match(required, preferred)
+        indexed.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        expected = scan(agents, required, preferred)
+        scanned.append(time.perf_counter() - start)
+        assert [agent_id for agent_id, _ in result] == [agent_id for agent_id, _ in expected]
+        sizes.append(len(result))
+
+    with quiet():
+        start = time.perf_counter()
+        for required, preferred in queries:
+            coordinator.assign_task({"type": "bench"}, {"capabilities": required, "preferred_capabilities": preferred})
+        assign = (time.perf_counter() - start) / len(queries)
+
+    stats = index.stats()
+    report(f"Agent discovery ({agent_count:,} agents, {capability_count} capabilities, {query_count:,} queries)", [
+        ("indexed capabilities / postings", f"{stats['capabilities']} / {stats['postings']:,}"),
+        ("register_agent (agent + index)", f"{registration / agent_count * 1e6:.1f} us per agent"),
+        ("agents matched per query, mean / max", f"{sum(sizes) / query_count:,.1f} / {max(sizes):,}"),
+        ("scan every agent p50 / p99", "%.1f / %.1f us" % percentiles(scanned)),
+        ("inverted index p50 / p99", "%.1f / %.1f us" % percentiles(indexed)),
+        ("speedup (mean)", f"{sum(scanned) / sum(indexed):.0f}x"),
+    ])
+    # Ranking every match costs O(matches); split the queries by how many agents they match
+    # 对所有匹配结果排序的开销为O(匹配数)；按匹配的Agent数量对查询分组
+    rows = []
+    for low, high in ((0, 100), (100, 1000), (1000, agent_count)):
+        bucket = [i for i, size in enumerate(sizes) if low <= size < high or (high == agent_count and size >= low)]
+        if bucket:
+            rows.append((f"{low:,}-{high:,} matches ({len(bucket)} queries)",
+                         "index %.1f us, scan %.1f us (p50)" % (percentiles([indexed[i] for i in bucket])[0],
+                                                                  percentiles([scanned[i] for i in bucket])[0])))
+    report("By result size", rows + [
+        ("assign_task end to end (mean)", f"{assign * 1e6:.1f} us"),
+    ])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Resident-memory benchmark for the compressed interaction cold tier.
+交互历史压缩冷层的常驻内存基准测试
+
+Simulates a school day: every student of the school asks a tutor agent a
+few questions per period and gets multi-kilobyte Chinese answers. Compares
+the Python heap held by MemoryManager with all history in RAM against a
+hot tier of the newest interactions plus compressed cold blocks.
+模拟一个上学日：全校每个学生每节课向辅导Agent提几个问题，并得到数千字节的中文回答。
+比较MemoryManager将全部历史保存在内存中与"最新交互热层 + 压缩冷块"两种方式占用的Python堆内存。
+
+Usage / 用法:
+    python benchmarks/bench_cold_tier.py [students] [periods]
+"""
+import gc
+import random
+import sys
+import time
+import tracemalloc
+
+from common import quiet, report
+
+from config.settings import settings
+from memory.cold_store import ColdBlockFile
+from memory.manager import MemoryManager
+
+SUBJECTS = ["数学", "语文", "英语", "物理", "化学", "生物", "历史", "地理"]
+SENTENCES = [
+    "这道题的关键是先找出已知条件和要求的量之间的关系。",
+    "我们可以把问题拆成几个小步骤，逐步推导出结论。",
+    "注意单位换算，很多同学在这里容易出错。",
+    "这个知识点和上节课学的内容是相通的，可以对比着记忆。",
+    "建议你把解题思路写在草稿纸上，再检查每一步是否合理。",
+    "从图像上看，函数在这个区间内是单调递增的。",
+    "这篇课文的中心思想是通过细节描写表达作者的情感。",
+    "这个单词的过去式是不规则变化，需要单独记忆。",
+    "实验中要控制变量，每次只改变一个条件。",
+    "化学方程式配平时，先配平原子数最多的物质。",
+    "细胞是生物体结构和功能的基本单位。",
+    "这一历史事件的背景可以从政治、经济、文化三个方面分析。",
+    "等高线越密集，说明地势越陡峭。",
+    "做完以后可以把答案代回原式验证一下。",
+    "如果还有不明白的地方，可以再举一个类似的例子练习。",
+    "这里用到了勾股定理，直角三角形两直角边的平方和等于斜边的平方。",
+]
+
+
+def school_day(students: int, periods: int, seed: int = 42):
+    """Yield (session_id, question, answer) in the order the day happens.
+    按一天中发生的顺序生成(会话ID, 问题, 回答)"""
+    rng = random.Random(seed)
+    for period in range(periods):
+        subject = SUBJECTS[period % len(SUBJECTS)]
+        for student in range(students):
+            for turn in range(3):
+                question = f"老师，{subject}第{rng.randint(1, 30)}题我不太明白，第{turn + 1}步为什么这样做？"
+                answer = "".join(rng.choice(SENTENCES) for _ in range(rng.randint(30, 60)))
+                yield f"student_{student}", question, answer
+
+
+def run(students: int, periods: int, hot_interactions):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    with quiet():
+        memory = MemoryManager("tutor_agent", hot_interactions=hot_interactions)
+        count = 0
+        for session_id, question, answer in school_day(students, periods):
+            memory.store_interaction(session_id,
+                                     {"role": "user", "content": question},
+                                     {"role": "assistant", "content": answer},
+                                     {"action": "respond", "reasoning": "answer the question"})
+            count += 1
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return memory, count, current, elapsed
+
+
+def main() -> None:
+    students = int(sys.argv[1]) if len(sys.argv) > 1 else 1200
+    periods = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    memory, count, baseline_bytes, baseline_seconds = run(students, periods, None)
+    del memory
+    settings.COLD_BLOCK_SIZE = 8
+    tiered, _, tiered_bytes, tiered_seconds = run(students, periods, 4)
+    cold_file = ColdBlockFile.shared(None)
+
+    # Random access into the cold tier
+    # 冷层随机访问
+    rng = random.Random(1)
+    samples = 2000
+    with quiet():
+        histories = [tiered.get_interaction_history(f"student_{rng.randrange(students)}")
+                     for _ in range(samples)]
+    start = time.perf_counter()
+    for history in histories:
+        history[rng.randrange(history.cold_count or 1)]
+    access_us = (time.perf_counter() - start) / samples * 1e6
+
+    report(f"School day: {students} students x {periods} periods = {count:,} interactions", [
+        ("all in RAM: Python heap", f"{baseline_bytes / 1e6:,.1f} MB"),
+        ("hot tier (4/session, blocks of 8): Python heap", f"{tiered_bytes / 1e6:,.1f} MB"),
+        ("cold tier file (on disk / page cache)", f"{cold_file.size / 1e6:,.1f} MB"),
+        ("resident memory reduction", f"{baseline_bytes / tiered_bytes:.1f}x"),
+        ("store throughput, all in RAM", f"{count / baseline_seconds:,.0f} interactions/s"),
+        ("store throughput, tiered", f"{count / tiered_seconds:,.0f} interactions/s"),
+        ("random cold read", f"{access_us:.1f} us"),
+    ])
+
+
+if __name__ == "__main__":
+    main()
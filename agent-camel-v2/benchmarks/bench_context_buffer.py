@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks for ring-buffer context storage.
+环形缓冲区上下文存储的微基准测试
+
+Compares ContextBuffer with the previous list-append-then-rebuild scheme
+(append, and rebuild as [-20:] once the list exceeds 50 messages).
+将ContextBuffer与之前的"列表追加超过50条后重建为[-20:]"方案进行比较。
+
+Usage / 用法:
+    python benchmarks/bench_context_buffer.py [message_count]
+"""
+import sys
+import time
+from typing import List, Dict, Any
+
+from common import report
+
+from memory.context_buffer import ContextBuffer
+
+
+def legacy_append(context: List[Dict[str, Any]], message: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """The old update_context behaviour.
+    旧版update_context的行为"""
+    context.append(message)
+    if len(context) > 50:
+        context = context[-20:]
+    return context
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def bench_append(count: int, messages: List[Dict[str, Any]]):
+    buffer = ContextBuffer(max_messages=50, max_bytes=64 * 1024)
+    latencies = []
+    clock = time.perf_counter_ns
+    start = time.perf_counter()
+    for message in messages:
+        t0 = clock()
+        buffer.append(message, 120)
+        latencies.append(clock() - t0)
+    ring_rate = count / (time.perf_counter() - start)
+    
+    context: List[Dict[str, Any]] = []
+    legacy_latencies = []
+    start = time.perf_counter()
+    for message in messages:
+        t0 = clock()
+        context = legacy_append(context, message)
+        legacy_latencies.append(clock() - t0)
+    legacy_rate = count / (time.perf_counter() - start)
+    return ring_rate, latencies, legacy_rate, legacy_latencies, buffer, context
+
+
+def bench_window(count: int, buffer: ContextBuffer, context: List[Dict[str, Any]]):
+    start = time.perf_counter()
+    for _ in range(count):
+        window = buffer.window(5)
+        for message in window:
+            pass
+    ring_rate = count / (time.perf_counter() - start)
+    
+    start = time.perf_counter()
+    for _ in range(count):
+        window = context[-5:]
+        for message in window:
+            pass
+    legacy_rate = count / (time.perf_counter() - start)
+    
+    start = time.perf_counter()
+    for _ in range(count):
+        window = buffer.window()
+    full_view_rate = count / (time.perf_counter() - start)
+    
+    start = time.perf_counter()
+    for _ in range(count):
+        window = list(context)
+    full_copy_rate = count / (time.perf_counter() - start)
+    return ring_rate, legacy_rate, full_view_rate, full_copy_rate
+
+
+def bench_large_window(count: int, size: int = 5_000):
+    """Full-window reads on a large context, where copying dominates.
+    在大上下文上读取完整窗口，此时复制开销占主导"""
+    buffer = ContextBuffer(max_messages=size)
+    context = []
+    for i in range(size):
+        message = {"role": "user", "content": f"消息 {i}"}
+        buffer.append(message, 16)
+        context.append(message)
+    start = time.perf_counter()
+    for _ in range(count):
+        buffer.window()[-5:]
+    view_rate = count / (time.perf_counter() - start)
+    start = time.perf_counter()
+    for _ in range(count):
+        list(context)[-5:]
+    copy_rate = count / (time.perf_counter() - start)
+    return view_rate, copy_rate
+
+
+def main(count: int = 1_000_000) -> None:
+    messages = [{"role": "user", "content": f"消息 {i}"} for i in range(count)]
+    ring_rate, ring_lat, legacy_rate, legacy_lat, buffer, context = bench_append(count, messages)
+    report(f"append ({count:,} messages)", [
+        ("ring buffer", f"{ring_rate:,.0f} msg/s"),
+        ("ring buffer p50 / p99.9 / max", f"{percentile(ring_lat, 0.5)} / {percentile(ring_lat, 0.999)} / {max(ring_lat)} ns"),
+        ("list + rebuild", f"{legacy_rate:,.0f} msg/s"),
+        ("list + rebuild p50 / p99.9 / max", f"{percentile(legacy_lat, 0.5)} / {percentile(legacy_lat, 0.999)} / {max(legacy_lat)} ns"),
+        ("context size: ring / list", f"{len(buffer)} (steady) / {len(context)} (20..50 sawtooth)"),
+    ])
+    
+    ring_rate, legacy_rate, view_rate, copy_rate = bench_window(count, buffer, context)
+    report(f"get window ({count:,} reads)", [
+        ("ring buffer window(5), iterated", f"{ring_rate:,.0f} reads/s"),
+        ("list[-5:], iterated", f"{legacy_rate:,.0f} reads/s"),
+        ("ring buffer full window (view)", f"{view_rate:,.0f} reads/s"),
+        ("list full copy", f"{copy_rate:,.0f} reads/s"),
+    ])
+    
+    view_rate, copy_rate = bench_large_window(count // 10)
+    report(f"get window on a 5,000-message context ({count // 10:,} reads)", [
+        ("ring buffer view, then last 5", f"{view_rate:,.0f} reads/s"),
+        ("list copy, then last 5", f"{copy_rate:,.0f} reads/s"),
+    ])
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Bulk export benchmark for interaction history.
+交互历史批量导出的基准测试
+
+Exports every interaction of an agent stored in SQLite to JSONL, either by
+materializing each session's history (get_interaction_history) or by
+streaming with iter_interactions, and compares peak Python heap and time.
+将SQLite中某Agent的所有交互导出为JSONL，分别采用物化每个会话的历史
+（get_interaction_history）和iter_interactions流式读取两种方式，比较Python堆峰值和耗时。
+
+Usage / 用法:
+    python benchmarks/bench_export.py [sessions] [interactions_per_session]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from common import quiet, report
+
+from memory.manager import MemoryManager
+
+
+def build(path: str, sessions: int, turns: int) -> None:
+    with quiet():
+        memory = MemoryManager("exporter", storage_path=path)
+        for session in range(sessions):
+            for turn in range(turns):
+                memory.store.append_interaction("exporter", f"session_{session}", {
+                    "input": {"role": "user", "content": f"第{turn}个问题：下周的作业安排是什么？"},
+                    "output": {"role": "assistant", "content": f"下周有数学练习册第{turn}页和一篇作文。" * 3},
+                    "plan": {"action": "respond"},
+                    "timestamp": time.time(),
+                })
+        memory.store.flush()
+
+
+def materialized(path: str, out: str) -> int:
+    memory = MemoryManager("exporter", storage_path=path)
+    records = []
+    for session_id in memory.store.list_sessions("exporter"):
+        for interaction in memory.get_interaction_history(session_id):
+            records.append({"agent_id": "exporter", "session_id": session_id, **interaction})
+    with open(out, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+    return len(records)
+
+
+def streamed(path: str, out: str) -> int:
+    return MemoryManager("exporter", storage_path=path).export_interactions(out)
+
+
+def measure(fn, path: str, out: str):
+    tracemalloc.start()
+    start = time.perf_counter()
+    with quiet():
+        count = fn(path, out)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return count, seconds, peak
+
+
+def main() -> None:
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    turns = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "memory.db")
+    build(path, sessions, turns)
+
+    rows = []
+    for name, fn in (("materialized", materialized), ("iter_interactions", streamed)):
+        count, seconds, peak = measure(fn, path, os.path.join(directory, f"{name}.jsonl"))
+        rows.append((f"{name} ({count:,} interactions)",
+                     f"{seconds:.2f} s, peak heap {peak / 1e6:.1f} MB"))
+    report(f"JSONL export: {sessions} sessions x {turns} interactions", rows)
+
+
+if __name__ == "__main__":
+    main()
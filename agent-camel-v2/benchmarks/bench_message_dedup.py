@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark for the content-addressed message store.
+内容寻址消息存储的内存基准测试
+
+Measures the Python heap held by agent memories with and without message
+deduplication in three multi-agent runs:
+在三种多Agent运行场景下，测量开启与关闭消息去重时Agent记忆占用的Python堆内存：
+
+1. classroom broadcast: each announcement is built per recipient and sent to
+   every student agent of a class
+   班级广播：每条通知为每个接收者单独构建，并发送给班级中每个学生Agent
+2. warm reload: sessions reloaded from SQLite, where context messages and
+   interaction inputs decode as separate copies
+   重启加载：从SQLite重新加载会话，上下文消息和交互输入被解码为各自的副本
+3. travel planning: travel_planning_conversation through TaskCoordinator with
+   a stub model provider
+   旅行规划：通过TaskCoordinator以桩模型提供商运行travel_planning_conversation
+
+Usage / 用法:
+    python benchmarks/bench_message_dedup.py [classes] [students_per_class]
+"""
+import gc
+import os
+import sys
+import tempfile
+import tracemalloc
+
+from common import quiet, register_stub_provider, report
+
+from config.settings import settings
+from memory.manager import MemoryManager
+from memory.message_store import MessageStore
+
+ANNOUNCEMENT = ("各位同学请注意：本周五下午第三节课改为年级大会，请提前十分钟到礼堂集合，"
+                "按班级顺序入座，带好笔记本和笔。会后各班班主任会布置期中复习计划，"
+                "请认真记录并按时完成。") * 4
+
+
+def measure(fn):
+    gc.collect()
+    tracemalloc.start()
+    keep = fn()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, keep
+
+
+def with_dedup(enabled: bool, fn):
+    settings.MESSAGE_DEDUP_ENABLED = enabled
+    MessageStore._shared_store = None
+    try:
+        return measure(fn)
+    finally:
+        settings.MESSAGE_DEDUP_ENABLED = True
+
+
+def classroom_broadcast(classes: int, students: int):
+    def run():
+        memories = []
+        with quiet():
+            for class_id in range(classes):
+                class_memories = [MemoryManager(f"student_{class_id}_{i}") for i in range(students)]
+                for day in range(5):
+                    for memory in class_memories:
+                        message = {"role": "teacher", "type": "announcement",
+                                   "content": f"第{day + 1}天：{ANNOUNCEMENT}"}
+                        memory.update_context("class_channel", message)
+                        memory.store_interaction("class_channel", message,
+                                                 {"role": "assistant", "content": "收到"},
+                                                 {"action": "respond"})
+                memories.extend(class_memories)
+        return memories
+    return run
+
+
+def warm_reload(path: str, agents: int, turns: int):
+    with quiet():
+        writer = MemoryManager("writer_probe", storage_path=path)
+        for agent in range(agents):
+            memory = MemoryManager(f"tutor_{agent}", storage_path=path)
+            for turn in range(turns):
+                question = {"role": "user", "content": f"第{turn}个问题：{ANNOUNCEMENT[:120]}"}
+                answer = {"role": "assistant", "content": ANNOUNCEMENT[turn % 40:]}
+                memory.update_context("s1", question)
+                memory.update_context("s1", answer)
+                memory.store_interaction("s1", question, answer, {"action": "respond"})
+        writer.store.flush()
+
+    def run():
+        memories = []
+        with quiet():
+            for agent in range(agents):
+                memory = MemoryManager(f"tutor_{agent}", storage_path=path)
+                memory.get_context("s1")
+                memories.append(memory)
+        return memories
+    return run
+
+
+def travel_planning(requests: int):
+    from examples.travel_planner import travel_planning_conversation
+    from agents.coordinator import TaskCoordinator
+
+    def run():
+        coordinators = []
+        original_init = TaskCoordinator.__init__
+        with quiet():
+            # Keep each coordinator (and its agents' memories) alive for measuring
+            # 保留每个协调器（及其Agent的记忆）以便测量
+            def init(self):
+                original_init(self)
+                coordinators.append(self)
+            TaskCoordinator.__init__ = init
+            try:
+                for i in range(requests):
+                    travel_planning_conversation(f"我想和家人去成都玩五天，预算一万元，第{i}次咨询")
+            finally:
+                TaskCoordinator.__init__ = original_init
+        return coordinators
+    return run
+
+
+def main() -> None:
+    classes = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    students = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    settings.DEFAULT_MODEL_PROVIDER = register_stub_provider()
+
+    rows = []
+    copies, _ = with_dedup(False, classroom_broadcast(classes, students))
+    shared, _ = with_dedup(True, classroom_broadcast(classes, students))
+    rows.append((f"broadcast ({classes}x{students} students, 5 days)",
+                 f"{copies / 1e6:.1f} MB -> {shared / 1e6:.1f} MB ({copies / shared:.1f}x)"))
+
+    path = os.path.join(tempfile.mkdtemp(), "memory.db")
+    reload_run = warm_reload(path, agents=200, turns=20)
+    copies, _ = with_dedup(False, reload_run)
+    shared, _ = with_dedup(True, reload_run)
+    rows.append(("warm reload (200 agents x 20 turns)",
+                 f"{copies / 1e6:.1f} MB -> {shared / 1e6:.1f} MB ({copies / shared:.1f}x)"))
+
+    copies, _ = with_dedup(False, travel_planning(200))
+    shared, _ = with_dedup(True, travel_planning(200))
+    rows.append(("travel planning (200 requests, 3 agents)",
+                 f"{copies / 1e6:.1f} MB -> {shared / 1e6:.1f} MB ({copies / shared:.2f}x)"))
+
+    report("Agent memory heap: copies -> shared records", rows)
+
+
+if __name__ == "__main__":
+    main()
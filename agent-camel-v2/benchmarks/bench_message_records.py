@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Allocation benchmark for compact message and interaction records.
+紧凑消息与交互记录的内存分配基准测试
+
+1. record size: heap bytes per message and interaction as plain dicts vs
+   slotted records
+   记录大小：普通字典与槽记录的每条消息、每条交互占用的堆字节数
+2. processed messages: heap blocks and bytes retained per message that a
+   TravelPlannerAgent processes (context, interaction history, response),
+   with a stub model provider
+   已处理消息：使用桩模型提供商时，TravelPlannerAgent每处理一条消息
+   （上下文、交互历史、响应）保留的堆内存块数和字节数
+
+Usage / 用法:
+    python benchmarks/bench_message_records.py [messages]
+"""
+import gc
+import sys
+import time
+import tracemalloc
+
+from common import quiet, register_stub_provider, report
+
+from config.settings import settings
+from memory.records import Interaction, Message
+
+QUESTION = "请帮我规划一下去成都的行程，第{}天想去看熊猫和吃火锅"
+
+
+def heap(fn):
+    """Heap bytes and blocks retained by the objects fn() returns.
+    fn()返回的对象所保留的堆字节数和内存块数"""
+    gc.collect()
+    blocks = sys.getallocatedblocks()
+    tracemalloc.start()
+    keep = fn()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, sys.getallocatedblocks() - blocks, keep
+
+
+def record_sizes(n: int):
+    def dicts():
+        return [{"input": {"role": "user", "content": QUESTION.format(i)},
+                 "output": {"role": "assistant", "content": QUESTION.format(i), "agent_id": "planner_1"},
+                 "plan": None, "timestamp": float(i)} for i in range(n)]
+
+    def records():
+        return [Interaction(Message("user", QUESTION.format(i)),
+                            Message("assistant", QUESTION.format(i), "planner_1"),
+                            None, float(i)) for i in range(n)]
+
+    rows = []
+    for name, fn in (("dict interactions", dicts), ("record interactions", records)):
+        size, _, _ = heap(fn)
+        rows.append((name, f"{size / n:.0f} bytes per interaction"))
+    return rows
+
+
+def processed_messages(n: int):
+    from agents.coordinator import TravelPlannerAgent
+
+    def run():
+        with quiet():
+            agent = TravelPlannerAgent("planner_1", settings.DEFAULT_MODEL_PROVIDER)
+            agent.memory
+            for i in range(n):
+                agent.process_message({"role": "user", "content": QUESTION.format(i)}, f"session_{i % 100}")
+        return agent
+
+    start = time.perf_counter()
+    size, blocks, _ = heap(run)
+    seconds = time.perf_counter() - start
+    return [("retained per processed message", f"{blocks / n:.1f} blocks, {size / n:.0f} bytes"),
+            ("time per processed message (traced)", f"{seconds / n * 1e6:.0f} us")]
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    settings.DEFAULT_MODEL_PROVIDER = register_stub_provider()
+    report(f"Record size ({n:,} interactions)", record_sizes(n))
+    report(f"TravelPlannerAgent ({n:,} messages, 100 sessions)", processed_messages(n))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Restart benchmark for durable MemoryManager storage.
+持久化MemoryManager存储的重启基准测试
+
+Fills the SQLite store with growing amounts of history and measures how long
+a restart takes (open + first access to one session).
+向SQLite存储写入越来越多的历史记录，测量重启耗时（打开存储 + 首次访问一个会话）。
+
+Usage / 用法:
+    python benchmarks/bench_persistence.py [max_interactions]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from common import quiet, report
+
+from memory.manager import MemoryManager
+from memory.storage import SQLiteMemoryStore
+
+
+def fill(store: SQLiteMemoryStore, start: int, stop: int, sessions: int = 1000) -> None:
+    for i in range(start, stop):
+        session_id = f"session_{i % sessions}"
+        message = {"role": "user", "content": f"第{i}条消息：请帮我安排明天的学习计划。"}
+        store.append_context("student_S001", session_id, message)
+        store.append_interaction("student_S001", session_id, {
+            "input": message,
+            "output": {"role": "assistant", "content": "好的，这是你明天的学习计划……" * 4},
+            "plan": {"action": "respond"}
+        })
+    store.flush()
+
+
+def main(max_interactions: int = 1_000_000) -> None:
+    path = os.path.join(tempfile.mkdtemp(), "memory.db")
+    rows = []
+    written = 0
+    size = 10_000
+    while size <= max_interactions:
+        with quiet():
+            store = SQLiteMemoryStore(path, group_commit_size=5000)
+            start = time.perf_counter()
+            fill(store, written, size)
+            write_rate = (size - written) / (time.perf_counter() - start)
+            store.close()
+            written = size
+            
+            start = time.perf_counter()
+            memory = MemoryManager("student_S001", storage_path=path)
+            opened = time.perf_counter() - start
+            start = time.perf_counter()
+            memory.get_context("session_7")
+            first_access = time.perf_counter() - start
+            memory.store.close()
+        rows.append((f"{size:>9,} interactions",
+                     f"open {opened * 1000:6.2f} ms, first access {first_access * 1000:6.2f} ms, "
+                     f"write {write_rate:,.0f}/s"))
+        size *= 10
+    report("Restart time vs. stored history", rows)
+    print(f"database size: {os.path.getsize(path) / 1024 / 1024:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
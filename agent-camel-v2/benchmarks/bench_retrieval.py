@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark for vector retrieval memory.
+向量检索记忆的基准测试
+
+Measures recall of noisy paraphrased queries against their source
+interaction, embedding throughput and top-k search latency over a large
+synthetic history.
+测量带噪声改写查询对原始交互的召回率、向量化吞吐量，
+以及在大规模合成历史上的top-k检索延迟。
+
+Usage / 用法:
+    python benchmarks/bench_retrieval.py [interaction_count] [dim]
+"""
+import random
+import sys
+import time
+from typing import List
+
+import numpy as np
+
+from common import report
+
+from memory.retrieval import VectorIndex, embed_texts
+
+VOCAB = [f"w{i}" for i in range(5000)]
+CITIES = ["北京", "上海", "成都", "杭州", "西安", "广州", "重庆", "南京"]
+TOPICS = ["故宫门票", "火锅推荐", "酒店预订", "高铁时刻", "博物馆", "夜市小吃", "登山路线", "亲子乐园"]
+
+
+def make_text(rng: random.Random) -> str:
+    words = rng.sample(VOCAB, 6)
+    return f"{rng.choice(CITIES)}{rng.choice(TOPICS)} " + " ".join(words)
+
+
+def noisy_query(text: str, rng: random.Random) -> str:
+    """Drop half of the words, shuffle the rest and add unrelated ones.
+    丢弃一半单词，打乱其余单词并加入无关单词"""
+    head, *words = text.split(" ")
+    kept = rng.sample(words, len(words) // 2)
+    kept += rng.sample(VOCAB, 2)
+    rng.shuffle(kept)
+    return head + " " + " ".join(kept)
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    dim = int(sys.argv[2]) if len(sys.argv) > 2 else 128
+    rng = random.Random(7)
+    texts = [make_text(rng) for _ in range(count)]
+
+    index = VectorIndex(dim)
+    start = time.perf_counter()
+    batch = 50_000
+    for offset in range(0, count, batch):
+        chunk = texts[offset:offset + batch]
+        index.add(embed_texts(chunk, dim), range(offset, offset + len(chunk)))
+    embed_seconds = time.perf_counter() - start
+
+    queries = 200
+    targets = [rng.randrange(count) for _ in range(queries)]
+    query_vectors = embed_texts([noisy_query(texts[t], rng) for t in targets], dim)
+    hits_1 = hits_5 = 0
+    latencies: List[float] = []
+    for target, vector in zip(targets, query_vectors):
+        t0 = time.perf_counter()
+        results = index.search(vector, 5)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        found = [payload for _, payload in results]
+        hits_1 += found[0] == target
+        hits_5 += target in found
+
+    latencies.sort()
+    report(f"Vector retrieval over {count:,} interactions (dim={dim})", [
+        ("embed + index throughput", f"{count / embed_seconds:,.0f} texts/s"),
+        ("index size", f"{index.vectors.nbytes / 1e6:,.1f} MB"),
+        ("recall@1 (noisy queries)", f"{hits_1 / queries:.1%}"),
+        ("recall@5 (noisy queries)", f"{hits_5 / queries:.1%}"),
+        ("top-5 search p50", f"{latencies[len(latencies) // 2]:.2f} ms"),
+        ("top-5 search p99", f"{latencies[int(len(latencies) * 0.99)]:.2f} ms"),
+    ])
+    # Exact search check: argpartition top-k must equal a full sort
+    # 精确性检查：argpartition的top-k必须与完整排序一致
+    scores = index.vectors @ query_vectors[0]
+    expected = np.argsort(scores)[::-1][:5]
+    assert [p for _, p in index.search(query_vectors[0], 5)] == list(expected)
+
+
+if __name__ == "__main__":
+    main()
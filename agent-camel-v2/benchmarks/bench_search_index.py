@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the offline BM25 search index.
+离线BM25检索索引的基准测试
+
+Indexes a synthetic Chinese corpus (character frequencies follow a Zipf
+law, so common bigrams have long postings like real text), then reports
+indexing throughput, on-disk size, reopen time and query latency
+percentiles for short keyword queries taken from the corpus.
+索引一个合成中文语料（字符频率服从Zipf分布，因此常见二元组与真实文本一样有很长的倒排表），
+然后报告索引吞吐量、磁盘占用、重新打开耗时，以及从语料中抽取的短关键词查询的延迟百分位数。
+
+Usage / 用法:
+    python benchmarks/bench_search_index.py [documents] [queries]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from common import quiet, report
+
+from tools.search_index import SearchIndex
+
+# 4000 CJK characters with Zipf(0.8) frequencies
+# 4000个中日韩字符，频率服从Zipf(0.8)分布
+CHARACTERS = np.array([chr(0x4E00 + i) for i in range(4000)])
+WEIGHTS = 1.0 / np.arange(1, 4001) ** 0.8
+WEIGHTS /= WEIGHTS.sum()
+CATEGORIES = ["旅行指南", "学校手册", "报销政策"]
+
+
+def documents(count: int, rng: np.random.Generator, chunk: int = 10000):
+    for start in range(0, count, chunk):
+        size = min(chunk, count - start)
+        lengths = rng.integers(20, 60, size)
+        characters = CHARACTERS[rng.choice(len(CHARACTERS), int(lengths.sum()), p=WEIGHTS)]
+        ends = np.cumsum(lengths)
+        for i in range(size):
+            text = "".join(characters[ends[i] - lengths[i]:ends[i]])
+            yield {"id": f"doc-{start + i}", "title": f"{CATEGORIES[(start + i) % 3]}{start + i}", "text": text}
+
+
+def queries(index: SearchIndex, count: int, rng: np.random.Generator):
+    """Keyword queries of 2-6 characters cut from random stored documents.
+    从随机存储文档中截取的2-6个字符的关键词查询"""
+    segments = index._segments
+    result = []
+    for _ in range(count):
+        segment = segments[int(rng.integers(len(segments)))]
+        text = segment.document(int(rng.integers(len(segment))))["text"]
+        size = int(rng.integers(2, 7))
+        start = int(rng.integers(0, max(1, len(text) - size)))
+        result.append(text[start:start + size])
+    return result
+
+
+def directory_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    query_count = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    rng = np.random.default_rng(0)
+    path = tempfile.mkdtemp(prefix="bench-search-")
+
+    with quiet():
+        index = SearchIndex(path)
+        start = time.perf_counter()
+        index.add_documents(documents(count, rng))
+        indexing = time.perf_counter() - start
+    stats = index.stats()
+    del index
+
+    start = time.perf_counter()
+    with quiet():
+        index = SearchIndex(path)
+    reopen = time.perf_counter() - start
+    report(f"Indexing ({count:,} documents)", [
+        ("throughput", f"{count / indexing:,.0f} docs/s ({indexing:.1f} s)"),
+        ("segments (live documents)", str(stats["segments"])),
+        ("postings", f"{stats['postings']:,}"),
+        ("index size on disk", f"{directory_size(path) / 2 ** 20:,.0f} MB"),
+        ("reopen (mmap)", f"{reopen * 1000:.1f} ms"),
+    ])
+
+    sample = queries(index, query_count, rng)
+    for query in sample[:200]:
+        index.search(query, 10)  # warm the page cache / 预热页缓存
+    latencies = []
+    hits = 0
+    for query in sample:
+        start = time.perf_counter()
+        result = index.search(query, 10)
+        latencies.append(time.perf_counter() - start)
+        hits += bool(result)
+    latencies.sort()
+    p50, p99, p999 = (latencies[min(len(latencies) - 1, int(len(latencies) * q))] for q in (0.5, 0.99, 0.999))
+    report(f"search(query, k=10) over {count:,} documents ({query_count:,} queries of 2-6 characters)", [
+        ("p50 / p99 / p99.9", f"{p50 * 1000:.2f} / {p99 * 1000:.2f} / {p999 * 1000:.2f} ms"),
+        ("max", f"{latencies[-1] * 1000:.2f} ms"),
+        ("queries with hits", f"{hits / len(sample):.1%}"),
+    ])
+    shutil.rmtree(path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
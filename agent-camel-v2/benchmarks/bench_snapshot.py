@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Warm-restart benchmark for memory snapshots.
+记忆快照的热重启基准测试
+
+Builds agent memories with 100k sessions persisted to SQLite, writes a
+snapshot, appends a log tail, then restarts in fresh processes:
+构建持久化到SQLite的10万个会话的Agent记忆，写入快照并追加日志尾部，
+然后在新进程中重启：
+
+- snapshot: open the snapshot, replay the tail, serve requests
+  快照：打开快照，重放日志尾部，处理请求
+- log replay: rebuild every session from the SQLite log
+  日志重放：从SQLite日志重建所有会话
+
+Usage / 用法:
+    python benchmarks/bench_snapshot.py [agents] [sessions_per_agent]
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import quiet, report
+
+from config.settings import settings
+from memory.manager import MemoryManager
+from memory.snapshot import save_snapshot
+
+
+def build(directory: str, agents: int, sessions: int) -> float:
+    settings.MEMORY_STORAGE_PATH = os.path.join(directory, "memory.db")
+    managers = []
+    with quiet():
+        for agent in range(agents):
+            memory = MemoryManager(f"agent_{agent}")
+            for session in range(sessions):
+                session_id = f"session_{session}"
+                for turn in range(3):
+                    question = {"role": "user", "content": f"第{turn}个问题：明天的课程安排是什么？{session}"}
+                    answer = {"role": "assistant", "content": f"明天上午是数学和语文，下午是体育。{agent}-{session}-{turn}"}
+                    memory.update_context(session_id, question)
+                    memory.update_context(session_id, answer)
+                    memory.store_interaction(session_id, question, answer, {"action": "respond"})
+            managers.append(memory)
+        managers[0].store.flush()
+        start = time.perf_counter()
+        save_snapshot(os.path.join(directory, "memory.snapshot"), managers=managers)
+        snapshot_seconds = time.perf_counter() - start
+        # Log tail written after the snapshot
+        # 快照之后写入的日志尾部
+        for agent in range(0, agents, 2):
+            managers[agent].update_context("session_0", {"role": "user", "content": "快照之后的新消息"})
+        managers[0].store.close()
+    return snapshot_seconds
+
+
+def restart(directory: str, agents: int, sessions: int, use_snapshot: bool) -> None:
+    """Runs in a fresh process and prints the restart time.
+    在新进程中运行并打印重启时间"""
+    settings.MEMORY_STORAGE_PATH = os.path.join(directory, "memory.db")
+    if use_snapshot:
+        settings.MEMORY_SNAPSHOT_PATH = os.path.join(directory, "memory.snapshot")
+    with quiet():
+        start = time.perf_counter()
+        managers = [MemoryManager(f"agent_{agent}") for agent in range(agents)]
+        if not use_snapshot:
+            for memory in managers:
+                for session in range(sessions):
+                    memory._ensure_loaded(f"session_{session}")
+        ready = time.perf_counter() - start
+        # First request of each agent after the restart
+        # 重启后每个Agent的第一个请求
+        for memory in managers:
+            memory.get_context("session_0")
+        first = time.perf_counter() - start - ready
+        assert managers[0].get_context("session_0")[-1]["content"] == "快照之后的新消息"
+    print(f"{ready} {first}")
+
+
+def main() -> None:
+    if len(sys.argv) > 1 and sys.argv[1] == "--restart":
+        restart(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]), sys.argv[5] == "snapshot")
+        return
+    agents = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    sessions = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    directory = tempfile.mkdtemp()
+    snapshot_seconds = build(directory, agents, sessions)
+    snapshot_size = os.path.getsize(os.path.join(directory, "memory.snapshot"))
+
+    rows = [("snapshot write", f"{snapshot_seconds:.2f} s, {snapshot_size / 1e6:.1f} MB")]
+    for mode in ("snapshot", "replay"):
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), "--restart", directory,
+                                 str(agents), str(sessions), mode],
+                                capture_output=True, text=True, check=True).stdout.split()
+        ready, first = float(output[-2]), float(output[-1])
+        rows.append((f"restart ({mode})", f"{ready * 1000:,.0f} ms"))
+        rows.append((f"first request per agent ({mode})", f"{first / agents * 1000:.2f} ms"))
+    report(f"Warm restart: {agents} agents x {sessions} sessions = {agents * sessions:,} sessions", rows)
+
+
+if __name__ == "__main__":
+    main()
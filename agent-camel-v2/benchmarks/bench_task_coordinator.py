@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark for concurrent task execution in TaskCoordinator.
+TaskCoordinator并发任务执行的基准测试
+
+Runs the three travel planning tasks (destination planning, local guidance,
+budget planning) against a stub provider that sleeps like a remote model,
+one after another with execute_task and concurrently with execute_tasks.
+A third run gives the budget advisor a much slower model and a deadline,
+to show that the other two results still arrive on time.
+针对一个像远程模型一样休眠的桩模型提供商，运行三个旅行规划任务（目的地规划、当地指南、
+预算规划）：先用execute_task依次执行，再用execute_tasks并发执行。第三轮让预算顾问使用
+慢得多的模型并设置截止时间，以说明其余两个结果仍能按时返回。
+
+Usage / 用法:
+    python benchmarks/bench_task_coordinator.py [model_latency_seconds] [rounds]
+"""
+import sys
+import time
+
+from common import StubProvider, quiet, register_stub_provider, report
+
+from agents.coordinator import TaskCoordinator
+from agents.model_provider import ModelProviderFactory
+
+AGENTS = {
+    "destination_planning": ("planner_1", "travel_planner"),
+    "local_guidance": ("guide_1", "local_guide"),
+    "budget_planning": ("budget_1", "budget_advisor"),
+}
+
+
+class SlowStubProvider(StubProvider):
+    """Stub provider ten times slower than the others.
+    比其他桩模型慢十倍的桩模型提供商"""
+
+    def generate(self, prompt: str, **kwargs) -> str:
+        time.sleep(StubProvider.latency * 9)
+        return super().generate(prompt, **kwargs)
+
+
+def build(provider: str, budget_provider: str) -> TaskCoordinator:
+    coordinator = TaskCoordinator()
+    for task_type, (agent_id, agent_type) in AGENTS.items():
+        coordinator.register_agent(agent_id, agent_type, [task_type],
+                                   budget_provider if task_type == "budget_planning" else provider)
+    return coordinator
+
+
+def assignments(coordinator: TaskCoordinator, round_number: int):
+    tasks = coordinator.analyze_request(f"五天京都之旅，预算一万元（第{round_number}轮）")["tasks"]
+    return [(AGENTS[task["type"]][0], task) for task in tasks]
+
+
+def timed(fn, rounds: int) -> float:
+    start = time.perf_counter()
+    for round_number in range(rounds):
+        fn(round_number)
+    return (time.perf_counter() - start) / rounds
+
+
+def main() -> None:
+    latency = float(sys.argv[1]) if len(sys.argv) > 1 else 0.2
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    provider = register_stub_provider(latency)
+    ModelProviderFactory.register_provider("stub-slow", SlowStubProvider)
+
+    with quiet():
+        coordinator = build(provider, provider)
+
+        def sequential(round_number: int) -> None:
+            for agent_id, task in assignments(coordinator, round_number):
+                coordinator.execute_task(agent_id, task, f"sequential-{round_number}")
+
+        def concurrent(round_number: int) -> None:
+            coordinator.execute_tasks(assignments(coordinator, round_number), f"concurrent-{round_number}")
+
+        sequential_time = timed(sequential, rounds)
+        concurrent_time = timed(concurrent, rounds)
+
+        slow = build(provider, "stub-slow")
+        deadline = latency * 4
+        start = time.perf_counter()
+        partial = slow.execute_tasks(assignments(slow, 0), "partial", timeout=deadline)
+        partial_time = time.perf_counter() - start
+        TaskCoordinator._pool().shutdown(wait=True)  # let the timed-out task finish quietly / 让超时的任务安静地运行完
+
+    report(f"Travel planning, 3 tasks, stub model latency {latency * 1000:.0f} ms ({rounds} rounds)", [
+        ("execute_task one after another", f"{sequential_time * 1000:.0f} ms"),
+        ("execute_tasks", f"{concurrent_time * 1000:.0f} ms"),
+        ("speedup", f"{sequential_time / concurrent_time:.2f}x"),
+    ])
+    report(f"Budget advisor 10x slower, per-task timeout {deadline * 1000:.0f} ms", [
+        ("execute_tasks returned after", f"{partial_time * 1000:.0f} ms"),
+        ("task status", ", ".join(f"{result['task_type']}={result['status']}" for result in partial)),
+    ])
+
+
+if __name__ == "__main__":
+    main()
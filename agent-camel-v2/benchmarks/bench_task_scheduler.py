@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the dependency-aware task scheduler.
+依赖感知任务调度器的基准测试
+
+1. The travel plan (destination planning first, then local guidance and
+   budget planning with its result): tasks one after another vs the DAG
+   scheduler.
+   旅行计划（先做目的地规划，再用其结果做当地指南和预算规划）：依次执行与DAG调度器对比。
+2. A chain of three dependent tasks plus six independent tasks with two
+   workers: critical-path priority vs first-come-first-served (all
+   estimates 0, so ready tasks run in submission order).
+   三个相互依赖的任务链加六个独立任务、两个工作线程：关键路径优先与先到先服务
+   （所有预计耗时为0，就绪任务按提交顺序执行）对比。
+
+Usage / 用法:
+    python benchmarks/bench_task_scheduler.py [model_latency_seconds]
+"""
+import re
+import sys
+import time
+
+from common import StubProvider, quiet, register_stub_provider, report
+
+from agents.coordinator import TaskCoordinator
+from agents.model_provider import ModelProviderFactory
+from agents.scheduler import format_timeline
+
+TRAVEL_AGENTS = {
+    "destination_planning": ("planner_1", "travel_planner"),
+    "local_guidance": ("guide_1", "local_guide"),
+    "budget_planning": ("budget_1", "budget_advisor"),
+}
+
+
+class CostStubProvider(StubProvider):
+    """Stub provider that sleeps `cost` model latencies when the prompt says "cost=N".
+    提示中含"cost=N"时休眠N倍模型延迟的桩模型提供商"""
+
+    def generate(self, prompt: str, **kwargs) -> str:
+        match = re.search(r"cost=(\d+)", prompt)
+        time.sleep(StubProvider.latency * (int(match.group(1)) if match else 1))
+        return f"stub plan for: {prompt[-80:]}"
+
+
+def travel(provider: str):
+    coordinator = TaskCoordinator()
+    for task_type, (agent_id, agent_type) in TRAVEL_AGENTS.items():
+        coordinator.register_agent(agent_id, agent_type, [task_type], provider)
+
+    def tasks(name: str):
+        result = coordinator.analyze_request(f"五天京都之旅，预算一万元（{name}）")["tasks"]
+        for task in result:
+            task["agent_id"] = TRAVEL_AGENTS[task["type"]][0]
+        return result
+
+    start = time.perf_counter()
+    results = {}
+    for task in tasks("sequential"):
+        # What the old flow did: each task in turn, no upstream results
+        # 旧流程的做法：逐个执行，不传递上游结果
+        results[task["type"]] = coordinator.execute_task(task["agent_id"], task, "sequential")
+    sequential = time.perf_counter() - start
+    run = coordinator.execute_graph(tasks("graph"), "graph")
+    return sequential, run
+
+
+def mixed(provider: str, prioritized: bool):
+    coordinator = TaskCoordinator()
+    tasks = [{"id": f"side_{i}", "type": "side", "description": "cost=1 side task"} for i in range(6)]
+    tasks += [{"id": "chain_1", "type": "chain", "description": "cost=1 chain step"},
+              {"id": "chain_2", "type": "chain", "description": "cost=1 chain step", "inputs": ["chain_1"]},
+              {"id": "chain_3", "type": "chain", "description": "cost=1 chain step", "inputs": ["chain_2"]}]
+    for task in tasks:
+        task["agent_id"] = task["id"]
+        coordinator.register_agent(task["id"], "travel_planner", [task["type"]], provider)
+        if not prioritized:
+            task["estimate"] = 0.0
+    return coordinator.execute_graph(tasks, f"mixed-{prioritized}", max_concurrency=2)
+
+
+def main() -> None:
+    latency = float(sys.argv[1]) if len(sys.argv) > 1 else 0.1
+    register_stub_provider(latency)
+    ModelProviderFactory.register_provider("stub-cost", CostStubProvider)
+
+    with quiet():
+        sequential, run = travel("stub-cost")
+        fifo = mixed("stub-cost", prioritized=False)
+        critical = mixed("stub-cost", prioritized=True)
+        TaskCoordinator._pool().shutdown(wait=True)
+
+    report(f"Travel plan, 3 tasks with dependencies, stub model latency {latency * 1000:.0f} ms", [
+        ("one after another (no upstream results)", f"{sequential * 1000:.0f} ms"),
+        ("DAG scheduler", f"{run['elapsed'] * 1000:.0f} ms"),
+        ("critical path", " -> ".join(run["critical_path"])),
+    ])
+    print(format_timeline(run))
+    report("Chain of 3 + 6 independent tasks, 2 workers", [
+        ("first come, first served", f"{fifo['elapsed'] * 1000:.0f} ms"),
+        ("critical path first", f"{critical['elapsed'] * 1000:.0f} ms"),
+        ("lower bound (total work / 2 workers, rounded up)", f"{latency * 5 * 1000:.0f} ms"),
+    ])
+    print("first come, first served:")
+    print(format_timeline(fifo))
+    print("critical path first:")
+    print(format_timeline(critical))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Shared helpers for Agent-Camel V2 benchmarks.
+Agent-Camel V2基准测试的公共辅助工具
+"""
+import os
+import sys
+import time
+import contextlib
+from typing import Iterator
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.model_provider import ModelProvider, ModelProviderFactory
+
+
+class StubProvider(ModelProvider):
+    """Deterministic offline provider used by benchmarks.
+    基准测试使用的确定性离线模型提供商"""
+    
+    latency: float = 0.0
+    
+    def generate(self, prompt: str, **kwargs) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        return f"stub plan for: {prompt[-80:]}"
+
+
+def register_stub_provider(latency: float = 0.0) -> str:
+    """Register StubProvider as "stub" and return the provider name.
+    将StubProvider注册为"stub"并返回提供商名称"""
+    StubProvider.latency = latency
+    ModelProviderFactory.register_provider("stub", StubProvider)
+    return "stub"
+
+
+@contextlib.contextmanager
+def quiet() -> Iterator[None]:
+    """Silence the per-call prints of the library while measuring.
+    测量期间屏蔽库内部的逐次打印输出"""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def report(title: str, rows) -> None:
+    """Print a simple aligned result table.
+    打印简单的对齐结果表"""
+    print(f"\n{title}")
+    print("-" * 60)
+    for name, value in rows:
+        print(f"{name:<40} {value}")
@@ -3,7 +3,7 @@ Configuration settings for Agent-Camel V2.
 Agent-Camel V2的配置设置
 """
 import os
-from typing import Optional
+from typing import List, Optional
 
 
 class Settings:
@@ -36,6 +36,49 @@ class Settings:
     MAX_TOKENS: int = int(os.getenv("MAX_TOKENS", "2000"))
     TEMPERATURE: float = float(os.getenv("TEMPERATURE", "0.7"))
 
+    # Memory settings
+    # 记忆设置
+    CONTEXT_MAX_MESSAGES: int = int(os.getenv("CONTEXT_MAX_MESSAGES", "50"))
+    CONTEXT_MAX_BYTES: Optional[int] = int(os.getenv("CONTEXT_MAX_BYTES")) if os.getenv("CONTEXT_MAX_BYTES") else None
+    SESSION_IDLE_TTL: float = float(os.getenv("SESSION_IDLE_TTL", str(24 * 3600)))
+    SESSION_MAX_COUNT: Optional[int] = int(os.getenv("SESSION_MAX_COUNT")) if os.getenv("SESSION_MAX_COUNT") else None
+    SESSION_MAX_BYTES: Optional[int] = int(os.getenv("SESSION_MAX_BYTES")) if os.getenv("SESSION_MAX_BYTES") else None
+    MEMORY_STORAGE_PATH: Optional[str] = os.getenv("MEMORY_STORAGE_PATH")
+    MEMORY_WRITE_BEHIND: bool = os.getenv("MEMORY_WRITE_BEHIND", "False").lower() == "true"
+    MEMORY_WRITE_QUEUE_SIZE: int = int(os.getenv("MEMORY_WRITE_QUEUE_SIZE", "10000"))
+    MEMORY_HIGH_WATERMARK: Optional[int] = int(os.getenv("MEMORY_HIGH_WATERMARK")) if os.getenv("MEMORY_HIGH_WATERMARK") else None
+    MEMORY_LOW_WATERMARK_RATIO: float = float(os.getenv("MEMORY_LOW_WATERMARK_RATIO", "0.9"))
+    MEMORY_BACKEND: str = os.getenv("MEMORY_BACKEND", "memory")
+    CONTEXT_SUMMARY_ENABLED: bool = os.getenv("CONTEXT_SUMMARY_ENABLED", "False").lower() == "true"
+    CONTEXT_SUMMARY_TOKENS: int = int(os.getenv("CONTEXT_SUMMARY_TOKENS", "512"))
+    RETRIEVAL_ENABLED: bool = os.getenv("RETRIEVAL_ENABLED", "False").lower() == "true"
+    RETRIEVAL_TOP_K: int = int(os.getenv("RETRIEVAL_TOP_K", "3"))
+    RETRIEVAL_EMBEDDING_DIM: int = int(os.getenv("RETRIEVAL_EMBEDDING_DIM", "256"))
+    RETRIEVAL_PERSIST: bool = os.getenv("RETRIEVAL_PERSIST", "False").lower() == "true"
+    INTERACTION_HOT_LIMIT: Optional[int] = int(os.getenv("INTERACTION_HOT_LIMIT")) if os.getenv("INTERACTION_HOT_LIMIT") else None
+    COLD_BLOCK_SIZE: int = int(os.getenv("COLD_BLOCK_SIZE", "16"))
+    COLD_STORAGE_PATH: Optional[str] = os.getenv("COLD_STORAGE_PATH")
+    COLD_COMPRESSION: str = os.getenv("COLD_COMPRESSION", "zlib")
+    MEMORY_SNAPSHOT_PATH: Optional[str] = os.getenv("MEMORY_SNAPSHOT_PATH")
+    MESSAGE_DEDUP_ENABLED: bool = os.getenv("MESSAGE_DEDUP_ENABLED", "True").lower() == "true"
+
+    # Tool settings
+    # 工具设置
+    TOOL_CACHE_ENABLED: bool = os.getenv("TOOL_CACHE_ENABLED", "True").lower() == "true"
+    TOOL_CACHE_SIZE: int = int(os.getenv("TOOL_CACHE_SIZE", "1024"))
+    TOOL_CACHE_TTL: float = float(os.getenv("TOOL_CACHE_TTL", "300"))
+    TOOL_TIMEOUT: Optional[float] = float(os.getenv("TOOL_TIMEOUT", "30")) if os.getenv("TOOL_TIMEOUT", "30") else None
+    TOOL_THREAD_WORKERS: int = int(os.getenv("TOOL_THREAD_WORKERS", "16"))
+    TOOL_PROCESS_WORKERS: Optional[int] = int(os.getenv("TOOL_PROCESS_WORKERS")) if os.getenv("TOOL_PROCESS_WORKERS") else None
+    SEARCH_INDEX_PATH: Optional[str] = os.getenv("SEARCH_INDEX_PATH")
+    SEARCH_CORPUS_PATHS: List[str] = [path for path in os.getenv("SEARCH_CORPUS_PATHS", "").split(",") if path]
+
+    # Coordinator settings
+    # 协调器设置
+    TASK_TIMEOUT: Optional[float] = float(os.getenv("TASK_TIMEOUT", "120")) if os.getenv("TASK_TIMEOUT", "120") else None
+    TASK_WORKERS: int = int(os.getenv("TASK_WORKERS", "16"))
+    AGENT_SELECTION_POLICY: str = os.getenv("AGENT_SELECTION_POLICY", "least_outstanding")
+
     # Monitoring settings
     # 监控设置
     COMET_API_KEY: Optional[str] = os.getenv("COMET_API_KEY")
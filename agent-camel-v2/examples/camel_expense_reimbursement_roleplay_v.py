@@ -23,6 +23,7 @@ from dotenv import load_dotenv
 
 # 导入comet监控器
 from agents.comet_monitor import comet_monitor
+from tools.cache import ToolResultCache
 
 # Load environment variables
 # 加载环境变量
@@ -98,6 +99,7 @@ class ExpenseReimbursementSystem:
         self.agents = {}
         self.current_status = "initialized"
         self.process_history = []
+        self._policy_info_tool = None
         self.expense_application = {
             "amount": 0,
             "purpose": "",
@@ -310,6 +312,9 @@ class ExpenseReimbursementSystem:
                 return f"未找到政策类型: {policy_type}\n\n使用'all'获取所有政策信息或'allowed_categories'获取允许报销的类别"
         
         # 为函数添加必要的元数据，使CAMEL框架能够正确识别
+        # 政策信息很少变化，多个角色反复查询时直接使用缓存结果
+        get_policy_info.cacheable = True
+        get_policy_info.cache_ttl = 3600
         get_policy_info.name = "get_policy_info"
         get_policy_info.description = "获取公司的报销政策信息"
         get_policy_info.parameters = {
@@ -325,6 +330,14 @@ class ExpenseReimbursementSystem:
         
         return get_policy_info
     
+    def _get_cached_policy_info_tool(self):
+        """
+        获取经过共享结果缓存的政策信息工具（每个报销系统只构建一次）
+        """
+        if self._policy_info_tool is None:
+            self._policy_info_tool = ToolResultCache.shared().wrap(self._get_policy_info_tool())
+        return self._policy_info_tool
+    
     def _generate_accounting_entry_tool(self):
         """
         生成会计分录工具 - 返回符合CAMEL框架期望的可调用工具
@@ -410,6 +423,8 @@ class ExpenseReimbursementSystem:
             return payment_result
         
         # 为函数添加必要的元数据，使CAMEL框架能够正确识别
+        # 付款有副作用，永远不能缓存
+        pay.side_effects = True
         pay.name = "pay"
         pay.description = "处理报销付款"
         pay.parameters = {
@@ -458,7 +473,7 @@ class ExpenseReimbursementSystem:
         )
         
         # 根据角色类型选择工具
-        tools = [self._get_policy_info_tool()]
+        tools = [self._get_cached_policy_info_tool()]
         
         # 为会计角色添加记账工具
         if role_type == "accountant":
@@ -978,7 +993,7 @@ class ExpenseReimbursementSystem:
             specified_task = specified_task_msg.msgs[0].content
             
             # 根据当前角色类型选择工具
-            tools = [self._get_policy_info_tool()]
+            tools = [self._get_cached_policy_info_tool()]
             
             # 为会计角色添加记账工具
             if current_role == "accountant":
@@ -8,7 +8,7 @@ import os
 import sys
 import time
 import json
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Callable, List, Optional
 import logging
 
 # 添加项目根目录到Python路径
@@ -23,6 +23,8 @@ from agents.base import BaseAgent
 from agents.model_provider import ModelProviderFactory
 from memory.manager import MemoryManager
 from tools.library import ToolLibrary
+from tools.cache import key_on
+from tools.registry import tool_factory
 
 from camel.societies import RolePlaying
 from camel.models import ModelFactory
@@ -106,6 +108,8 @@ class SchoolAgent(BaseAgent):
     学校智能系统中的基础Agent类，扩展自CAMEL的BaseAgent
     """
     
+    __slots__ = ("role_description",)
+    
     def __init__(self, agent_id: str, role: str, model_provider: str = "openai"):
         """
         初始化学校智能系统中的Agent
@@ -115,10 +119,9 @@ class SchoolAgent(BaseAgent):
             role: Agent的角色
             model_provider: 语言模型提供商
         """
+        # 角色特有的工具由BaseAgent在首次创建同类共享配置时注册一次
         super().__init__(agent_id, role, model_provider)
-        self.role_description = role
-        # 注册该角色特有的工具
-        self._register_role_specific_tools()
+        self.role_description = self.role
         
     def get_name(self) -> str:
         """
@@ -224,7 +227,7 @@ class SchoolAgent(BaseAgent):
             动作计划
         """
         # 获取上下文
-        context = self.memory.get_context(session_id)
+        context = self.memory.get_context(session_id, query=message.get("content", ""))
         
         # 获取可用工具
         tools = self.tools.get_available_tools()
@@ -271,6 +274,8 @@ class StudentAgent(SchoolAgent):
     学生代理 - 为每位学生提供个性化服务
     """
     
+    __slots__ = ("student_name",)
+    
     def __init__(self, student_id: str, student_name: str, model_provider: str = "openai"):
         """
         初始化学生代理
@@ -300,6 +305,8 @@ class SubjectTeacherAgent(SchoolAgent):
     学科教师代理 - 为每位学科教师提供教学助理服务
     """
     
+    __slots__ = ("teacher_name", "subject")
+    
     def __init__(self, teacher_id: str, teacher_name: str, subject: str, model_provider: str = "openai"):
         """
         初始化学科教师代理
@@ -331,6 +338,8 @@ class GradingAgent(SchoolAgent):
     阅卷代理 - 为学校/年级组提供自动阅卷服务
     """
     
+    __slots__ = ()
+    
     def __init__(self, model_provider: str = "openai"):
         """
         初始化阅卷代理
@@ -356,6 +365,8 @@ class HeadTeacherAgent(SchoolAgent):
     班主任代理 - 为每位班主任提供班级管理服务
     """
     
+    __slots__ = ("teacher_name", "class_name")
+    
     def __init__(self, teacher_id: str, teacher_name: str, class_name: str, model_provider: str = "openai"):
         """
         初始化班主任代理
@@ -386,6 +397,8 @@ class ParentAgent(SchoolAgent):
     家长代理 - 为每位家长提供校园信息服务
     """
     
+    __slots__ = ("parent_name", "child_id")
+    
     def __init__(self, parent_id: str, parent_name: str, child_id: str, model_provider: str = "openai"):
         """
         初始化家长代理
@@ -416,6 +429,8 @@ class AcademicAdminAgent(SchoolAgent):
     教务行政代理 - 为教务处提供资源调度服务
     """
     
+    __slots__ = ()
+    
     def __init__(self, model_provider: str = "openai"):
         """
         初始化教务行政代理
@@ -441,6 +456,8 @@ class MedicalAgent(SchoolAgent):
     医务代理 - 为校医室提供健康监测服务
     """
     
+    __slots__ = ()
+    
     def __init__(self, model_provider: str = "openai"):
         """
         初始化医务代理
@@ -466,6 +483,8 @@ class DietitianAgent(SchoolAgent):
     营养膳食代理 - 为食堂提供食谱优化服务
     """
     
+    __slots__ = ()
+    
     def __init__(self, model_provider: str = "openai"):
         """
         初始化营养膳食代理
@@ -491,6 +510,8 @@ class SecurityAgent(SchoolAgent):
     安保代理 - 为保卫处提供智能巡检服务
     """
     
+    __slots__ = ()
+    
     def __init__(self, model_provider: str = "openai"):
         """
         初始化安保代理
@@ -516,6 +537,8 @@ class PrincipalAgent(SchoolAgent):
     校长/教导主任代理 - 为校领导提供决策支持服务
     """
     
+    __slots__ = ()
+    
     def __init__(self, model_provider: str = "openai"):
         """
         初始化校长代理
@@ -536,6 +559,8 @@ class PrincipalAgent(SchoolAgent):
 
 
 # 定义学校智能系统中的工具
+# 每个工具由进程级ToolRegistry只构建一次，所有Agent共享
+@tool_factory
 def get_study_plan_tool() -> Callable:
     """
     获取学习计划工具 - 返回可调用的函数
@@ -565,6 +590,10 @@ def get_study_plan_tool() -> Callable:
         return {"status": "success", "data": plan}
         
     # 为函数添加必要的元数据，使CAMEL框架能够正确识别
+    # 学习计划变化缓慢，按学生和科目缓存
+    study_plan.cacheable = True
+    study_plan.cache_ttl = 600
+    study_plan.cache_key = key_on("student_id", "subject")
     study_plan.name = "study_plan"
     study_plan.description = "管理个人学习计划，智能推送复习内容"
     study_plan.parameters = {
@@ -584,6 +613,7 @@ def get_study_plan_tool() -> Callable:
     
     return study_plan
 
+@tool_factory
 def get_task_tracker_tool() -> Callable:
     """
     获取任务跟踪工具 - 返回可调用的函数
@@ -627,6 +657,7 @@ def get_task_tracker_tool() -> Callable:
     return task_tracker
 
 
+@tool_factory
 def get_request_submission_tool() -> Callable:
     """
     获取请求提交工具 - 返回可调用的函数
@@ -692,6 +723,7 @@ def get_request_submission_tool() -> Callable:
     return request_submission
 
 
+@tool_factory
 def get_data_dashboard_tool() -> Callable:
     """
     获取数据看板工具 - 返回可调用的函数
@@ -740,6 +772,7 @@ def get_data_dashboard_tool() -> Callable:
     return data_dashboard
 
 
+@tool_factory
 def get_assignment_grading_tool() -> Callable:
     """
     获取作业批改工具 - 返回可调用的函数
@@ -759,9 +792,12 @@ def get_assignment_grading_tool() -> Callable:
         assignment_id = parameters.get("assignment_id")
         
         logger.info(f"教师 {teacher_id} 批改班级 {class_id} 的作业 {assignment_id}")
-        
-        # 模拟作业批改
-        grading_result = {
+
+        return {"status": "success", "data": grade(class_id, assignment_id)}
+
+    def grade(class_id: Any, assignment_id: Any) -> Dict[str, Any]:
+        """模拟批改某班级的一份作业"""
+        return {
             "assignment_id": assignment_id,
             "average_score": 82.5,
             "highest_score": 98,
@@ -769,10 +805,30 @@ def get_assignment_grading_tool() -> Callable:
             "common_mistakes": ["第5题：概念理解错误", "第8题：计算失误"],
             "recommended_exercises": ["习题集第15-20题", "补充练习卷A"]
         }
-        
-        return {"status": "success", "data": grading_result}
+
+    def grade_assignments(calls: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        批量批改：一次处理全班（或多个班级）的作业，供ToolLibrary.execute_many使用
+
+        每份（班级, 作业）只批改一次，请求同一份作业报告的调用各自得到该报告的副本。
+
+        Args:
+            calls: 参数字典列表，每个字典与单次execute的参数相同
+                   （本工具只有一个parameters参数，即{"parameters": {...}}）
+
+        Returns:
+            与calls一一对应的批改结果
+        """
+        parameters = [call.get("parameters", {}) for call in calls]
+        keys = [(params.get("class_id"), params.get("assignment_id")) for params in parameters]
+        reports = {key: grade(*key) for key in dict.fromkeys(keys)}
+        logger.info(f"批量批改 {len(calls)} 个请求，共 {len(reports)} 份作业")
+        # 每个调用拿到自己的报告副本，修改一份不会影响其他调用
+        return [{"status": "success", "data": dict(reports[key])} for key in keys]
         
     # 为函数添加必要的元数据，使CAMEL框架能够正确识别
+    # 批改全班作业时，execute_many通过原生批量入口一次性提交
+    assignment_grading.batch = grade_assignments
     assignment_grading.name = "assignment_grading"
     assignment_grading.description = "自动批改客观题、生成作业报告、推荐个性化习题"
     assignment_grading.parameters = {
@@ -797,6 +853,7 @@ def get_assignment_grading_tool() -> Callable:
     return assignment_grading
 
 
+@tool_factory
 def get_multi_modal_grading_tool() -> Callable:
     """
     获取多模态批改工具 - 返回可调用的函数
@@ -841,6 +898,7 @@ def get_multi_modal_grading_tool() -> Callable:
     return multi_modal_grading
 
 
+@tool_factory
 def get_learning_insights_tool() -> Callable:
     """
     获取学情洞察工具 - 返回可调用的函数
@@ -886,6 +944,7 @@ def get_learning_insights_tool() -> Callable:
     return learning_insights
 
 
+@tool_factory
 def get_data_distribution_tool() -> Callable:
     """
     获取数据分发工具 - 返回可调用的函数
@@ -938,6 +997,7 @@ def get_data_distribution_tool() -> Callable:
     return data_distribution
 
 
+@tool_factory
 def get_class_control_tool() -> Callable:
     """
     获取班级总控工具 - 返回可调用的函数
@@ -983,6 +1043,7 @@ def get_class_control_tool() -> Callable:
     return class_control
 
 
+@tool_factory
 def get_early_warning_tool() -> Callable:
     """
     获取预警干预工具 - 返回可调用的函数
@@ -1025,6 +1086,7 @@ def get_early_warning_tool() -> Callable:
     return early_warning
 
 
+@tool_factory
 def get_parent_communication_tool() -> Callable:
     """
     获取家校沟通工具 - 返回可调用的函数
@@ -1081,6 +1143,7 @@ def get_parent_communication_tool() -> Callable:
     return parent_communication
 
 
+@tool_factory
 def get_learning_analytics_tool() -> Callable:
     """
     获取学情分析工具 - 返回可调用的函数
@@ -1115,6 +1178,10 @@ def get_learning_analytics_tool() -> Callable:
         return {"status": "success", "data": analysis}
         
     # 为函数添加必要的元数据，使CAMEL框架能够正确识别
+    # 学情分析按学科和班级缓存
+    learning_analytics.cacheable = True
+    learning_analytics.cache_ttl = 600
+    learning_analytics.cache_key = key_on("subject", "class_id")
     learning_analytics.name = "learning_analytics"
     learning_analytics.description = "分析学生学习数据，提供教学改进建议"
     learning_analytics.parameters = {
@@ -1135,6 +1202,7 @@ def get_learning_analytics_tool() -> Callable:
     return learning_analytics
 
 
+@tool_factory
 def get_schedule_management_tool() -> Callable:
     """
     获取日程管理工具 - 返回可调用的函数
@@ -1164,6 +1232,10 @@ def get_schedule_management_tool() -> Callable:
         return {"status": "success", "data": schedule}
         
     # 为函数添加必要的元数据，使CAMEL框架能够正确识别
+    # 日程按教师和日期缓存，有效期较短
+    schedule_management.cacheable = True
+    schedule_management.cache_ttl = 60
+    schedule_management.cache_key = key_on("teacher_id", "date")
     schedule_management.name = "schedule_management"
     schedule_management.description = "帮助教师管理教学计划和日程安排"
     schedule_management.parameters = {
@@ -1184,6 +1256,7 @@ def get_schedule_management_tool() -> Callable:
     return schedule_management
 
 
+@tool_factory
 def get_communication_hub_tool() -> Callable:
     """
     获取沟通中枢工具 - 返回可调用的函数
@@ -1227,6 +1300,7 @@ def get_communication_hub_tool() -> Callable:
     return communication_hub
 
 
+@tool_factory
 def get_school_transparency_tool() -> Callable:
     """
     获取透明校园工具 - 返回可调用的函数
@@ -1270,6 +1344,7 @@ def get_school_transparency_tool() -> Callable:
     return school_transparency
 
 
+@tool_factory
 def get_authorized_communication_tool() -> Callable:
     """
     获取授权沟通工具 - 返回可调用的函数
@@ -1326,6 +1401,7 @@ def get_authorized_communication_tool() -> Callable:
     return authorized_communication
 
 
+@tool_factory
 def get_growth_record_tool() -> Callable:
     """
     获取成长档案工具 - 返回可调用的函数
@@ -1371,6 +1447,7 @@ def get_growth_record_tool() -> Callable:
     return growth_record
 
 
+@tool_factory
 def get_resource_scheduling_tool() -> Callable:
     """
     获取资源调度工具 - 返回可调用的函数
@@ -1424,6 +1501,7 @@ def get_resource_scheduling_tool() -> Callable:
     return resource_scheduling
 
 
+@tool_factory
 def get_activity_management_tool() -> Callable:
     """
     获取活动管理工具 - 返回可调用的函数
@@ -1461,6 +1539,7 @@ def get_activity_management_tool() -> Callable:
     return activity_management
 
 
+@tool_factory
 def get_record_management_tool() -> Callable:
     """
     获取档案管理工具 - 返回可调用的函数
@@ -1504,6 +1583,7 @@ def get_record_management_tool() -> Callable:
     return record_management
 
 
+@tool_factory
 def get_health_monitoring_tool() -> Callable:
     """
     获取健康监测工具 - 返回可调用的函数
@@ -1548,6 +1628,7 @@ def get_health_monitoring_tool() -> Callable:
     return health_monitoring
 
 
+@tool_factory
 def get_emergency_response_tool() -> Callable:
     """
     获取应急响应工具 - 返回可调用的函数
@@ -1597,6 +1678,7 @@ def get_emergency_response_tool() -> Callable:
     return emergency_response
 
 
+@tool_factory
 def get_consultation_tool() -> Callable:
     """
     获取咨询顾问工具 - 返回可调用的函数
@@ -1640,6 +1722,7 @@ def get_consultation_tool() -> Callable:
     return consultation
 
 
+@tool_factory
 def get_recipe_optimization_tool() -> Callable:
     """
     获取食谱优化工具 - 返回可调用的函数
@@ -1685,6 +1768,7 @@ def get_recipe_optimization_tool() -> Callable:
     return recipe_optimization
 
 
+@tool_factory
 def get_safety_traceability_tool() -> Callable:
     """
     获取安全溯源工具 - 返回可调用的函数
@@ -1730,6 +1814,7 @@ def get_safety_traceability_tool() -> Callable:
     return safety_traceability
 
 
+@tool_factory
 def get_personalized_meal_tool() -> Callable:
     """
     获取个性化膳食工具 - 返回可调用的函数
@@ -1783,6 +1868,7 @@ def get_personalized_meal_tool() -> Callable:
     return personalized_meal
 
 
+@tool_factory
 def get_intelligent_patrol_tool() -> Callable:
     """
     获取智能巡检工具 - 返回可调用的函数
@@ -1829,6 +1915,7 @@ def get_intelligent_patrol_tool() -> Callable:
     return intelligent_patrol
 
 
+@tool_factory
 def get_emergency_broadcast_tool() -> Callable:
     """
     获取应急广播工具 - 返回可调用的函数
@@ -1873,6 +1960,7 @@ def get_emergency_broadcast_tool() -> Callable:
     return emergency_broadcast
 
 
+@tool_factory
 def get_visitor_management_tool() -> Callable:
     """
     获取访客管理工具 - 返回可调用的函数
@@ -1916,6 +2004,7 @@ def get_visitor_management_tool() -> Callable:
     return visitor_management
 
 
+@tool_factory
 def get_decision_cockpit_tool() -> Callable:
     """
     获取决策驾驶舱工具 - 返回可调用的函数
@@ -1954,6 +2043,7 @@ def get_decision_cockpit_tool() -> Callable:
     return decision_cockpit
 
 
+@tool_factory
 def get_trend_insight_tool() -> Callable:
     """
     获取趋势洞察工具 - 返回可调用的函数
@@ -1999,6 +2089,7 @@ def get_trend_insight_tool() -> Callable:
     return trend_insight
 
 
+@tool_factory
 def get_resource_planning_tool() -> Callable:
     """
     获取资源规划工具 - 返回可调用的函数
@@ -2377,11 +2468,11 @@ class SchoolIntelligentSystem:
                         user_role_name=to_agent.get_name(),
                         assistant_agent_kwargs=dict(
                             model=model,
-                            tools=list(from_agent.tools.tools.values())  # 传递工具对象列表
+                            tools=list(from_agent.tools.view.tools)  # 传递共享视图中的工具对象列表
                         ),
                         user_agent_kwargs=dict(
                             model=model,
-                            tools=list(to_agent.tools.tools.values())  # 传递工具对象列表
+                            tools=list(to_agent.tools.view.tools)  # 传递共享视图中的工具对象列表
                         ),
                         task_prompt=f"{from_agent.get_name()}需要与{to_agent.get_name()}沟通: {initial_message.get('content', '')}",
                         with_task_specify=False,
@@ -2541,7 +2632,8 @@ class SchoolIntelligentSystem:
             # 发送消息
             response = self.send_message(session_id, message)
             
-            # 如果是特定类型的消息，增强响应内容
+            # 如果是特定类型的消息，增强响应内容（响应消息不可变，先转换为字典）
+            response = dict(response)
             if message_type == "assignment_submission":
                 # 试卷批改场景
                 if not response.get("grading_result"):
@@ -5,6 +5,7 @@ Agent-Camel V2的旅行规划示例
 import uuid
 from typing import Dict, Any, List
 from agents.coordinator import TaskCoordinator
+from agents.scheduler import format_timeline
 from config.settings import settings
 
 
@@ -71,12 +72,14 @@ def travel_planning_conversation(user_request: str) -> Dict[str, Any]:
     
     # 4. Execute multi-agent collaboration
     # 4. 执行多Agent协作
-    results = {}
-    for task in task_analysis.get('tasks', []):
-        agent_id = coordinator.assign_task(task, task.get('requirements', {}))
-        if agent_id:
-            result = coordinator.execute_task(agent_id, task, session_id)
-            results[task['type']] = result
+    # Local guidance and the budget build on the chosen destinations: the scheduler
+    # runs destination planning first, then both of them concurrently with its result.
+    # A task that fails or times out leaves its section to the placeholder text.
+    # 当地指南和预算都基于选定的目的地：调度器先执行目的地规划，再将其结果传给另外两个任务并发执行。
+    # 失败或超时的任务显示占位文字。
+    run = coordinator.execute_graph(task_analysis.get('tasks', []), session_id)
+    print(f"Execution timeline:\n{format_timeline(run)}")
+    results = run['results']  # Keyed by task id, which defaults to the task type / 以任务ID为键，默认即任务类型
     
     # 5. Synthesize results and generate final response
     # 5. 综合结果并生成最终响应
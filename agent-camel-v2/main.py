@@ -16,6 +16,8 @@ logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(name)s - %(leve
 logger = logging.getLogger(__name__)
 
 from examples.camel_travel_planner import camel_travel_planning_conversation
+from config.settings import settings
+from memory.snapshot import save_snapshot
 
 
 def main():
@@ -70,6 +72,11 @@ def main():
         print("\n详细信息:")
         for key, value in result["details"].items():
             print(f"- {key}: {value}")
+    
+    # Snapshot agent memory so the next start is a warm restart
+    # 保存Agent记忆快照，使下次启动为热重启
+    if settings.MEMORY_SNAPSHOT_PATH:
+        save_snapshot()
     print("Application execution completed")
 
 
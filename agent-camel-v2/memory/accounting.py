@@ -0,0 +1,160 @@
+"""
+Process-wide memory accounting for Agent-Camel V2.
+Agent-Camel V2的进程级内存统计
+
+Every MemoryManager reports byte changes of its sessions here as they
+happen, so the total across all agents is always known without scanning.
+Above a high-watermark the heaviest sessions of any agent are evicted until
+usage drops below the low-watermark, so a single session holding large
+documents cannot dominate the process.
+每个MemoryManager在会话字节数变化时实时上报，因此无需扫描即可随时得知所有Agent的总量。
+超过高水位线时，会淘汰任意Agent中最重的会话，直到用量降到低水位线以下，
+从而避免单个保存了大文档的会话占满整个进程。
+"""
+from typing import Dict, Any, List, Optional, Tuple
+import heapq
+import logging
+import threading
+import weakref
+
+from config.settings import settings
+
+# 设置日志记录
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+
+class MemoryAccountant:
+    """
+    Tracks bytes held by all memory managers and enforces a global high-watermark.
+    跟踪所有记忆管理器占用的字节数，并执行全局高水位线
+    """
+
+    _shared_accountant: Optional["MemoryAccountant"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, high_watermark: Optional[int] = None, low_watermark_ratio: float = 0.9):
+        """
+        Initialize the accountant.
+        初始化内存统计器
+
+        Args:
+            high_watermark: Total bytes above which sessions are evicted (None disables)
+                        超过此总字节数时淘汰会话（为None时禁用）
+            low_watermark_ratio: Eviction stops below high_watermark * ratio
+                             淘汰在低于high_watermark * ratio时停止
+        """
+        self.high_watermark = high_watermark
+        self.low_watermark_ratio = low_watermark_ratio
+        self.total_bytes = 0
+        self.peak_bytes = 0
+        self.evictions = 0
+        self._managers: "weakref.WeakSet" = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls) -> "MemoryAccountant":
+        """
+        Get the process-wide accountant configured from settings.
+        获取根据配置创建的进程内共享内存统计器
+        """
+        with cls._shared_lock:
+            if cls._shared_accountant is None:
+                cls._shared_accountant = cls(settings.MEMORY_HIGH_WATERMARK,
+                                             settings.MEMORY_LOW_WATERMARK_RATIO)
+            return cls._shared_accountant
+
+    def register(self, manager: Any) -> None:
+        """
+        Track a memory manager.
+        跟踪一个记忆管理器
+
+        The bytes its sessions still hold are subtracted once the manager is
+        garbage collected, so a dropped manager does not keep the total above
+        the watermark.
+        管理器被垃圾回收后，会减去其会话仍占用的字节数，
+        因此被丢弃的管理器不会使总量一直高于水位线。
+        """
+        if manager in self._managers:
+            return
+        self._managers.add(manager)
+        # The finalizer must not reference the manager itself, only its byte tracker
+        # 终结器不能引用管理器本身，只引用其字节跟踪器
+        weakref.finalize(manager, self._release, manager.sessions)
+
+    def _release(self, sessions: Any) -> None:
+        """Subtract the bytes of a garbage-collected manager.
+        减去已被垃圾回收的管理器的字节数"""
+        if sessions.total_bytes:
+            self.add(-sessions.total_bytes)
+
+    def add(self, delta: int) -> None:
+        """Record a change in bytes held.
+        记录占用字节数的变化"""
+        with self._lock:
+            self.total_bytes += delta
+            if self.total_bytes > self.peak_bytes:
+                self.peak_bytes = self.total_bytes
+
+    def over_watermark(self) -> bool:
+        """Whether usage is above the high-watermark (O(1)).
+        用量是否超过高水位线（O(1)）"""
+        return self.high_watermark is not None and self.total_bytes > self.high_watermark
+
+    def enforce(self, keep: Optional[Tuple[Any, str]] = None) -> List[Tuple[str, str, int]]:
+        """
+        Evict the heaviest sessions until usage is below the low-watermark.
+        淘汰最重的会话，直到用量低于低水位线
+
+        Args:
+            keep: (manager, session_id) that must not be evicted, e.g. the one being written
+              不得淘汰的(管理器, 会话ID)，例如正在写入的会话
+
+        Returns:
+            Evicted (agent_id, session_id, bytes)
+            被淘汰的(Agent ID, 会话ID, 字节数)
+        """
+        evicted: List[Tuple[str, str, int]] = []
+        if not self.over_watermark():
+            return evicted
+        target = int(self.high_watermark * self.low_watermark_ratio)
+        # Max-heap of every session; only built when the watermark is crossed
+        # 所有会话的最大堆；只在超过水位线时构建
+        candidates = []
+        for manager in list(self._managers):
+            for session_id, size, _ in manager.sessions.heaviest(len(manager.sessions)):
+                if size > 0 and (manager, session_id) != keep:
+                    candidates.append((-size, id(manager), session_id, manager))
+        heapq.heapify(candidates)
+        while candidates and self.total_bytes > target:
+            size, _, session_id, manager = heapq.heappop(candidates)
+            if manager.evict_session(session_id):
+                evicted.append((manager.agent_id, session_id, -size))
+        self.evictions += len(evicted)
+        if evicted:
+            logger.warning(f"Memory above high-watermark ({self.high_watermark} bytes): "
+                           f"evicted {len(evicted)} heaviest sessions, now {self.total_bytes} bytes")
+        return evicted
+
+    def top_sessions(self, n: int = 10) -> List[Dict[str, Any]]:
+        """
+        List the n heaviest sessions across all agents.
+        列出所有Agent中最重的n个会话
+        """
+        rows = []
+        for manager in list(self._managers):
+            rows.extend(manager.heaviest_sessions(n))
+        return heapq.nlargest(n, rows, key=lambda row: row["bytes"])
+
+    def stats(self) -> Dict[str, Any]:
+        """Get accounting statistics.
+        获取内存统计信息"""
+        managers = list(self._managers)
+        return {
+            "total_bytes": self.total_bytes,
+            "peak_bytes": self.peak_bytes,
+            "high_watermark": self.high_watermark,
+            "evictions": self.evictions,
+            "agents": len(managers),
+            "sessions": sum(len(manager.sessions) for manager in managers),
+        }
@@ -0,0 +1,391 @@
+"""
+Compressed cold tier for Agent-Camel V2 interaction history.
+Agent-Camel V2交互历史的压缩冷存储层
+
+Recent interactions stay in RAM as plain dicts; older ones are packed into
+compressed blocks appended to a memory-mapped file, with a per-session
+offset index for random access.
+最近的交互以普通字典保存在内存中；较早的交互被打包成压缩块追加到内存映射文件中，
+并通过每个会话的偏移索引支持随机访问。
+"""
+from array import array
+from collections.abc import Sequence
+from typing import Dict, Any, List, Optional, Iterator, Tuple, Union
+import json
+import logging
+import mmap
+import os
+import tempfile
+import threading
+import zlib
+
+from memory.records import json_default
+
+# 尝试导入zstandard，如果不可用则使用zlib
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# 设置日志记录
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+_ZLIB = b"z"
+_ZSTD = b"s"
+
+
+class ColdBlockFile:
+    """
+    File of compressed interaction blocks.
+    压缩交互块文件
+
+    Each block is one codec byte followed by the compressed JSON lines of its
+    interactions, so blocks are self-contained and one file can be shared by
+    every session and agent of a process. Blocks are appended and addressed
+    by a block id; released blocks leave dead bytes behind, and once those
+    exceed compact_ratio of the file the live blocks are rewritten into a new
+    file and their offsets remapped, so the file does not grow without bound
+    while some sessions stay cold. Reads go through an mmap that is remapped
+    only when the file has grown past it.
+    每个块由一个编码字节和其交互的压缩JSON行组成，块之间相互独立，
+    因此进程内所有会话和Agent可以共享一个文件。块追加写入并通过块ID访问；
+    释放的块留下无效字节，无效字节超过文件的compact_ratio时，存活的块会被重写到新文件
+    并重新映射偏移，因此即使一直有冷会话存在，文件也不会无限增长。
+    读取通过mmap进行，只有文件增长超出映射范围时才重新映射。
+    """
+
+    _shared: Dict[str, "ColdBlockFile"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path: Optional[str] = None, codec: str = "zlib", level: int = 6,
+                 compact_ratio: float = 0.5, compact_min_bytes: int = 1 << 20):
+        """
+        Open the block file.
+        打开块文件
+
+        Args:
+            path: File path; an anonymous temporary file if None
+              文件路径；为None时使用匿名临时文件
+            codec: "zlib" or "zstd" (falls back to zlib if zstandard is missing)
+               "zlib"或"zstd"（未安装zstandard时回退到zlib）
+            level: Compression level
+               压缩级别
+            compact_ratio: Compact once released bytes exceed this share of the file
+                       已释放字节超过文件的此比例时压缩
+            compact_min_bytes: Do not compact files smaller than this
+                           小于此大小的文件不压缩
+        """
+        if codec == "zstd" and not ZSTD_AVAILABLE:
+            logger.warning("zstandard库不可用，冷存储回退到zlib压缩")
+            codec = "zlib"
+        self.path = path
+        self.codec = codec
+        self.level = level
+        self.compact_ratio = compact_ratio
+        self.compact_min_bytes = compact_min_bytes
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._file = open(path, "w+b")
+        else:
+            self._file = tempfile.TemporaryFile()
+        self._size = 0
+        self._map: Optional[mmap.mmap] = None
+        self._lock = threading.Lock()
+        # Block id -> (offset, length) of every live block
+        # 每个存活块的块ID -> (偏移, 长度)
+        self._blocks: Dict[int, Tuple[int, int]] = {}
+        self._next_id = 0
+        self.live_bytes = 0
+        self.compactions = 0
+        if codec == "zstd":
+            self._compressor = zstandard.ZstdCompressor(level=level)
+            self._decompressor = zstandard.ZstdDecompressor()
+
+    @classmethod
+    def shared(cls, path: Optional[str] = None, **kwargs: Any) -> "ColdBlockFile":
+        """
+        Get the process-wide block file for a path (or the anonymous one).
+        获取某路径（或匿名文件）对应的进程内共享块文件
+        """
+        key = os.path.abspath(path) if path else ""
+        with cls._shared_lock:
+            block_file = cls._shared.get(key)
+            if block_file is None:
+                block_file = cls(path, **kwargs)
+                cls._shared[key] = block_file
+            return block_file
+
+    @property
+    def size(self) -> int:
+        """Bytes in the file, including released blocks not yet compacted away.
+        文件中的字节数，包括尚未被压缩清除的已释放块"""
+        return self._size
+
+    def write_block(self, records: List[Dict[str, Any]]) -> int:
+        """
+        Compress and append a block of records.
+        压缩并追加一个记录块
+
+        Returns:
+            Block id
+            块ID
+        """
+        raw = "\n".join(json.dumps(record, ensure_ascii=False, default=json_default)
+                        for record in records).encode("utf-8")
+        if self.codec == "zstd":
+            data = _ZSTD + self._compressor.compress(raw)
+        else:
+            data = _ZLIB + zlib.compress(raw, self.level)
+        return self.append_raw(data)
+
+    def append_raw(self, data: bytes) -> int:
+        """
+        Append an already compressed block (e.g. from a snapshot).
+        追加一个已压缩的块（例如来自快照）
+
+        Returns:
+            Block id
+            块ID
+        """
+        with self._lock:
+            offset = self._size
+            self._file.seek(offset)
+            self._file.write(data)
+            self._file.flush()
+            self._size += len(data)
+            self.live_bytes += len(data)
+            block_id = self._next_id
+            self._next_id += 1
+            self._blocks[block_id] = (offset, len(data))
+        return block_id
+
+    def length(self, block_id: int) -> int:
+        """Compressed length of a block.
+        块压缩后的长度"""
+        return self._blocks[block_id][1]
+
+    def read_raw(self, block_id: int) -> bytes:
+        """
+        Read the compressed bytes of a block.
+        读取块的压缩字节
+        """
+        with self._lock:
+            offset, length = self._blocks[block_id]
+            if self._map is None or offset + length > len(self._map):
+                if self._map is not None:
+                    self._map.close()
+                self._map = mmap.mmap(self._file.fileno(), self._size, access=mmap.ACCESS_READ)
+            return self._map[offset:offset + length]
+
+    def read_block(self, block_id: int) -> List[Dict[str, Any]]:
+        """
+        Read and decompress a block.
+        读取并解压一个块
+        """
+        data = self.read_raw(block_id)
+        if data[:1] == _ZSTD:
+            raw = self._decompressor.decompress(data[1:])
+        else:
+            raw = zlib.decompress(data[1:])
+        return [json.loads(line) for line in raw.decode("utf-8").split("\n")]
+
+    def release(self, block_id: int) -> None:
+        """
+        Mark a block as no longer referenced. The file is truncated once no
+        live block is left, and compacted once released bytes exceed
+        compact_ratio of it.
+        将一个块标记为不再被引用。没有存活块时截断文件，
+        已释放字节超过文件的compact_ratio时压缩文件。
+        """
+        with self._lock:
+            _, length = self._blocks.pop(block_id)
+            self.live_bytes -= length
+            if not self._blocks:
+                self.live_bytes = 0
+                self._close_map()
+                self._file.truncate(0)
+                self._size = 0
+            elif (self._size >= self.compact_min_bytes and
+                    self._size - self.live_bytes > self.compact_ratio * self._size):
+                self._compact()
+
+    def _close_map(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def _compact(self) -> None:
+        """Rewrite the live blocks into a new file and remap their offsets (lock held).
+        将存活的块重写到新文件并重新映射其偏移（需持有锁）"""
+        before = self._size
+        new_file = open(self.path + ".compact", "w+b") if self.path else tempfile.TemporaryFile()
+        blocks: Dict[int, Tuple[int, int]] = {}
+        position = 0
+        for block_id, (offset, length) in sorted(self._blocks.items(), key=lambda item: item[1][0]):
+            self._file.seek(offset)
+            new_file.write(self._file.read(length))
+            blocks[block_id] = (position, length)
+            position += length
+        new_file.flush()
+        self._close_map()
+        self._file.close()
+        if self.path:
+            new_file.close()
+            os.replace(self.path + ".compact", self.path)
+            new_file = open(self.path, "r+b")
+        self._file = new_file
+        self._blocks = blocks
+        self._size = position
+        self.compactions += 1
+        print(f"Compacted cold block file: {before / 1e6:.1f} MB -> {position / 1e6:.1f} MB")
+
+    def close(self) -> None:
+        """
+        Close the file.
+        关闭文件
+        """
+        with self._lock:
+            self._close_map()
+            self._file.close()
+        with self._shared_lock:
+            key = os.path.abspath(self.path) if self.path else ""
+            if self._shared.get(key) is self:
+                del self._shared[key]
+
+
+class TieredHistory(Sequence):
+    """
+    Interaction history of one session split into a hot and a cold tier.
+    拆分为热层和冷层的单个会话交互历史
+
+    The newest interactions are kept as dicts in `hot`. Once the hot tier
+    holds hot_limit + block_size interactions, the oldest block_size are
+    compressed into one cold block. Cold blocks are indexed by a compact
+    array of block ids; every block holds exactly block_size interactions, so interaction i lives in block i // block_size. Decoded
+    blocks are not kept: iterating or slicing decompresses each block it
+    touches once, and the cold tier never grows back into RAM.
+    最新的交互以字典形式保存在`hot`中。热层达到hot_limit + block_size条时，
+    最旧的block_size条会被压缩为一个冷块。冷块由紧凑的块ID数组索引；
+    每个块恰好包含block_size条交互，因此第i条交互位于第i // block_size个块。
+    解码后的块不会保留：遍历或切片时每个涉及的块只解压一次，冷层不会重新占用内存。
+    """
+
+    __slots__ = ("hot", "hot_limit", "block_size", "_file", "_blocks")
+
+    def __init__(self, block_file: ColdBlockFile, hot_limit: int = 20, block_size: int = 64):
+        self.hot: List[Dict[str, Any]] = []
+        self.hot_limit = hot_limit
+        self.block_size = block_size
+        self._file = block_file
+        self._blocks = array("Q")
+
+    @property
+    def cold_count(self) -> int:
+        """Number of interactions in the cold tier.
+        冷层中的交互数"""
+        return len(self._blocks) * self.block_size
+
+    @property
+    def cold_bytes(self) -> int:
+        """Compressed bytes of the cold tier.
+        冷层压缩后的字节数"""
+        return sum(self._file.length(block_id) for block_id in self._blocks)
+
+    def __len__(self) -> int:
+        return self.cold_count + len(self.hot)
+
+    def append(self, interaction: Dict[str, Any]) -> None:
+        self.hot.append(interaction)
+
+    def extend(self, interactions: List[Dict[str, Any]]) -> None:
+        self.hot.extend(interactions)
+
+    def spill(self) -> List[Dict[str, Any]]:
+        """
+        Move full blocks beyond the hot limit to the cold tier.
+        将超出热层上限的完整块移入冷层
+
+        Returns:
+            Interactions that left RAM
+            离开内存的交互
+        """
+        spilled: List[Dict[str, Any]] = []
+        while len(self.hot) >= self.hot_limit + self.block_size:
+            block = self.hot[:self.block_size]
+            self._blocks.append(self._file.write_block(block))
+            del self.hot[:self.block_size]
+            spilled.extend(block)
+        return spilled
+
+    def _block(self, number: int) -> List[Dict[str, Any]]:
+        return self._file.read_block(self._blocks[number])
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        if isinstance(index, slice):
+            cold = self.cold_count
+            result = []
+            decoded: Tuple[int, List[Dict[str, Any]]] = (-1, [])
+            for i in range(*index.indices(len(self))):
+                if i >= cold:
+                    result.append(self.hot[i - cold])
+                    continue
+                number = i // self.block_size
+                if decoded[0] != number:
+                    decoded = (number, self._block(number))
+                result.append(decoded[1][i % self.block_size])
+            return result
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError("interaction index out of range")
+        cold = self.cold_count
+        if index >= cold:
+            return self.hot[index - cold]
+        return self._block(index // self.block_size)[index % self.block_size]
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for number in range(len(self._blocks)):
+            yield from self._block(number)
+        yield from self.hot
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (Sequence, list)) and not isinstance(other, str):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        """Materialize the whole history as a list.
+        将整个历史物化为列表"""
+        return list(self)
+
+    def export_state(self) -> tuple:
+        """
+        Export for a snapshot: hot interactions plus the raw compressed blocks.
+        导出用于快照：热层交互加上原始压缩块
+        """
+        blocks = [self._file.read_raw(block_id) for block_id in self._blocks]
+        return (list(self.hot), self.hot_limit, self.block_size, blocks)
+
+    @classmethod
+    def from_state(cls, block_file: ColdBlockFile, state: tuple) -> "TieredHistory":
+        """
+        Rebuild a history from export_state(), copying its blocks into block_file.
+        根据export_state()的结果重建历史，并将其块复制到block_file
+        """
+        hot, hot_limit, block_size, blocks = state
+        history = cls(block_file, hot_limit, block_size)
+        for data in blocks:
+            history._blocks.append(block_file.append_raw(data))
+        history.hot.extend(hot)
+        return history
+
+    def release(self) -> None:
+        """
+        Release the cold blocks of this history.
+        释放此历史的冷块
+        """
+        for block_id in self._blocks:
+            self._file.release(block_id)
+        self._blocks = array("Q")
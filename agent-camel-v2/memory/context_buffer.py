@@ -0,0 +1,296 @@
+"""
+Bounded ring-buffer context storage for Agent-Camel V2.
+Agent-Camel V2的有界环形缓冲区上下文存储
+"""
+from collections import deque
+from collections.abc import Sequence
+from itertools import islice
+from typing import Deque, Dict, Any, List, Optional, Iterator, Union
+
+
+def message_size(message: Dict[str, Any]) -> int:
+    """
+    Estimate the size of a message in bytes.
+    估算一条消息占用的字节数
+
+    Only string values are counted (as UTF-8), which is where the bulk of
+    the memory goes for chat messages.
+    只统计字符串值（按UTF-8计算），聊天消息的内存主要消耗在这里。
+
+    Args:
+        message: Message dictionary
+             消息字典
+
+    Returns:
+        Estimated size in bytes
+        估算的字节数
+    """
+    size = 0
+    for value in message.values():
+        if isinstance(value, str):
+            size += len(value.encode("utf-8"))
+    return size
+
+
+class ContextView(Sequence):
+    """
+    Read-only, zero-copy window over a ContextBuffer.
+    ContextBuffer上的只读零拷贝窗口
+
+    A view addresses messages by their absolute position in the buffer, so it
+    stays valid while new messages are appended. Reading a message that has
+    since been evicted raises IndexError.
+    视图按消息在缓冲区中的绝对位置寻址，因此追加新消息后仍然有效。
+    读取已被淘汰的消息会抛出IndexError。
+    """
+
+    __slots__ = ("_buffer", "_start", "_stop")
+
+    def __init__(self, buffer: "ContextBuffer", start: int, stop: int):
+        self._buffer = buffer
+        self._start = start
+        self._stop = stop
+
+    def __len__(self) -> int:
+        return self._stop - self._start
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Dict[str, Any], "ContextView"]:
+        length = self._stop - self._start
+        if isinstance(index, slice):
+            start, stop, step = index.indices(length)
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            stop = max(stop, start)
+            return ContextView(self._buffer, self._start + start, self._start + stop)
+        if index < 0:
+            index += length
+        if index < 0 or index >= length:
+            raise IndexError("context view index out of range")
+        return self._buffer._get_absolute(self._start + index)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return self._buffer._iter_absolute(self._start, self._stop)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (ContextView, list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"ContextView({self.to_list()!r})"
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        """Copy the window into a plain list.
+        将窗口复制为普通列表"""
+        return list(self)
+
+
+class CompositeContextView(Sequence):
+    """
+    Single context view assembled from several parts.
+    由多个部分组装而成的单一上下文视图
+
+    Order: the running summary (as a leading system message, if any), then
+    relevant earlier messages picked by retrieval, then the recent window.
+    The `summary`, `relevant` and `recent` attributes give direct access to
+    each part.
+    顺序为：滚动摘要（如有，作为开头的system消息）、检索选出的相关历史消息、
+    最近窗口。通过`summary`、`relevant`和`recent`属性可以直接访问各部分。
+    """
+
+    __slots__ = ("summary", "relevant", "recent", "_head")
+
+    def __init__(self, summary: str, recent: Sequence, relevant: Sequence = ()):
+        self.summary = summary
+        self.relevant = relevant
+        self.recent = recent
+        head = [{"role": "system", "content": f"Conversation summary: {summary}"}] if summary else []
+        head.extend(relevant)
+        self._head = head
+
+    def __len__(self) -> int:
+        return len(self._head) + len(self.recent)
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        head = len(self._head)
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step == 1 and start >= head:
+                return self.recent[start - head:max(stop, start) - head]
+            return [self[i] for i in range(start, stop, step)]
+        if index < 0:
+            index += len(self)
+        if 0 <= index < head:
+            return self._head[index]
+        if index < 0 or index >= len(self):
+            raise IndexError("context view index out of range")
+        return self.recent[index - head]
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        yield from self._head
+        yield from self.recent
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (Sequence, list)) and not isinstance(other, str):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+
+class ContextBuffer:
+    """
+    Bounded ring buffer holding the context of one session.
+    保存单个会话上下文的有界环形缓冲区
+
+    Backed by collections.deque with maxlen, so appending and evicting the
+    oldest message are both O(1) and never copy the stored messages. Byte
+    sizes are kept in a parallel deque so the byte limit is enforced in O(1)
+    per evicted message as well.
+    基于带maxlen的collections.deque实现，追加和淘汰最旧消息均为O(1)，
+    且不会复制已存储的消息。字节数保存在并行的deque中，
+    因此按字节上限淘汰时每条消息同样为O(1)。
+    """
+
+    __slots__ = ("max_messages", "max_bytes", "_messages", "_sizes", "_evicted", "total_bytes")
+
+    def __init__(self, max_messages: int = 50, max_bytes: Optional[int] = None):
+        """
+        Initialize the buffer.
+        初始化缓冲区
+
+        Args:
+            max_messages: Maximum number of messages kept
+                      保留的最大消息数
+            max_bytes: Optional maximum total message size in bytes
+                   可选的消息总字节数上限
+        """
+        if max_messages < 1:
+            raise ValueError("max_messages must be at least 1")
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self._messages: Deque[Dict[str, Any]] = deque(maxlen=max_messages)
+        self._sizes: Deque[int] = deque(maxlen=max_messages)
+        self._evicted = 0  # Number of messages evicted so far
+                           # 迄今为止已淘汰的消息数
+        self.total_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    @property
+    def evicted(self) -> int:
+        """Number of messages evicted since the buffer was created.
+        缓冲区创建以来已淘汰的消息数"""
+        return self._evicted
+
+    def append(self, message: Dict[str, Any], size: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Append a message, evicting the oldest ones if a limit is exceeded.
+        追加一条消息，超过上限时淘汰最旧的消息
+
+        Args:
+            message: Message to append
+                 要追加的消息
+            size: Precomputed message size in bytes
+              预先计算的消息字节数
+
+        Returns:
+            Messages evicted by this append (usually empty)
+            本次追加淘汰的消息（通常为空）
+        """
+        if size is None:
+            size = message_size(message)
+        messages = self._messages
+        evicted: List[Dict[str, Any]] = []
+        if len(messages) == self.max_messages:
+            # deque(maxlen) drops the oldest entry on append
+            # deque(maxlen)在追加时会丢弃最旧的条目
+            evicted.append(messages[0])
+            self.total_bytes -= self._sizes[0]
+            self._evicted += 1
+        messages.append(message)
+        self._sizes.append(size)
+        self.total_bytes += size
+
+        if self.max_bytes is not None:
+            # Always keep the newest message, even if it alone exceeds the limit
+            # 始终保留最新的消息，即使它本身就超过了上限
+            while self.total_bytes > self.max_bytes and len(messages) > 1:
+                evicted.append(self.popleft())
+        return evicted
+
+    def popleft(self) -> Dict[str, Any]:
+        """
+        Remove and return the oldest message.
+        移除并返回最旧的消息
+        """
+        if not self._messages:
+            raise IndexError("pop from an empty context buffer")
+        self.total_bytes -= self._sizes.popleft()
+        self._evicted += 1
+        return self._messages.popleft()
+
+    def truncate(self, keep: int) -> List[Dict[str, Any]]:
+        """
+        Evict the oldest messages until at most `keep` remain.
+        淘汰最旧的消息，直到最多剩余keep条
+
+        Returns:
+            Evicted messages, oldest first
+            被淘汰的消息，按从旧到新排列
+        """
+        evicted = []
+        while len(self._messages) > max(keep, 0):
+            evicted.append(self.popleft())
+        return evicted
+
+    def window(self, last: Optional[int] = None) -> ContextView:
+        """
+        Get a zero-copy view of the newest `last` messages (all if None).
+        获取最新last条消息的零拷贝视图（为None时返回全部）
+        """
+        count = len(self._messages)
+        stop = self._evicted + count
+        if last is None or last >= count:
+            return ContextView(self, self._evicted, stop)
+        return ContextView(self, stop - max(last, 0), stop)
+
+    def export_state(self) -> tuple:
+        """
+        Export the buffer contents for a snapshot (shallow, O(n) pointer copy).
+        导出缓冲区内容用于快照（浅拷贝，O(n)指针复制）
+        """
+        return (self.max_messages, self.max_bytes, list(self._messages),
+                list(self._sizes), self._evicted, self.total_bytes)
+
+    @classmethod
+    def from_state(cls, state: tuple) -> "ContextBuffer":
+        """
+        Rebuild a buffer from export_state().
+        根据export_state()的结果重建缓冲区
+        """
+        max_messages, max_bytes, messages, sizes, evicted, total_bytes = state
+        buffer = cls(max_messages, max_bytes)
+        buffer._messages.extend(messages)
+        buffer._sizes.extend(sizes)
+        buffer._evicted = evicted
+        buffer.total_bytes = total_bytes
+        return buffer
+
+    def _get_absolute(self, position: int) -> Dict[str, Any]:
+        """Get a message by absolute position (evicted + offset).
+        按绝对位置（已淘汰数 + 偏移）获取消息"""
+        offset = position - self._evicted
+        if offset < 0:
+            raise IndexError("context message has been evicted")
+        return self._messages[offset]
+
+    def _iter_absolute(self, start: int, stop: int) -> Iterator[Dict[str, Any]]:
+        """Iterate messages in [start, stop) by absolute position.
+        按绝对位置迭代[start, stop)范围内的消息"""
+        offset = start - self._evicted
+        if offset < 0:
+            raise IndexError("context message has been evicted")
+        count = stop - start
+        if offset + count > len(self._messages):
+            raise IndexError("context view index out of range")
+        return islice(self._messages, offset, offset + count)
@@ -0,0 +1,177 @@
+"""
+Session eviction policy for Agent-Camel V2 memory.
+Agent-Camel V2记忆的会话淘汰策略
+"""
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+import heapq
+import time
+
+
+class SessionEntry:
+    """Bookkeeping for one tracked session.
+    单个被跟踪会话的记录"""
+
+    __slots__ = ("last_access", "bytes")
+
+    def __init__(self, last_access: float, size: int = 0):
+        self.last_access = last_access
+        self.bytes = size
+
+
+class SessionEvictor:
+    """
+    Tracks session access and decides which sessions to evict.
+    跟踪会话访问并决定淘汰哪些会话
+
+    Sessions are kept in an OrderedDict in last-access order. Because every
+    session shares the same idle TTL, the least recently used session is also
+    the first to expire, so the LRU list doubles as the expiry queue: touching
+    a session and checking for expired ones are both O(1), and each eviction
+    costs O(1) amortized. Nothing is scanned on the write path.
+    会话按最后访问时间顺序保存在OrderedDict中。由于所有会话使用相同的空闲TTL，
+    最久未使用的会话也最先过期，因此LRU链表同时充当过期队列：
+    访问会话和检查过期会话都是O(1)，每次淘汰的均摊开销为O(1)，写路径上不做任何扫描。
+    """
+
+    def __init__(self, idle_ttl: Optional[float] = None, max_sessions: Optional[int] = None,
+                 max_bytes: Optional[int] = None, clock: Callable[[], float] = time.monotonic,
+                 on_bytes: Optional[Callable[[int], None]] = None):
+        """
+        Initialize the evictor.
+        初始化会话淘汰器
+
+        Args:
+            idle_ttl: Seconds a session may stay idle before it is evicted
+                  会话被淘汰前允许空闲的秒数
+            max_sessions: Maximum number of sessions kept
+                      保留的最大会话数
+            max_bytes: Maximum total bytes across all sessions
+                   所有会话的最大总字节数
+            clock: Time source, returns seconds
+               时间源，返回秒数
+            on_bytes: Called with every change of total_bytes (e.g. a global accountant)
+                  total_bytes每次变化时调用（例如全局内存统计器）
+        """
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.on_bytes = on_bytes
+        self._sessions: "OrderedDict[str, SessionEntry]" = OrderedDict()
+        self.total_bytes = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def touch(self, session_id: str, bytes_delta: int = 0) -> None:
+        """
+        Record an access to a session, optionally adjusting its size.
+        记录一次会话访问，并可调整其大小
+
+        Args:
+            session_id: Session identifier
+                    会话标识符
+            bytes_delta: Change in the session's size in bytes
+                     会话字节数的变化量
+        """
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            entry = SessionEntry(self.clock())
+            self._sessions[session_id] = entry
+        else:
+            entry.last_access = self.clock()
+            self._sessions.move_to_end(session_id)
+        if bytes_delta:
+            entry.bytes += bytes_delta
+            self.total_bytes += bytes_delta
+            if self.on_bytes is not None:
+                self.on_bytes(bytes_delta)
+
+    def forget(self, session_id: str) -> None:
+        """
+        Stop tracking a session.
+        停止跟踪一个会话
+        """
+        entry = self._sessions.pop(session_id, None)
+        if entry is not None:
+            self.total_bytes -= entry.bytes
+            if self.on_bytes is not None and entry.bytes:
+                self.on_bytes(-entry.bytes)
+
+    def session_bytes(self, session_id: str) -> int:
+        """Get the tracked size of a session in bytes.
+        获取会话被跟踪的字节数"""
+        entry = self._sessions.get(session_id)
+        return entry.bytes if entry is not None else 0
+
+    def last_access(self, session_id: str) -> Optional[float]:
+        """Get the last access time of a session.
+        获取会话的最后访问时间"""
+        entry = self._sessions.get(session_id)
+        return entry.last_access if entry is not None else None
+
+    def heaviest(self, n: int) -> List[Tuple[str, int, float]]:
+        """
+        Get the n largest sessions by bytes.
+        获取字节数最大的n个会话
+
+        Returns:
+            (session_id, bytes, last_access) tuples, largest first
+            (会话ID, 字节数, 最后访问时间)元组，按从大到小排列
+        """
+        return heapq.nlargest(n, ((session_id, entry.bytes, entry.last_access)
+                                  for session_id, entry in self._sessions.items()),
+                              key=lambda item: item[1])
+
+    def collect(self, keep: Optional[str] = None) -> List[str]:
+        """
+        Pop the sessions that must be evicted now, least recently used first.
+        弹出当前必须淘汰的会话，按最久未使用优先
+
+        A session is evicted when it has been idle longer than idle_ttl, or
+        while the session count or total bytes exceed their limits.
+        会话空闲超过idle_ttl，或会话数、总字节数超过上限时将被淘汰。
+
+        Args:
+            keep: Session that must not be evicted (e.g. the one being written)
+              不得淘汰的会话（例如正在写入的会话）
+
+        Returns:
+            Evicted session IDs
+            被淘汰的会话ID列表
+        """
+        evicted: List[str] = []
+        sessions = self._sessions
+        if not sessions:
+            return evicted
+        deadline = self.clock() - self.idle_ttl if self.idle_ttl is not None else None
+        while sessions:
+            session_id, entry = next(iter(sessions.items()))
+            if session_id == keep:
+                break
+            expired = deadline is not None and entry.last_access < deadline
+            over_count = self.max_sessions is not None and len(sessions) > self.max_sessions
+            over_bytes = self.max_bytes is not None and self.total_bytes > self.max_bytes
+            if not (expired or over_count or over_bytes):
+                break
+            del sessions[session_id]
+            self.total_bytes -= entry.bytes
+            if self.on_bytes is not None and entry.bytes:
+                self.on_bytes(-entry.bytes)
+            self.evictions += 1
+            evicted.append(session_id)
+        return evicted
+
+    def stats(self) -> Dict[str, int]:
+        """Get evictor statistics.
+        获取淘汰器统计信息"""
+        return {
+            "sessions": len(self._sessions),
+            "total_bytes": self.total_bytes,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,56 @@
+"""
+Memory Manager factory for Agent-Camel V2.
+Agent-Camel V2的记忆管理器工厂
+"""
+import threading
+from typing import Any, Dict, Optional
+
+from config.settings import settings
+from memory.manager import MemoryManager
+
+
+class MemoryManagerFactory:
+    """Factory creating memory managers for the configured backend.
+    根据配置的后端创建记忆管理器的工厂类"""
+    
+    # Redis clients shared by all agents, one per URL
+    # 所有Agent共享的Redis客户端，每个地址一个
+    _redis_clients: Dict[str, Any] = {}
+    _lock = threading.Lock()
+    
+    @classmethod
+    def get_manager(cls, agent_id: str, backend: Optional[str] = None) -> MemoryManager:
+        """
+        Create a memory manager for an agent.
+        为Agent创建记忆管理器
+        
+        Args:
+            agent_id: ID of the agent
+                  Agent ID
+            backend: "memory" (in-process, optionally persisted to
+                 MEMORY_STORAGE_PATH) or "redis"; defaults to
+                 settings.MEMORY_BACKEND
+                 "memory"（进程内，可选持久化到MEMORY_STORAGE_PATH）或"redis"；
+                 默认为settings.MEMORY_BACKEND
+            
+        Returns:
+            MemoryManager instance
+            MemoryManager实例
+        """
+        backend = (backend or settings.MEMORY_BACKEND).lower()
+        if backend == "redis":
+            from memory.redis_manager import RedisMemoryManager
+            return RedisMemoryManager(agent_id, client=cls._get_redis_client(settings.REDIS_URL))
+        return MemoryManager(agent_id)
+    
+    @classmethod
+    def _get_redis_client(cls, url: str) -> Any:
+        """Get the shared Redis client for a URL.
+        获取某地址对应的共享Redis客户端"""
+        with cls._lock:
+            client = cls._redis_clients.get(url)
+            if client is None:
+                import redis
+                client = redis.Redis.from_url(url)
+                cls._redis_clients[url] = client
+            return client
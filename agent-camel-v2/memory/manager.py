@@ -2,22 +2,88 @@
 Memory Manager for Agent-Camel V2.
 Agent-Camel V2的记忆管理器
 """
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Callable, Tuple
+from bisect import bisect_left
+from collections.abc import Mapping
 import json
 import os
 import logging
+import threading
+import time
 from datetime import datetime, timedelta
+from config.settings import settings
+from memory.context_buffer import ContextBuffer, ContextView, CompositeContextView, message_size
+from memory.eviction import SessionEvictor
+from memory.storage import SQLiteMemoryStore
+from memory.summarizer import ContextSummarizer
+from memory.retrieval import RetrievalMemory
+from memory.cold_store import ColdBlockFile, TieredHistory
+from memory.message_store import MessageStore
+from memory.records import Interaction, Message, json_default
+from memory.retrieval import VectorIndex
+from memory.snapshot import AgentSnapshot, SnapshotReader, register_manager
+from memory.accounting import MemoryAccountant
 
 # 设置日志记录
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 
+def interaction_size(interaction: Dict[str, Any]) -> int:
+    """
+    Estimate the size of a stored interaction in bytes.
+    估算一条已存储交互占用的字节数
+    """
+    return sum(message_size(part) for part in interaction.values() if isinstance(part, Mapping))
+
+
+def interaction_time(interaction: Dict[str, Any]) -> float:
+    """
+    Creation time of an interaction (0 for records stored without one).
+    交互的创建时间（没有时间戳的记录为0）
+    """
+    return interaction.get("timestamp") or 0.0
+
+
+def page_bounds(history: List[Dict[str, Any]], cursor: Optional[str], limit: int,
+                since: Optional[float], until: Optional[float]) -> Tuple[int, int, Optional[str]]:
+    """
+    Resolve a page of a time-ordered history to (start, stop, next_cursor).
+    将按时间排序的历史中的一页解析为(start, stop, next_cursor)
+
+    The cursor is the index of the next interaction; interactions are only
+    ever appended, so cursors stay valid while new ones arrive. Time bounds
+    are found by binary search.
+    游标是下一条交互的索引；交互只会追加，因此新交互到达时游标仍然有效。
+    时间范围通过二分查找确定。
+    """
+    start = int(cursor) if cursor else 0
+    if since is not None:
+        start = max(start, bisect_left(history, since, key=interaction_time))
+    end = len(history) if until is None else bisect_left(history, until, key=interaction_time)
+    stop = min(end, start + limit)
+    return start, max(start, stop), str(stop) if stop < end else None
+
+
 class MemoryManager:
     """Manages agent memory and context.
     管理Agent记忆和上下文"""
     
-    def __init__(self, agent_id: str, storage_path: Optional[str] = None):
+    # Shared empty buffer returned for unknown sessions
+    # 未知会话返回的共享空缓冲区
+    _empty_context = ContextBuffer(1)
+    
+    def __init__(self, agent_id: str, storage_path: Optional[str] = None,
+                 max_context_messages: Optional[int] = None,
+                 max_context_bytes: Optional[int] = None,
+                 idle_ttl: Optional[float] = None,
+                 max_sessions: Optional[int] = None,
+                 max_total_bytes: Optional[int] = None,
+                 on_evict: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                 summarizer: Optional[ContextSummarizer] = None,
+                 retrieval: Optional[RetrievalMemory] = None,
+                 hot_interactions: Optional[int] = None,
+                 message_store: Optional[MessageStore] = None):
         """
         Initialize the memory manager.
         初始化记忆管理器
@@ -25,15 +91,86 @@ class MemoryManager:
         Args:
             agent_id: ID of the agent this memory manager belongs to
                   属于此记忆管理器的Agent ID
-            storage_path: Optional path to persistent storage
-                      持久化存储的可选路径
+            storage_path: Optional path to persistent storage (SQLite file);
+                      defaults to settings.MEMORY_STORAGE_PATH
+                      持久化存储的可选路径（SQLite文件），
+                      默认为settings.MEMORY_STORAGE_PATH
+            max_context_messages: Maximum messages kept per session context
+                              每个会话上下文保留的最大消息数
+            max_context_bytes: Optional maximum bytes kept per session context
+                           每个会话上下文保留的可选最大字节数
+            idle_ttl: Seconds a session may stay idle before eviction
+                  会话被淘汰前允许空闲的秒数
+            max_sessions: Maximum number of sessions kept in memory
+                      内存中保留的最大会话数
+            max_total_bytes: Maximum total bytes of all sessions in memory
+                         内存中所有会话的最大总字节数
+            on_evict: Callback receiving (session_id, session_data) for every
+                  evicted session, e.g. to spill it to persistent storage
+                  每个被淘汰会话的回调，参数为(session_id, session_data)，
+                  例如用于将会话写入持久化存储
+            summarizer: Optional background summarizer; messages leaving the
+                    context window are folded into a running summary
+                    可选的后台摘要器；离开上下文窗口的消息会被合并进滚动摘要
+            retrieval: Optional vector retrieval memory; interactions are
+                   indexed so get_context can add relevant earlier messages
+                   可选的向量检索记忆；交互会被索引，
+                   使get_context可以加入相关的历史消息
+            hot_interactions: Interactions per session kept uncompressed in RAM;
+                          older ones go to the compressed cold tier
+                          (defaults to settings.INTERACTION_HOT_LIMIT, None keeps all in RAM)
+                          每个会话在内存中保留的未压缩交互数；较早的交互进入压缩冷层
+                          （默认为settings.INTERACTION_HOT_LIMIT，为None时全部保留在内存中）
+            message_store: Content-addressed store that stored messages are
+                       interned into (defaults to the shared store when
+                       settings.MESSAGE_DEDUP_ENABLED is set)
+                       存储的消息会被驻留到的内容寻址存储
+                       （settings.MESSAGE_DEDUP_ENABLED开启时默认为共享存储）
         """
         self.agent_id = agent_id
-        self.storage_path = storage_path
-        self.contexts: Dict[str, List[Dict[str, Any]]] = {}  # Session contexts
-                                                    # 会话上下文
+        self.storage_path = storage_path or settings.MEMORY_STORAGE_PATH
+        self.max_context_messages = max_context_messages or settings.CONTEXT_MAX_MESSAGES
+        self.max_context_bytes = max_context_bytes if max_context_bytes is not None else settings.CONTEXT_MAX_BYTES
+        self.contexts: Dict[str, ContextBuffer] = {}  # Session contexts (ring buffers)
+                                             # 会话上下文（环形缓冲区）
         self.interactions: Dict[str, List[Dict[str, Any]]] = {}  # Interaction history
                                                       # 交互历史
+        self.accountant = MemoryAccountant.shared()  # Process-wide byte accounting
+                                                     # 进程级字节统计
+        self.sessions = SessionEvictor(
+            idle_ttl=idle_ttl if idle_ttl is not None else settings.SESSION_IDLE_TTL,
+            max_sessions=max_sessions if max_sessions is not None else settings.SESSION_MAX_COUNT,
+            max_bytes=max_total_bytes if max_total_bytes is not None else settings.SESSION_MAX_BYTES,
+            on_bytes=self.accountant.add
+        )  # Last-access and byte tracking for session eviction
+           # 用于会话淘汰的最后访问和字节跟踪
+        self.accountant.register(self)
+        self.on_evict = on_evict
+        self.summarizer = summarizer
+        self.summaries: Dict[str, str] = {}  # Running summaries of evicted context
+                                             # 已移出上下文的滚动摘要
+        self.retrieval = retrieval
+        self.hot_interactions = hot_interactions if hot_interactions is not None else settings.INTERACTION_HOT_LIMIT
+        if message_store is None and settings.MESSAGE_DEDUP_ENABLED:
+            message_store = MessageStore.shared()
+        self.messages = message_store  # Shared message records, referenced instead of copied
+                                       # 共享的消息记录，以引用代替副本
+        self.cold_file: Optional[ColdBlockFile] = None  # Compressed cold tier, shared per process
+                                                # 压缩冷层，进程内共享
+        if self.hot_interactions is not None:
+            self.cold_file = ColdBlockFile.shared(settings.COLD_STORAGE_PATH,
+                                                  codec=settings.COLD_COMPRESSION)
+        self.store: Optional[SQLiteMemoryStore] = None  # Persistent store, shared per path
+                                                # 持久化存储，同一路径共享
+        self._loaded: set = set()  # Sessions already loaded from storage
+                                   # 已从存储加载的会话
+        self._snapshot: Optional[AgentSnapshot] = None  # Sessions not yet restored from the snapshot
+                                                # 尚未从快照恢复的会话
+        self._tail: Dict[str, Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]] = {}  # Log rows written after the snapshot
+                                                                                 # 快照之后写入的日志行
+        self._write_lock = threading.RLock()  # Makes each write and its log row atomic for snapshot_state
+                                              # 使每次写入与其日志行对snapshot_state而言是原子的
+        register_manager(self)
         print(f"Initialized MemoryManager for agent {agent_id}")
         self.load_from_storage()  # Load existing memory from storage
                         # 从存储中加载现有记忆
@@ -50,24 +187,35 @@ class MemoryManager:
                  要添加到上下文的消息
         """
         print(f"Updating context for session {session_id} in agent {self.agent_id}")
-        if session_id not in self.contexts:
-            self.contexts[session_id] = []
+        self._ensure_loaded(session_id)
+        buffer = self.contexts.get(session_id)
+        if buffer is None:
+            buffer = ContextBuffer(self.max_context_messages, self.max_context_bytes)
+            self.contexts[session_id] = buffer
             print(f"Created new context for session {session_id}")
         
-        self.contexts[session_id].append(message)
-        print(f"Added message to context for session {session_id}. Context now has {len(self.contexts[session_id])} messages")
+        message = self._record(message)
         
-        # Limit context size and compress if necessary
-        # 限制上下文大小并在必要时压缩
-        if len(self.contexts[session_id]) > 50:
-            logger.warning(f"Context for session {session_id} exceeds 50 messages, compressing")
-            self.compress_context(session_id)
+        # The ring buffer evicts the oldest messages in O(1) once a limit is reached
+        # 达到上限后，环形缓冲区以O(1)淘汰最旧的消息
+        with self._write_lock:
+            bytes_before = buffer.total_bytes
+            evicted = buffer.append(message)
+            if self.store is not None:
+                self.store.append_context(self.agent_id, session_id, message)
+        if evicted:
+            logger.debug(f"Evicted {len(evicted)} messages from context of session {session_id}")
+            if self.summarizer is not None:
+                self.summarizer.submit(self, session_id, evicted)
+        self.sessions.touch(session_id, buffer.total_bytes - bytes_before)
+        print(f"Added message to context for session {session_id}. Context now has {len(buffer)} messages")
             
         # Automatically clean up old sessions
         # 自动清理旧会话
-        self.cleanup_old_sessions()
+        self.cleanup_old_sessions(keep=session_id)
     
-    def get_context(self, session_id: str) -> List[Dict[str, Any]]:
+    def get_context(self, session_id: str, last: Optional[int] = None,
+                    query: Optional[str] = None, top_k: Optional[int] = None) -> ContextView:
         """
         Get the context for a session.
         获取会话的上下文
@@ -75,13 +223,35 @@ class MemoryManager:
         Args:
             session_id: Session identifier
                     会话标识符
+            last: Only return the newest `last` messages (all if None)
+              只返回最新的last条消息（为None时返回全部）
+            query: Current request; with retrieval enabled, the top_k most
+               relevant earlier messages are added to the view
+               当前请求；启用检索时，会将最相关的top_k条历史消息加入视图
+            top_k: Number of relevant interactions to retrieve
+               检索的相关交互数
             
         Returns:
-            Context messages
-            上下文消息
+            Zero-copy read-only view of the context messages; with a
+            summarizer or retrieval, a CompositeContextView of the running
+            summary, the relevant messages and the window
+            上下文消息的零拷贝只读视图；启用摘要器或检索时，
+            返回由滚动摘要、相关消息和窗口组成的CompositeContextView
         """
         print(f"Getting context for session {session_id} in agent {self.agent_id}")
-        context = self.contexts.get(session_id, [])
+        self._ensure_loaded(session_id)
+        buffer = self.contexts.get(session_id)
+        if buffer is None:
+            buffer = self._empty_context
+        else:
+            self.sessions.touch(session_id)
+        context = buffer.window(last)
+        relevant: List[Dict[str, Any]] = []
+        if query and self.retrieval is not None:
+            relevant = self._relevant_messages(session_id, query, context,
+                                               top_k or settings.RETRIEVAL_TOP_K)
+        if self.summarizer is not None or relevant:
+            context = CompositeContextView(self.summaries.get(session_id, ""), context, relevant)
         print(f"Retrieved context with {len(context)} messages for session {session_id}")
         return context
     
@@ -102,19 +272,81 @@ class MemoryManager:
               动作计划
         """
         print(f"Storing interaction for session {session_id} in agent {self.agent_id}")
+        self._ensure_loaded(session_id)
         if session_id not in self.interactions:
-            self.interactions[session_id] = []
+            self.interactions[session_id] = self._new_history()
             print(f"Created new interaction history for session {session_id}")
         
-        interaction = {
-            'input': input_message,
-            'output': output_message,
-            'plan': plan
-        }
+        interaction = Interaction(self._record(input_message), self._record(output_message),
+                                  plan, time.time())
         
-        self.interactions[session_id].append(interaction)
+        history = self.interactions[session_id]
+        with self._write_lock:
+            history.append(interaction)
+            spilled = self._spill(history)
+            if self.store is not None:
+                self.store.append_interaction(self.agent_id, session_id, interaction, interaction.timestamp)
+            if self.retrieval is not None:
+                self.retrieval.add(session_id, interaction)
+        self.sessions.touch(session_id, interaction_size(interaction) - spilled)
+        if self.accountant.over_watermark():
+            self.cleanup_old_sessions(keep=session_id)
         print(f"Stored interaction for session {session_id}. History now has {len(self.interactions[session_id])} interactions")
     
+    def _record(self, message: Mapping) -> Message:
+        """Turn a message into a record, shared through the message store when enabled.
+        将消息转换为记录，启用消息存储时通过其共享"""
+        if self.messages is not None:
+            return self.messages.intern(message)
+        return Message.from_dict(message)
+    
+    def _new_history(self) -> List[Dict[str, Any]]:
+        """Create an empty interaction history, tiered if a hot limit is set.
+        创建空的交互历史，设置了热层上限时为分层历史"""
+        if self.cold_file is None:
+            return []
+        return TieredHistory(self.cold_file, self.hot_interactions, settings.COLD_BLOCK_SIZE)
+    
+    @staticmethod
+    def _spill(history: List[Dict[str, Any]]) -> int:
+        """Move old interactions to the cold tier; returns the bytes that left RAM.
+        将较早的交互移入冷层；返回离开内存的字节数"""
+        if not isinstance(history, TieredHistory):
+            return 0
+        return sum(interaction_size(interaction) for interaction in history.spill())
+    
+    def _relevant_messages(self, session_id: str, query: str, recent: ContextView,
+                           top_k: int) -> List[Dict[str, Any]]:
+        """
+        Retrieve earlier messages relevant to a query, skipping the recent window.
+        检索与查询相关的历史消息，跳过最近窗口中已有的消息
+        """
+        in_window = {id(message) for message in recent}
+        relevant: List[Dict[str, Any]] = []
+        for score, interaction in self.retrieval.search(session_id, query, top_k):
+            if score <= 0:
+                continue
+            for key in ("input", "output"):
+                message = interaction.get(key)
+                if isinstance(message, Mapping) and id(message) not in in_window and message.get("content") != query:
+                    relevant.append(message)
+        return relevant
+    
+    def get_summary(self, session_id: str) -> str:
+        """
+        Get the running summary of a session's evicted context.
+        获取会话已移出上下文的滚动摘要
+        
+        Args:
+            session_id: Session identifier
+                    会话标识符
+            
+        Returns:
+            Summary text (empty if none yet)
+            摘要文本（尚无摘要时为空）
+        """
+        return self.summaries.get(session_id, "")
+    
     def get_interaction_history(self, session_id: str) -> List[Dict[str, Any]]:
         """
         Get interaction history for a session.
@@ -125,14 +357,126 @@ class MemoryManager:
                     会话标识符
             
         Returns:
-            Interaction history
-            交互历史
+            Interaction history; with a hot limit, a TieredHistory whose
+            older entries are decompressed on access
+            交互历史；设置热层上限时为TieredHistory，较早的条目在访问时解压
         """
         print(f"Getting interaction history for session {session_id} in agent {self.agent_id}")
+        self._ensure_loaded(session_id)
         history = self.interactions.get(session_id, [])
+        if session_id in self.sessions:
+            self.sessions.touch(session_id)
         print(f"Retrieved interaction history with {len(history)} entries for session {session_id}")
         return history
     
+    def get_interaction_page(self, session_id: str, cursor: Optional[str] = None, limit: int = 50,
+                             since: Optional[float] = None, until: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Get one page of a session's interaction history.
+        获取会话交互历史的一页
+        
+        Args:
+            session_id: Session identifier
+                    会话标识符
+            cursor: next_cursor of the previous page (None for the first page)
+                上一页的next_cursor（第一页为None）
+            limit: Maximum interactions on the page
+               每页最多的交互数
+            since: Only interactions at or after this Unix time
+               只返回在此Unix时间及之后的交互
+            until: Only interactions before this Unix time
+               只返回在此Unix时间之前的交互
+            
+        Returns:
+            {"interactions": [...], "next_cursor": str or None when there are no more}
+            {"interactions": [...], "next_cursor": 字符串，没有更多时为None}
+        """
+        self._ensure_loaded(session_id)
+        history = self.interactions.get(session_id, [])
+        if session_id in self.sessions:
+            self.sessions.touch(session_id)
+        start, stop, next_cursor = page_bounds(history, cursor, limit, since, until)
+        return {"interactions": list(history[start:stop]), "next_cursor": next_cursor}
+    
+    def iter_interactions(self, session_ids: Optional[Iterable[str]] = None,
+                          since: Optional[float] = None, until: Optional[float] = None,
+                          batch_size: int = 500) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Stream interactions for bulk export, oldest first within each session.
+        流式读取交互以便批量导出，每个会话内按从旧到新排列
+        
+        With persistent storage the rows are streamed from SQLite in batches
+        and sessions are not loaded into memory; otherwise the in-memory
+        histories are walked (cold blocks are decompressed one at a time).
+        有持久化存储时从SQLite按批次流式读取，不会把会话加载到内存；
+        否则遍历内存中的历史（冷块逐个解压）。
+        
+        Args:
+            session_ids: Sessions to export (all sessions if None)
+                     要导出的会话（为None时导出所有会话）
+            since: Only interactions at or after this Unix time
+               只读取在此Unix时间及之后的交互
+            until: Only interactions before this Unix time
+               只读取在此Unix时间之前的交互
+            batch_size: Interactions read per batch
+                    每批读取的交互数
+            
+        Yields:
+            (session_id, interaction)
+        """
+        if self.store is not None:
+            if session_ids is None:
+                yield from self.store.iter_interactions(self.agent_id, None, since, until, batch_size)
+            else:
+                for session_id in session_ids:
+                    yield from self.store.iter_interactions(self.agent_id, session_id, since, until, batch_size)
+            return
+        if session_ids is None:
+            session_ids = list(self.interactions)
+            if self._snapshot is not None:
+                session_ids.extend(session_id for session_id in self._snapshot.sessions
+                                   if session_id not in self.interactions)
+        for session_id in session_ids:
+            cursor = None
+            while True:
+                self._ensure_loaded(session_id)
+                history = self.interactions.get(session_id, [])
+                start, stop, cursor = page_bounds(history, cursor, batch_size, since, until)
+                for interaction in history[start:stop]:
+                    yield session_id, interaction
+                if cursor is None:
+                    break
+    
+    def export_interactions(self, path: str, session_ids: Optional[Iterable[str]] = None,
+                            since: Optional[float] = None, until: Optional[float] = None) -> int:
+        """
+        Export interactions to a JSONL file, one interaction per line.
+        将交互导出为JSONL文件，每行一条交互
+        
+        Args:
+            path: Output file path
+              输出文件路径
+            session_ids: Sessions to export (all sessions if None)
+                     要导出的会话（为None时导出所有会话）
+            since: Only interactions at or after this Unix time
+               只导出在此Unix时间及之后的交互
+            until: Only interactions before this Unix time
+               只导出在此Unix时间之前的交互
+            
+        Returns:
+            Number of interactions written
+            写入的交互数
+        """
+        count = 0
+        with open(path, "w", encoding="utf-8") as f:
+            for session_id, interaction in self.iter_interactions(session_ids, since, until):
+                record = {"agent_id": self.agent_id, "session_id": session_id, **interaction}
+                f.write(json.dumps(record, ensure_ascii=False, default=json_default))
+                f.write("\n")
+                count += 1
+        print(f"Exported {count} interactions of agent {self.agent_id} to {path}")
+        return count
+    
     def compress_context(self, session_id: str) -> None:
         """
         Compress the context for a session to reduce memory usage.
@@ -143,45 +487,340 @@ class MemoryManager:
                     会话标识符
         """
         print(f"Compressing context for session {session_id} in agent {self.agent_id}")
-        # Simple implementation - keep last 20 messages
-        # 简单实现 - 保留最后20条消息
-        if session_id in self.contexts:
-            original_length = len(self.contexts[session_id])
-            self.contexts[session_id] = self.contexts[session_id][-20:]
-            print(f"Compressed context for session {session_id} from {original_length} to {len(self.contexts[session_id])} messages")
+        # Keep the last 20 messages; with a summarizer the older ones are
+        # folded into the running summary in the background instead of lost
+        # 保留最后20条消息；启用摘要器时，较早的消息会在后台合并进滚动摘要而不是丢弃
+        buffer = self.contexts.get(session_id)
+        if buffer is not None:
+            original_length = len(buffer)
+            bytes_before = buffer.total_bytes
+            evicted = buffer.truncate(20)
+            self.sessions.touch(session_id, buffer.total_bytes - bytes_before)
+            if self.summarizer is not None:
+                self.summarizer.submit(self, session_id, evicted)
+            print(f"Compressed context for session {session_id} from {original_length} to {len(buffer)} messages")
     
-    def cleanup_old_sessions(self) -> None:
+    def cleanup_old_sessions(self, keep: Optional[str] = None) -> List[str]:
         """
         Clean up old sessions to free up memory.
         清理旧会话以释放内存
+        
+        Evicts sessions idle longer than the idle TTL (24 hours by default)
+        and, least recently used first, sessions beyond the session count or
+        total byte limits of this agent. If the whole process is above the
+        global high-watermark, the heaviest sessions of any agent are evicted
+        as well. Costs O(1) when nothing needs to be evicted.
+        淘汰空闲超过TTL（默认24小时）的会话，并按最久未使用优先淘汰
+        超出此Agent会话数或总字节数上限的会话。如果整个进程超过全局高水位线，
+        还会淘汰任意Agent中最重的会话。无需淘汰时开销为O(1)。
+        
+        Args:
+            keep: Session that must not be evicted (e.g. the one being written)
+              不得淘汰的会话（例如正在写入的会话）
+            
+        Returns:
+            Evicted session IDs
+            被淘汰的会话ID列表
+        """
+        evicted = self.sessions.collect(keep=keep)
+        for session_id in evicted:
+            self._evict_session(session_id)
+        if self.accountant.over_watermark():
+            evicted.extend(session_id for agent_id, session_id, _ in self.accountant.enforce(keep=(self, keep))
+                           if agent_id == self.agent_id)
+        if evicted:
+            print(f"Cleaned up {len(evicted)} old sessions in agent {self.agent_id}")
+        return evicted
+    
+    def heaviest_sessions(self, n: int = 10) -> List[Dict[str, Any]]:
+        """
+        List the n sessions of this agent holding the most bytes.
+        列出此Agent中占用字节数最多的n个会话
+        
+        Args:
+            n: Number of sessions to return
+           返回的会话数
+            
+        Returns:
+            One dict per session (agent_id, session_id, bytes, context_messages,
+            context_bytes, interactions, idle_seconds), heaviest first
+            每个会话一个字典（agent_id、session_id、bytes、context_messages、
+            context_bytes、interactions、idle_seconds），按从重到轻排列
+        """
+        now = self.sessions.clock()
+        rows = []
+        for session_id, size, last_access in self.sessions.heaviest(n):
+            buffer = self.contexts.get(session_id)
+            rows.append({
+                "agent_id": self.agent_id,
+                "session_id": session_id,
+                "bytes": size,
+                "context_messages": len(buffer) if buffer is not None else 0,
+                "context_bytes": buffer.total_bytes if buffer is not None else 0,
+                "interactions": len(self.interactions.get(session_id, ())),
+                "idle_seconds": now - last_access,
+            })
+        return rows
+    
+    def memory_usage(self) -> Dict[str, Any]:
         """
-        print(f"Cleaning up old sessions in agent {self.agent_id}")
-        # Remove sessions older than 24 hours
-        # 删除超过24小时的会话
-        # Placeholder implementation
-        # 占位符实现
-        pass
+        Get this agent's memory usage.
+        获取此Agent的内存用量
+        """
+        return {
+            "agent_id": self.agent_id,
+            "sessions": len(self.sessions),
+            "bytes": self.sessions.total_bytes,
+            "evictions": self.sessions.evictions,
+        }
+    
+    def evict_session(self, session_id: str) -> bool:
+        """
+        Evict a session from memory now.
+        立即从内存中淘汰一个会话
+        
+        Args:
+            session_id: Session identifier
+                    会话标识符
+            
+        Returns:
+            True if the session was in memory, False otherwise
+            如果会话在内存中则返回True，否则返回False
+        """
+        found = session_id in self.contexts or session_id in self.interactions
+        self.sessions.forget(session_id)
+        if found:
+            self._evict_session(session_id)
+        return found
+    
+    def _evict_session(self, session_id: str) -> None:
+        """Drop a session's data and hand it to the eviction callback.
+        删除会话数据并交给淘汰回调处理"""
+        buffer = self.contexts.pop(session_id, None)
+        history = self.interactions.pop(session_id, None)
+        summary = self.summaries.pop(session_id, "")
+        if isinstance(history, TieredHistory):
+            tiered = history
+            history = tiered.to_list() if self.on_evict is not None else None
+            tiered.release()
+        if self.retrieval is not None:
+            self.retrieval.drop(session_id)
+        # Persisted sessions are reloaded from storage on their next access
+        # 已持久化的会话会在下次访问时从存储重新加载
+        self._loaded.discard(session_id)
+        logger.debug(f"Evicted session {session_id} from agent {self.agent_id}")
+        if self.on_evict is not None:
+            session_data = {
+                "context": buffer.window().to_list() if buffer is not None else [],
+                "interactions": history or [],
+                "summary": summary
+            }
+            try:
+                self.on_evict(session_id, session_data)
+            except Exception as e:
+                logger.error(f"Eviction callback failed for session {session_id}: {str(e)}")
+    
+    def _ensure_loaded(self, session_id: str) -> None:
+        """
+        Load a session from persistent storage on its first access.
+        在会话首次访问时从持久化存储加载
+        
+        Args:
+            session_id: Session identifier
+                    会话标识符
+        """
+        if session_id in self._loaded:
+            return
+        if self._snapshot is not None and session_id in self._snapshot:
+            self._loaded.add(session_id)
+            self._restore_session(session_id)
+            return
+        if self.store is None:
+            return
+        self._loaded.add(session_id)
+        context = self.store.load_context(self.agent_id, session_id, self.max_context_messages)
+        history = self.store.load_interactions(self.agent_id, session_id)
+        if not context and not history:
+            return
+        # Context messages and interaction inputs decode as separate copies; share them
+        # 上下文消息和交互输入被解码为各自的副本；将它们共享
+        context = [self._record(message) for message in context]
+        history = [Interaction.from_dict(interaction, self._record) for interaction in history]
+        size = 0
+        if context:
+            buffer = ContextBuffer(self.max_context_messages, self.max_context_bytes)
+            for message in context:
+                buffer.append(message)
+            self.contexts[session_id] = buffer
+            size += buffer.total_bytes
+        if history:
+            size += sum(interaction_size(interaction) for interaction in history)
+            if self.cold_file is not None:
+                tiered = self._new_history()
+                tiered.extend(history)
+                size -= self._spill(tiered)
+                history = tiered
+            self.interactions[session_id] = history
+        self.sessions.touch(session_id, size)
+        print(f"Loaded session {session_id} from storage for agent {self.agent_id}: "
+              f"{len(context)} context messages, {len(history)} interactions")
     
     def save_to_storage(self) -> None:
         """
         Save memory to persistent storage.
         将记忆保存到持久化存储
+        
+        Messages and interactions are already appended to storage as they
+        arrive; this commits any writes still pending in the current group
+        and persists the retrieval indexes of live sessions.
+        消息和交互在到达时已追加到存储中，此方法提交当前组中仍未提交的写入，
+        并持久化存活会话的检索索引。
         """
         print(f"Saving memory to storage for agent {self.agent_id}")
-        # Placeholder implementation
-        # 占位符实现
-        # In a real implementation, we would save to a database or file system
-        # 在实际实现中，我们会保存到数据库或文件系统
-        pass
+        if self.store is not None:
+            self.store.flush()
+        if self.retrieval is not None:
+            self.retrieval.persist()
     
     def load_from_storage(self) -> None:
         """
         Load memory from persistent storage.
         从持久化存储加载记忆
+        
+        Only opens the store; sessions are loaded lazily on first access so
+        startup time does not grow with the stored history.
+        只打开存储；会话在首次访问时延迟加载，因此启动时间不会随存储的历史增长。
         """
         print(f"Loading memory from storage for agent {self.agent_id}")
-        # Placeholder implementation
-        # 占位符实现
-        # In a real implementation, we would load from a database or file system
-        # 在实际实现中，我们会从数据库或文件系统加载
-        pass
\ No newline at end of file
+        if self.storage_path and self.store is None:
+            self.store = SQLiteMemoryStore.shared(self.storage_path,
+                                                  write_behind=settings.MEMORY_WRITE_BEHIND,
+                                                  queue_size=settings.MEMORY_WRITE_QUEUE_SIZE)
+            # The store is shared, so each agent keeps its own context window
+            # 存储是共享的，因此每个Agent保留各自的上下文窗口
+            self.store.set_context_keep(self.agent_id, self.max_context_messages)
+        if settings.MEMORY_SNAPSHOT_PATH and self._snapshot is None:
+            reader = SnapshotReader.shared(settings.MEMORY_SNAPSHOT_PATH)
+            snapshot = reader.take(self.agent_id) if reader is not None else None
+            if snapshot is not None:
+                self.restore_snapshot(snapshot)
+    
+    def snapshot_state(self) -> Tuple[Optional[Tuple[int, int]], Dict[str, Any]]:
+        """
+        Capture this manager's sessions for save_snapshot().
+        为save_snapshot()捕获此管理器的会话
+        
+        Only shallow copies are taken here, so it is cheap to call on the
+        request thread; sessions still waiting in the previous snapshot are
+        carried over as raw bytes. The state and the log position are taken
+        under the write lock, so a concurrent write is either in both or in
+        neither and is never replayed twice on restore.
+        这里只做浅拷贝，因此可以在请求线程上低成本调用；
+        仍在上一次快照中等待恢复的会话以原始字节形式带入。
+        状态和日志位置在写锁下一起获取，因此并发写入要么同时包含在两者中，要么都不包含，
+        恢复时不会被重放两次。
+        
+        Returns:
+            (log position of the persistent store, {session_id: session})
+            (持久化存储的日志位置, {会话ID: 会话})
+        """
+        with self._write_lock:
+            # Sessions with log rows after the old snapshot must be restored first
+            # 在旧快照之后有日志行的会话必须先恢复
+            for session_id in list(self._tail):
+                self._ensure_loaded(session_id)
+            position = self.store.log_position() if self.store is not None else None
+            sessions: Dict[str, Any] = {}
+            if self._snapshot is not None:
+                for session_id in self._snapshot.sessions:
+                    sessions[session_id] = ("raw",) + self._snapshot.raw(session_id)
+            for session_id in set(self.contexts) | set(self.interactions):
+                buffer = self.contexts.get(session_id)
+                history = self.interactions.get(session_id)
+                index = self.retrieval.indexes.get(session_id) if self.retrieval is not None else None
+                sessions[session_id] = ("state", {
+                    "context": buffer.export_state() if buffer is not None else None,
+                    "interactions": (history.export_state() if isinstance(history, TieredHistory)
+                                     else list(history or ())),
+                    "summary": self.summaries.get(session_id, ""),
+                    "vectors": (index.vectors, list(index.payloads)) if index is not None and len(index) else None,
+                })
+        return position, sessions
+    
+    def restore_snapshot(self, snapshot: AgentSnapshot) -> None:
+        """
+        Attach a snapshot; its sessions are restored on first access.
+        关联一个快照；其会话在首次访问时恢复
+        
+        Only log rows written after the snapshot are read from the
+        persistent store, and they are applied when their session is restored.
+        只从持久化存储读取快照之后写入的日志行，并在其会话恢复时应用。
+        
+        Args:
+            snapshot: This agent's part of a snapshot file
+                  快照文件中属于此Agent的部分
+        """
+        self._snapshot = snapshot
+        self._tail = {}
+        if self.store is not None and snapshot.log_position is not None:
+            context_tail, interaction_tail = self.store.load_tail(self.agent_id, *snapshot.log_position)
+            for session_id, message in context_tail:
+                if session_id in snapshot:
+                    self._tail.setdefault(session_id, ([], []))[0].append(message)
+            for session_id, interaction in interaction_tail:
+                if session_id in snapshot:
+                    self._tail.setdefault(session_id, ([], []))[1].append(interaction)
+        print(f"Restored snapshot for agent {self.agent_id}: {len(snapshot)} sessions, "
+              f"{len(self._tail)} with newer log rows")
+    
+    def _restore_session(self, session_id: str) -> None:
+        """Rebuild one session from the snapshot and replay its log tail.
+        从快照重建一个会话并重放其日志尾部"""
+        state = self._snapshot.pop(session_id)
+        size = 0
+        buffer = None
+        if state["context"] is not None:
+            buffer = ContextBuffer.from_state(state["context"])
+            self.contexts[session_id] = buffer
+        history = state["interactions"]
+        if isinstance(history, tuple):
+            tiered = TieredHistory.from_state(self.cold_file or ColdBlockFile.shared(None), history)
+            if self.cold_file is None:
+                history = tiered.to_list()
+                tiered.release()
+            else:
+                history = tiered
+        elif history and self.cold_file is not None:
+            tiered = self._new_history()
+            tiered.extend(history)
+            history = tiered
+        if history:
+            self.interactions[session_id] = history
+        if state["summary"]:
+            self.summaries[session_id] = state["summary"]
+        if self.retrieval is not None and state["vectors"] is not None:
+            self.retrieval.indexes[session_id] = VectorIndex.from_arrays(*state["vectors"])
+        
+        context_tail, interaction_tail = self._tail.pop(session_id, ((), ()))
+        for message in context_tail:
+            message = self._record(message)
+            if buffer is None:
+                buffer = self.contexts[session_id] = ContextBuffer(self.max_context_messages,
+                                                                   self.max_context_bytes)
+            buffer.append(message)
+        for interaction in interaction_tail:
+            interaction = Interaction.from_dict(interaction, self._record)
+            if session_id not in self.interactions:
+                self.interactions[session_id] = self._new_history()
+            self.interactions[session_id].append(interaction)
+            if self.retrieval is not None:
+                self.retrieval.add(session_id, interaction)
+        
+        if buffer is not None:
+            size += buffer.total_bytes
+        history = self.interactions.get(session_id)
+        if history:
+            size += sum(interaction_size(interaction) for interaction in
+                        (history.hot if isinstance(history, TieredHistory) else history))
+            size -= self._spill(history)
+        self.sessions.touch(session_id, size)
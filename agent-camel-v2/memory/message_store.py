@@ -0,0 +1,108 @@
+"""
+Content-addressed message store for Agent-Camel V2 memory.
+Agent-Camel V2记忆的内容寻址消息存储
+
+Agents that see the same message (a broadcast, a task fanned out to several
+agents, a session reloaded from storage) keep references to one shared,
+immutable record instead of their own copies.
+看到同一条消息的多个Agent（广播、分发给多个Agent的任务、从存储重新加载的会话）
+会引用同一个共享的不可变记录，而不是各自保存一份副本。
+"""
+from typing import Dict, Mapping, Optional
+import threading
+import weakref
+
+from memory.records import Message, message_digest
+
+
+class MessageStore:
+    """
+    Process-wide, deduplicating store of Message records.
+    进程内去重的Message记录存储
+
+    Records are held through weak references, so a message is freed as soon
+    as no agent memory refers to it any more; the store itself never keeps
+    messages alive.
+    记录通过弱引用保存，一旦没有任何Agent记忆引用某条消息，它就会被释放；
+    存储本身不会使消息保持存活。
+    """
+
+    _shared_store: Optional["MessageStore"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self):
+        self._records: "weakref.WeakValueDictionary[str, Message]" = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def shared(cls) -> "MessageStore":
+        """
+        Get the process-wide message store.
+        获取进程内共享的消息存储
+        """
+        with cls._shared_lock:
+            if cls._shared_store is None:
+                cls._shared_store = cls()
+            return cls._shared_store
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def intern(self, message: Mapping) -> Message:
+        """
+        Return the shared record for a message, creating it on first sight.
+        返回消息对应的共享记录，首次出现时创建
+        
+        Args:
+            message: Message dict or record (left untouched)
+                 消息字典或记录（不会被修改）
+        
+        Returns:
+            Immutable shared record with the same content
+            内容相同的共享不可变记录
+        """
+        digest = message.digest if type(message) is Message else None
+        if digest is None:
+            digest = message_digest(message)
+        with self._lock:
+            record = self._records.get(digest)
+            if record is not None:
+                self.hits += 1
+                return record
+            self.misses += 1
+            record = Message.from_dict(message)
+            object.__setattr__(record, "digest", digest)
+            self._records[digest] = record
+            return record
+
+    def adopt(self, message: Mapping, digest: str) -> Message:
+        """
+        Register a record whose digest is already known (e.g. from a snapshot).
+        注册一个已知内容哈希的记录（例如来自快照）
+        """
+        with self._lock:
+            record = self._records.get(digest)
+            if record is None:
+                record = Message.from_dict(message)
+                object.__setattr__(record, "digest", digest)
+                self._records[digest] = record
+            return record
+
+    def get(self, digest: str) -> Optional[Message]:
+        """
+        Look up a live record by its content hash.
+        按内容哈希查找存活的记录
+        """
+        return self._records.get(digest)
+
+    def stats(self) -> Dict[str, int]:
+        """Get store statistics.
+        获取存储统计信息"""
+        return {
+            "records": len(self._records),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
@@ -0,0 +1,299 @@
+"""
+Compact immutable message and interaction records for Agent-Camel V2.
+Agent-Camel V2紧凑的不可变消息与交互记录
+
+Messages and interactions used to travel as plain dicts, rebuilt at every
+layer (agents, coordinator, memory). These records keep the common fields in
+__slots__ with interned role and agent ids, and implement the read-only
+Mapping protocol, so code written for dicts (get(), [], in, **) keeps
+working. to_dict() returns a plain, mutable dict when one is really needed.
+消息和交互过去以普通字典传递，并在每一层（Agent、协调器、记忆）重新构建。
+这些记录将常用字段保存在__slots__中，并驻留角色和Agent ID，同时实现只读的
+Mapping协议，因此为字典编写的代码（get()、[]、in、**）无需修改即可使用。
+确实需要字典时，to_dict()返回普通的可变字典。
+"""
+from collections.abc import Mapping
+from typing import Dict, Any, Callable, Iterator, List, Optional, Tuple
+import hashlib
+import json
+import sys
+
+# Short string values (roles, names, types) are interned; long contents are
+# shared through the record itself
+# 短字符串值（角色、名称、类型）会被驻留；长内容通过记录本身共享
+_INTERN_MAX_LENGTH = 64
+
+# Marks a field that is absent from the message
+# 标记消息中不存在的字段
+_MISSING: Any = type("_Missing", (), {"__repr__": lambda self: "<missing>"})()
+
+_MESSAGE_FIELDS = frozenset(("role", "content", "agent_id"))
+_INTERACTION_FIELDS = frozenset(("input", "output", "plan", "timestamp"))
+
+
+def _intern(value: Any) -> Any:
+    """Intern short strings.
+    驻留短字符串"""
+    if type(value) is str and len(value) <= _INTERN_MAX_LENGTH:
+        return sys.intern(value)
+    return value
+
+
+def json_default(value: Any) -> Any:
+    """
+    `default` hook for json.dumps: records become dicts, anything else a string.
+    json.dumps的default钩子：记录转换为字典，其他对象转换为字符串
+    """
+    to_dict = getattr(value, "to_dict", None)
+    return to_dict() if to_dict is not None else str(value)
+
+
+def message_digest(message: Mapping) -> str:
+    """
+    Content hash of a message, independent of key order.
+    消息的内容哈希，与键的顺序无关
+    """
+    if not isinstance(message, dict):
+        message = message.to_dict() if isinstance(message, Message) else dict(message)
+    canonical = json.dumps(message, ensure_ascii=False, sort_keys=True, default=json_default)
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _immutable(self, *args: Any) -> None:
+    raise TypeError(f"{type(self).__name__} is immutable; use to_dict() for a mutable copy")
+
+
+class Message(Mapping):
+    """
+    Immutable chat message with role, content and agent_id in slots.
+    不可变聊天消息，角色、内容和agent_id保存在槽中
+
+    Any other keys live in a small `extra` dict (None when there are none).
+    Role, agent id and short extra values are interned.
+    其他键保存在一个小的extra字典中（没有时为None）。角色、Agent ID和较短的额外值会被驻留。
+    """
+
+    __slots__ = ("role", "content", "agent_id", "extra", "digest", "__weakref__")
+
+    def __init__(self, role: Any = _MISSING, content: Any = _MISSING, agent_id: Any = _MISSING,
+                 extra: Optional[Dict[str, Any]] = None):
+        """
+        Create a message.
+        创建消息
+
+        Args:
+            role: Message role, e.g. "user" or "assistant"
+              消息角色，例如"user"或"assistant"
+            content: Message content
+                 消息内容
+            agent_id: ID of the agent that produced the message
+                  生成此消息的Agent ID
+            extra: Any other keys
+               其他键
+        """
+        init = object.__setattr__
+        init(self, "role", _intern(role))
+        init(self, "content", content)
+        init(self, "agent_id", _intern(agent_id))
+        init(self, "extra", extra or None)
+        init(self, "digest", None)
+
+    @classmethod
+    def from_dict(cls, message: Mapping) -> "Message":
+        """
+        Build a record from a message dict (records are returned unchanged).
+        从消息字典构建记录（记录原样返回）
+        """
+        if type(message) is cls:
+            return message
+        extra = {_intern(key): _intern(value) for key, value in message.items()
+                 if key not in _MESSAGE_FIELDS}
+        return cls(message.get("role", _MISSING), message.get("content", _MISSING),
+                   message.get("agent_id", _MISSING), extra)
+
+    __setattr__ = __delattr__ = _immutable
+
+    def __getitem__(self, key: str) -> Any:
+        if key in _MESSAGE_FIELDS:
+            value = getattr(self, key)
+            if value is _MISSING:
+                raise KeyError(key)
+            return value
+        if self.extra is None:
+            raise KeyError(key)
+        return self.extra[key]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in _MESSAGE_FIELDS:
+            value = getattr(self, key)
+            return default if value is _MISSING else value
+        return self.extra.get(key, default) if self.extra is not None else default
+
+    def __contains__(self, key: object) -> bool:
+        if key in _MESSAGE_FIELDS:
+            return getattr(self, key) is not _MISSING
+        return self.extra is not None and key in self.extra
+
+    def __iter__(self) -> Iterator[str]:
+        if self.role is not _MISSING:
+            yield "role"
+        if self.content is not _MISSING:
+            yield "content"
+        if self.agent_id is not _MISSING:
+            yield "agent_id"
+        if self.extra is not None:
+            yield from self.extra
+
+    def values(self) -> List[Any]:
+        # The record is immutable, so a list is as good as a view and much cheaper
+        # 记录不可变，因此列表与视图等价且开销小得多
+        values = [value for value in (self.role, self.content, self.agent_id) if value is not _MISSING]
+        if self.extra is not None:
+            values.extend(self.extra.values())
+        return values
+
+    def items(self) -> List[Tuple[str, Any]]:
+        return list(self.to_dict().items())
+
+    def __len__(self) -> int:
+        return ((self.role is not _MISSING) + (self.content is not _MISSING) +
+                (self.agent_id is not _MISSING) + (len(self.extra) if self.extra is not None else 0))
+
+    def __hash__(self) -> int:
+        digest = self.digest
+        if digest is None:
+            digest = message_digest(self)
+            object.__setattr__(self, "digest", digest)
+        return hash(digest)
+
+    def __reduce__(self):
+        return (_restore_message, (self.to_dict(), self.digest))
+
+    def __repr__(self) -> str:
+        return f"Message({self.to_dict()!r})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain, mutable dict with the same content.
+        内容相同的普通可变字典"""
+        message: Dict[str, Any] = {}
+        if self.role is not _MISSING:
+            message["role"] = self.role
+        if self.content is not _MISSING:
+            message["content"] = self.content
+        if self.agent_id is not _MISSING:
+            message["agent_id"] = self.agent_id
+        if self.extra is not None:
+            message.update(self.extra)
+        return message
+
+    copy = to_dict
+
+
+class Interaction(Mapping):
+    """
+    Immutable record of one input/output exchange of an agent.
+    Agent一次输入/输出交换的不可变记录
+    """
+
+    __slots__ = ("input", "output", "plan", "timestamp")
+
+    def __init__(self, input: Any, output: Any, plan: Any, timestamp: Optional[float] = None):
+        """
+        Create an interaction.
+        创建交互记录
+
+        Args:
+            input: Input message
+               输入消息
+            output: Output message
+                输出消息
+            plan: Action plan
+              动作计划
+            timestamp: Creation time (Unix seconds)
+                   创建时间（Unix秒）
+        """
+        init = object.__setattr__
+        init(self, "input", input)
+        init(self, "output", output)
+        init(self, "plan", plan)
+        init(self, "timestamp", timestamp)
+
+    @classmethod
+    def from_dict(cls, interaction: Mapping,
+                  message: Callable[[Mapping], Any] = Message.from_dict) -> "Interaction":
+        """
+        Build a record from an interaction dict (records are returned unchanged).
+        从交互字典构建记录（记录原样返回）
+
+        Args:
+            interaction: Interaction dict
+                     交互字典
+            message: Turns the input and output dicts into message records
+                 将输入和输出字典转换为消息记录
+        """
+        if type(interaction) is cls:
+            return interaction
+        input_message = interaction.get("input")
+        output_message = interaction.get("output")
+        return cls(message(input_message) if isinstance(input_message, Mapping) else input_message,
+                   message(output_message) if isinstance(output_message, Mapping) else output_message,
+                   interaction.get("plan"), interaction.get("timestamp"))
+
+    __setattr__ = __delattr__ = _immutable
+
+    def __getitem__(self, key: str) -> Any:
+        if key in _INTERACTION_FIELDS and (key != "timestamp" or self.timestamp is not None):
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in _INTERACTION_FIELDS:
+            value = getattr(self, key)
+            return default if value is None and key == "timestamp" else value
+        return default
+
+    def __iter__(self) -> Iterator[str]:
+        yield "input"
+        yield "output"
+        yield "plan"
+        if self.timestamp is not None:
+            yield "timestamp"
+
+    def values(self) -> List[Any]:
+        values = [self.input, self.output, self.plan]
+        if self.timestamp is not None:
+            values.append(self.timestamp)
+        return values
+
+    def items(self) -> List[Tuple[str, Any]]:
+        return list(self.to_dict().items())
+
+    def __len__(self) -> int:
+        return 3 if self.timestamp is None else 4
+
+    def __reduce__(self):
+        return (Interaction, (self.input, self.output, self.plan, self.timestamp))
+
+    def __repr__(self) -> str:
+        return f"Interaction({self.to_dict()!r})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain, mutable dict with the same content.
+        内容相同的普通可变字典"""
+        interaction = {"input": self.input, "output": self.output, "plan": self.plan}
+        if self.timestamp is not None:
+            interaction["timestamp"] = self.timestamp
+        return interaction
+
+    copy = to_dict
+
+
+def _restore_message(message: Dict[str, Any], digest: Optional[str]) -> Message:
+    """Unpickle a message, sharing it through the message store if it was shared before.
+    反序列化消息；如果之前是共享记录，则通过消息存储继续共享"""
+    if digest is None:
+        return Message.from_dict(message)
+    # Imported here because the message store itself builds on these records
+    # 在此处导入，因为消息存储本身依赖这些记录
+    from memory.message_store import MessageStore
+    return MessageStore.shared().adopt(message, digest)
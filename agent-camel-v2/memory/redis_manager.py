@@ -0,0 +1,408 @@
+"""
+Redis-backed Memory Manager for Agent-Camel V2.
+Agent-Camel V2基于Redis的记忆管理器
+
+Lets several worker processes share session context by keeping it in Redis
+instead of process memory.
+将会话上下文保存在Redis而非进程内存中，使多个工作进程可以共享会话上下文。
+"""
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Callable, Tuple
+import atexit
+import fnmatch
+import json
+import logging
+import threading
+import time
+import weakref
+
+from config.settings import settings
+from memory.context_buffer import CompositeContextView
+from memory.manager import MemoryManager, interaction_time
+from memory.records import Interaction, json_default
+
+# 尝试导入redis，如果不可用则只能使用进程内替身
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+# 设置日志记录
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# Managers that may still hold queued writes, flushed when the interpreter exits
+# 可能仍有排队写操作的管理器，在解释器退出时刷新
+_open_managers: "weakref.WeakSet" = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_on_shutdown() -> None:
+    for manager in list(_open_managers):
+        try:
+            manager.flush()
+        except Exception as e:
+            logger.error(f"Flushing Redis memory of {manager.agent_id} at exit failed: {str(e)}")
+
+
+class InMemoryRedis:
+    """
+    In-process stand-in for the subset of Redis used by RedisMemoryManager.
+    RedisMemoryManager所用Redis命令子集的进程内替身
+
+    Supports lists, key expiry and non-transactional pipelines, which is
+    enough to run and test the Redis backend without a server.
+    支持列表、键过期和非事务管道，无需服务器即可运行和测试Redis后端。
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self._lists: Dict[str, List[bytes]] = {}
+        self._expiry: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.round_trips = 0
+
+    def _alive(self, key: str) -> Optional[List[bytes]]:
+        deadline = self._expiry.get(key)
+        if deadline is not None and deadline <= self.clock():
+            self._lists.pop(key, None)
+            self._expiry.pop(key, None)
+        return self._lists.get(key)
+
+    @staticmethod
+    def _encode(value: Any) -> bytes:
+        return value if isinstance(value, bytes) else str(value).encode("utf-8")
+
+    def _rpush(self, key: str, *values: Any) -> int:
+        items = self._alive(key)
+        if items is None:
+            items = self._lists[key] = []
+        items.extend(self._encode(value) for value in values)
+        return len(items)
+
+    def _ltrim(self, key: str, start: int, end: int) -> bool:
+        items = self._alive(key)
+        if items is not None:
+            stop = None if end == -1 else end + 1
+            self._lists[key] = items[start:stop]
+        return True
+
+    def _lrange(self, key: str, start: int, end: int) -> List[bytes]:
+        items = self._alive(key) or []
+        stop = None if end == -1 else end + 1
+        return items[start:stop]
+
+    def _llen(self, key: str) -> int:
+        return len(self._alive(key) or [])
+
+    def _expire(self, key: str, seconds: int) -> bool:
+        if self._alive(key) is None:
+            return False
+        self._expiry[key] = self.clock() + seconds
+        return True
+
+    def _ttl(self, key: str) -> int:
+        if self._alive(key) is None:
+            return -2
+        deadline = self._expiry.get(key)
+        return -1 if deadline is None else int(round(deadline - self.clock()))
+
+    def _delete(self, *keys: str) -> int:
+        removed = 0
+        for key in keys:
+            if self._lists.pop(key, None) is not None:
+                removed += 1
+            self._expiry.pop(key, None)
+        return removed
+
+    def _keys(self, pattern: str = "*") -> List[bytes]:
+        return [key.encode("utf-8") for key in list(self._lists)
+                if self._alive(key) is not None and fnmatch.fnmatchcase(key, pattern)]
+
+    def _scan_iter(self, match: str = "*") -> Iterator[bytes]:
+        return iter(self._keys(match))
+
+    def _call(self, name: str, *args: Any) -> Any:
+        with self._lock:
+            self.round_trips += 1
+            return getattr(self, "_" + name)(*args)
+
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        if name in ("rpush", "ltrim", "lrange", "llen", "expire", "ttl", "delete", "keys", "scan_iter"):
+            return lambda *args: self._call(name, *args)
+        raise AttributeError(name)
+
+    def pipeline(self, transaction: bool = False) -> "InMemoryPipeline":
+        return InMemoryPipeline(self)
+
+
+class InMemoryPipeline:
+    """Command buffer for InMemoryRedis; execute() is a single round trip.
+    InMemoryRedis的命令缓冲区；execute()只算一次往返"""
+
+    def __init__(self, client: InMemoryRedis):
+        self._client = client
+        self._commands: List[Tuple[str, Tuple[Any, ...]]] = []
+
+    def __len__(self) -> int:
+        return len(self._commands)
+
+    def __getattr__(self, name: str) -> Callable[..., "InMemoryPipeline"]:
+        if name in ("rpush", "ltrim", "lrange", "llen", "expire", "ttl", "delete", "keys"):
+            def queue(*args: Any) -> "InMemoryPipeline":
+                self._commands.append((name, args))
+                return self
+            return queue
+        raise AttributeError(name)
+
+    def execute(self) -> List[Any]:
+        commands, self._commands = self._commands, []
+        with self._client._lock:
+            self._client.round_trips += 1
+            return [getattr(self._client, "_" + name)(*args) for name, args in commands]
+
+
+class RedisMemoryManager(MemoryManager):
+    """
+    Memory manager that keeps session context and history in Redis.
+    将会话上下文和历史保存在Redis中的记忆管理器
+
+    Each update_context and store_interaction sends its commands in one
+    pipeline round trip before returning, so other workers see the write
+    right away. With batch_size > 1 writes are held back across calls until
+    that many are queued (for bulk loads); reads flush the pipeline first so
+    a worker always sees its own writes, and queued writes are flushed at
+    interpreter exit. Context windows are capped lists (RPUSH +
+    LTRIM) and every session key expires after the idle TTL, so Redis
+    itself evicts idle sessions.
+    每次update_context和store_interaction在返回前通过一次管道往返发送其命令，
+    其他工作进程可以立即看到写入。batch_size > 1时写操作跨调用积压，直到排满该数量
+    （用于批量导入）；读取前会先刷新管道，保证工作进程总能读到自己的写入，
+    排队的写操作在解释器退出时刷新。
+    上下文窗口是有上限的列表（RPUSH + LTRIM），每个会话键在空闲TTL后过期，
+    由Redis自身淘汰空闲会话。
+    """
+
+    def __init__(self, agent_id: str, client: Any = None, redis_url: Optional[str] = None,
+                 key_prefix: str = "agent_camel", batch_size: int = 1,
+                 max_context_messages: Optional[int] = None,
+                 idle_ttl: Optional[float] = None):
+        """
+        Initialize the Redis memory manager.
+        初始化Redis记忆管理器
+
+        Args:
+            agent_id: ID of the agent this memory manager belongs to
+                  属于此记忆管理器的Agent ID
+            client: Redis client (or InMemoryRedis); created from redis_url if None
+                Redis客户端（或InMemoryRedis）；为None时根据redis_url创建
+            redis_url: Redis URL, defaults to settings.REDIS_URL
+                   Redis地址，默认为settings.REDIS_URL
+            key_prefix: Prefix of all keys written by this manager
+                    此管理器写入的所有键的前缀
+            batch_size: Writes queued before a pipeline round trip (1: send every
+                    call's write before it returns, so other workers see it at once)
+                    发起管道往返前排队的写操作数（为1时每次调用返回前即发送，其他工作进程立即可见）
+            max_context_messages: Maximum messages kept per session context
+                              每个会话上下文保留的最大消息数
+            idle_ttl: Seconds after which an idle session's keys expire
+                  空闲会话的键过期前的秒数
+        """
+        if client is None:
+            if not REDIS_AVAILABLE:
+                raise ImportError("redis库不可用，请安装redis或传入InMemoryRedis客户端")
+            client = redis.Redis.from_url(redis_url or settings.REDIS_URL)
+        self.client = client
+        self.key_prefix = key_prefix
+        self.batch_size = batch_size
+        self._pipe = client.pipeline(transaction=False)
+        self._pending = 0
+        self._pipe_lock = threading.RLock()
+        super().__init__(agent_id, max_context_messages=max_context_messages, idle_ttl=idle_ttl)
+        self.expire_seconds = max(1, int(self.sessions.idle_ttl or settings.SESSION_IDLE_TTL))
+        _open_managers.add(self)
+
+    def _key(self, session_id: str, kind: str) -> str:
+        return f"{self.key_prefix}:{self.agent_id}:{session_id}:{kind}"
+
+    def _queue(self, key: str, value: Dict[str, Any], cap: Optional[int] = None) -> None:
+        """Queue an append (and optional cap) on the pipeline, sending full batches.
+        将追加（及可选的长度限制）排入管道，批次满时发送"""
+        with self._pipe_lock:
+            self._pipe.rpush(key, json.dumps(value, ensure_ascii=False, default=json_default))
+            if cap is not None:
+                self._pipe.ltrim(key, -cap, -1)
+            self._pipe.expire(key, self.expire_seconds)
+            self._pending += 1
+            if self._pending >= self.batch_size:
+                self.flush()
+
+    def flush(self) -> None:
+        """
+        Send all queued writes in one pipeline round trip.
+        通过一次管道往返发送所有排队的写操作
+        """
+        with self._pipe_lock:
+            if self._pending:
+                self._pipe.execute()
+                self._pending = 0
+
+    def update_context(self, session_id: str, message: Dict[str, Any]) -> None:
+        """
+        Append a message to the session's capped context list.
+        向会话的有上限上下文列表追加一条消息
+        """
+        self._queue(self._key(session_id, "context"), message, cap=self.max_context_messages)
+
+    def get_context(self, session_id: str, last: Optional[int] = None,
+                    query: Optional[str] = None, top_k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Get the context for a session.
+        获取会话的上下文
+
+        Args:
+            session_id: Session identifier
+                    会话标识符
+            last: Only return the newest `last` messages (all if None)
+              只返回最新的last条消息（为None时返回全部）
+            query: Current request, used for retrieval when enabled
+               当前请求，启用检索时用于检索相关消息
+            top_k: Number of relevant interactions to retrieve
+               检索的相关交互数
+
+        Returns:
+            Context messages
+            上下文消息
+        """
+        self.flush()
+        start = -last if last else 0
+        items = self.client.lrange(self._key(session_id, "context"), start, -1)
+        context = [json.loads(item) for item in items]
+        if query and self.retrieval is not None:
+            relevant = [message for message in self._relevant_messages(
+                session_id, query, [], top_k or settings.RETRIEVAL_TOP_K) if message not in context]
+            if relevant:
+                return CompositeContextView("", context, relevant)
+        return context
+
+    def store_interaction(self, session_id: str, input_message: Dict[str, Any],
+                          output_message: Dict[str, Any], plan: Dict[str, Any]) -> None:
+        """
+        Append an interaction to the session's history list.
+        向会话的历史列表追加一条交互记录
+        """
+        interaction = Interaction(self._record(input_message), self._record(output_message),
+                                  plan, time.time())
+        self._queue(self._key(session_id, "interactions"), interaction)
+        if self.retrieval is not None:
+            self.retrieval.add(session_id, interaction)
+
+    def get_interaction_history(self, session_id: str) -> List[Dict[str, Any]]:
+        """
+        Get interaction history for a session.
+        获取会话的交互历史
+        """
+        self.flush()
+        items = self.client.lrange(self._key(session_id, "interactions"), 0, -1)
+        return [json.loads(item) for item in items]
+
+    def get_interaction_page(self, session_id: str, cursor: Optional[str] = None, limit: int = 50,
+                             since: Optional[float] = None, until: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Get one page of a session's interaction history with LRANGE.
+        通过LRANGE获取会话交互历史的一页
+
+        Interactions before `since` are skipped in batches of `limit`, so
+        memory stays bounded by the page size.
+        since之前的交互以limit为批次跳过，内存占用以页大小为上限。
+        """
+        self.flush()
+        key = self._key(session_id, "interactions")
+        start = int(cursor) if cursor else 0
+        page: List[Dict[str, Any]] = []
+        while len(page) < limit:
+            wanted = limit - len(page)
+            items = self.client.lrange(key, start, start + wanted - 1)
+            for item in items:
+                interaction = json.loads(item)
+                if until is not None and interaction_time(interaction) >= until:
+                    return {"interactions": page, "next_cursor": None}
+                start += 1
+                if since is None or interaction_time(interaction) >= since:
+                    page.append(interaction)
+            if len(items) < wanted:
+                break
+        more = len(page) == limit and self.client.llen(key) > start
+        return {"interactions": page, "next_cursor": str(start) if more else None}
+
+    def iter_interactions(self, session_ids: Optional[Iterable[str]] = None,
+                          since: Optional[float] = None, until: Optional[float] = None,
+                          batch_size: int = 500) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Stream interactions from Redis in LRANGE batches; sessions are found with SCAN.
+        以LRANGE批次从Redis流式读取交互；通过SCAN查找会话
+        """
+        self.flush()
+        if session_ids is None:
+            prefix = f"{self.key_prefix}:{self.agent_id}:"
+            suffix = ":interactions"
+            session_ids = (key.decode("utf-8")[len(prefix):-len(suffix)]
+                           for key in self.client.scan_iter(f"{prefix}*{suffix}"))
+        for session_id in session_ids:
+            cursor = None
+            while True:
+                page = self.get_interaction_page(session_id, cursor, batch_size, since, until)
+                for interaction in page["interactions"]:
+                    yield session_id, interaction
+                cursor = page["next_cursor"]
+                if cursor is None:
+                    break
+
+    def compress_context(self, session_id: str) -> None:
+        """
+        Trim the session context to its last 20 messages.
+        将会话上下文裁剪为最后20条消息
+        """
+        self.flush()
+        self.client.ltrim(self._key(session_id, "context"), -20, -1)
+
+    def cleanup_old_sessions(self, keep: Optional[str] = None) -> List[str]:
+        """
+        Idle sessions are expired by Redis itself, so there is nothing to scan.
+        空闲会话由Redis自身过期淘汰，无需扫描
+        """
+        return []
+
+    def evict_session(self, session_id: str) -> bool:
+        """
+        Delete a session's keys from Redis.
+        从Redis中删除会话的键
+        """
+        self.flush()
+        if self.retrieval is not None:
+            self.retrieval.drop(session_id)
+        return bool(self.client.delete(self._key(session_id, "context"),
+                                       self._key(session_id, "interactions")))
+
+    def snapshot_state(self) -> None:
+        """
+        Sessions live in Redis, so there is nothing to snapshot.
+        会话保存在Redis中，无需快照
+        """
+        return None
+
+    def save_to_storage(self) -> None:
+        """
+        Send any queued writes to Redis and persist the retrieval indexes.
+        将排队的写操作发送到Redis，并持久化检索索引
+        """
+        self.flush()
+        if self.retrieval is not None:
+            self.retrieval.persist()
+
+    def load_from_storage(self) -> None:
+        """
+        Nothing to load: sessions are read from Redis on access.
+        无需加载：会话在访问时从Redis读取
+        """
+        pass
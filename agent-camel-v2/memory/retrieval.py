@@ -0,0 +1,277 @@
+"""
+Vector retrieval memory for Agent-Camel V2.
+Agent-Camel V2的向量检索记忆
+
+Interactions are embedded with an offline hashing embedding and kept in a
+NumPy matrix per session, so prompts can include the earlier messages most
+relevant to the current request instead of only the latest ones.
+交互通过离线哈希向量化后保存在每个会话的NumPy矩阵中，
+使提示可以包含与当前请求最相关的历史消息，而不仅仅是最近的消息。
+"""
+from collections.abc import Mapping
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+from functools import lru_cache
+from urllib.parse import quote
+import json
+import logging
+import os
+import re
+import zlib
+
+import numpy as np
+
+from memory.records import json_default
+
+# 设置日志记录
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+_CJK_RUN = re.compile("[\u3400-\u9fff\uf900-\ufaff]+")
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _features(text: str) -> List[str]:
+    """Split a text into hashing features: CJK characters and bigrams, lowercase words.
+    将文本拆分为哈希特征：中日韩字符及其二元组、小写单词"""
+    text = text.lower()
+    features = _WORD.findall(text)
+    for run in _CJK_RUN.findall(text):
+        features.extend(run)
+        features.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return features
+
+
+@lru_cache(maxsize=1 << 18)
+def _feature_slot(feature: str, dim: int) -> Tuple[int, float]:
+    """Stable hash of a feature to (column, sign).
+    将特征稳定地哈希为(列, 符号)"""
+    h = zlib.crc32(feature.encode("utf-8"))
+    return h % dim, 1.0 if (h >> 31) & 1 else -1.0
+
+
+def embed_texts(texts: Sequence[str], dim: int = 256) -> np.ndarray:
+    """
+    Embed texts with the signed hashing trick, L2-normalized.
+    使用带符号的哈希技巧向量化文本，并做L2归一化
+
+    Fully offline and deterministic across processes, so stored vectors
+    stay valid after a restart.
+    完全离线，且在不同进程间结果一致，重启后已存储的向量仍然有效。
+
+    Args:
+        texts: Texts to embed
+           要向量化的文本
+        dim: Embedding dimension
+         向量维度
+
+    Returns:
+        float32 array of shape (len(texts), dim)
+        形状为(len(texts), dim)的float32数组
+    """
+    rows: List[int] = []
+    cols: List[int] = []
+    signs: List[float] = []
+    for row, text in enumerate(texts):
+        for feature in _features(text):
+            col, sign = _feature_slot(feature, dim)
+            rows.append(row)
+            cols.append(col)
+            signs.append(sign)
+    flat = np.asarray(rows, dtype=np.int64) * dim + np.asarray(cols, dtype=np.int64)
+    vectors = np.bincount(flat, weights=np.asarray(signs), minlength=len(texts) * dim)
+    vectors = vectors.reshape(len(texts), dim).astype(np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
+
+
+class VectorIndex:
+    """
+    Growable NumPy matrix of unit vectors with top-k cosine search.
+    可增长的单位向量NumPy矩阵，支持top-k余弦相似度检索
+    """
+
+    __slots__ = ("dim", "_vectors", "_count", "payloads")
+
+    def __init__(self, dim: int = 256, capacity: int = 16):
+        self.dim = dim
+        self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self._count = 0
+        self.payloads: List[Any] = []
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """Stored vectors (a view, no copy).
+        已存储的向量（视图，不复制）"""
+        return self._vectors[:self._count]
+
+    def add(self, vectors: np.ndarray, payloads: Sequence[Any]) -> None:
+        """
+        Append vectors with their payloads; storage doubles when full.
+        追加向量及其负载；存储满时容量加倍
+        """
+        vectors = np.atleast_2d(vectors)
+        needed = self._count + len(vectors)
+        if needed > len(self._vectors):
+            capacity = max(needed, len(self._vectors) * 2)
+            grown = np.zeros((capacity, self.dim), dtype=np.float32)
+            grown[:self._count] = self._vectors[:self._count]
+            self._vectors = grown
+        self._vectors[self._count:needed] = vectors
+        self._count = needed
+        self.payloads.extend(payloads)
+
+    def search(self, query: np.ndarray, k: int) -> List[Tuple[float, Any]]:
+        """
+        Find the k most similar entries by cosine similarity.
+        按余弦相似度查找最相似的k个条目
+
+        Returns:
+            (score, payload) pairs, best first
+            (相似度, 负载)对，按相似度从高到低排列
+        """
+        if not self._count or k <= 0:
+            return []
+        scores = self._vectors[:self._count] @ query
+        k = min(k, self._count)
+        if k < self._count:
+            top = np.argpartition(scores, -k)[-k:]
+        else:
+            top = np.arange(self._count)
+        top = top[np.argsort(scores[top])[::-1]]
+        return [(float(scores[i]), self.payloads[i]) for i in top]
+
+    def save(self, path: str) -> None:
+        """
+        Save to `path`.npy (vectors) and `path`.jsonl (payloads).
+        保存到`path`.npy（向量）和`path`.jsonl（负载）
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        np.save(path + ".npy", self.vectors)
+        with open(path + ".jsonl", "w", encoding="utf-8") as f:
+            for payload in self.payloads:
+                f.write(json.dumps(payload, ensure_ascii=False, default=json_default) + "\n")
+
+    @classmethod
+    def load(cls, path: str, dim: int = 256) -> Optional["VectorIndex"]:
+        """
+        Load an index saved by save(); vectors are memory-mapped until grown.
+        加载由save()保存的索引；在增长之前向量以内存映射方式读取
+        """
+        if not os.path.exists(path + ".npy"):
+            return None
+        vectors = np.load(path + ".npy", mmap_mode="r")
+        with open(path + ".jsonl", encoding="utf-8") as f:
+            payloads = [json.loads(line) for line in f]
+        return cls.from_arrays(vectors, payloads)
+
+    @classmethod
+    def from_arrays(cls, vectors: np.ndarray, payloads: List[Any]) -> "VectorIndex":
+        """
+        Wrap existing (possibly read-only, memory-mapped) vectors without copying.
+        包装已有的（可能是只读、内存映射的）向量而不复制
+        """
+        index = cls(vectors.shape[1], capacity=0)
+        index._vectors = vectors
+        index._count = len(vectors)
+        index.payloads = payloads
+        return index
+
+
+def interaction_text(interaction: Dict[str, Any]) -> str:
+    """Text used to embed an interaction: its input and output content.
+    用于向量化交互的文本：输入和输出内容"""
+    parts = []
+    for key in ("input", "output"):
+        message = interaction.get(key)
+        if isinstance(message, Mapping):
+            parts.append(str(message.get("content", "")))
+    return "\n".join(parts)
+
+
+class RetrievalMemory:
+    """
+    Per-session vector indexes of an agent's interactions.
+    Agent交互记录的按会话向量索引
+    """
+
+    def __init__(self, agent_id: str, dim: int = 256, persist_dir: Optional[str] = None):
+        """
+        Initialize the retrieval memory.
+        初始化检索记忆
+
+        Args:
+            agent_id: ID of the owning agent
+                  所属Agent的ID
+            dim: Embedding dimension
+             向量维度
+            persist_dir: Optional directory (e.g. CHROMA_DB_PATH) for saved indexes
+                     保存索引的可选目录（例如CHROMA_DB_PATH）
+        """
+        self.agent_id = agent_id
+        self.dim = dim
+        self.persist_dir = persist_dir
+        self.indexes: Dict[str, VectorIndex] = {}
+
+    def _path(self, session_id: str) -> Optional[str]:
+        if not self.persist_dir:
+            return None
+        return os.path.join(self.persist_dir, quote(self.agent_id, safe=""), quote(session_id, safe=""))
+
+    def _index(self, session_id: str, create: bool) -> Optional[VectorIndex]:
+        index = self.indexes.get(session_id)
+        if index is None:
+            path = self._path(session_id)
+            if path is not None:
+                index = VectorIndex.load(path, self.dim)
+            if index is None and create:
+                index = VectorIndex(self.dim)
+            if index is not None:
+                self.indexes[session_id] = index
+        return index
+
+    def add(self, session_id: str, interaction: Dict[str, Any]) -> None:
+        """
+        Embed and index an interaction.
+        向量化并索引一条交互记录
+        """
+        vector = embed_texts([interaction_text(interaction)], self.dim)
+        self._index(session_id, create=True).add(vector, [interaction])
+
+    def search(self, session_id: str, query: str, k: int = 3) -> List[Tuple[float, Dict[str, Any]]]:
+        """
+        Find the k interactions of a session most relevant to a query.
+        查找会话中与查询最相关的k条交互记录
+
+        Returns:
+            (score, interaction) pairs, best first
+            (相似度, 交互记录)对，按相似度从高到低排列
+        """
+        index = self._index(session_id, create=False)
+        if index is None:
+            return []
+        return index.search(embed_texts([query], self.dim)[0], k)
+
+    def persist(self, session_id: Optional[str] = None) -> None:
+        """
+        Save one session's index (or all of them) to persist_dir.
+        将一个会话（或全部会话）的索引保存到persist_dir
+        """
+        if not self.persist_dir:
+            return
+        session_ids = [session_id] if session_id is not None else list(self.indexes)
+        for sid in session_ids:
+            index = self.indexes.get(sid)
+            if index is not None:
+                index.save(self._path(sid))
+
+    def drop(self, session_id: str) -> None:
+        """
+        Persist (if configured) and release a session's index.
+        持久化（如已配置）并释放一个会话的索引
+        """
+        self.persist(session_id)
+        self.indexes.pop(session_id, None)
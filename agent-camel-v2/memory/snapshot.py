@@ -0,0 +1,299 @@
+"""
+Binary snapshots and warm restart for Agent-Camel V2 memory.
+Agent-Camel V2记忆的二进制快照与热重启
+
+A snapshot holds every session of every agent as its own pickle (protocol 5,
+NumPy arrays as out-of-band buffers) plus an offset index at the end of the
+file. Restart memory-maps the file and reads only the index; a session is
+unpickled on its first access, and only log rows written after the snapshot
+are replayed on top of it. Restart time therefore does not grow with the
+number of sessions.
+快照将每个Agent的每个会话保存为独立的pickle（协议5，NumPy数组作为带外缓冲区），
+并在文件末尾保存偏移索引。重启时以内存映射方式打开文件且只读取索引；
+会话在首次访问时才反序列化，并且只在其上重放快照之后写入的日志行。
+因此重启时间不会随会话数量增长。
+
+File layout / 文件布局:
+    header: magic (8 bytes), index offset (8 bytes), index length (8 bytes)
+    blobs:  session pickle, then its out-of-band buffers (64-byte aligned)
+    index:  pickle of {agent_id: {"log_position": ..., "sessions": {session_id: entry}}}
+"""
+from typing import Dict, Any, List, Optional, Tuple
+import atexit
+import logging
+import mmap
+import os
+import pickle
+import struct
+import threading
+import time
+import weakref
+
+from config.settings import settings
+
+# 设置日志记录
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+_MAGIC = b"ACMSNAP1"
+_HEADER = struct.Struct("<8sQQ")
+_ALIGN = 64
+
+# (pickle offset, pickle length, ((buffer offset, buffer length), ...))
+SessionEntry = Tuple[int, int, Tuple[Tuple[int, int], ...]]
+
+# Memory managers alive in this process, snapshotted by save_snapshot()
+# 本进程中存活的记忆管理器，由save_snapshot()生成快照
+_managers: "weakref.WeakSet" = weakref.WeakSet()
+_write_lock = threading.Lock()
+
+
+def register_manager(manager: Any) -> None:
+    """Track a memory manager so that save_snapshot() includes it.
+    跟踪一个记忆管理器，使save_snapshot()包含它"""
+    _managers.add(manager)
+
+
+def persist_retrieval(managers: Optional[List[Any]] = None) -> None:
+    """Write the retrieval indexes of live sessions to disk (when persistence is configured).
+    将存活会话的检索索引写入磁盘（已配置持久化时）"""
+    for manager in (managers if managers is not None else list(_managers)):
+        retrieval = getattr(manager, "retrieval", None)
+        if retrieval is not None:
+            try:
+                retrieval.persist()
+            except Exception as e:
+                logger.error(f"Persisting retrieval index of {manager.agent_id} failed: {str(e)}")
+
+
+# Indexes of sessions still live at exit are persisted, not only evicted ones
+# 退出时仍存活的会话的索引也会持久化，而不仅是被淘汰的会话
+atexit.register(persist_retrieval)
+
+
+class AgentSnapshot:
+    """
+    Sessions of one agent inside a snapshot file, unpickled on demand.
+    快照文件中单个Agent的会话，按需反序列化
+    """
+
+    def __init__(self, reader: "SnapshotReader", log_position: Optional[Tuple[int, int]],
+                 sessions: Dict[str, SessionEntry]):
+        self.reader = reader
+        self.log_position = log_position
+        self.sessions = sessions
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self.sessions
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    def pop(self, session_id: str) -> Any:
+        """
+        Unpickle a session and remove it from the snapshot index.
+        反序列化一个会话并将其从快照索引中移除
+        """
+        offset, length, buffers = self.sessions.pop(session_id)
+        view = self.reader.view
+        return pickle.loads(view[offset:offset + length],
+                            buffers=[view[start:start + size] for start, size in buffers])
+
+    def raw(self, session_id: str) -> Tuple[memoryview, List[memoryview]]:
+        """
+        Get a session's pickle and buffers without unpickling (for carrying
+        it over into the next snapshot).
+        不经反序列化获取会话的pickle和缓冲区（用于带入下一次快照）
+        """
+        offset, length, buffers = self.sessions[session_id]
+        view = self.reader.view
+        return view[offset:offset + length], [view[start:start + size] for start, size in buffers]
+
+
+class SnapshotReader:
+    """
+    Memory-mapped snapshot file; opening it reads only the index.
+    内存映射的快照文件；打开时只读取索引
+    """
+
+    _shared: Dict[str, "SnapshotReader"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path: str):
+        """
+        Open a snapshot.
+        打开快照
+
+        Args:
+            path: Snapshot file path
+              快照文件路径
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self._map)
+        magic, index_offset, index_length = _HEADER.unpack_from(self._map, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a memory snapshot")
+        index = pickle.loads(self.view[index_offset:index_offset + index_length])
+        self.agents: Dict[str, AgentSnapshot] = {
+            agent_id: AgentSnapshot(self, entry["log_position"], entry["sessions"])
+            for agent_id, entry in index.items()
+        }
+
+    @classmethod
+    def shared(cls, path: str) -> Optional["SnapshotReader"]:
+        """
+        Get the process-wide reader for a path, or None if there is no snapshot.
+        获取某路径对应的进程内共享读取器，没有快照时返回None
+        """
+        key = os.path.abspath(path)
+        with cls._shared_lock:
+            reader = cls._shared.get(key)
+            if reader is None and os.path.exists(path):
+                start = time.perf_counter()
+                reader = cls(path)
+                cls._shared[key] = reader
+                print(f"Opened memory snapshot {path} with {len(reader.agents)} agents "
+                      f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+            return reader
+
+    def take(self, agent_id: str) -> Optional[AgentSnapshot]:
+        """
+        Hand an agent's sessions to its memory manager (at most once).
+        将某Agent的会话交给其记忆管理器（最多一次）
+        """
+        return self.agents.pop(agent_id, None)
+
+
+def write_snapshot(path: str, agents: Dict[str, Tuple[Optional[Tuple[int, int]], Dict[str, Any]]]) -> int:
+    """
+    Write a snapshot atomically (temporary file, fsync, rename).
+    原子地写入快照（临时文件、fsync、重命名）
+
+    Args:
+        path: Snapshot file path
+          快照文件路径
+        agents: {agent_id: (log_position, {session_id: session})}, where a
+            session is ("state", object) or ("raw", pickle, buffers)
+            {agent_id: (日志位置, {会话ID: 会话})}，会话为("state", 对象)
+            或("raw", pickle, 缓冲区)
+
+    Returns:
+        Size of the snapshot in bytes
+        快照的字节数
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temporary = f"{path}.tmp"
+    index: Dict[str, Any] = {}
+    with open(temporary, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, 0, 0))
+        position = _HEADER.size
+
+        def write(data) -> int:
+            nonlocal position
+            start = position
+            f.write(data)
+            position += len(data) if isinstance(data, bytes) else memoryview(data).nbytes
+            return start
+
+        def align() -> None:
+            padding = -position % _ALIGN
+            if padding:
+                write(b"\0" * padding)
+
+        for agent_id, (log_position, sessions) in agents.items():
+            entries: Dict[str, SessionEntry] = {}
+            for session_id, session in sessions.items():
+                if session[0] == "raw":
+                    data, buffers = session[1], session[2]
+                else:
+                    collected: List[pickle.PickleBuffer] = []
+                    data = pickle.dumps(session[1], protocol=5, buffer_callback=collected.append)
+                    buffers = [buffer.raw() for buffer in collected]
+                offset = write(data)
+                spans = []
+                for buffer in buffers:
+                    align()
+                    spans.append((write(buffer), memoryview(buffer).nbytes))
+                entries[session_id] = (offset, memoryview(data).nbytes, tuple(spans))
+            index[agent_id] = {"log_position": log_position, "sessions": entries}
+
+        index_data = pickle.dumps(index, protocol=5)
+        index_offset = write(index_data)
+        f.seek(0)
+        f.write(_HEADER.pack(_MAGIC, index_offset, len(index_data)))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+    # Make the rename itself durable
+    # 确保重命名本身持久化
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    except OSError:
+        pass
+    return position
+
+
+def save_snapshot(path: Optional[str] = None, managers: Optional[List[Any]] = None,
+                  background: bool = False) -> Optional[threading.Thread]:
+    """
+    Snapshot agent memories to a file.
+    将Agent记忆保存为快照文件
+
+    State is captured on the calling thread (shallow copies, no
+    serialization); pickling and writing happen on a background thread when
+    `background` is set. Agents restored from the previous snapshot but not
+    created since are carried over unchanged. Retrieval indexes of live
+    sessions are persisted on the calling thread as well.
+    状态在调用线程上捕获（浅拷贝，不做序列化）；设置background时，
+    序列化和写入在后台线程中进行。从上一次快照恢复但此后尚未创建的Agent会原样带入。
+    存活会话的检索索引也在调用线程上持久化。
+
+    Args:
+        path: Snapshot path, defaults to settings.MEMORY_SNAPSHOT_PATH
+          快照路径，默认为settings.MEMORY_SNAPSHOT_PATH
+        managers: Memory managers to include, defaults to all live ones
+              要包含的记忆管理器，默认为所有存活的管理器
+        background: Write on a background thread
+                在后台线程中写入
+
+    Returns:
+        The writer thread when background is set, otherwise None
+        设置background时返回写入线程，否则返回None
+    """
+    path = path or settings.MEMORY_SNAPSHOT_PATH
+    if not path:
+        raise ValueError("No snapshot path given and MEMORY_SNAPSHOT_PATH is not set")
+    agents: Dict[str, Tuple[Optional[Tuple[int, int]], Dict[str, Any]]] = {}
+    previous = SnapshotReader._shared.get(os.path.abspath(path))
+    if previous is not None:
+        for agent_id, agent in previous.agents.items():
+            agents[agent_id] = (agent.log_position,
+                                {session_id: ("raw",) + agent.raw(session_id) for session_id in agent.sessions})
+    managers = managers if managers is not None else list(_managers)
+    for manager in managers:
+        state = manager.snapshot_state()
+        if state is not None:
+            agents[manager.agent_id] = state
+    persist_retrieval(managers)
+
+    def run() -> None:
+        with _write_lock:
+            start = time.perf_counter()
+            size = write_snapshot(path, agents)
+            sessions = sum(len(sessions) for _, sessions in agents.values())
+            print(f"Wrote memory snapshot {path}: {len(agents)} agents, {sessions} sessions, "
+                  f"{size / 1e6:.1f} MB in {time.perf_counter() - start:.2f} s")
+
+    if not background:
+        run()
+        return None
+    thread = threading.Thread(target=run, name="memory-snapshot", daemon=False)
+    thread.start()
+    return thread
@@ -0,0 +1,676 @@
+"""
+Durable SQLite storage for Agent-Camel V2 memory.
+Agent-Camel V2记忆的持久化SQLite存储
+"""
+from typing import Dict, Any, Iterator, List, Optional, Set, Tuple
+import atexit
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+import weakref
+
+from memory.records import json_default
+
+# 设置日志记录
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS context (
+    id INTEGER PRIMARY KEY,
+    agent_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    message TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS context_session ON context (agent_id, session_id, id);
+CREATE TABLE IF NOT EXISTS interactions (
+    id INTEGER PRIMARY KEY,
+    agent_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS interactions_session ON interactions (agent_id, session_id, id);
+"""
+
+
+# Queue markers for the write-behind flusher
+# 写后刷新线程的队列标记
+_FLUSH = object()
+_STOP = object()
+
+# Stores still open, flushed and closed when the interpreter exits
+# 仍处于打开状态的存储，在解释器退出时刷新并关闭
+_open_stores: "weakref.WeakSet" = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_on_shutdown() -> None:
+    for store in list(_open_stores):
+        store.close()
+
+
+def _commit_loop(store_ref: "weakref.ref", group_open: threading.Event, stopping: threading.Event) -> None:
+    """Committer thread of a synchronous store: commit each group once it is
+    group_commit_interval old, even if no later write arrives. Holds the
+    store only weakly so an unused store can still be collected.
+    同步存储的提交线程：组存在group_commit_interval后即提交，即使之后没有写入。
+    只弱引用存储，使不再使用的存储仍可被回收。"""
+    while not stopping.is_set():
+        if not group_open.wait(1.0):
+            if store_ref() is None:
+                return
+            continue
+        store = store_ref()
+        if store is None:
+            return
+        delay = store._commit_if_due()
+        del store
+        if delay is not None:
+            stopping.wait(delay)
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, default=json_default)
+
+
+def _with_timestamp(created_at: float, data: str) -> Dict[str, Any]:
+    """Decode an interaction row; rows written before interactions carried a
+    timestamp get the row's creation time.
+    解码一条交互行；交互尚未携带时间戳时写入的行使用该行的创建时间"""
+    interaction = json.loads(data)
+    interaction.setdefault("timestamp", created_at)
+    return interaction
+
+
+class SQLiteMemoryStore:
+    """
+    Append-only memory store on SQLite in WAL mode.
+    基于WAL模式SQLite的仅追加记忆存储
+
+    Every context message and interaction is appended as its own row, so
+    writes are incremental. Rows are committed in groups (by count or age)
+    to amortize fsyncs; at most one group is lost on a crash. A committer
+    thread commits a group once it is group_commit_interval old even if no
+    further write arrives, and every open store is flushed at interpreter exit. Context rows
+    beyond the window are compacted away periodically, while interactions
+    are kept as full history. Nothing is read at open time: sessions are
+    loaded on demand through indexed lookups, so opening the store costs
+    the same no matter how much history it holds.
+
+    With `write_behind`, appends only go onto a bounded queue and a flusher
+    thread inserts and commits them in batches, so no disk I/O happens on
+    the request path. A full queue blocks the writer (backpressure), reads
+    wait for queued writes first, and the store is flushed at interpreter
+    exit. A crash loses at most the queued rows plus one batch; see stats().
+    每条上下文消息和交互都作为独立的行追加，写入是增量的。
+    行按组提交（按数量或时间），以分摊fsync开销；崩溃时最多丢失一组数据。
+    即使之后没有新的写入，提交线程也会在组存在group_commit_interval后提交它，
+    所有打开的存储都会在解释器退出时刷新。
+    超出窗口的上下文行会被定期压缩清理，交互则作为完整历史保留。
+    打开时不读取任何数据：会话通过索引按需加载，
+    因此无论存储了多少历史，打开存储的开销都相同。
+
+    启用write_behind时，追加操作只进入有界队列，由刷新线程按批插入并提交，
+    请求路径上不发生磁盘I/O。队列满时写入方会阻塞（背压），读取前会等待排队的写入，
+    解释器退出时会刷新存储。崩溃时最多丢失排队的行加一个批次；参见stats()。
+    """
+
+    _shared: Dict[str, "SQLiteMemoryStore"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path: str, group_commit_size: int = 64,
+                 group_commit_interval: float = 0.05,
+                 context_keep: int = 50, compact_every: int = 10000,
+                 write_behind: bool = False, queue_size: int = 10000):
+        """
+        Open (or create) the store.
+        打开（或创建）存储
+
+        Args:
+            path: SQLite database file path
+              SQLite数据库文件路径
+            group_commit_size: Commit after this many pending writes
+                           待提交写入达到此数量时提交
+            group_commit_interval: Commit when the oldest pending write is this old (seconds)
+                               最早的待提交写入超过此时长（秒）时提交
+            context_keep: Context messages kept per session by compaction, for
+                      agents that did not set their own with set_context_keep()
+                      压缩时每个会话保留的上下文消息数（用于未通过set_context_keep()单独设置的Agent）
+            compact_every: Compact dirty sessions after this many context writes
+                       每写入此数量的上下文消息后压缩有变动的会话
+            write_behind: Write on a background flusher thread instead of the caller's
+                      在后台刷新线程而非调用方线程上写入
+            queue_size: Writes queued before writers block (write-behind only)
+                    写入方阻塞前可排队的写入数（仅用于写后模式）
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.group_commit_size = group_commit_size
+        self.group_commit_interval = group_commit_interval
+        self.context_keep = context_keep
+        self._context_keep: Dict[str, int] = {}
+        self.compact_every = compact_every
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._pending = 0
+        self._pending_since = 0.0
+        self._group_open = threading.Event()
+        self._stopping = threading.Event()
+        self._committer: Optional[threading.Thread] = None
+        self._context_writes = 0
+        self._dirty_sessions: Set[Tuple[str, str]] = set()
+        self.commits = 0
+        self.committed_rows = 0
+        self.failed_rows = 0
+        self.max_batch = 0
+        self.last_commit_seconds = 0.0
+        self.max_commit_seconds = 0.0
+        self.max_lag_seconds = 0.0
+        self.backpressure_waits = 0
+        self.backpressure_seconds = 0.0
+        self.queue_size = queue_size
+        self._queue: Optional[queue.Queue] = None
+        self._flusher: Optional[threading.Thread] = None
+        self._batch_ready = threading.Event()
+        self._flush_requests = 0
+        if write_behind:
+            self._queue = queue.Queue(maxsize=queue_size)
+            self._flusher = threading.Thread(target=self._flush_loop, name="memory-write-behind", daemon=True)
+            self._flusher.start()
+        _open_stores.add(self)
+        print(f"Opened SQLite memory store at {path}" + (" (write-behind)" if write_behind else ""))
+
+    @classmethod
+    def shared(cls, path: str, **kwargs: Any) -> "SQLiteMemoryStore":
+        """
+        Get the process-wide store for a path, opening it on first use.
+        获取某路径对应的进程内共享存储，首次使用时打开
+
+        Many agents can then share one connection instead of opening their own.
+        这样多个Agent可以共享一个连接，而不必各自打开。
+        """
+        key = os.path.abspath(path)
+        with cls._shared_lock:
+            store = cls._shared.get(key)
+            if store is None:
+                store = cls(path, **kwargs)
+                cls._shared[key] = store
+            return store
+
+    def _begin(self) -> None:
+        """Open a write transaction if none is pending.
+        如果没有待提交事务则开启写事务"""
+        if not self._pending:
+            self._conn.execute("BEGIN")
+            self._pending_since = time.monotonic()
+            if self._queue is None:
+                # Commit the group when it is old enough even if no later write arrives
+                # 即使之后没有写入，组足够久时也会提交
+                if self._committer is None:
+                    self._committer = threading.Thread(
+                        target=_commit_loop, args=(weakref.ref(self), self._group_open, self._stopping),
+                        name="memory-group-commit", daemon=True)
+                    self._committer.start()
+                self._group_open.set()
+
+    def _commit_if_due(self) -> Optional[float]:
+        """Committer thread: commit the pending group if it is old enough.
+        提交线程：待提交的组足够久时提交
+
+        Returns:
+            Seconds until the pending group is due, or None if nothing is pending
+            距待提交组到期的秒数；没有待提交数据时返回None
+        """
+        with self._lock:
+            if self._pending:
+                remaining = self._pending_since + self.group_commit_interval - time.monotonic()
+                if remaining > 0:
+                    return remaining
+                self._commit()
+            self._group_open.clear()
+            return None
+
+    def set_context_keep(self, agent_id: str, keep: int) -> None:
+        """
+        Set how many context messages compaction keeps per session of an agent.
+        设置压缩时为某Agent的每个会话保留的上下文消息数
+
+        Agents sharing the store can have different context windows.
+        共享存储的Agent可以有不同的上下文窗口。
+        """
+        with self._lock:
+            self._context_keep[agent_id] = keep
+
+    def _after_write(self) -> None:
+        """Group commit: commit once the batch is large or old enough.
+        组提交：批次足够大或足够久时提交"""
+        self._pending += 1
+        if (self._pending >= self.group_commit_size or
+                time.monotonic() - self._pending_since >= self.group_commit_interval):
+            self._commit()
+
+    def _enqueue(self, item: tuple) -> None:
+        """Queue a write for the flusher, blocking while the queue is full.
+        将写入排入刷新线程的队列，队列满时阻塞"""
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            start = time.monotonic()
+            self._batch_ready.set()
+            self._queue.put(item)
+            with self._lock:
+                self.backpressure_waits += 1
+                self.backpressure_seconds += time.monotonic() - start
+        if self._queue.qsize() >= self.group_commit_size:
+            self._batch_ready.set()
+
+    def _flush_loop(self) -> None:
+        """Flusher thread: collect a batch by size or age, then write and commit it.
+        刷新线程：按数量或时间收集一个批次，然后写入并提交"""
+        while True:
+            item = self._queue.get()
+            batch = []
+            done = 1
+            stop = item is _STOP
+            if item is not _FLUSH and not stop:
+                batch.append(item)
+                # Sleep until a full batch is queued, a flush is requested or the
+                # interval is over, instead of waking up for every write
+                # 休眠直到排满一个批次、请求刷新或间隔结束，而不是每次写入都唤醒
+                self._batch_ready.clear()
+                if not self._flush_requests and self._queue.qsize() < self.group_commit_size - 1:
+                    self._batch_ready.wait(self.group_commit_interval)
+                while len(batch) < self.group_commit_size:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    done += 1
+                    if item is _FLUSH:
+                        break
+                    if item is _STOP:
+                        stop = True
+                        break
+                    batch.append(item)
+            if batch:
+                self._write_batch(batch)
+            for _ in range(done):
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _write_batch(self, batch: List[tuple]) -> None:
+        """Insert a batch of queued writes in one transaction.
+        在一个事务中插入一批排队的写入"""
+        context_rows = [(agent_id, session_id, data)
+                        for kind, agent_id, session_id, data, _, _ in batch if kind == "context"]
+        interaction_rows = [(agent_id, session_id, created_at, data)
+                            for kind, agent_id, session_id, data, created_at, _ in batch if kind == "interaction"]
+        oldest = min(queued_at for *_, queued_at in batch)
+        with self._lock:
+            start = time.monotonic()
+            try:
+                self._conn.execute("BEGIN")
+                if context_rows:
+                    self._conn.executemany(
+                        "INSERT INTO context (agent_id, session_id, message) VALUES (?, ?, ?)", context_rows)
+                    self._dirty_sessions.update((row[0], row[1]) for row in context_rows)
+                    before = self._context_writes
+                    self._context_writes += len(context_rows)
+                    if self._context_writes // self.compact_every != before // self.compact_every:
+                        self._compact_dirty()
+                if interaction_rows:
+                    self._conn.executemany(
+                        "INSERT INTO interactions (agent_id, session_id, created_at, data) VALUES (?, ?, ?, ?)",
+                        interaction_rows)
+                self._conn.execute("COMMIT")
+            except sqlite3.Error as e:
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                self.failed_rows += len(batch)
+                logger.error(f"Write-behind batch of {len(batch)} rows failed: {str(e)}")
+                return
+            now = time.monotonic()
+            self.commits += 1
+            self.committed_rows += len(batch)
+            self.max_batch = max(self.max_batch, len(batch))
+            self.last_commit_seconds = now - start
+            self.max_commit_seconds = max(self.max_commit_seconds, self.last_commit_seconds)
+            self.max_lag_seconds = max(self.max_lag_seconds, now - oldest)
+
+    def _sync(self) -> None:
+        """Wait for queued writes so that reads see them.
+        等待排队的写入完成，使读取能看到它们"""
+        if self._queue is not None and self._queue.unfinished_tasks:
+            self.flush()
+
+    def append_context(self, agent_id: str, session_id: str, message: Dict[str, Any]) -> None:
+        """
+        Append a context message.
+        追加一条上下文消息
+        """
+        if self._queue is not None:
+            self._enqueue(("context", agent_id, session_id, _dumps(message), None, time.monotonic()))
+            return
+        with self._lock:
+            self._begin()
+            self._conn.execute(
+                "INSERT INTO context (agent_id, session_id, message) VALUES (?, ?, ?)",
+                (agent_id, session_id, _dumps(message))
+            )
+            self._dirty_sessions.add((agent_id, session_id))
+            self._context_writes += 1
+            if self._context_writes % self.compact_every == 0:
+                self._compact_dirty()
+            self._after_write()
+
+    def append_interaction(self, agent_id: str, session_id: str, interaction: Dict[str, Any],
+                           created_at: Optional[float] = None) -> None:
+        """
+        Append an interaction.
+        追加一条交互记录
+        """
+        if self._queue is not None:
+            self._enqueue(("interaction", agent_id, session_id, _dumps(interaction),
+                           created_at if created_at is not None else time.time(), time.monotonic()))
+            return
+        with self._lock:
+            self._begin()
+            self._conn.execute(
+                "INSERT INTO interactions (agent_id, session_id, created_at, data) VALUES (?, ?, ?, ?)",
+                (agent_id, session_id, created_at if created_at is not None else time.time(),
+                 _dumps(interaction))
+            )
+            self._after_write()
+
+    def load_context(self, agent_id: str, session_id: str, limit: int) -> List[Dict[str, Any]]:
+        """
+        Load the newest `limit` context messages of a session, oldest first.
+        加载会话最新的limit条上下文消息，按从旧到新排列
+        """
+        self._sync()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT message FROM context WHERE agent_id = ? AND session_id = ? "
+                "ORDER BY id DESC LIMIT ?",
+                (agent_id, session_id, limit)
+            ).fetchall()
+        return [json.loads(row[0]) for row in reversed(rows)]
+
+    def load_interactions(self, agent_id: str, session_id: str) -> List[Dict[str, Any]]:
+        """
+        Load all interactions of a session, oldest first.
+        加载会话的全部交互记录，按从旧到新排列
+        """
+        self._sync()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT created_at, data FROM interactions WHERE agent_id = ? AND session_id = ? ORDER BY id",
+                (agent_id, session_id)
+            ).fetchall()
+        return [_with_timestamp(row[0], row[1]) for row in rows]
+
+    def iter_interactions(self, agent_id: str, session_id: Optional[str] = None,
+                          since: Optional[float] = None, until: Optional[float] = None,
+                          batch_size: int = 500) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Stream an agent's interactions session by session, oldest first, in batches.
+        按会话逐个、按批次流式读取某Agent的交互记录，每个会话内按从旧到新排列
+
+        Uses keyset pagination on (session_id, id) along the session index,
+        so every batch is an index range scan, memory stays bounded by
+        `batch_size` and the lock is released between batches.
+        沿会话索引在(session_id, id)上使用键集分页，每个批次都是索引范围扫描，
+        内存占用以batch_size为上限，并且批次之间会释放锁。
+
+        Args:
+            agent_id: Agent ID
+                  Agent ID
+            session_id: Only this session (all sessions if None)
+                    只读取此会话（为None时读取所有会话）
+            since: Only interactions created at or after this Unix time
+               只读取在此Unix时间及之后创建的交互
+            until: Only interactions created before this Unix time
+               只读取在此Unix时间之前创建的交互
+            batch_size: Rows fetched per query
+                    每次查询读取的行数
+
+        Yields:
+            (session_id, interaction)
+        """
+        if session_id is None:
+            where, order = ["agent_id = ?", "(session_id, id) > (?, ?)"], "session_id, id"
+        else:
+            where, order = ["agent_id = ?", "session_id = ?", "id > ?"], "id"
+        filters: List[Any] = []
+        if since is not None:
+            where.append("created_at >= ?")
+            filters.append(since)
+        if until is not None:
+            where.append("created_at < ?")
+            filters.append(until)
+        query = (f"SELECT session_id, id, created_at, data FROM interactions "
+                 f"WHERE {' AND '.join(where)} ORDER BY {order} LIMIT ?")
+        self.flush()
+        last = ("", 0) if session_id is None else (session_id, 0)
+        while True:
+            with self._lock:
+                rows = self._conn.execute(query, (agent_id, *last, *filters, batch_size)).fetchall()
+            for row_session, _, created_at, data in rows:
+                yield row_session, _with_timestamp(created_at, data)
+            if len(rows) < batch_size:
+                return
+            last = (rows[-1][0], rows[-1][1]) if session_id is None else (session_id, rows[-1][1])
+
+    def log_position(self) -> Tuple[int, int]:
+        """
+        Get the newest (context id, interaction id) written so far.
+        获取迄今为止写入的最新(上下文ID, 交互ID)
+
+        A snapshot records this position; on restart only rows after it are
+        replayed.
+        快照会记录此位置；重启时只重放其后的行。
+        """
+        self.flush()
+        with self._lock:
+            context = self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM context").fetchone()[0]
+            interactions = self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM interactions").fetchone()[0]
+        return context, interactions
+
+    def load_tail(self, agent_id: str, context_after: int,
+                  interactions_after: int) -> Tuple[List[Tuple[str, Dict[str, Any]]],
+                                                    List[Tuple[str, Dict[str, Any]]]]:
+        """
+        Load an agent's rows written after a log position, oldest first.
+        加载某Agent在日志位置之后写入的行，按从旧到新排列
+
+        Returns:
+            ([(session_id, message)], [(session_id, interaction)])
+        """
+        self._sync()
+        with self._lock:
+            context = self._conn.execute(
+                "SELECT session_id, message FROM context WHERE id > ? AND agent_id = ? ORDER BY id",
+                (context_after, agent_id)
+            ).fetchall()
+            interactions = self._conn.execute(
+                "SELECT session_id, created_at, data FROM interactions WHERE id > ? AND agent_id = ? ORDER BY id",
+                (interactions_after, agent_id)
+            ).fetchall()
+        return ([(row[0], json.loads(row[1])) for row in context],
+                [(row[0], _with_timestamp(row[1], row[2])) for row in interactions])
+
+    def has_session(self, agent_id: str, session_id: str) -> bool:
+        """
+        Check whether anything is stored for a session.
+        检查某会话是否有已存储的数据
+        """
+        self._sync()
+        with self._lock:
+            for table in ("context", "interactions"):
+                row = self._conn.execute(
+                    f"SELECT 1 FROM {table} WHERE agent_id = ? AND session_id = ? LIMIT 1",
+                    (agent_id, session_id)
+                ).fetchone()
+                if row:
+                    return True
+        return False
+
+    def list_sessions(self, agent_id: str) -> List[str]:
+        """
+        List the sessions stored for an agent.
+        列出某Agent已存储的会话
+        """
+        self._sync()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT session_id FROM context WHERE agent_id = ? "
+                "UNION SELECT session_id FROM interactions WHERE agent_id = ?",
+                (agent_id, agent_id)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def delete_session(self, agent_id: str, session_id: str) -> None:
+        """
+        Delete everything stored for a session.
+        删除某会话存储的全部数据
+        """
+        self._sync()
+        with self._lock:
+            self._begin()
+            for table in ("context", "interactions"):
+                self._conn.execute(f"DELETE FROM {table} WHERE agent_id = ? AND session_id = ?",
+                                   (agent_id, session_id))
+            self._dirty_sessions.discard((agent_id, session_id))
+            self._after_write()
+            if self._queue is not None:
+                # The flusher opens its own transactions, so none may stay pending
+                # 刷新线程会开启自己的事务，因此不能保留未提交的事务
+                self._commit()
+
+    def _commit(self) -> None:
+        """Commit the caller-side group, if any (lock held).
+        提交调用方线程上的组（需持有锁）"""
+        if self._pending:
+            self._conn.execute("COMMIT")
+            self.commits += 1
+            self.committed_rows += self._pending
+            self.max_batch = max(self.max_batch, self._pending)
+            self.max_lag_seconds = max(self.max_lag_seconds, time.monotonic() - self._pending_since)
+            self._pending = 0
+
+    def flush(self) -> None:
+        """
+        Commit all pending writes.
+        提交所有待写入的数据
+
+        With write-behind, waits until the flusher has committed everything
+        queued before the call.
+        写后模式下，等待刷新线程提交调用之前排队的所有写入。
+        """
+        if self._flusher is not None and self._flusher.is_alive():
+            with self._lock:
+                self._flush_requests += 1
+            try:
+                self._queue.put(_FLUSH)
+                self._batch_ready.set()
+                self._queue.join()
+            finally:
+                with self._lock:
+                    self._flush_requests -= 1
+        with self._lock:
+            self._commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get write statistics and crash-loss bounds.
+        获取写入统计信息和崩溃丢失上限
+
+        pending_rows are written but not yet durable, i.e. what a crash right
+        now would lose. loss_bound_rows is the most that can ever be pending;
+        max_lag_seconds is the longest a row has waited to be committed.
+        pending_rows是已写入但尚未持久化的行数，即此刻崩溃会丢失的数据。
+        loss_bound_rows是任何时刻最多可能未持久化的行数；
+        max_lag_seconds是一行等待提交的最长时间。
+        """
+        write_behind = self._queue is not None
+        return {
+            "write_behind": write_behind,
+            "queued_rows": self._queue.qsize() if write_behind else 0,
+            "pending_rows": self._queue.unfinished_tasks if write_behind else self._pending,
+            "loss_bound_rows": (self.queue_size + self.group_commit_size) if write_behind
+                               else self.group_commit_size,
+            "max_lag_seconds": self.max_lag_seconds,
+            "commits": self.commits,
+            "committed_rows": self.committed_rows,
+            "failed_rows": self.failed_rows,
+            "max_batch": self.max_batch,
+            "last_commit_seconds": self.last_commit_seconds,
+            "max_commit_seconds": self.max_commit_seconds,
+            "backpressure_waits": self.backpressure_waits,
+            "backpressure_seconds": self.backpressure_seconds,
+        }
+
+    def _compact_dirty(self) -> None:
+        """Drop context rows that fell out of the window of recently written sessions.
+        删除最近写入会话中已超出窗口的上下文行"""
+        for agent_id, session_id in self._dirty_sessions:
+            self._conn.execute(
+                "DELETE FROM context WHERE agent_id = ? AND session_id = ? AND id < ("
+                "SELECT MIN(id) FROM (SELECT id FROM context WHERE agent_id = ? AND session_id = ? "
+                "ORDER BY id DESC LIMIT ?))",
+                (agent_id, session_id, agent_id, session_id, self._context_keep.get(agent_id, self.context_keep))
+            )
+        self._dirty_sessions.clear()
+
+    def compact(self) -> None:
+        """
+        Compact the whole store: trim every session's context and checkpoint the WAL.
+        压缩整个存储：裁剪所有会话的上下文并对WAL执行检查点
+        """
+        self.flush()
+        with self._lock:
+            trim = ("DELETE FROM context WHERE id IN ("
+                    "SELECT id FROM (SELECT id, ROW_NUMBER() OVER ("
+                    "PARTITION BY agent_id, session_id ORDER BY id DESC) AS rank FROM context WHERE {}) "
+                    "WHERE rank > ?)")
+            custom = dict(self._context_keep)
+            self._conn.execute("BEGIN")
+            for agent_id, keep in custom.items():
+                self._conn.execute(trim.format("agent_id = ?"), (agent_id, keep))
+            self._conn.execute(trim.format(f"agent_id NOT IN ({', '.join('?' * len(custom))})"),
+                               (*custom, self.context_keep))
+            self._conn.execute("COMMIT")
+            self._dirty_sessions.clear()
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            print(f"Compacted SQLite memory store at {self.path}")
+
+    def close(self) -> None:
+        """
+        Flush pending writes, stop the flusher and close the connection.
+        提交待写入数据，停止刷新线程并关闭连接
+        """
+        self.flush()
+        if self._flusher is not None and self._flusher.is_alive():
+            self._queue.put(_STOP)
+            self._batch_ready.set()
+            self._flusher.join()
+        _open_stores.discard(self)
+        self._stopping.set()
+        self._group_open.set()
+        with self._lock:
+            self._commit()
+            self._conn.close()
+        with self._shared_lock:
+            if self._shared.get(os.path.abspath(self.path)) is self:
+                del self._shared[os.path.abspath(self.path)]
@@ -0,0 +1,195 @@
+"""
+Background context summarization for Agent-Camel V2 memory.
+Agent-Camel V2记忆的后台上下文摘要
+
+Messages that fall out of a session's recent window are folded into a
+running summary by a background worker, so long sessions keep their earlier
+facts without growing the prompt.
+从会话最近窗口中移出的消息由后台工作线程合并进滚动摘要，
+长会话因此能保留早期信息，而不会使提示不断变长。
+"""
+from typing import Dict, Any, List, Optional, Callable, Tuple
+import logging
+import queue
+import re
+import threading
+
+# 设置日志记录
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+_CJK = re.compile("[\u3400-\u9fff\uf900-\ufaff]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Roughly estimate the number of tokens in a text.
+    粗略估算文本的token数
+
+    CJK characters count as one token each, other text as one token per
+    four characters.
+    每个中日韩字符计为一个token，其他文本每四个字符计为一个token。
+    """
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    """
+    Cut a text so that its estimated token count fits the budget.
+    截断文本，使其估算token数不超过预算
+    """
+    if estimate_tokens(text) <= budget:
+        return text
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if estimate_tokens(text[:middle]) <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low]
+
+
+SummarizeFn = Callable[[str, List[Dict[str, Any]], int], str]
+
+
+def llm_summarize_fn(model: Any) -> SummarizeFn:
+    """
+    Build a summarize function backed by a ModelProvider.
+    构建基于ModelProvider的摘要函数
+
+    Args:
+        model: ModelProvider used to write the summary
+           用于生成摘要的ModelProvider
+
+    Returns:
+        Function (previous_summary, messages, token_budget) -> new summary
+        函数 (previous_summary, messages, token_budget) -> 新摘要
+    """
+    def summarize(previous_summary: str, messages: List[Dict[str, Any]], budget: int) -> str:
+        prompt = ("Update the running summary of a conversation with the new messages below. "
+                  "Keep every fact, decision, preference and open question the user may rely on later. "
+                  f"Answer with the summary only, at most {budget} tokens.\n\n")
+        prompt += f"Current summary:\n{previous_summary or '(empty)'}\n\nNew messages:\n"
+        for message in messages:
+            prompt += f"- {message.get('role', 'user')}: {message.get('content', '')}\n"
+        return model.generate(prompt, max_tokens=budget)
+    return summarize
+
+
+class ContextSummarizer:
+    """
+    Background worker folding evicted context into running summaries.
+    将被移出的上下文合并进滚动摘要的后台工作器
+
+    submit() only queues messages and returns immediately, so no LLM call
+    happens on the request path. Pending messages of the same session are
+    coalesced into one summarization call, and every message is summarized
+    exactly once: the new summary is built from the previous summary plus
+    the newly evicted messages only.
+    submit()只将消息入队并立即返回，请求路径上不会发生LLM调用。
+    同一会话的待处理消息会合并为一次摘要调用，且每条消息只被摘要一次：
+    新摘要只由上一版摘要加上新移出的消息生成。
+    """
+
+    _shared: Dict[int, "ContextSummarizer"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, summarize_fn: SummarizeFn, token_budget: int = 512):
+        """
+        Initialize the summarizer and start its worker thread.
+        初始化摘要器并启动工作线程
+
+        Args:
+            summarize_fn: Function (previous_summary, messages, token_budget) -> summary
+                      函数 (previous_summary, messages, token_budget) -> 摘要
+            token_budget: Maximum estimated tokens of a summary
+                      摘要的最大估算token数
+        """
+        self.summarize_fn = summarize_fn
+        self.token_budget = token_budget
+        self._pending: Dict[Tuple[int, str], Tuple[Any, List[Dict[str, Any]]]] = {}
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[Optional[Tuple[int, str]]]" = queue.Queue()
+        self.summarized_messages = 0
+        self.summary_calls = 0
+        self._worker = threading.Thread(target=self._run, name="context-summarizer", daemon=True)
+        self._worker.start()
+
+    @classmethod
+    def shared(cls, model: Any, token_budget: int = 512) -> "ContextSummarizer":
+        """
+        Get the process-wide summarizer for a model provider.
+        获取某模型提供商对应的进程内共享摘要器
+        """
+        with cls._shared_lock:
+            summarizer = cls._shared.get(id(model))
+            if summarizer is None:
+                summarizer = cls(llm_summarize_fn(model), token_budget)
+                cls._shared[id(model)] = summarizer
+            return summarizer
+
+    def submit(self, memory: Any, session_id: str, messages: List[Dict[str, Any]]) -> None:
+        """
+        Queue evicted messages of a session for summarization.
+        将会话中被移出的消息排队等待摘要
+
+        Args:
+            memory: MemoryManager owning the session
+                拥有该会话的MemoryManager
+            session_id: Session identifier
+                    会话标识符
+            messages: Messages leaving the recent window, oldest first
+                  离开最近窗口的消息，按从旧到新排列
+        """
+        if not messages:
+            return
+        key = (id(memory), session_id)
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is None:
+                self._pending[key] = (memory, list(messages))
+                self._queue.put(key)
+            else:
+                pending[1].extend(messages)
+
+    def _run(self) -> None:
+        while True:
+            key = self._queue.get()
+            try:
+                if key is None:
+                    return
+                with self._lock:
+                    memory, messages = self._pending.pop(key)
+                self._summarize(memory, key[1], messages)
+            except Exception as e:
+                logger.error(f"Context summarization failed: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    def _summarize(self, memory: Any, session_id: str, messages: List[Dict[str, Any]]) -> None:
+        previous = memory.summaries.get(session_id, "")
+        summary = self.summarize_fn(previous, messages, self.token_budget)
+        summary = truncate_to_tokens(summary.strip(), self.token_budget)
+        self.summary_calls += 1
+        self.summarized_messages += len(messages)
+        # The session may have been evicted while the summary was being written
+        # 生成摘要期间会话可能已被淘汰
+        if session_id in memory.contexts:
+            memory.summaries[session_id] = summary
+
+    def drain(self) -> None:
+        """
+        Block until every queued message has been summarized.
+        阻塞直到所有排队的消息都已完成摘要
+        """
+        self._queue.join()
+
+    def stop(self) -> None:
+        """
+        Finish queued work and stop the worker thread.
+        完成已排队的工作并停止工作线程
+        """
+        self._queue.put(None)
+        self._worker.join()
@@ -0,0 +1,230 @@
+"""
+Tool result cache for Agent-Camel V2.
+Agent-Camel V2的工具结果缓存
+
+Tools opt in by declaring cache metadata next to name/description/parameters:
+工具通过在name/description/parameters旁声明缓存元数据来启用缓存：
+
+    tool.cacheable = True                  # pure or slowly changing lookup / 纯函数或变化缓慢的查询
+    tool.cache_ttl = 300                   # seconds, optional / 秒，可选
+    tool.cache_key = lambda p: p["id"]     # optional, defaults to all parameters / 可选，默认使用全部参数
+
+Tools without cacheable=True, and any tool declaring side_effects=True (such
+as pay), are always executed.
+没有声明cacheable=True的工具，以及声明了side_effects=True的工具（如pay），总是会被执行。
+"""
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Hashable, Optional, Tuple
+import functools
+import json
+import logging
+import threading
+import time
+
+from config.settings import settings
+
+# 设置日志记录
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+
+def is_cacheable(tool: Callable) -> bool:
+    """Whether a tool declared itself cacheable and free of side effects.
+    工具是否声明了可缓存且无副作用"""
+    return bool(getattr(tool, "cacheable", False)) and not getattr(tool, "side_effects", False)
+
+
+def key_on(*fields: str) -> Callable[[Dict[str, Any]], Tuple[Any, ...]]:
+    """
+    Build a cache_key function from the parameter fields that determine the result.
+    根据决定结果的参数字段构建cache_key函数
+
+    Tools that take a single `parameters` dict are keyed on its fields.
+    对于只接收一个parameters字典的工具，使用该字典中的字段作为键。
+    """
+    def cache_key(parameters: Dict[str, Any]) -> Tuple[Any, ...]:
+        nested = parameters.get("parameters")
+        if len(parameters) == 1 and isinstance(nested, dict):
+            parameters = nested
+        return tuple(parameters.get(field) for field in fields)
+    return cache_key
+
+
+class ToolResultCache:
+    """
+    Shared LRU cache of tool results with per-tool TTLs and hit rates.
+    共享的工具结果LRU缓存，支持按工具设置TTL并统计命中率
+
+    Cached results are shared between callers and must not be modified.
+    缓存的结果在调用方之间共享，不得修改。
+    """
+
+    _shared_cache: Optional["ToolResultCache"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, max_entries: int = 1024, default_ttl: float = 300.0):
+        """
+        Initialize the cache.
+        初始化缓存
+
+        Args:
+            max_entries: Results kept before the least recently used one is dropped
+                     超过此数量时丢弃最久未使用的结果
+            default_ttl: TTL in seconds for tools that do not declare cache_ttl
+                     未声明cache_ttl的工具使用的TTL（秒）
+        """
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries: "OrderedDict[Tuple[Any, Hashable], Tuple[float, Any]]" = OrderedDict()
+        self._tool_stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def shared(cls) -> "ToolResultCache":
+        """
+        Get the process-wide cache configured from settings.
+        获取根据配置创建的进程内共享缓存
+        """
+        with cls._shared_lock:
+            if cls._shared_cache is None:
+                cls._shared_cache = cls(settings.TOOL_CACHE_SIZE, settings.TOOL_CACHE_TTL)
+            return cls._shared_cache
+
+    def _key(self, tool: Callable, parameters: Dict[str, Any]) -> Tuple[Any, Hashable]:
+        """Cache key: the tool object itself plus its key function (or all parameters).
+        缓存键：工具对象本身加上其键函数的结果（或全部参数）"""
+        key_function = getattr(tool, "cache_key", None)
+        if key_function is not None:
+            return tool, key_function(parameters)
+        return tool, json.dumps(parameters, ensure_ascii=False, sort_keys=True, default=str)
+
+    def _count(self, name: str, field: str) -> None:
+        stats = self._tool_stats.get(name)
+        if stats is None:
+            stats = self._tool_stats[name] = {"hits": 0, "misses": 0}
+        stats[field] += 1
+
+    def call(self, tool: Callable, parameters: Dict[str, Any], run: Callable[[], Any]) -> Any:
+        """
+        Return the cached result of a tool call, or run it and cache the result.
+        返回工具调用的缓存结果，或执行调用并缓存结果
+
+        Args:
+            tool: Tool being called
+              被调用的工具
+            parameters: Call parameters
+                    调用参数
+            run: Executes the call on a miss (errors are not cached)
+             未命中时执行调用（错误不会被缓存）
+
+        Returns:
+            Tool result
+            工具结果
+        """
+        hit, result = self.lookup(tool, parameters)
+        if hit:
+            return result
+        result = run()
+        self.store(tool, parameters, result)
+        return result
+
+    def lookup(self, tool: Callable, parameters: Dict[str, Any]) -> Tuple[bool, Any]:
+        """
+        Look up a cached result; counts a hit or miss for cacheable tools.
+        查找缓存的结果；对可缓存的工具记录一次命中或未命中
+
+        Returns:
+            (hit, result)
+            (是否命中, 结果)
+        """
+        if not is_cacheable(tool):
+            return False, None
+        key = self._key(tool, parameters)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    self._count(tool.name, "hits")
+                    return True, entry[1]
+                del self._entries[key]
+            self.misses += 1
+            self._count(tool.name, "misses")
+        return False, None
+
+    def store(self, tool: Callable, parameters: Dict[str, Any], result: Any) -> None:
+        """Cache the result of a call (ignored for tools that are not cacheable).
+        缓存一次调用的结果（不可缓存的工具会被忽略）"""
+        if not is_cacheable(tool):
+            return
+        key = self._key(tool, parameters)
+        ttl = getattr(tool, "cache_ttl", None)
+        expires_at = time.monotonic() + (self.default_ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def wrap(self, tool: Callable) -> Callable:
+        """
+        Wrap a tool so direct calls (e.g. from CAMEL agents) go through the cache.
+        包装工具，使直接调用（例如来自CAMEL Agent的调用）也经过缓存
+
+        Metadata (name, description, parameters, cache settings) is copied;
+        tools that are not cacheable are returned unchanged.
+        元数据（名称、描述、参数、缓存设置）会被复制；不可缓存的工具原样返回。
+        """
+        if not is_cacheable(tool):
+            return tool
+
+        @functools.wraps(tool)
+        def cached(*args: Any, **parameters: Any) -> Any:
+            if args:
+                # Positional calls have no parameter names to key on
+                # 位置参数调用没有可用作键的参数名
+                return tool(*args, **parameters)
+            return self.call(tool, parameters, lambda: tool(**parameters))
+        return cached
+
+    def invalidate(self, tool_name: Optional[str] = None) -> int:
+        """
+        Drop cached results of one tool (or all tools).
+        丢弃某个工具（或所有工具）的缓存结果
+
+        Returns:
+            Number of dropped results
+            丢弃的结果数
+        """
+        with self._lock:
+            if tool_name is None:
+                dropped = len(self._entries)
+                self._entries.clear()
+                return dropped
+            keys = [key for key in self._entries if key[0].name == tool_name]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit rates overall and per tool.
+        获取总体和每个工具的命中率"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "tools": {
+                    name: dict(stats, hit_rate=stats["hits"] / (stats["hits"] + stats["misses"]))
+                    for name, stats in self._tool_stats.items()
+                },
+            }
@@ -0,0 +1,348 @@
+"""
+Safe expression engine for the calculator tool of Agent-Camel V2.
+Agent-Camel V2计算器工具的安全表达式引擎
+
+Expressions are parsed with `ast`, checked against a whitelist (numbers,
+variables, + - * / // % **, and a few math functions), and compiled once to a
+function of their variables. Compiled expressions are cached by text, so an
+agent evaluating the same formula repeatedly only pays for a function call.
+With NumPy installed, the same expression can be evaluated over arrays of
+inputs in one vectorized call.
+表达式通过ast解析，并按白名单检查（数字、变量、+ - * / // % **以及少量数学函数），
+然后只编译一次，成为以其变量为参数的函数。编译结果按表达式文本缓存，因此Agent
+反复计算同一公式时只需一次函数调用。安装NumPy后，同一表达式可以在一次向量化调用中
+对整组输入求值。
+"""
+from functools import lru_cache, reduce
+from typing import Dict, Any, Callable, FrozenSet, Optional, Tuple
+import ast
+import logging
+import math
+import re
+
+# 设置日志记录
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# NumPy is optional; only batch evaluation needs it
+# NumPy是可选的，只有批量求值需要它
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+# Longest expression accepted, largest exponent, and largest integer power result in bits
+# 可接受的最长表达式、最大指数，以及整数幂结果的最大位数
+MAX_EXPRESSION_LENGTH = 1000
+MAX_EXPONENT = 1000
+MAX_POWER_BITS = 100000
+
+
+class CalculatorError(ValueError):
+    """An expression is invalid, unsafe or cannot be evaluated.
+    表达式无效、不安全或无法求值"""
+
+
+def _pow(base: Any, exponent: Any) -> Any:
+    """Power that refuses exponents large enough to hang the process.
+    拒绝可能使进程卡死的过大指数的幂运算"""
+    if abs(exponent) > MAX_EXPONENT:
+        raise CalculatorError(f"Exponent {exponent} is too large")
+    if type(base) is int and type(exponent) is int and base.bit_length() * exponent > MAX_POWER_BITS:
+        raise CalculatorError("Result is too large")
+    return base ** exponent
+
+
+_SCALAR_FUNCTIONS: Dict[str, Callable] = {
+    "abs": abs, "min": min, "max": max, "round": round,
+    "sqrt": math.sqrt, "log": math.log, "log10": math.log10, "exp": math.exp,
+    "sin": math.sin, "cos": math.cos, "tan": math.tan,
+    "floor": math.floor, "ceil": math.ceil,
+}
+_CONSTANTS: Dict[str, float] = {"pi": math.pi, "e": math.e}
+
+_BINARY_OPERATORS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow)
+_UNARY_OPERATORS = (ast.UAdd, ast.USub)
+
+# Full-width and typographic operators people type in chat
+# 聊天中常见的全角和排版运算符
+_NORMALIZE = str.maketrans({"×": "*", "÷": "/", "（": "(", "）": ")", "＋": "+", "－": "-", "＊": "*", "／": "/"})
+
+
+class _Validator(ast.NodeVisitor):
+    """Rejects every node outside the whitelist and collects variable names.
+    拒绝白名单之外的所有节点，并收集变量名"""
+
+    def __init__(self):
+        self.variables = set()
+
+    def generic_visit(self, node: ast.AST) -> None:
+        raise CalculatorError(f"Unsupported syntax: {type(node).__name__}")
+
+    def visit_Expression(self, node: ast.Expression) -> None:
+        self.visit(node.body)
+
+    def visit_Constant(self, node: ast.Constant) -> None:
+        if type(node.value) not in (int, float):
+            raise CalculatorError(f"Unsupported constant: {node.value!r}")
+
+    def visit_Name(self, node: ast.Name) -> None:
+        if node.id in _SCALAR_FUNCTIONS:
+            raise CalculatorError(f"Function {node.id} must be called")
+        if node.id not in _CONSTANTS:
+            if node.id.startswith("_"):
+                raise CalculatorError(f"Invalid variable name: {node.id}")
+            self.variables.add(node.id)
+
+    def visit_BinOp(self, node: ast.BinOp) -> None:
+        if not isinstance(node.op, _BINARY_OPERATORS):
+            raise CalculatorError(f"Unsupported operator: {type(node.op).__name__}")
+        self.visit(node.left)
+        self.visit(node.right)
+
+    def visit_UnaryOp(self, node: ast.UnaryOp) -> None:
+        if not isinstance(node.op, _UNARY_OPERATORS):
+            raise CalculatorError(f"Unsupported operator: {type(node.op).__name__}")
+        self.visit(node.operand)
+
+    def visit_Call(self, node: ast.Call) -> None:
+        if not isinstance(node.func, ast.Name) or node.func.id not in _SCALAR_FUNCTIONS:
+            raise CalculatorError(f"Unsupported function: {ast.unparse(node.func)}")
+        if node.keywords:
+            raise CalculatorError("Keyword arguments are not supported")
+        for argument in node.args:
+            self.visit(argument)
+
+
+class _PowRewriter(ast.NodeTransformer):
+    """Turns a ** b into _pow(a, b) so exponents can be bounded.
+    将a ** b改写为_pow(a, b)，以便限制指数大小"""
+
+    def visit_BinOp(self, node: ast.BinOp) -> ast.AST:
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Pow):
+            return ast.copy_location(
+                ast.Call(func=ast.Name("_pow", ast.Load()), args=[node.left, node.right], keywords=[]), node)
+        return node
+
+
+class CompiledExpression:
+    """
+    A validated expression compiled to a function of its variables.
+    经过验证并编译为其变量函数的表达式
+    """
+
+    __slots__ = ("text", "variables", "_scalar", "_code", "_vector")
+
+    def __init__(self, text: str, variables: FrozenSet[str], code: Any):
+        self.text = text
+        self.variables = variables
+        self._code = code
+        self._scalar = eval(code, {"__builtins__": {}, "_pow": _pow, **_SCALAR_FUNCTIONS, **_CONSTANTS})
+        self._vector: Optional[Callable] = None
+
+    def _check(self, variables: Dict[str, Any]) -> None:
+        missing = self.variables.difference(variables)
+        if missing:
+            raise CalculatorError(f"Missing variables: {', '.join(sorted(missing))}")
+
+    def evaluate(self, variables: Optional[Dict[str, Any]] = None) -> Any:
+        """
+        Evaluate with scalar variables.
+        使用标量变量求值
+
+        Args:
+            variables: Variable values by name
+                   按名称给出的变量值
+
+        Returns:
+            Result (int or float)
+            结果（整数或浮点数）
+        """
+        variables = variables or {}
+        self._check(variables)
+        try:
+            result = self._scalar(**{name: variables[name] for name in self.variables})
+        except CalculatorError:
+            raise
+        except (ArithmeticError, ValueError, TypeError) as e:
+            raise CalculatorError(f"Cannot evaluate {self.text!r}: {str(e)}") from None
+        if type(result) is complex:
+            raise CalculatorError(f"Cannot evaluate {self.text!r}: result is not a real number")
+        return result
+
+    def evaluate_batch(self, variables: Dict[str, Any]) -> Any:
+        """
+        Evaluate over arrays of inputs in one vectorized NumPy call.
+        在一次向量化NumPy调用中对整组输入求值
+
+        Variables may be arrays or scalars and are broadcast against each
+        other, e.g. days=[1..30] and price=[[300], [500]] gives a 2 x 30 grid.
+        变量可以是数组或标量，并相互广播，例如days=[1..30]与price=[[300], [500]]得到2 x 30的网格。
+
+        Args:
+            variables: Variable arrays by name
+                   按名称给出的变量数组
+
+        Returns:
+            numpy.ndarray of results
+            结果数组（numpy.ndarray）
+        """
+        if not NUMPY_AVAILABLE:
+            raise CalculatorError("Batch evaluation requires numpy")
+        self._check(variables)
+        if self._vector is None:
+            self._vector = eval(self._code, {"__builtins__": {}, **_vector_namespace()})
+        try:
+            arrays = {name: np.asarray(variables[name], dtype=float) for name in self.variables}
+            with np.errstate(all="ignore"):
+                return np.asarray(self._vector(**arrays), dtype=float)
+        except CalculatorError:
+            raise
+        except (ArithmeticError, ValueError, TypeError) as e:
+            raise CalculatorError(f"Cannot evaluate {self.text!r}: {str(e)}") from None
+
+    def __repr__(self) -> str:
+        return f"CompiledExpression({self.text!r}, variables={sorted(self.variables)})"
+
+
+def _vector_pow(base: Any, exponent: Any) -> Any:
+    """Elementwise _pow in floating point, so integer literals such as 10**20
+    cannot overflow int64 or fail on negative exponents.
+    浮点数下的逐元素_pow，使10**20等整数字面量不会溢出int64，负指数也不会出错"""
+    exponent = np.asarray(exponent, dtype=float)
+    if exponent.size and np.abs(exponent).max() > MAX_EXPONENT:
+        raise CalculatorError(f"Exponent {exponent.max() if exponent.ndim else exponent} is too large")
+    return np.power(np.asarray(base, dtype=float), exponent)
+
+
+def _elementwise(function: Callable, name: str) -> Callable:
+    """Fold a binary ufunc over the arguments, like the n-ary builtin min/max.
+    像内置的多参数min/max一样，用二元ufunc折叠所有参数"""
+    def fold(*args: Any) -> Any:
+        if len(args) < 2:
+            # The scalar path calls min/max on a number, which fails the same way
+            # 标量路径对单个数字调用min/max同样会失败
+            raise TypeError(f"{name} expects at least two arguments")
+        return reduce(function, args)
+    return fold
+
+
+@lru_cache(maxsize=1)
+def _vector_namespace() -> Dict[str, Any]:
+    """NumPy counterparts of the whitelisted functions (elementwise).
+    白名单函数对应的NumPy逐元素版本"""
+    return {
+        "_pow": _vector_pow, "abs": np.abs, "min": _elementwise(np.minimum, "min"),
+        "max": _elementwise(np.maximum, "max"), "round": np.round,
+        "sqrt": np.sqrt, "log": np.log, "log10": np.log10, "exp": np.exp,
+        "sin": np.sin, "cos": np.cos, "tan": np.tan, "floor": np.floor, "ceil": np.ceil,
+        **_CONSTANTS,
+    }
+
+
+@lru_cache(maxsize=1024)
+def compile_expression(text: str) -> CompiledExpression:
+    """
+    Parse, validate and compile an expression (cached by text).
+    解析、验证并编译表达式（按文本缓存）
+
+    Raises:
+        CalculatorError: The expression is invalid or uses anything outside the whitelist
+                     表达式无效或使用了白名单之外的内容
+    """
+    source = text.translate(_NORMALIZE).strip()
+    if not source:
+        raise CalculatorError("Empty expression")
+    if len(source) > MAX_EXPRESSION_LENGTH:
+        raise CalculatorError(f"Expression longer than {MAX_EXPRESSION_LENGTH} characters")
+    try:
+        tree = ast.parse(source, mode="eval")
+    except SyntaxError as e:
+        raise CalculatorError(f"Invalid expression {text!r}: {e.msg}") from None
+    validator = _Validator()
+    validator.visit(tree)
+    variables = frozenset(validator.variables)
+    body = _PowRewriter().visit(tree.body)
+    function = ast.Expression(ast.Lambda(
+        args=ast.arguments(posonlyargs=[], args=[ast.arg(name) for name in sorted(variables)],
+                           kwonlyargs=[], kw_defaults=[], defaults=[]),
+        body=body))
+    ast.fix_missing_locations(function)
+    return CompiledExpression(text, variables, compile(function, "<calculator>", "eval"))
+
+
+def evaluate(text: str, variables: Optional[Dict[str, Any]] = None) -> Any:
+    """Evaluate an expression with scalar variables.
+    使用标量变量计算表达式"""
+    return compile_expression(text).evaluate(variables)
+
+
+def evaluate_batch(text: str, variables: Dict[str, Any]) -> Any:
+    """Evaluate an expression over arrays of inputs (requires numpy).
+    对整组输入计算表达式（需要numpy）"""
+    return compile_expression(text).evaluate_batch(variables)
+
+
+_EXPRESSION_PATTERN = re.compile(r"[\d.\s()（）+\-*/×÷%]+")
+# Words that ask for a calculation; a single operator only counts next to one of these
+# 请求计算的词；只有一个运算符时，必须出现这些词之一才视为计算
+_CALCULATION_CUE = re.compile(r"计算|算一?下|算算|等于|多少|一共|总共|合计|共计|[=＝]|"
+                              r"\b(?:calculate|compute|how much|total|sum)\b", re.IGNORECASE)
+# Hyphen-separated numbers: dates ("2024-5-1") and ranges ("2-3 people", "page 10-12")
+# 以连字符分隔的数字：日期（"2024-5-1"）和范围（"2-3人"、"第10-12页"）
+_RANGE_PATTERN = re.compile(r"\d+(?:\s*-\s*\d+)+")
+# A cue right before or after a span, e.g. "计算100-30" or "100-30="
+# 紧邻片段之前或之后的提示词，例如"计算100-30"或"100-30="
+_CUE_BEFORE = re.compile(r"(?:计算|算一?下|算算|calculate|compute)\s*[:：]?\s*$", re.IGNORECASE)
+_CUE_AFTER = re.compile(r"\s*(?:[=＝]|等于)")
+_OPERATOR_PATTERN = re.compile(r"(?<=[\d)）])\s*[+\-*/×÷%]\s*(?=[\d(（])")
+
+
+def extract_expression(text: str) -> Optional[str]:
+    """
+    Find the longest arithmetic expression in free text, e.g. "3*800+1200" in a chat message.
+    在自由文本中查找最长的算术表达式，例如聊天消息中的"3*800+1200"
+
+    Numbers are often written with operator characters without meaning a
+    calculation ("2-3 people", "3/4 people", "2024-5-1"), so a span counts
+    only if it has at least two operators, or one operator and the text asks
+    for a calculation ("计算", "多少", "=", "how much", ...). Hyphen-separated
+    numbers such as dates and ranges only count as a subtraction when a cue
+    is right next to them ("计算100-30", "100-30=").
+    数字常常带着运算符字符书写却并非计算（"2-3人"、"3/4的人"、"2024-5-1"），
+    因此只有包含至少两个运算符，或包含一个运算符且文本请求计算（"计算"、"多少"、"="、"how much"等）
+    的片段才算作表达式。以连字符分隔的数字（如日期和范围）只有紧邻提示词时才算作减法
+    （"计算100-30"、"100-30="）。
+
+    Returns:
+        The expression, or None if the text has no calculation with an operator
+        表达式；文本中没有带运算符的计算时返回None
+    """
+    asks_for_calculation = _CALCULATION_CUE.search(text) is not None
+    best: Optional[str] = None
+    for match in _EXPRESSION_PATTERN.finditer(text):
+        candidate = match.group().strip()
+        operators = len(_OPERATOR_PATTERN.findall(candidate))
+        if operators == 0 or (operators == 1 and not asks_for_calculation):
+            continue
+        if (_RANGE_PATTERN.fullmatch(candidate) and
+                not _CUE_BEFORE.search(text[:match.start()]) and
+                not _CUE_AFTER.match(text, match.end())):
+            continue
+        try:
+            compile_expression(candidate)
+        except CalculatorError:
+            continue
+        if best is None or len(candidate) > len(best):
+            best = candidate
+    return best
+
+
+def cache_info() -> Tuple[int, int, int]:
+    """(hits, misses, size) of the compiled expression cache.
+    已编译表达式缓存的(命中数, 未命中数, 大小)"""
+    info = compile_expression.cache_info()
+    return info.hits, info.misses, info.currsize
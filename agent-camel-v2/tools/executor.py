@@ -0,0 +1,382 @@
+"""
+Tool execution engine for Agent-Camel V2.
+Agent-Camel V2的工具执行引擎
+
+Runs each tool where it belongs instead of inline on the agent's thread:
+将每个工具放到合适的位置执行，而不是在Agent线程上直接调用：
+
+- async tools (coroutine functions) on a shared event loop thread
+  异步工具（协程函数）在共享的事件循环线程上运行
+- blocking tools on a thread pool
+  阻塞型工具在线程池中运行
+- tools declaring cpu_bound=True on a process pool, so they do not hold the GIL
+  声明cpu_bound=True的工具在进程池中运行，不占用GIL
+
+Tools may declare `timeout` (seconds) and `max_concurrency` next to
+name/description/parameters. Calls over a tool's concurrency limit wait in a
+per-tool queue without occupying a worker.
+工具可以在name/description/parameters旁声明timeout（秒）和max_concurrency。
+超出并发上限的调用在每个工具的队列中等待，不占用工作线程。
+"""
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Any, Callable, Deque, Optional, Set, Tuple
+import asyncio
+import concurrent.futures
+import inspect
+import logging
+import multiprocessing
+import os
+import pickle
+import threading
+import time
+
+from config.settings import settings
+
+# 设置日志记录
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+
+class ToolTimeoutError(TimeoutError):
+    """A tool call did not finish within its timeout.
+    工具调用未在超时时间内完成"""
+
+
+def _run_timed(tool: Callable, parameters: Dict[str, Any]) -> Tuple[Any, float, float]:
+    """Run a tool and return (result, started, finished) on the monotonic clock.
+    执行工具并返回单调时钟上的(结果, 开始时间, 结束时间)
+
+    Module level so that it can run in a worker process.
+    定义在模块级，以便在工作进程中运行。"""
+    started = time.monotonic()
+    result = tool(**parameters)
+    return result, started, time.monotonic()
+
+
+async def _run_timed_async(tool: Callable, parameters: Dict[str, Any]) -> Tuple[Any, float, float]:
+    started = time.monotonic()
+    result = await tool(**parameters)
+    return result, started, time.monotonic()
+
+
+class _ToolSlots:
+    """Concurrency limit, waiting calls and metrics of one tool.
+    单个工具的并发上限、等待中的调用和指标"""
+
+    __slots__ = ("limit", "running", "waiting", "calls", "completed", "failed", "cancelled",
+                 "timeouts", "abandoned", "abandoned_running", "queue_seconds", "max_queue_seconds", "run_seconds", "max_run_seconds")
+
+    def __init__(self, limit: Optional[int]):
+        self.limit = limit
+        self.running = 0
+        self.waiting: Deque[Tuple[Callable, Dict[str, Any], Future, float]] = deque()
+        self.calls = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.timeouts = 0
+        # Calls whose caller gave up (timeout or cancel) while a thread or process kept running them
+        # 调用方放弃（超时或取消）时线程或进程仍在执行的调用
+        self.abandoned = 0
+        self.abandoned_running = 0
+        self.queue_seconds = 0.0
+        self.max_queue_seconds = 0.0
+        self.run_seconds = 0.0
+        self.max_run_seconds = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        finished = self.completed + self.failed
+        return {
+            "calls": self.calls,
+            "completed": self.completed,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+            "timeouts": self.timeouts,
+            "abandoned": self.abandoned,
+            "abandoned_running": self.abandoned_running,
+            "running": self.running,
+            "waiting": len(self.waiting),
+            "avg_queue_seconds": self.queue_seconds / finished if finished else 0.0,
+            "max_queue_seconds": self.max_queue_seconds,
+            "avg_run_seconds": self.run_seconds / finished if finished else 0.0,
+            "max_run_seconds": self.max_run_seconds,
+        }
+
+
+class ToolExecutor:
+    """
+    Runs tool calls on thread/process pools or an event loop, with timeouts,
+    cancellation, per-tool concurrency limits and queue/run-time metrics.
+    在线程池、进程池或事件循环上执行工具调用，支持超时、取消、
+    按工具的并发上限以及排队/运行时间指标。
+    """
+
+    _shared_executor: Optional["ToolExecutor"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, max_threads: int = 16, max_processes: Optional[int] = None,
+                 default_timeout: Optional[float] = 30.0):
+        """
+        Initialize the executor; pools and the event loop start on first use.
+        初始化执行器；线程池、进程池和事件循环在首次使用时启动
+
+        Args:
+            max_threads: Threads for blocking tools
+                     阻塞型工具使用的线程数
+            max_processes: Processes for CPU-bound tools (default: CPU count)
+                       CPU密集型工具使用的进程数（默认：CPU核数）
+            default_timeout: Timeout for tools that do not declare one (None: no timeout)
+                         未声明超时的工具使用的超时时间（为None时不超时）
+        """
+        self.max_threads = max_threads
+        self.max_processes = max_processes or os.cpu_count() or 1
+        self.default_timeout = default_timeout
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._processes: Optional[ProcessPoolExecutor] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._slots: Dict[str, _ToolSlots] = {}
+        self._picklable: Dict[Callable, bool] = {}
+        self._abandoned: Set[Future] = set()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls) -> "ToolExecutor":
+        """
+        Get the process-wide executor configured from settings.
+        获取根据配置创建的进程内共享执行器
+        """
+        with cls._shared_lock:
+            if cls._shared_executor is None:
+                cls._shared_executor = cls(settings.TOOL_THREAD_WORKERS, settings.TOOL_PROCESS_WORKERS,
+                                           settings.TOOL_TIMEOUT)
+            return cls._shared_executor
+
+    def _thread_pool(self) -> ThreadPoolExecutor:
+        if self._threads is None:
+            with self._lock:
+                if self._threads is None:
+                    self._threads = ThreadPoolExecutor(self.max_threads, thread_name_prefix="tool")
+        return self._threads
+
+    def _process_pool(self) -> ProcessPoolExecutor:
+        if self._processes is None:
+            with self._lock:
+                if self._processes is None:
+                    # spawn: forking a process that runs threads is unsafe
+                    # 使用spawn：对运行着多个线程的进程执行fork是不安全的
+                    self._processes = ProcessPoolExecutor(self.max_processes,
+                                                          mp_context=multiprocessing.get_context("spawn"))
+        return self._processes
+
+    def _event_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    threading.Thread(target=loop.run_forever, name="tool-event-loop", daemon=True).start()
+                    self._loop = loop
+        return self._loop
+
+    def _slots_for(self, tool: Callable) -> _ToolSlots:
+        slots = self._slots.get(tool.name)
+        if slots is None:
+            with self._lock:
+                slots = self._slots.get(tool.name)
+                if slots is None:
+                    slots = self._slots[tool.name] = _ToolSlots(getattr(tool, "max_concurrency", None))
+        return slots
+
+    def _use_processes(self, tool: Callable) -> bool:
+        """CPU-bound tools run in processes if they can be pickled (closures cannot).
+        CPU密集型工具在可被pickle时（闭包不行）在进程中运行"""
+        if not getattr(tool, "cpu_bound", False):
+            return False
+        picklable = self._picklable.get(tool)
+        if picklable is None:
+            try:
+                pickle.dumps(tool)
+                picklable = True
+            except (pickle.PicklingError, AttributeError, TypeError):
+                picklable = False
+                logger.warning(f"CPU-bound tool {tool.name} cannot be pickled; running it on the thread pool")
+            self._picklable[tool] = picklable
+        return picklable
+
+    def timeout_for(self, tool: Callable, timeout: Optional[float] = None) -> Optional[float]:
+        """Timeout of a call: the argument, else the tool's declaration, else the default.
+        调用的超时时间：优先使用参数，其次是工具的声明，最后是默认值"""
+        if timeout is not None:
+            return timeout
+        return getattr(tool, "timeout", self.default_timeout)
+
+    def submit(self, tool: Callable, parameters: Dict[str, Any]) -> Future:
+        """
+        Schedule a tool call and return its future.
+        调度一次工具调用并返回其Future
+
+        Cancelling the future drops a call that is still waiting and cancels an
+        async tool. A call already running on a thread or process cannot be
+        stopped: its result is abandoned, but it keeps its worker and its
+        max_concurrency slot until it returns (see "abandoned_running" in stats()).
+        取消Future会丢弃仍在等待的调用并取消异步工具。已在线程或进程上运行的调用无法停止：
+        其结果被丢弃，但在返回前仍占用工作线程/进程和max_concurrency并发槽
+        （参见stats()中的"abandoned_running"）。
+        """
+        future: Future = Future()
+        slots = self._slots_for(tool)
+        call = (tool, parameters, future, time.monotonic())
+        with self._lock:
+            slots.calls += 1
+            if slots.limit is not None and slots.running >= slots.limit:
+                slots.waiting.append(call)
+                return future
+            slots.running += 1
+        self._start(slots, call)
+        return future
+
+    def _start(self, slots: _ToolSlots, call: Tuple[Callable, Dict[str, Any], Future, float]) -> None:
+        """Hand a call to its pool; the slot is released when it finishes.
+        将调用交给对应的池；调用结束时释放并发槽"""
+        tool, parameters, future, submitted = call
+        try:
+            if inspect.iscoroutinefunction(tool):
+                inner = asyncio.run_coroutine_threadsafe(_run_timed_async(tool, parameters), self._event_loop())
+            elif self._use_processes(tool):
+                inner = self._process_pool().submit(_run_timed, tool, parameters)
+            else:
+                inner = self._thread_pool().submit(_run_timed, tool, parameters)
+        except Exception as e:
+            # E.g. the executor was shut down; fail the call but keep the slot accounting right
+            # 例如执行器已关闭；让调用失败，但保持并发槽计数正确
+            inner = Future()
+            inner.set_exception(e)
+        future.add_done_callback(lambda f: f.cancelled() and self._abandon(slots, inner))
+        inner.add_done_callback(lambda f: self._finish(slots, f, future, submitted))
+
+    def _abandon(self, slots: _ToolSlots, inner: Future) -> None:
+        """The caller gave up on a started call: cancel it if possible, else count it as abandoned.
+        调用方放弃了已开始的调用：尽可能取消，否则计为已放弃"""
+        if inner.cancel():
+            return
+        with self._lock:
+            if not inner.done():
+                slots.abandoned += 1
+                slots.abandoned_running += 1
+                self._abandoned.add(inner)
+
+    def _finish(self, slots: _ToolSlots, inner: Future, future: Future, submitted: float) -> None:
+        """Record metrics, resolve the caller's future and start the next waiting call.
+        记录指标，完成调用方的Future，并启动下一个等待中的调用"""
+        result = error = None
+        if inner.cancelled():
+            error = concurrent.futures.CancelledError()
+        else:
+            error = inner.exception()
+        with self._lock:
+            if inner in self._abandoned:
+                self._abandoned.discard(inner)
+                slots.abandoned_running -= 1
+            if error is None:
+                result, started, finished = inner.result()
+                slots.completed += 1
+                queued, ran = started - submitted, finished - started
+                slots.queue_seconds += queued
+                slots.run_seconds += ran
+                slots.max_queue_seconds = max(slots.max_queue_seconds, queued)
+                slots.max_run_seconds = max(slots.max_run_seconds, ran)
+            elif inner.cancelled():
+                slots.cancelled += 1
+            else:
+                slots.failed += 1
+            following = None
+            while slots.waiting:
+                following = slots.waiting.popleft()
+                if not following[2].cancelled():
+                    break
+                slots.cancelled += 1
+                following = None
+            if following is None:
+                slots.running -= 1
+        if future.set_running_or_notify_cancel():
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+        if following is not None:
+            self._start(slots, following)
+
+    def run(self, tool: Callable, parameters: Dict[str, Any], timeout: Optional[float] = None) -> Any:
+        """
+        Run a tool call and wait for its result.
+        执行一次工具调用并等待结果
+
+        Raises:
+            ToolTimeoutError: The call did not finish in time (its result is abandoned;
+                          a call already running on a thread or process keeps running)
+                          调用未在规定时间内完成（其结果被丢弃；已在线程或进程上运行的调用会继续运行）
+        """
+        return self.wait(tool, self.submit(tool, parameters), self.timeout_for(tool, timeout))
+
+    def wait(self, tool: Callable, future: Future, timeout: Optional[float]) -> Any:
+        """
+        Wait for the result of a submitted call.
+        等待已提交调用的结果
+
+        Raises:
+            ToolTimeoutError: The call did not finish in time (its result is abandoned;
+                          a call already running on a thread or process keeps running)
+                          调用未在规定时间内完成（其结果被丢弃；已在线程或进程上运行的调用会继续运行）
+        """
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            self._timed_out(tool, future)
+            raise ToolTimeoutError(f"Tool {tool.name} did not finish within {timeout} seconds") from None
+
+    async def run_async(self, tool: Callable, parameters: Dict[str, Any],
+                        timeout: Optional[float] = None) -> Any:
+        """
+        Await a tool call from an event loop without blocking it.
+        在事件循环中等待工具调用，不阻塞事件循环
+
+        Raises:
+            ToolTimeoutError: The call did not finish in time (its result is abandoned;
+                          a call already running on a thread or process keeps running)
+                          调用未在规定时间内完成（其结果被丢弃；已在线程或进程上运行的调用会继续运行）
+        """
+        timeout = self.timeout_for(tool, timeout)
+        future = self.submit(tool, parameters)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            self._timed_out(tool, future)
+            raise ToolTimeoutError(f"Tool {tool.name} did not finish within {timeout} seconds") from None
+
+    def _timed_out(self, tool: Callable, future: Future) -> None:
+        """Give up on a call: drop it if waiting, cancel it if async, abandon it if running.
+        放弃调用：等待中则丢弃，异步则取消，运行中则丢弃其结果"""
+        future.cancel()
+        slots = self._slots_for(tool)
+        with self._lock:
+            slots.timeouts += 1
+        logger.warning(f"Tool {tool.name} timed out; its result is abandoned")
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get per-tool queue/run-time metrics.
+        获取每个工具的排队/运行时间指标"""
+        with self._lock:
+            return {name: slots.stats() for name, slots in self._slots.items()}
+
+    def shutdown(self) -> None:
+        """Stop the pools and the event loop; calls not yet started are cancelled.
+        停止线程池、进程池和事件循环；尚未开始的调用会被取消"""
+        with self._lock:
+            threads, processes, loop = self._threads, self._processes, self._loop
+            self._threads = self._processes = self._loop = None
+        if threads is not None:
+            threads.shutdown(wait=False, cancel_futures=True)
+        if processes is not None:
+            processes.shutdown(wait=False, cancel_futures=True)
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
@@ -2,59 +2,143 @@
 Tool Library for Agent-Camel V2.
 Agent-Camel V2的工具库
 """
-from typing import Dict, Any, List, Callable
+from typing import Dict, Any, List, Callable, Optional, Tuple
+import json
 import logging
+import time
+
+from config.settings import settings
+from tools import calculator as calculator_engine
+from tools.cache import ToolResultCache, key_on
+from tools.executor import ToolExecutor
+from tools.registry import ToolRegistry, ToolView
+from tools.search_index import SearchIndex
+from tools.validation import ToolArgumentError
 
 # 设置日志记录
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 
+class _NativeBatch:
+    """
+    A tool's native batch entry point, submitted to the executor like a tool.
+    工具的原生批量入口，像工具一样提交给执行器
+    
+    Module level (not a closure) so that batches of CPU-bound tools can still
+    run in a worker process.
+    定义在模块级（而不是闭包），以便CPU密集型工具的批量调用仍能在工作进程中运行。
+    """
+    
+    __slots__ = ("name", "batch", "cpu_bound", "timeout", "max_concurrency")
+    
+    def __init__(self, tool: Callable):
+        self.name = f"{tool.name}.batch"
+        self.batch = tool.batch
+        self.cpu_bound = getattr(tool, "cpu_bound", False)
+        self.timeout = getattr(tool, "timeout", None)
+        self.max_concurrency = getattr(tool, "max_concurrency", None)
+    
+    def __call__(self, calls: List[Dict[str, Any]]) -> List[Any]:
+        results = list(self.batch(calls))
+        if len(results) != len(calls):
+            raise ValueError(f"Batch entry point of {self.name} returned {len(results)} results "
+                             f"for {len(calls)} calls")
+        return results
+
+
 class ToolLibrary:
     """Library of available tools.
-    可用工具库"""
+    可用工具库
+    
+    Tools come from the process-wide ToolRegistry, so each one is built
+    once no matter how many libraries use it, and libraries with the same
+    tools share one pre-rendered ToolView.
+    工具来自进程级ToolRegistry，因此无论有多少工具库使用，每个工具都只构建一次，
+    并且工具相同的工具库共享同一个预渲染的ToolView。
+    
+    Results of tools declared cacheable are served from a shared
+    ToolResultCache; everything else runs on the shared ToolExecutor with a
+    timeout.
+    声明为可缓存的工具，其结果由共享的ToolResultCache提供；其余调用在共享的
+    ToolExecutor上带超时执行。
     
-    def __init__(self):
+    Arguments are checked against each tool's parameter schema, compiled
+    once at registration, before anything runs.
+    参数在执行前按各工具在注册时编译好的参数模式进行检查。
+    
+    Tools may declare a native batch entry point next to their metadata,
+    `tool.batch = function(calls) -> results`, taking a list of parameter
+    dicts and returning one result per dict; execute_many() uses it when a
+    tool is called more than once.
+    工具可以在元数据旁声明原生批量入口tool.batch = function(calls) -> results，
+    接收参数字典列表并为每个字典返回一个结果；同一工具被调用多次时execute_many()会使用它。"""
+    
+    def __init__(self, registry: Optional[ToolRegistry] = None,
+                 cache: Optional[ToolResultCache] = None,
+                 executor: Optional[ToolExecutor] = None):
         self.tools: Dict[str, Callable] = {}
+        self.registry = registry or ToolRegistry.shared()
+        if cache is None and settings.TOOL_CACHE_ENABLED:
+            cache = ToolResultCache.shared()
+        self.cache = cache
+        self.executor = executor or ToolExecutor.shared()
+        self._view: Optional[ToolView] = None
+        self._batches: Dict[Callable, _NativeBatch] = {}
         print("Initializing ToolLibrary")
         # Register some basic tools
         # 注册一些基本工具
-        self.register_tool(self._get_search_tool())
-        self.register_tool(self._get_calculator_tool())
+        self.register_tool(self.registry.build("search", self._get_search_tool))
+        self.register_tool(self.registry.build("calculator", self._get_calculator_tool))
     
     def _get_search_tool(self) -> Callable:
         """获取搜索工具 - 返回可调用的函数"""
-        def search(query: str) -> Dict[str, Any]:
+        def search(query: str, k: int = 5) -> Dict[str, Any]:
             """
-            在网络上搜索信息
+            在离线文档库（旅行指南、学校手册、报销政策等）中检索信息
             
             Args:
                 query: 搜索查询词
+                k: 返回的结果数
                 
             Returns:
                 搜索结果字典
             """
             print(f"Executing search tool with query: {query}")
-            # This is a placeholder implementation
-            # 这是一个占位符实现
-            # In a real implementation, we would integrate with a search API
-            # 在实际实现中，我们会与搜索API集成
-            result = {
-                "result": f"Search results for '{query}' would be displayed here in a real implementation."
-                          f"在实际实现中，'{query}'的搜索结果将显示在这里。"
-            }
-            print(f"Search tool execution completed for query: {query}")
+            hits = SearchIndex.shared().search(query, k)
+            if hits:
+                lines = [
+                    f"{n}. {hit.get('title') or hit['id']} ({hit['id']}): {hit['snippet']}"
+                    for n, hit in enumerate(hits, 1)
+                ]
+                text = "\n".join(lines)
+            else:
+                text = f"No documents found for '{query}'. 未找到与'{query}'相关的文档。"
+            result = {"result": text, "hits": hits}
+            print(f"Search tool execution completed for query: {query} ({len(hits)} hits)")
             return result
         
         # 为函数添加必要的元数据，使CAMEL框架能够正确识别
+        # 结果随索引内容变化，因此缓存键包含索引的代数（每次添加、删除和提交都会变化）
+        search.cacheable = True
+        query_key = key_on("query", "k")
+        search.cache_key = lambda parameters: (query_key(parameters), SearchIndex.shared().generation)
         search.name = "search"
-        search.description = "Search the web for information\n在网络上搜索信息"
+        search.description = ("Search our offline documents (travel guides, school handbooks, reimbursement policies)\n"
+                              "检索离线文档（旅行指南、学校手册、报销政策）")
         search.parameters = {
             "type": "object",
             "properties": {
                 "query": {
                     "type": "string",
                     "description": "The search query string\n搜索查询字符串"
+                },
+                "k": {
+                    "type": "integer",
+                    "description": "Number of results to return\n返回的结果数",
+                    "default": 5,
+                    "minimum": 1,
+                    "maximum": 50
                 }
             },
             "required": ["query"]
@@ -64,29 +148,32 @@ class ToolLibrary:
     
     def _get_calculator_tool(self) -> Callable:
         """获取计算器工具 - 返回可调用的函数"""
-        def calculator(expression: str) -> Dict[str, Any]:
+        def calculator(expression: str, variables: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
             """
             执行数学计算
             
             Args:
-                expression: 数学表达式
+                expression: 数学表达式，可以包含变量
+                variables: 变量取值；某个变量取值为列表时，对每种情况批量计算
                 
             Returns:
                 计算结果字典
             """
             print(f"Executing calculator tool with expression: {expression}")
-            # This is a placeholder implementation
-            # 这是一个占位符实现
-            # In a real implementation, we would evaluate the expression
-            # 在实际实现中，我们会计算表达式
-            result = {
-                "result": f"Result of '{expression}' would be calculated here in a real implementation."
-                          f"在实际实现中，'{expression}'的结果将在这里计算。"
-            }
+            compiled = calculator_engine.compile_expression(expression)
+            variables = variables or {}
+            if any(isinstance(value, (list, tuple)) for value in variables.values()):
+                value = compiled.evaluate_batch(variables).tolist()
+            else:
+                value = compiled.evaluate(variables)
+            result = {"result": value, "expression": expression}
             print(f"Calculator tool execution completed for expression: {expression}")
             return result
         
         # 为函数添加必要的元数据，使CAMEL框架能够正确识别
+        # 计算是纯函数，结果可以长期缓存
+        calculator.cacheable = True
+        calculator.cache_ttl = 24 * 3600
         calculator.name = "calculator"
         calculator.description = "Perform mathematical calculations\n执行数学计算"
         calculator.parameters = {
@@ -94,7 +181,11 @@ class ToolLibrary:
             "properties": {
                 "expression": {
                     "type": "string",
-                    "description": "The mathematical expression to evaluate\n要计算的数学表达式"
+                    "description": "The mathematical expression to evaluate, e.g. days * price + 1200\n要计算的数学表达式，例如 days * price + 1200"
+                },
+                "variables": {
+                    "type": "object",
+                    "description": "Variable values; a list of values evaluates every scenario at once\n变量取值；取值为列表时一次计算所有情况"
                 }
             },
             "required": ["expression"]
@@ -106,32 +197,205 @@ class ToolLibrary:
         """Register a tool in the library.
         在库中注册一个工具"""
         print(f"Registering tool: {tool.name}")
-        self.tools[tool.name] = tool
+        self.tools[tool.name] = self.registry.register(tool)
+        self._view = None
         print(f"Tool {tool.name} registered successfully")
     
+    @property
+    def view(self) -> ToolView:
+        """Pre-rendered view of this library's tools, shared with identical libraries.
+        此工具库工具的预渲染视图，与工具相同的工具库共享"""
+        view = self._view
+        if view is None:
+            view = self._view = self.registry.view(tuple(self.tools.values()))
+        return view
+    
+    @property
+    def version(self) -> str:
+        """Version of the tool catalog; changes whenever a tool or its schema changes.
+        工具目录的版本号；任何工具或其模式变化时都会改变"""
+        return self.view.version
+    
     def get_available_tools(self) -> List[Dict[str, str]]:
         """Get a list of available tools with their descriptions.
-        获取可用工具及其描述的列表"""
-        print(f"Getting available tools. Count: {len(self.tools)}")
-        tools_list = [
-            {
-                'name': tool.name,
-                'description': tool.description
-            }
-            for tool in self.tools.values()
-        ]
-        print(f"Available tools: {[tool['name'] for tool in tools_list]}")
-        return tools_list
-    
-    def execute(self, tool_name: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
-        """Execute a tool by name with given parameters.
-        根据名称和给定参数执行工具"""
-        print(f"Executing tool: {tool_name}")
-        if tool_name not in self.tools:
+        获取可用工具及其描述的列表
+        
+        The list is cached and shared; do not modify it.
+        该列表已缓存并共享，请勿修改。"""
+        return self.view.catalog
+    
+    def get_tool_schemas(self) -> List[Dict[str, Any]]:
+        """Get the cached function-calling schemas of all tools.
+        获取所有工具已缓存的函数调用模式"""
+        return self.view.schemas
+    
+    def _get_tool(self, tool_name: str) -> Callable:
+        tool = self.tools.get(tool_name)
+        if tool is None:
             logger.error(f"Tool '{tool_name}' not found in library")
             raise ValueError(f"Tool '{tool_name}' not found in library")
+        return tool
+    
+    def validate(self, tool_name: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """Check parameters against the tool's compiled schema.
+        按工具已编译的模式检查参数
+        
+        Returns:
+            The parameters, or a copy with values coerced to the declared types
+            参数本身，或将值转换为声明类型后的副本
+        
+        Raises:
+            ToolArgumentError: The parameters do not match the schema
+                           参数与模式不匹配"""
+        try:
+            return self.registry.validator(self._get_tool(tool_name))(parameters)
+        except ToolArgumentError as e:
+            logger.warning(str(e))
+            raise
+    
+    def execute(self, tool_name: str, parameters: Dict[str, Any],
+                timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Execute a tool by name with given parameters.
+        根据名称和给定参数执行工具
         
-        # 直接调用工具函数，传入参数
-        result = self.tools[tool_name](**parameters)
+        Raises:
+            ValueError: Unknown tool
+                    未知工具
+            ToolArgumentError: The parameters do not match the tool's schema
+                           参数与工具的模式不匹配
+            ToolTimeoutError: The tool did not finish within its timeout
+                          工具未在超时时间内完成"""
+        print(f"Executing tool: {tool_name}")
+        tool = self._get_tool(tool_name)
+        parameters = self.validate(tool_name, parameters)
+        
+        # 可缓存的工具先查共享缓存，未命中时由执行引擎带超时执行
+        run = lambda: self.executor.run(tool, parameters, timeout)
+        result = self.cache.call(tool, parameters, run) if self.cache is not None else run()
         print(f"Tool {tool_name} execution completed")
+        return result
+    
+    def execute_many(self, calls: List[Any], timeout: Optional[float] = None,
+                     return_exceptions: bool = False) -> List[Any]:
+        """Execute many tool calls concurrently and return their results in order.
+        并发执行多个工具调用，并按顺序返回结果
+        
+        Identical calls (same tool and parameters) run once and share the
+        result, except for tools declaring side_effects=True. Cached results
+        are used as in execute(). Distinct calls are dispatched concurrently
+        through the executor; several calls to a tool with a native `batch`
+        entry point are sent to it as one list.
+        相同的调用（相同工具和参数）只执行一次并共享结果，声明side_effects=True的工具除外。
+        缓存的使用方式与execute()相同。不同的调用通过执行器并发分发；对带有原生batch
+        入口的工具的多次调用会作为一个列表一次性交给它。
+        
+        Args:
+            calls: (tool_name, parameters) tuples or {"tool_name", "parameters"} dicts
+               (工具名, 参数)元组或{"tool_name", "parameters"}字典
+            timeout: Timeout of each call (default: the tool's or the executor's)
+                 每个调用的超时时间（默认使用工具或执行器的设置）
+            return_exceptions: Put errors in the result list instead of raising the first one
+                           将错误放入结果列表，而不是抛出第一个错误
+        
+        Returns:
+            One result per call, in the order of the calls
+            每个调用一个结果，顺序与调用相同
+        
+        Raises:
+            ValueError, ToolArgumentError, ToolTimeoutError: The first failed call
+            (only when return_exceptions is False)
+            第一个失败的调用（仅当return_exceptions为False时）"""
+        print(f"Executing {len(calls)} tool calls")
+        results: List[Any] = [None] * len(calls)
+        # Distinct calls: key -> (tool, parameters, positions in calls)
+        # 不同的调用：键 -> (工具, 参数, 在calls中的位置)
+        distinct: Dict[Tuple[Callable, Any], Tuple[Callable, Dict[str, Any], List[int]]] = {}
+        for position, call in enumerate(calls):
+            if isinstance(call, dict):
+                tool_name, parameters = call["tool_name"], call.get("parameters", {})
+            else:
+                tool_name, parameters = call
+            try:
+                tool = self._get_tool(tool_name)
+                parameters = self.validate(tool_name, parameters)
+            except ValueError as e:
+                if not return_exceptions:
+                    raise
+                results[position] = e
+                continue
+            if getattr(tool, "side_effects", False):
+                key = (tool, position)
+            else:
+                key = (tool, json.dumps(parameters, ensure_ascii=False, sort_keys=True, default=str))
+            entry = distinct.get(key)
+            if entry is None:
+                distinct[key] = (tool, parameters, [position])
+            else:
+                entry[2].append(position)
+        
+        # Serve cache hits, group the rest by tool
+        # 先使用缓存命中的结果，其余按工具分组
+        pending: Dict[Callable, List[Tuple[Dict[str, Any], List[int]]]] = {}
+        hits = 0
+        for tool, parameters, positions in distinct.values():
+            if self.cache is not None:
+                hit, result = self.cache.lookup(tool, parameters)
+                if hit:
+                    hits += 1
+                    for position in positions:
+                        results[position] = result
+                    continue
+            pending.setdefault(tool, []).append((parameters, positions))
+        
+        # Dispatch: one submission per native batch, otherwise one per call
+        # 分发：每个原生批量只提交一次，否则每个调用提交一次
+        submitted = []
+        batches = 0
+        for tool, group in pending.items():
+            if len(group) > 1 and getattr(tool, "batch", None) is not None:
+                batch = self._batches.get(tool)
+                if batch is None:
+                    batch = self._batches.setdefault(tool, _NativeBatch(tool))
+                future = self.executor.submit(batch, {"calls": [parameters for parameters, _ in group]})
+                submitted.append((batch, future, tool, group))
+                batches += 1
+            else:
+                for item in group:
+                    submitted.append((tool, self.executor.submit(tool, item[0]), tool, [item]))
+        
+        started = time.monotonic()
+        for runner, future, tool, group in submitted:
+            limit = self.executor.timeout_for(runner, timeout)
+            remaining = None if limit is None else max(0.0, started + limit - time.monotonic())
+            try:
+                value = self.executor.wait(runner, future, remaining)
+                values = value if runner is not tool else [value]
+            except Exception as e:
+                values = [e] * len(group)
+            for (parameters, positions), result in zip(group, values):
+                if self.cache is not None and not isinstance(result, Exception):
+                    self.cache.store(tool, parameters, result)
+                for position in positions:
+                    results[position] = result
+        
+        print(f"Tool calls completed: {len(calls)} calls, {len(distinct)} distinct, "
+              f"{hits} cached, {batches} native batches")
+        if not return_exceptions:
+            for result in results:
+                if isinstance(result, Exception):
+                    raise result
+        return results
+    
+    async def execute_async(self, tool_name: str, parameters: Dict[str, Any],
+                            timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Execute a tool from an event loop without blocking it.
+        在事件循环中执行工具，不阻塞事件循环"""
+        tool = self._get_tool(tool_name)
+        parameters = self.validate(tool_name, parameters)
+        if self.cache is None:
+            return await self.executor.run_async(tool, parameters, timeout)
+        hit, result = self.cache.lookup(tool, parameters)
+        if not hit:
+            result = await self.executor.run_async(tool, parameters, timeout)
+            self.cache.store(tool, parameters, result)
         return result
\ No newline at end of file
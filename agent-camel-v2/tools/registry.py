@@ -0,0 +1,222 @@
+"""
+Process-wide tool registry for Agent-Camel V2.
+Agent-Camel V2的进程级工具注册表
+
+Each tool is built once per process and shared by every ToolLibrary that
+uses it. For each distinct set of tools the registry keeps one ToolView
+holding the pre-rendered catalog (for prompts) and the tool list (for
+RolePlaying tools=), tagged with a version derived from its content.
+每个工具在进程内只构建一次，并由所有使用它的ToolLibrary共享。
+对于每一组不同的工具，注册表保存一个ToolView，其中包含预先渲染的目录（用于提示）
+和工具列表（用于RolePlaying的tools=），并带有根据内容计算的版本号。
+"""
+from typing import Dict, Any, Callable, List, Optional, Tuple
+import functools
+import hashlib
+import json
+import logging
+import threading
+
+from tools.validation import ArgumentValidator, compile_validator
+
+# 设置日志记录
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+
+def tool_schema(tool: Callable) -> Dict[str, Any]:
+    """
+    Function-calling schema of a tool (name, description, parameters).
+    工具的函数调用模式（名称、描述、参数）
+    """
+    return {
+        "name": tool.name,
+        "description": getattr(tool, "description", ""),
+        "parameters": getattr(tool, "parameters", {"type": "object", "properties": {}}),
+    }
+
+
+class ToolView:
+    """
+    Immutable, pre-rendered view of a set of tools, shared by all roles using that set.
+    一组工具的不可变预渲染视图，由使用相同工具组的所有角色共享
+    """
+
+    __slots__ = ("tools", "names", "catalog", "schemas", "serialized", "tool_block", "version")
+
+    def __init__(self, tools: Tuple[Callable, ...], schema: Callable[[Callable], Dict[str, Any]] = tool_schema):
+        """
+        Render the view.
+        渲染视图
+
+        Args:
+            tools: Tools in registration order
+               按注册顺序排列的工具
+            schema: Returns the schema of a tool
+                返回工具模式的函数
+        """
+        self.tools = tools
+        self.names = tuple(tool.name for tool in tools)
+        # Same format as ToolLibrary.get_available_tools() always returned
+        # 与ToolLibrary.get_available_tools()一直以来返回的格式相同
+        self.catalog: List[Dict[str, str]] = [
+            {"name": tool.name, "description": tool.description} for tool in tools
+        ]
+        self.schemas: List[Dict[str, Any]] = [schema(tool) for tool in tools]
+        self.serialized = json.dumps(self.schemas, ensure_ascii=False, sort_keys=True, default=str)
+        block = "Available tools:\n"
+        for tool in self.catalog:
+            block += f"- {tool['name']}: {tool['description']}\n"
+        self.tool_block = block
+        # Stable across processes, so it can key prompt caches
+        # 跨进程保持稳定，因此可用作提示缓存的键
+        self.version = hashlib.blake2b(self.serialized.encode("utf-8"), digest_size=8).hexdigest()
+
+    def __len__(self) -> int:
+        return len(self.tools)
+
+    def __repr__(self) -> str:
+        return f"ToolView({list(self.names)!r}, version={self.version})"
+
+
+class ToolRegistry:
+    """
+    Builds each tool once and caches tool schemas and views.
+    每个工具只构建一次，并缓存工具模式和视图
+    """
+
+    _shared_registry: Optional["ToolRegistry"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self):
+        self._tools: Dict[str, Callable] = {}
+        self._built: Dict[Any, Callable] = {}
+        self._schemas: Dict[Callable, Dict[str, Any]] = {}
+        self._validators: Dict[Callable, ArgumentValidator] = {}
+        self._views: Dict[Tuple[Callable, ...], ToolView] = {}
+        self._lock = threading.RLock()
+        self.version = 0
+        self.builds = 0
+        self.view_hits = 0
+
+    @classmethod
+    def shared(cls) -> "ToolRegistry":
+        """
+        Get the process-wide registry.
+        获取进程内共享的注册表
+        """
+        with cls._shared_lock:
+            if cls._shared_registry is None:
+                cls._shared_registry = cls()
+            return cls._shared_registry
+
+    def build(self, key: Any, factory: Callable[[], Callable]) -> Callable:
+        """
+        Get the tool built by a factory, calling the factory only the first time.
+        获取由工厂函数构建的工具，只在第一次时调用工厂函数
+
+        Args:
+            key: Cache key of the factory, e.g. the factory itself or the tool name
+             工厂函数的缓存键，例如工厂函数本身或工具名称
+            factory: Builds the tool
+                 构建工具的函数
+
+        Returns:
+            Shared tool
+            共享的工具
+        """
+        tool = self._built.get(key)
+        if tool is None:
+            with self._lock:
+                tool = self._built.get(key)
+                if tool is None:
+                    tool = factory()
+                    self.builds += 1
+                    self._built[key] = tool
+                    self.register(tool)
+        return tool
+
+    def register(self, tool: Callable) -> Callable:
+        """
+        Make a tool available by name; replacing a tool bumps the registry version.
+        按名称登记工具；替换已有工具会增加注册表版本号
+
+        The argument validator of the tool is compiled here, so a broken
+        parameter schema fails at registration rather than on first call.
+        工具的参数校验器在此编译，因此错误的参数模式会在注册时而不是首次调用时报错。
+        """
+        with self._lock:
+            if self._tools.get(tool.name) is not tool:
+                self.validator(tool)
+                self._tools[tool.name] = tool
+                self.version += 1
+        return tool
+
+    def get(self, name: str) -> Optional[Callable]:
+        """Get a registered tool by name.
+        按名称获取已登记的工具"""
+        return self._tools.get(name)
+
+    def schema(self, tool: Callable) -> Dict[str, Any]:
+        """Cached function-calling schema of a tool.
+        工具的函数调用模式（已缓存）"""
+        schema = self._schemas.get(tool)
+        if schema is None:
+            schema = self._schemas.setdefault(tool, tool_schema(tool))
+        return schema
+
+    def validator(self, tool: Callable) -> ArgumentValidator:
+        """Compiled argument validator of a tool (compiled once per tool).
+        工具已编译的参数校验器（每个工具只编译一次）"""
+        validator = self._validators.get(tool)
+        if validator is None:
+            validator = self._validators.setdefault(tool, compile_validator(tool, self.schema(tool)["parameters"]))
+        return validator
+
+    def view(self, tools: Tuple[Callable, ...]) -> ToolView:
+        """
+        Get the shared view of a set of tools, rendering it on first use.
+        获取一组工具的共享视图，首次使用时渲染
+
+        Args:
+            tools: Tools in registration order
+               按注册顺序排列的工具
+
+        Returns:
+            Shared ToolView
+            共享的ToolView
+        """
+        view = self._views.get(tools)
+        if view is not None:
+            self.view_hits += 1
+            return view
+        with self._lock:
+            view = self._views.get(tools)
+            if view is None:
+                view = ToolView(tools, self.schema)
+                self._views[tools] = view
+                print(f"Rendered tool view {view.version}: {list(view.names)}")
+        return view
+
+    def stats(self) -> Dict[str, Any]:
+        """Get registry statistics.
+        获取注册表统计信息"""
+        return {
+            "tools": len(self._tools),
+            "builds": self.builds,
+            "views": len(self._views),
+            "view_hits": self.view_hits,
+            "validators": len(self._validators),
+            "version": self.version,
+        }
+
+
+def tool_factory(factory: Callable[[], Callable]) -> Callable[[], Callable]:
+    """
+    Decorator for get_*_tool() factories: the tool is built once per process.
+    用于get_*_tool()工厂函数的装饰器：每个进程只构建一次工具
+    """
+    @functools.wraps(factory)
+    def get_tool() -> Callable:
+        return ToolRegistry.shared().build(factory, factory)
+    return get_tool
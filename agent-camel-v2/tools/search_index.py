@@ -0,0 +1,731 @@
+"""
+Offline full-text search for Agent-Camel V2.
+Agent-Camel V2的离线全文检索
+
+An inverted index over our own documents (travel guides, school handbooks,
+reimbursement policies) with BM25 ranking. Text is tokenized into lowercase
+words and CJK character bigrams, so Chinese needs no dictionary.
+基于自有文档（旅行指南、学校手册、报销政策）的倒排索引，使用BM25排序。
+文本被切分为小写单词和中日韩字符二元组，因此中文无需词典。
+
+The index is a set of immutable segments (Lucene style). New documents are
+buffered in memory and written as a new segment on commit(), which also
+merges segments of similar size into larger ones. Each segment is a
+handful of .npy files opened with mmap, so opening a large index is instant
+and its postings are paged in by the OS on demand:
+索引由一组不可变的段组成（类似Lucene）。新文档先缓存在内存中，commit()时写成新段，
+同时将大小相近的段合并为更大的段。每个段由几个以mmap打开的.npy文件组成，
+因此打开大型索引几乎不花时间，倒排表由操作系统按需调入：
+
+    <name>.terms.npy      sorted 64-bit term hashes / 排序后的64位词项哈希
+    <name>.offsets.npy    postings range of each term / 每个词项的倒排表范围
+    <name>.docs.npy       postings: segment-local document numbers / 倒排表：段内文档编号
+    <name>.weights.npy    postings: precomputed BM25 term-frequency weights / 倒排表：预计算的BM25词频权重
+    <name>.tfs.npy        postings: raw term frequencies (for merging) / 倒排表：原始词频（用于合并）
+    <name>.lengths.npy    document lengths in tokens / 文档长度（词元数）
+    <name>.ids.npy        hashes of document ids, and their sort order / 文档ID的哈希及其排序
+    <name>.store.npy      stored documents as JSON lines, and their offsets / 以JSON行存储的文档及其偏移
+    <name>.deleted.npy    deleted documents (only once something was deleted) / 已删除文档（有删除时才存在）
+"""
+from array import array
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+import functools
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import shutil
+import tempfile
+import threading
+import weakref
+
+import numpy as np
+
+from config.settings import settings
+
+# 设置日志记录
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile("[a-z0-9]+|[\u3400-\u9fff\uf900-\ufaff]+")
+_WORD = re.compile("[a-z0-9]+")
+_CJK_CHARACTER = re.compile("[\u3400-\u9fff\uf900-\ufaff]")
+
+# Files indexed by add_path(), and the heading that starts a new markdown section
+# add_path()会索引的文件类型，以及开始新Markdown章节的标题
+_TEXT_SUFFIXES = (".md", ".txt")
+_JSON_SUFFIXES = (".json", ".jsonl")
+_HEADING = re.compile(r"^#{1,6}\s+(.*)$", re.MULTILINE)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase words and CJK character bigrams.
+    将文本切分为小写单词和中日韩字符二元组
+
+    "住宿报销标准" -> ["住宿", "宿报", "报销", "销标", "标准"]; a lone CJK
+    character is kept as a unigram.
+    单独的中日韩字符保留为一元词。
+    """
+    tokens: List[str] = []
+    for run in _TOKEN.findall(text.lower()):
+        if len(run) == 1 or _WORD.match(run):
+            tokens.append(run)
+        else:
+            tokens.extend([run[i:i + 2] for i in range(len(run) - 1)])
+    return tokens
+
+
+def _hash(value: str) -> int:
+    """Stable 64-bit hash of a document id.
+    文档ID的稳定64位哈希"""
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+# CJK terms are encoded exactly from their code points, with the top bit set;
+# words are hashed into the other half of the key space
+# 中日韩词项直接由码位精确编码并设置最高位；单词则哈希到键空间的另一半
+_CJK_FLAG = 1 << 63
+_WORD_MASK = _CJK_FLAG - 1
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def _term_key(term: str) -> int:
+    """64-bit key of a token produced by tokenize().
+    tokenize()产生的词元的64位键"""
+    if _CJK_CHARACTER.match(term):
+        return _CJK_FLAG | ord(term[0]) << 21 | (ord(term[1]) if len(term) > 1 else 0)
+    return _hash(term) & _WORD_MASK
+
+
+def _is_cjk(codes: np.ndarray) -> np.ndarray:
+    return ((codes >= 0x3400) & (codes <= 0x9FFF)) | ((codes >= 0xF900) & (codes <= 0xFAFF))
+
+
+def _tokenize_many(texts: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Vectorized tokenize() of many texts at once, as term keys.
+    对多个文本一次性向量化执行tokenize()，结果为词项键
+
+    CJK bigrams and unigrams are computed with NumPy over the UTF-32 code
+    points of all texts; only ASCII words go through the regex.
+    中日韩二元组和一元词基于所有文本的UTF-32码位用NumPy计算；只有ASCII单词使用正则。
+
+    Returns:
+        (term keys, document numbers, document lengths); each (document, term)
+        pair appears once per occurrence
+        (词项键, 文档编号, 文档长度)；每个(文档, 词项)对每出现一次就出现一次
+    """
+    # A newline between texts is not CJK, so no bigram crosses two documents
+    # 文本之间的换行符不是中日韩字符，因此二元组不会跨越两个文档
+    codes = np.frombuffer("\n".join(texts).encode("utf-32-le"), np.uint32).astype(np.uint64)
+    owners = np.repeat(np.arange(len(texts), dtype=np.uint32), [len(text) + 1 for text in texts])[:len(codes)]
+    cjk = _is_cjk(codes)
+    pairs = cjk[:-1] & cjk[1:]
+    single = cjk.copy()
+    single[:-1] &= ~pairs
+    single[1:] &= ~pairs
+    bigrams = np.flatnonzero(pairs)
+    unigrams = np.flatnonzero(single)
+    keys = [np.uint64(_CJK_FLAG) | codes[bigrams] << np.uint64(21) | codes[bigrams + 1],
+            np.uint64(_CJK_FLAG) | codes[unigrams] << np.uint64(21)]
+    docs = [owners[bigrams], owners[unigrams]]
+    word_keys, word_docs = array("Q"), array("I")
+    for doc, text in enumerate(texts):
+        for word in _WORD.findall(text):
+            word_keys.append(_term_key(word))
+            word_docs.append(doc)
+    keys.append(np.frombuffer(word_keys, np.uint64))
+    docs.append(np.frombuffer(word_docs, np.uint32))
+    docs = np.concatenate(docs)
+    return np.concatenate(keys), docs, np.bincount(docs, minlength=len(texts)).astype(np.uint32)
+
+
+def _load(path: str) -> np.ndarray:
+    """Memory-map an .npy file (empty arrays cannot be mapped and are read).
+    以内存映射方式打开.npy文件（空数组无法映射，直接读取）"""
+    try:
+        return np.load(path, mmap_mode="r")
+    except ValueError:
+        return np.load(path)
+
+
+class _Segment:
+    """
+    One immutable, memory-mapped segment of the index.
+    索引中一个不可变、内存映射的段
+    """
+
+    __slots__ = ("name", "terms", "offsets", "docs", "weights", "tfs", "lengths", "ids", "id_order",
+                 "store", "store_offsets", "deleted", "deleted_count", "dirty", "__weakref__")
+
+    def __init__(self, directory: str, name: str):
+        base = os.path.join(directory, name)
+        self.name = name
+        for field in ("terms", "offsets", "docs", "weights", "tfs", "lengths", "ids", "id_order",
+                      "store", "store_offsets"):
+            setattr(self, field, _load(f"{base}.{field}.npy"))
+        deleted_path = f"{base}.deleted.npy"
+        self.deleted = np.load(deleted_path) if os.path.exists(deleted_path) else np.zeros(len(self.lengths), bool)
+        self.deleted_count = int(self.deleted.sum())
+        self.dirty = False
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    @property
+    def live(self) -> int:
+        return len(self.lengths) - self.deleted_count
+
+    def postings(self, term_hash: np.uint64) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """(documents, weights) of a term, or None if the segment does not contain it.
+        某个词项的(文档, 权重)；段中没有该词项时为None"""
+        i = int(np.searchsorted(self.terms, term_hash))
+        if i < len(self.terms) and self.terms[i] == term_hash:
+            start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+            return self.docs[start:end], self.weights[start:end]
+        return None
+
+    def find(self, id_hash: np.uint64) -> Optional[int]:
+        """Segment-local number of the live document with this id hash.
+        具有该ID哈希的存活文档在段内的编号"""
+        i = int(np.searchsorted(self.ids, id_hash, sorter=self.id_order))
+        while i < len(self.id_order):
+            doc = int(self.id_order[i])
+            if self.ids[doc] != id_hash:
+                return None
+            if not self.deleted[doc]:
+                return doc
+            i += 1
+        return None
+
+    def delete(self, doc: int) -> None:
+        if not self.deleted[doc]:
+            self.deleted[doc] = True
+            self.deleted_count += 1
+            self.dirty = True
+
+    def document(self, doc: int) -> Dict[str, Any]:
+        start, end = int(self.store_offsets[doc]), int(self.store_offsets[doc + 1])
+        return json.loads(self.store[start:end].tobytes())
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """Raw arrays for merging, with one term hash per posting.
+        用于合并的原始数组，每个倒排项带一个词项哈希"""
+        return {
+            "hashes": np.repeat(np.asarray(self.terms), np.diff(self.offsets)),
+            "docs": np.asarray(self.docs), "tfs": np.asarray(self.tfs), "lengths": np.asarray(self.lengths),
+            "ids": np.asarray(self.ids), "store": np.asarray(self.store),
+            "store_offsets": np.asarray(self.store_offsets), "live": ~self.deleted,
+        }
+
+    def files(self, directory: str) -> List[str]:
+        base = os.path.join(directory, self.name)
+        return [f"{base}.{field}.npy" for field in ("terms", "offsets", "docs", "weights", "tfs", "lengths", "ids",
+                                                     "id_order", "store", "store_offsets", "deleted")]
+
+
+class _Buffer:
+    """
+    Documents added since the last commit; they are tokenized together on commit.
+    上次提交以来添加的文档；在提交时一起分词
+    """
+
+    def __init__(self):
+        self.texts: List[str] = []
+        self.ids = array("Q")
+        self.store = bytearray()
+        self.store_offsets = array("q", [0])
+        self.by_id: Dict[int, int] = {}
+        self.deleted: set = set()
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def add(self, id_hash: int, stored: bytes, text: str) -> None:
+        self.by_id[id_hash] = len(self.texts)
+        self.texts.append(text.lower())
+        self.ids.append(id_hash)
+        self.store += stored
+        self.store_offsets.append(len(self.store))
+
+    def delete(self, id_hash: int) -> bool:
+        """Delete a buffered document.
+        删除一个缓冲中的文档"""
+        doc = self.by_id.pop(id_hash, None)
+        if doc is None:
+            return False
+        self.deleted.add(doc)
+        return True
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        keys, docs, lengths = _tokenize_many(self.texts)
+        # One posting per (document, term) with its frequency
+        # 每个(文档, 词项)对应一个倒排项及其词频
+        order = np.lexsort((keys, docs))
+        keys, docs = keys[order], docs[order]
+        first = np.ones(len(keys), bool)
+        first[1:] = (keys[1:] != keys[:-1]) | (docs[1:] != docs[:-1])
+        starts = np.flatnonzero(first)
+        tfs = np.diff(np.append(starts, len(keys)))
+        live = np.ones(len(self.texts), bool)
+        live[list(self.deleted)] = False
+        return {
+            "hashes": keys[starts], "docs": docs[starts], "tfs": np.minimum(tfs, 0xFFFF).astype(np.uint16),
+            "lengths": lengths, "ids": np.frombuffer(self.ids, np.uint64),
+            "store": np.frombuffer(bytes(self.store), np.uint8),
+            "store_offsets": np.frombuffer(self.store_offsets, np.int64), "live": live,
+        }
+
+
+def _write_segment(directory: str, name: str, parts: List[Dict[str, np.ndarray]],
+                   avgdl: float, k1: float, b: float) -> bool:
+    """
+    Write the live documents of one or more raw parts as a new segment.
+    将一个或多个原始部分中的存活文档写成一个新段
+
+    Returns:
+        False if no live document was left (nothing is written)
+        没有剩余存活文档时返回False（不写入任何内容）
+    """
+    hashes, docs, tfs, lengths, ids, stores, store_offsets = [], [], [], [], [], [], []
+    base = 0
+    for part in parts:
+        live = part["live"]
+        remap = (np.cumsum(live) - 1 + base).astype(np.uint32)
+        keep = live[part["docs"]]
+        hashes.append(part["hashes"][keep])
+        docs.append(remap[part["docs"][keep]])
+        tfs.append(part["tfs"][keep])
+        lengths.append(part["lengths"][live])
+        ids.append(part["ids"][live])
+        byte_lengths = np.diff(part["store_offsets"])
+        stores.append(part["store"][np.repeat(live, byte_lengths)])
+        store_offsets.append(byte_lengths[live])
+        base += int(live.sum())
+    if base == 0:
+        return False
+    hashes, docs, tfs = np.concatenate(hashes), np.concatenate(docs), np.concatenate(tfs)
+    lengths, ids = np.concatenate(lengths), np.concatenate(ids)
+    # Stable sort by term keeps each term's postings in document order
+    # 按词项稳定排序，使每个词项的倒排表保持文档顺序
+    order = np.argsort(hashes, kind="stable")
+    hashes, docs, tfs = hashes[order], docs[order], tfs[order]
+    terms, starts = np.unique(hashes, return_index=True)
+    tf = tfs.astype(np.float32)
+    norm = k1 * (1.0 - b + b * lengths[docs].astype(np.float32) / np.float32(avgdl))
+    arrays = {
+        "terms": terms,
+        "offsets": np.append(starts, len(hashes)).astype(np.int64),
+        "docs": docs,
+        "weights": (tf * (k1 + 1.0) / (tf + norm)).astype(np.float32),
+        "tfs": tfs,
+        "lengths": lengths,
+        "ids": ids,
+        "id_order": np.argsort(ids, kind="stable").astype(np.uint32),
+        "store": np.concatenate(stores),
+        "store_offsets": np.concatenate([[0], np.cumsum(np.concatenate(store_offsets))]).astype(np.int64),
+    }
+    for field, values in arrays.items():
+        np.save(os.path.join(directory, f"{name}.{field}.npy"), values)
+    return True
+
+
+def _snippet(text: str, tokens: List[str], width: int = 120) -> str:
+    """Window of the text around the first query token it contains.
+    文本中包含第一个查询词元的位置附近的片段"""
+    lowered = text.lower()
+    positions = [position for position in (lowered.find(token) for token in tokens) if position >= 0]
+    start = max(0, min(positions) - width // 4) if positions else 0
+    snippet = " ".join(text[start:start + width].split())
+    return ("…" if start > 0 else "") + snippet + ("…" if start + width < len(text) else "")
+
+
+class SearchIndex:
+    """
+    Persistent, incrementally updated BM25 inverted index.
+    持久化、可增量更新的BM25倒排索引
+
+    Documents are dicts with an "id", an optional "title" and the searchable
+    "text" (or "content"); any other fields are stored and returned with hits.
+    Adding a document whose id is already indexed replaces it.
+    文档是包含"id"、可选"title"以及可检索的"text"（或"content"）的字典；
+    其他字段会被存储并随命中结果返回。添加已索引ID的文档会替换旧文档。
+    """
+
+    _shared_index: Optional["SearchIndex"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path: Optional[str] = None, k1: float = 1.2, b: float = 0.75,
+                 flush_documents: int = 10000, merge_factor: int = 10):
+        """
+        Open (or create) an index.
+        打开（或创建）索引
+
+        Args:
+            path: Index directory; a temporary directory if None
+              索引目录；为None时使用临时目录
+            k1: BM25 term-frequency saturation
+            b: BM25 length normalization
+            flush_documents: Buffered documents that trigger a commit
+                         触发提交的缓冲文档数
+            merge_factor: Segments of similar size that are merged into one
+                      大小相近的段达到此数量时合并为一个
+        """
+        if path is None:
+            path = tempfile.mkdtemp(prefix="agent-camel-search-")
+            weakref.finalize(self, shutil.rmtree, path, True)
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.flush_documents = flush_documents
+        self.merge_factor = merge_factor
+        self._segments: Tuple[_Segment, ...] = ()
+        self._buffer = _Buffer()
+        self._next_segment = 0
+        self._documents = 0
+        self._length = 0
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        # Bumped by every add, delete and commit, so results can be cached per generation
+        # 每次添加、删除和提交都会递增，因此检索结果可以按代数缓存
+        self.generation = 0
+        self.merges = 0
+        self._open()
+
+    @classmethod
+    def shared(cls) -> "SearchIndex":
+        """
+        Get the process-wide index configured from settings.
+        获取根据配置创建的进程内共享索引
+
+        An empty index is filled from SEARCH_CORPUS_PATHS on first use.
+        空索引在首次使用时从SEARCH_CORPUS_PATHS导入文档。
+        """
+        with cls._shared_lock:
+            if cls._shared_index is None:
+                index = cls(settings.SEARCH_INDEX_PATH)
+                if not len(index):
+                    for path in settings.SEARCH_CORPUS_PATHS:
+                        index.add_path(path)
+                    index.commit()
+                cls._shared_index = index
+            return cls._shared_index
+
+    def _manifest_path(self) -> str:
+        return os.path.join(self.path, "manifest.json")
+
+    def _open(self) -> None:
+        if not os.path.exists(self._manifest_path()):
+            return
+        with open(self._manifest_path(), encoding="utf-8") as f:
+            manifest = json.load(f)
+        self._next_segment = manifest["next_segment"]
+        self.generation = manifest["generation"]
+        self._segments = tuple(_Segment(self.path, name) for name in manifest["segments"])
+        for segment in self._segments:
+            self._documents += segment.live
+            self._length += int(segment.lengths[~segment.deleted].sum())
+        print(f"Opened search index {self.path}: {self._documents} documents in {len(self._segments)} segments")
+
+    def __len__(self) -> int:
+        """Number of live documents, including uncommitted ones.
+        存活文档数，包括尚未提交的文档"""
+        return self._documents
+
+    @property
+    def avgdl(self) -> float:
+        return self._length / self._documents if self._documents else 1.0
+
+    def add(self, document: Dict[str, Any]) -> None:
+        """
+        Add or replace a document; it becomes searchable on the next commit or search.
+        添加或替换文档；在下一次提交或检索时即可被检索到
+
+        Args:
+            document: {"id", "title", "text"} plus any fields to store
+                  {"id", "title", "text"}以及需要存储的其他字段
+        """
+        doc_id = str(document["id"])
+        text = f"{document.get('title', '')}\n{document.get('text', document.get('content', ''))}"
+        stored = json.dumps(document, ensure_ascii=False, default=str).encode("utf-8")
+        id_hash = _hash(doc_id)
+        with self._lock:
+            # Older versions in committed segments are deleted on commit, in one pass per segment
+            # 已提交段中的旧版本在提交时删除，每个段只需一次遍历
+            if self._buffer.delete(id_hash):
+                self._documents -= 1
+            self._buffer.add(id_hash, stored, text)
+            self._documents += 1
+            self.generation += 1
+            if len(self._buffer) >= self.flush_documents:
+                self.commit()
+
+    def add_documents(self, documents: Iterable[Dict[str, Any]]) -> int:
+        """Add many documents and commit; returns how many were added.
+        添加多个文档并提交；返回添加的数量"""
+        count = 0
+        for document in documents:
+            self.add(document)
+            count += 1
+        self.commit()
+        return count
+
+    def add_path(self, path: str) -> int:
+        """
+        Index a file or every supported file under a directory.
+        索引一个文件，或目录下所有支持的文件
+
+        Markdown and text files are split into one document per heading;
+        .json files hold a list of documents and .jsonl files one per line.
+        Markdown和文本文件按标题拆分为多个文档；.json文件包含文档列表，.jsonl文件每行一个文档。
+
+        Returns:
+            Number of documents added
+            添加的文档数
+        """
+        if os.path.isdir(path):
+            count = 0
+            for root, _, names in sorted(os.walk(path)):
+                for name in sorted(names):
+                    if name.endswith(_TEXT_SUFFIXES + _JSON_SUFFIXES):
+                        count += self.add_path(os.path.join(root, name))
+            return count
+        with open(path, encoding="utf-8") as f:
+            content = f.read()
+        if path.endswith(".jsonl"):
+            documents = [json.loads(line) for line in content.splitlines() if line.strip()]
+        elif path.endswith(".json"):
+            documents = json.loads(content)
+        else:
+            documents = []
+            headings = list(_HEADING.finditer(content))
+            sections = [(None, 0)] + [(match.group(1).strip(), match.start()) for match in headings]
+            for number, (heading, start) in enumerate(sections):
+                end = sections[number + 1][1] if number + 1 < len(sections) else len(content)
+                text = content[start:end].strip()
+                if text:
+                    documents.append({"id": f"{path}#{number}", "title": heading or os.path.basename(path),
+                                      "text": text, "source": path})
+        for document in documents:
+            self.add(document)
+        print(f"Indexed {len(documents)} documents from {path}")
+        return len(documents)
+
+    def delete(self, doc_id: str) -> bool:
+        """
+        Delete a document; takes effect for searches immediately.
+        删除文档；对检索立即生效
+
+        Returns:
+            Whether the document was indexed
+            文档是否曾被索引
+        """
+        id_hash = _hash(str(doc_id))
+        with self._lock:
+            if self._buffer.delete(id_hash):
+                self._documents -= 1
+                self.generation += 1
+                return True
+            key = np.uint64(id_hash)
+            for segment in self._segments:
+                doc = segment.find(key)
+                if doc is not None:
+                    segment.delete(doc)
+                    self._documents -= 1
+                    self._length -= int(segment.lengths[doc])
+                    self.generation += 1
+                    return True
+            return False
+
+    def commit(self) -> None:
+        """
+        Write buffered documents as a new segment, persist deletions, and
+        merge segments of similar size.
+        将缓冲文档写成新段，持久化删除标记，并合并大小相近的段
+        """
+        with self._lock:
+            changed = False
+            if len(self._buffer):
+                self._replace(np.frombuffer(self._buffer.ids, np.uint64))
+                arrays = self._buffer.arrays()
+                self._length += int(arrays["lengths"][arrays["live"]].sum())
+                name = f"seg{self._next_segment:06d}"
+                self._next_segment += 1
+                if _write_segment(self.path, name, [arrays], self.avgdl, self.k1, self.b):
+                    self._segments += (_Segment(self.path, name),)
+                self._buffer = _Buffer()
+                changed = True
+            for segment in self._segments:
+                if segment.dirty:
+                    np.save(os.path.join(self.path, f"{segment.name}.deleted.npy"), segment.deleted)
+                    segment.dirty = False
+                    changed = True
+            if not changed:
+                return
+            group = self._merge_candidates()
+            while group:
+                self._merge(group)
+                group = self._merge_candidates()
+            self.generation += 1
+            self._write_manifest()
+
+    def _replace(self, ids: np.ndarray) -> None:
+        """Delete committed documents whose ids were added again.
+        删除ID被再次添加的已提交文档"""
+        for segment in self._segments:
+            replaced = np.flatnonzero(np.isin(segment.ids, ids) & ~segment.deleted)
+            for doc in replaced:
+                segment.delete(int(doc))
+            if len(replaced):
+                self._documents -= len(replaced)
+                self._length -= int(segment.lengths[replaced].sum())
+
+    def _merge_candidates(self) -> List[_Segment]:
+        """Segments of one size tier once there are merge_factor of them.
+        同一大小层级的段达到merge_factor个时返回这些段"""
+        tiers: Dict[int, List[_Segment]] = {}
+        for segment in self._segments:
+            size = max(segment.live, 1) / self.flush_documents
+            tier = max(0, int(math.log(size, self.merge_factor))) if size > 1 else 0
+            tiers.setdefault(tier, []).append(segment)
+        for tier in sorted(tiers):
+            if len(tiers[tier]) >= self.merge_factor:
+                return tiers[tier]
+        return []
+
+    def _merge(self, group: List[_Segment]) -> None:
+        """Merge segments into one, dropping deleted documents.
+        将多个段合并为一个，并丢弃已删除的文档"""
+        name = f"seg{self._next_segment:06d}"
+        self._next_segment += 1
+        merged = _write_segment(self.path, name, [segment.arrays() for segment in group],
+                                self.avgdl, self.k1, self.b)
+        remaining = tuple(segment for segment in self._segments if segment not in group)
+        self._segments = remaining + ((_Segment(self.path, name),) if merged else ())
+        self.merges += 1
+        print(f"Merged {len(group)} search segments into {name}")
+        self._write_manifest()
+        # Searches still running on the old segments keep their mappings alive
+        # 仍在旧段上运行的检索会保持其映射有效
+        for segment in group:
+            for file in segment.files(self.path):
+                if os.path.exists(file):
+                    os.remove(file)
+
+    def _write_manifest(self) -> None:
+        manifest = {
+            "segments": [segment.name for segment in self._segments],
+            "next_segment": self._next_segment,
+            "generation": self.generation,
+        }
+        temporary = self._manifest_path() + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(temporary, self._manifest_path())
+
+    def _scores(self, segment: _Segment) -> np.ndarray:
+        """Per-thread score accumulator of a segment (kept zeroed between searches).
+        每个线程在每个段上的得分累加器（两次检索之间保持为零）"""
+        buffers = getattr(self._local, "buffers", None)
+        if buffers is None:
+            buffers = self._local.buffers = weakref.WeakKeyDictionary()
+        scores = buffers.get(segment)
+        if scores is None:
+            scores = buffers[segment] = np.zeros(len(segment), np.float32)
+        return scores
+
+    def search(self, query: str, k: int = 10) -> List[Dict[str, Any]]:
+        """
+        Rank documents for a query with BM25.
+        使用BM25为查询对文档排序
+
+        Args:
+            query: Free-text query (Chinese, English or mixed)
+               自由文本查询（中文、英文或混合）
+            k: Number of hits
+           返回的结果数
+
+        Returns:
+            Hits, best first: the stored document plus "score" and "snippet"
+            按得分从高到低排列的结果：存储的文档加上"score"和"snippet"
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens or k <= 0:
+            return []
+        if len(self._buffer):
+            self.commit()
+        segments, total = self._segments, self._documents
+        if not total:
+            return []
+
+        # Postings of each query term in each segment, weighted by the term's global idf
+        # 每个查询词项在每个段中的倒排表，乘以该词项的全局idf
+        per_segment: List[List[Tuple[np.ndarray, np.ndarray, float]]] = [[] for _ in segments]
+        for token in tokens:
+            key = np.uint64(_term_key(token))
+            found = [(i, segment.postings(key)) for i, segment in enumerate(segments)]
+            df = sum(len(postings[0]) for _, postings in found if postings is not None)
+            if not df:
+                continue
+            idf = math.log(1.0 + (total - df + 0.5) / (df + 0.5))
+            for i, postings in found:
+                if postings is not None:
+                    per_segment[i].append((postings[0], postings[1], idf))
+
+        candidates: List[Tuple[float, int, int]] = []
+        for i, (segment, terms) in enumerate(zip(segments, per_segment)):
+            if not terms:
+                continue
+            if len(terms) == 1:
+                docs, weights, idf = terms[0]
+                scores = weights * np.float32(idf)
+            else:
+                accumulator = self._scores(segment)
+                for docs, weights, idf in terms:
+                    accumulator[docs] += weights * np.float32(idf)
+                docs = np.concatenate([term[0] for term in terms])
+                scores = accumulator[docs]
+                accumulator[docs] = 0.0
+            if segment.deleted_count:
+                live = ~segment.deleted[docs]
+                docs, scores = docs[live], scores[live]
+            # A document appears once per matching term, so k * terms entries hold the top k documents
+            # 每个文档在每个匹配词项中出现一次，因此前k * 词项数个条目一定包含前k个文档
+            top = min(k * len(terms), len(scores))
+            if top < len(scores):
+                best = np.argpartition(scores, len(scores) - top)[len(scores) - top:]
+            else:
+                best = np.arange(len(scores))
+            candidates.extend((float(scores[j]), i, int(docs[j])) for j in best)
+
+        seen = set()
+        hits: List[Dict[str, Any]] = []
+        for score, i, doc in sorted(candidates, key=lambda candidate: -candidate[0]):
+            if (i, doc) in seen:
+                continue
+            seen.add((i, doc))
+            document = segments[i].document(doc)
+            text = str(document.get("text", document.get("content", "")))
+            document["score"] = round(score, 4)
+            document["snippet"] = _snippet(text, tokens)
+            hits.append(document)
+            if len(hits) == k:
+                break
+        return hits
+
+    def stats(self) -> Dict[str, Any]:
+        """Get index statistics.
+        获取索引统计信息"""
+        return {
+            "documents": self._documents,
+            "buffered": len(self._buffer),
+            "segments": [segment.live for segment in self._segments],
+            "postings": sum(len(segment.docs) for segment in self._segments),
+            "avgdl": self.avgdl,
+            "generation": self.generation,
+            "merges": self.merges,
+        }
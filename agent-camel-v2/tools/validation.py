@@ -0,0 +1,451 @@
+"""
+Tool argument validation for Agent-Camel V2.
+Agent-Camel V2的工具参数校验
+
+Each tool's JSON-schema `parameters` is compiled once, when the tool is
+registered, into a tree of small checking functions. Calls are then checked
+and lightly coerced (e.g. "3" to 3 for an integer field, a JSON string to an
+object) before the tool runs. Problems are collected into structured errors
+that can be shown to the model so it can fix its call in one retry.
+每个工具的JSON模式parameters在注册时只编译一次，成为由小型检查函数组成的树。
+之后每次调用在工具执行前都会被检查并做轻量的类型转换（例如整数字段的"3"转为3，
+JSON字符串转为对象）。问题会汇总为结构化错误，可以反馈给模型，使其在一次重试内修正调用。
+
+Supported keywords: type, properties, required, additionalProperties, items,
+enum, minimum, maximum, exclusiveMinimum, exclusiveMaximum, minLength,
+maxLength, pattern, minItems, maxItems. Other keywords are ignored.
+支持的关键字如上；其他关键字会被忽略。
+"""
+from typing import Dict, Any, Callable, List, Optional, Tuple
+import json
+import logging
+import math
+import re
+
+# 设置日志记录
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# A compiled check: (value, path, errors) -> value, possibly coerced
+# 编译后的检查函数：(值, 路径, 错误列表) -> 值（可能已转换）
+Check = Callable[[Any, str, List[Dict[str, Any]]], Any]
+
+_INTEGER_PATTERN = re.compile(r"[+-]?\d+")
+
+# Marks a value that failed its check
+# 标记未通过检查的值
+_INVALID: Any = type("_Invalid", (), {"__repr__": lambda self: "<invalid>"})()
+
+
+class ToolArgumentError(ValueError):
+    """
+    Tool call arguments do not match the tool's parameter schema.
+    工具调用参数与工具的参数模式不匹配
+    """
+
+    def __init__(self, tool_name: str, errors: List[Dict[str, Any]]):
+        """
+        Args:
+            tool_name: Name of the tool that was called
+                   被调用的工具名称
+            errors: One {"path", "message"} dict per problem
+                每个问题对应一个{"path", "message"}字典
+        """
+        self.tool_name = tool_name
+        self.errors = errors
+        details = "; ".join(f"{error['path']}: {error['message']}" for error in errors)
+        super().__init__(f"Invalid arguments for tool {tool_name}: {details}")
+
+    def feedback(self) -> Dict[str, Any]:
+        """
+        Structured error to give back to the model.
+        反馈给模型的结构化错误
+        """
+        return {
+            "error": str(self),
+            "tool_name": self.tool_name,
+            "validation_errors": self.errors,
+        }
+
+
+def _type_name(value: Any) -> str:
+    """JSON type name of a Python value.
+    Python值对应的JSON类型名"""
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, int):
+        return "integer"
+    if isinstance(value, float):
+        return "number"
+    if isinstance(value, str):
+        return "string"
+    if isinstance(value, (list, tuple)):
+        return "array"
+    if isinstance(value, dict):
+        return "object"
+    return type(value).__name__
+
+
+def _parse_json(value: str, expected: type) -> Any:
+    try:
+        parsed = json.loads(value)
+    except ValueError:
+        return _INVALID
+    return parsed if isinstance(parsed, expected) else _INVALID
+
+
+# Exact type tests and the coercions tried when they fail (model output is
+# often stringly typed)
+# 精确类型检查，以及检查失败时尝试的转换（模型输出常常把所有值都写成字符串）
+def _is_string(value: Any) -> bool:
+    return type(value) is str
+
+
+def _to_string(value: Any) -> Any:
+    if type(value) in (int, float):
+        return str(value)
+    return _INVALID
+
+
+def _is_integer(value: Any) -> bool:
+    return type(value) is int
+
+
+def _to_integer(value: Any) -> Any:
+    if type(value) is float and value.is_integer():
+        return int(value)
+    if type(value) is str and _INTEGER_PATTERN.fullmatch(value.strip()):
+        return int(value)
+    return _INVALID
+
+
+def _is_number(value: Any) -> bool:
+    return type(value) in (int, float)
+
+
+def _to_number(value: Any) -> Any:
+    if type(value) is str:
+        text = value.strip()
+        if _INTEGER_PATTERN.fullmatch(text):
+            return int(text)
+        try:
+            number = float(text)
+        except ValueError:
+            return _INVALID
+        return number if math.isfinite(number) else _INVALID
+    return _INVALID
+
+
+def _is_boolean(value: Any) -> bool:
+    return type(value) is bool
+
+
+def _to_boolean(value: Any) -> Any:
+    if type(value) is str:
+        return {"true": True, "false": False}.get(value.strip().lower(), _INVALID)
+    return _INVALID
+
+
+def _is_array(value: Any) -> bool:
+    return type(value) is list
+
+
+def _to_array(value: Any) -> Any:
+    if type(value) is tuple:
+        return list(value)
+    if type(value) is str and value.lstrip().startswith("["):
+        return _parse_json(value, list)
+    return _INVALID
+
+
+def _is_object(value: Any) -> bool:
+    return type(value) is dict
+
+
+def _to_object(value: Any) -> Any:
+    if isinstance(value, dict):
+        return dict(value)
+    if type(value) is str and value.lstrip().startswith("{"):
+        return _parse_json(value, dict)
+    return _INVALID
+
+
+def _is_null(value: Any) -> bool:
+    return value is None
+
+
+def _to_null(value: Any) -> Any:
+    return _INVALID
+
+
+_TYPES: Dict[str, Tuple[Callable[[Any], bool], Callable[[Any], Any]]] = {
+    "string": (_is_string, _to_string),
+    "integer": (_is_integer, _to_integer),
+    "number": (_is_number, _to_number),
+    "boolean": (_is_boolean, _to_boolean),
+    "array": (_is_array, _to_array),
+    "object": (_is_object, _to_object),
+    "null": (_is_null, _to_null),
+}
+
+
+def _compile_type(types: List[str]) -> Check:
+    """Check (and coerce to) one of the given JSON types.
+    检查（并转换为）给定JSON类型之一"""
+    unknown = [name for name in types if name not in _TYPES]
+    if unknown:
+        raise ValueError(f"Unknown JSON type(s) in schema: {', '.join(unknown)}")
+    tests = tuple(_TYPES[name][0] for name in types)
+    coercions = tuple(_TYPES[name][1] for name in types)
+    expected = " or ".join(types)
+
+    def check_type(value: Any, path: str, errors: List[Dict[str, Any]]) -> Any:
+        for test in tests:
+            if test(value):
+                return value
+        for coerce in coercions:
+            coerced = coerce(value)
+            if coerced is not _INVALID:
+                return coerced
+        errors.append({"path": path, "message": f"expected {expected}, got {_type_name(value)}"})
+        return _INVALID
+    return check_type
+
+
+def _compile_constraints(schema: Dict[str, Any]) -> List[Check]:
+    """Checks for enum and the numeric, string and array bounds of a schema.
+    模式中enum以及数值、字符串、数组范围的检查"""
+    checks: List[Check] = []
+
+    if "enum" in schema:
+        allowed = list(schema["enum"])
+
+        def check_enum(value: Any, path: str, errors: List[Dict[str, Any]]) -> Any:
+            if value not in allowed:
+                errors.append({"path": path, "message": f"must be one of {allowed}, got {value!r}"})
+                return _INVALID
+            return value
+        checks.append(check_enum)
+
+    bounds = [
+        (keyword, limit, test) for keyword, test in (
+            ("minimum", lambda value, limit: value >= limit),
+            ("maximum", lambda value, limit: value <= limit),
+            ("exclusiveMinimum", lambda value, limit: value > limit),
+            ("exclusiveMaximum", lambda value, limit: value < limit),
+        )
+        for limit in (schema.get(keyword),)
+        if type(limit) in (int, float)
+    ]
+    if bounds:
+        def check_bounds(value: Any, path: str, errors: List[Dict[str, Any]]) -> Any:
+            if type(value) in (int, float):
+                for keyword, limit, test in bounds:
+                    if not test(value, limit):
+                        errors.append({"path": path, "message": f"must satisfy {keyword} {limit}, got {value}"})
+                        return _INVALID
+            return value
+        checks.append(check_bounds)
+
+    for keyword, kind, longer in (("minLength", str, False), ("maxLength", str, True),
+                                  ("minItems", list, False), ("maxItems", list, True)):
+        limit = schema.get(keyword)
+        if type(limit) is not int:
+            continue
+
+        def check_length(value: Any, path: str, errors: List[Dict[str, Any]],
+                         keyword: str = keyword, kind: type = kind, limit: int = limit,
+                         longer: bool = longer) -> Any:
+            if type(value) is kind and (len(value) > limit if longer else len(value) < limit):
+                errors.append({"path": path, "message": f"length must satisfy {keyword} {limit}, got {len(value)}"})
+                return _INVALID
+            return value
+        checks.append(check_length)
+
+    if "pattern" in schema:
+        pattern = re.compile(schema["pattern"])
+
+        def check_pattern(value: Any, path: str, errors: List[Dict[str, Any]]) -> Any:
+            if type(value) is str and pattern.search(value) is None:
+                errors.append({"path": path, "message": f"must match pattern {pattern.pattern!r}"})
+                return _INVALID
+            return value
+        checks.append(check_pattern)
+
+    return checks
+
+
+def _compile_items(schema: Dict[str, Any]) -> Optional[Check]:
+    """Check every item of an array.
+    检查数组中的每一项"""
+    items = schema.get("items")
+    if not isinstance(items, dict):
+        return None
+    check_item = _compile(items)
+
+    def check_items(value: Any, path: str, errors: List[Dict[str, Any]]) -> Any:
+        if type(value) is not list:
+            return value
+        checked = value
+        for index, item in enumerate(value):
+            result = check_item(item, f"{path}[{index}]", errors)
+            if result is not item and result is not _INVALID:
+                if checked is value:
+                    checked = list(value)
+                checked[index] = result
+        return checked
+    return check_items
+
+
+def _compile_properties(schema: Dict[str, Any]) -> Optional[Check]:
+    """Check required, declared and additional properties of an object.
+    检查对象的必需属性、已声明属性和额外属性"""
+    properties = {name: _compile(subschema) for name, subschema in (schema.get("properties") or {}).items()}
+    required = tuple(schema.get("required") or ())
+    additional = schema.get("additionalProperties", True)
+    check_additional = _compile(additional) if isinstance(additional, dict) else None
+    if not properties and not required and additional is True:
+        return None
+
+    def check_properties(value: Any, path: str, errors: List[Dict[str, Any]]) -> Any:
+        if type(value) is not dict:
+            return value
+        prefix = f"{path}." if path else ""
+        for name in required:
+            if name not in value:
+                errors.append({"path": prefix + name, "message": "required property is missing"})
+        checked = value
+        for name, item in value.items():
+            check = properties.get(name)
+            if check is None:
+                if additional is False:
+                    errors.append({"path": prefix + name, "message": "unexpected property"})
+                    continue
+                if check_additional is None:
+                    continue
+                check = check_additional
+            result = check(item, prefix + name, errors)
+            if result is not item and result is not _INVALID:
+                if checked is value:
+                    checked = dict(value)
+                checked[name] = result
+        return checked
+    return check_properties
+
+
+def _compile(schema: Dict[str, Any]) -> Check:
+    """
+    Compile a schema into one check function.
+    将模式编译为一个检查函数
+    """
+    checks: List[Check] = []
+    declared = schema.get("type")
+    if declared is not None:
+        checks.append(_compile_type([declared] if isinstance(declared, str) else list(declared)))
+    checks.extend(_compile_constraints(schema))
+    for compile_part in (_compile_items, _compile_properties):
+        check = compile_part(schema)
+        if check is not None:
+            checks.append(check)
+
+    if not checks:
+        return lambda value, path, errors: value
+    if len(checks) == 1:
+        return checks[0]
+
+    def check_all(value: Any, path: str, errors: List[Dict[str, Any]]) -> Any:
+        for check in checks:
+            value = check(value, path, errors)
+            if value is _INVALID:
+                break
+        return value
+    return check_all
+
+
+class ArgumentValidator:
+    """
+    Compiled validator for the arguments of one tool.
+    某个工具参数的已编译校验器
+
+    Tools that take a single `parameters` dict (e.g. the school system tools)
+    describe the fields of that dict in their schema; calls shaped as
+    {"parameters": {...}} are checked on the inner dict.
+    只接收一个parameters字典的工具（例如学校系统工具）在模式中描述的是该字典的字段；
+    形如{"parameters": {...}}的调用会检查内部字典。
+    """
+
+    __slots__ = ("tool_name", "schema", "_check", "_wrapped")
+
+    def __init__(self, tool_name: str, schema: Dict[str, Any]):
+        """
+        Compile the schema.
+        编译模式
+
+        Args:
+            tool_name: Name of the tool, used in errors
+                   工具名称，用于错误信息
+            schema: JSON-schema of the tool's parameters
+                工具参数的JSON模式
+
+        Raises:
+            ValueError: The schema uses an unknown type
+                    模式使用了未知类型
+        """
+        self.tool_name = tool_name
+        self.schema = schema
+        self._check = _compile(schema)
+        self._wrapped = "parameters" not in (schema.get("properties") or {})
+
+    def __call__(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Check and coerce call arguments.
+        检查并转换调用参数
+
+        Args:
+            arguments: Arguments of the call
+                   调用参数
+
+        Returns:
+            The arguments, or a coerced copy (the input is never modified)
+            参数本身，或转换后的副本（不会修改输入）
+
+        Raises:
+            ToolArgumentError: The arguments do not match the schema
+                           参数与模式不匹配
+        """
+        errors: List[Dict[str, Any]] = []
+        nested = arguments.get("parameters") if type(arguments) is dict else None
+        if self._wrapped and len(arguments) == 1 and isinstance(nested, dict):
+            checked = self._check(nested, "parameters", errors)
+            if checked is not nested and checked is not _INVALID:
+                arguments = {"parameters": checked}
+        else:
+            checked = self._check(arguments, "", errors)
+            if checked is not _INVALID:
+                arguments = checked
+        if errors:
+            for error in errors:
+                error["path"] = error["path"] or "(arguments)"
+            raise ToolArgumentError(self.tool_name, errors)
+        return arguments
+
+    def __repr__(self) -> str:
+        return f"ArgumentValidator({self.tool_name!r})"
+
+
+def compile_validator(tool: Callable, schema: Optional[Dict[str, Any]] = None) -> ArgumentValidator:
+    """
+    Compile the argument validator of a tool.
+    编译工具的参数校验器
+
+    Args:
+        tool: Tool with name and (optionally) parameters
+          带有name和（可选）parameters的工具
+        schema: Parameter schema to use instead of tool.parameters
+            用于替代tool.parameters的参数模式
+    """
+    if schema is None:
+        schema = getattr(tool, "parameters", None) or {"type": "object"}
+    return ArgumentValidator(tool.name, schema)
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+测试脚本：验证Agent-Camel V2任务协调器
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'agent-camel-v2'))
+
+import threading
+import time
+
+from agents.base import AgentProfile, BaseAgent
+from agents.capability_index import CapabilityIndex
+from agents.coordinator import TaskCoordinator, TravelPlannerAgent
+from agents.model_provider import ModelProvider, ModelProviderFactory
+from agents.scheduler import TaskGraph
+from agents.selection import AgentLoad, PowerOfTwoChoicesPolicy, SessionAffinityPolicy, make_policy
+
+
+class SleepyProvider(ModelProvider):
+    """按提示中的标记休眠的离线模型：含"slow"的任务很慢，含"broken"的任务报错"""
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def generate(self, prompt, **kwargs):
+        with SleepyProvider.lock:
+            SleepyProvider.active += 1
+            SleepyProvider.peak = max(SleepyProvider.peak, SleepyProvider.active)
+        try:
+            if "broken" in prompt:
+                raise RuntimeError("model unavailable")
+            time.sleep(1.0 if "slow" in prompt else 0.1)
+            return f"plan: {prompt[-20:]}"
+        finally:
+            with SleepyProvider.lock:
+                SleepyProvider.active -= 1
+
+
+ModelProviderFactory.register_provider("sleepy", SleepyProvider)
+ModelProviderFactory.register_provider("sleepy_backup", SleepyProvider)
+
+
+def _coordinator():
+    coordinator = TaskCoordinator()
+    coordinator.register_agent("planner_1", "travel_planner", ["destination_recommendation"], "sleepy")
+    coordinator.register_agent("guide_1", "local_guide", ["local_knowledge"], "sleepy")
+    coordinator.register_agent("budget_1", "budget_advisor", ["cost_estimation"], "sleepy")
+    return coordinator
+
+
+def _task(task_type, description, **extra):
+    return {"type": task_type, "description": description, **extra}
+
+
+class CountingAgent(BaseAgent):
+    """记录角色特有工具注册次数的测试Agent"""
+    __slots__ = ()
+    registrations = 0
+
+    def _register_role_specific_tools(self):
+        CountingAgent.registrations += 1
+
+    def process_message(self, message, session_id):
+        return {"content": message["content"]}
+
+    def plan_next_action(self, message, session_id):
+        return {}
+
+    def execute_plan(self, plan, session_id):
+        return {}
+
+
+def test_agents_share_profiles_and_create_state_lazily():
+    """测试同类Agent共享配置，角色工具每个配置只注册一次，状态和记忆在首次访问时才创建"""
+    print("🔍 测试Agent共享配置与延迟状态...")
+    AgentProfile.clear()
+    CountingAgent.registrations = 0
+    first, second = CountingAgent("count_1", "计数", "sleepy"), CountingAgent("count_2", "计数", "sleepy")
+    assert first._profile is second._profile and first.tools is second.tools and first.model is second.model
+    assert CountingAgent.registrations == 1
+    # 不同的模型提供商使用另一个配置
+    other = CountingAgent("count_3", "计数", "sleepy_backup")
+    assert other._profile is not first._profile and CountingAgent.registrations == 2
+    # 不同的Agent类也使用另一个配置
+    planner = TravelPlannerAgent("planner_lazy", "sleepy")
+    assert planner._profile is not first._profile
+
+    assert not first.has_state and first._state is None
+    memory = first.memory
+    assert first.has_state and first.memory is memory and not second.has_state
+    assert memory is not second.memory and second.has_state
+    # 只有槽位，没有逐实例的__dict__
+    assert not hasattr(first, "__dict__") and not hasattr(planner, "__dict__")
+    print("  ✅ Agent共享配置与延迟状态测试通过")
+
+
+def test_independent_tasks_run_concurrently():
+    """测试不同Agent的任务并发执行，结果按输入顺序返回"""
+    print("🔍 测试并发执行任务...")
+    coordinator = _coordinator()
+    SleepyProvider.peak = 0
+    tasks = [("planner_1", _task("destination_planning", "规划京都行程")),
+             ("guide_1", _task("local_guidance", "介绍京都美食")),
+             ("budget_1", _task("budget_planning", "估算京都预算"))]
+    started = time.monotonic()
+    results = coordinator.execute_tasks(tasks, "concurrent")
+    assert time.monotonic() - started < 0.25, "three 0.1s tasks should overlap"
+    assert SleepyProvider.peak == 3
+    assert [result["task_type"] for result in results] == ["destination_planning", "local_guidance", "budget_planning"]
+    assert all(result["status"] == "completed" and result["result"] for result in results)
+    assert [result["agent_id"] for result in results] == ["planner_1", "guide_1", "budget_1"]
+    print("  ✅ 并发执行任务测试通过")
+
+
+def test_tasks_on_one_agent_run_in_order():
+    """测试同一Agent的任务依次执行，会话上下文按顺序记录"""
+    print("🔍 测试同一Agent任务串行...")
+    coordinator = _coordinator()
+    SleepyProvider.peak = 0
+    tasks = [("planner_1", _task("destination_planning", f"第{i}个问题")) for i in range(3)]
+    results = coordinator.execute_tasks(tasks, "serial")
+    assert SleepyProvider.peak == 1
+    assert all(result["status"] == "completed" for result in results)
+    context = coordinator.agents["planner_1"].memory.get_context("serial")
+    user_messages = [message["content"] for message in context if message["role"] == "user"]
+    assert len(user_messages) == 3
+    print("  ✅ 同一Agent任务串行测试通过")
+
+
+def test_timeouts_and_failures_return_partial_results():
+    """测试超时和失败的任务不影响其他任务，返回部分结果"""
+    print("🔍 测试超时与部分结果...")
+    coordinator = _coordinator()
+    tasks = [("planner_1", _task("destination_planning", "规划行程")),
+             ("guide_1", _task("local_guidance", "slow guide", timeout=0.3)),
+             ("budget_1", _task("budget_planning", "broken budget")),
+             ("missing", _task("budget_planning", "无此Agent"))]
+    started = time.monotonic()
+    results = coordinator.execute_tasks(tasks, "partial", timeout=5)
+    assert time.monotonic() - started < 0.8, "the slow task must not hold up the call"
+    assert [result["status"] for result in results] == ["completed", "timeout", "failed", "failed"]
+    assert "result" not in results[1] and "timed out" in results[1]["error"]
+    assert "missing" in results[3]["error"]
+    print("  ✅ 超时与部分结果测试通过")
+
+
+def test_task_graph_runs_ready_tasks_with_upstream_results():
+    """测试DAG调度：就绪任务并发执行，上游结果传入下游提示，失败的上游使下游被跳过"""
+    print("🔍 测试DAG任务调度...")
+    coordinator = _coordinator()
+    tasks = coordinator.analyze_request("京都五日游")["tasks"]
+    for task, agent_id in zip(tasks, ["planner_1", "guide_1", "budget_1"]):
+        task["agent_id"] = agent_id
+    run = coordinator.execute_graph(tasks, "graph")
+    assert list(run["results"]) == ["destination_planning", "local_guidance", "budget_planning"]
+    assert all(result["status"] == "completed" for result in run["results"].values())
+    assert run["critical_path"][0] == "destination_planning"
+    timeline = {entry["task_id"]: entry for entry in run["timeline"]}
+    first = timeline["destination_planning"]
+    assert timeline["local_guidance"]["start"] >= first["end"] and timeline["budget_planning"]["start"] >= first["end"]
+    # 两个下游任务并发执行
+    assert abs(timeline["local_guidance"]["start"] - timeline["budget_planning"]["start"]) < 0.05
+    assert run["elapsed"] < 0.35
+    prompt = coordinator.agents["guide_1"].memory.get_context("graph")[0]["content"]
+    assert "[destination_planning]" in prompt and run["results"]["destination_planning"]["result"] in prompt
+    assert set(coordinator.task_durations) == {"destination_planning", "local_guidance", "budget_planning"}
+
+    # 上游失败时下游被跳过，其余分支照常完成
+    run = coordinator.execute_graph([
+        {"id": "a", "type": "a", "description": "broken", "agent_id": "planner_1"},
+        {"id": "b", "type": "b", "description": "下游", "inputs": ["a"], "agent_id": "guide_1"},
+        {"id": "c", "type": "c", "description": "再下游", "inputs": ["b"], "agent_id": "guide_1"},
+        {"id": "d", "type": "d", "description": "独立", "agent_id": "budget_1"},
+    ], "failing")
+    assert [result["status"] for result in run["results"].values()] == ["failed", "skipped", "skipped", "completed"]
+
+    for bad in ([{"id": "x", "inputs": ["y"]}, {"id": "y", "inputs": ["x"]}], [{"id": "x", "inputs": ["z"]}]):
+        try:
+            TaskGraph(bad)
+            assert False
+        except ValueError:
+            pass
+    print("  ✅ DAG任务调度测试通过")
+
+
+def test_critical_path_runs_first():
+    """测试并发受限时关键路径上的任务优先执行"""
+    print("🔍 测试关键路径优先...")
+    graph = TaskGraph([{"id": "side", "estimate": 2}, {"id": "head", "estimate": 1},
+                       {"id": "tail", "estimate": 2, "inputs": ["head"]}])
+    assert graph.critical_path() == ["head", "tail"] and graph.rank["head"] == 3
+
+    coordinator = _coordinator()
+    tasks = [{"id": "side", "type": "side", "description": "旁支", "agent_id": "budget_1"},
+             {"id": "head", "type": "head", "description": "链首", "agent_id": "planner_1"},
+             {"id": "tail", "type": "tail", "description": "链尾", "inputs": ["head"], "agent_id": "guide_1"}]
+    run = coordinator.execute_graph(tasks, "critical", max_concurrency=1)
+    # 先到先服务会先执行旁支；关键路径优先则先执行链首
+    assert run["timeline"][0]["task_id"] == "head"
+    assert run["timeline"][1]["start"] >= run["timeline"][0]["end"]
+    print("  ✅ 关键路径优先测试通过")
+
+
+def test_agents_are_found_by_capability():
+    """测试能力倒排索引：所需能力取交集，按权重排序，任务分配给对应的专家"""
+    print("🔍 测试能力索引...")
+    index = CapabilityIndex()
+    index.add("generalist", ["itinerary_planning", "local_knowledge", "cost_estimation"])
+    index.add("kyoto_expert", {"local_knowledge": 2.0, "itinerary_planning": 1.5})
+    index.add("accountant", {"cost_estimation": 1.8})
+    assert index.match(["local_knowledge", "itinerary_planning"]) == [("kyoto_expert", 3.5), ("generalist", 2.0)]
+    assert index.match(["cost_estimation", "local_knowledge"]) == [("generalist", 2.0)]
+    assert index.match(["cost_estimation", "translation"]) == []
+    # 优选能力只影响排序，不影响是否匹配
+    assert [agent for agent, _ in index.match(["cost_estimation"])] == ["accountant", "generalist"]
+    assert [agent for agent, _ in index.match(["cost_estimation"], ["local_knowledge"])] == ["generalist", "accountant"]
+    assert [agent for agent, _ in index.match(preferred=["cost_estimation"])] == ["accountant", "generalist", "kyoto_expert"]
+    assert [agent for agent, _ in index.match()] == ["generalist", "kyoto_expert", "accountant"]
+    # 重新注册会替换旧能力，缓存的排序随之失效
+    index.add("accountant", {"cost_estimation": 0.5})
+    assert [agent for agent, _ in index.match(["cost_estimation"])] == ["generalist", "accountant"]
+    index.remove("generalist")
+    assert index.match(["cost_estimation", "local_knowledge"]) == []
+    assert index.stats() == {"agents": 2, "capabilities": 3, "postings": 3}
+
+    # 旅行请求的三个任务分别分配给具备对应能力的Agent，因此并发执行
+    coordinator = _coordinator()
+    tasks = coordinator.analyze_request("京都五日游")["tasks"]
+    assert [coordinator.assign_task(task, task["requirements"]) for task in tasks] == ["planner_1", "guide_1", "budget_1"]
+    assert coordinator.assign_task({"type": "translation"}, {"capabilities": ["translation"]}) is None
+    run = coordinator.execute_graph(tasks, "discovery")
+    assert [result["agent_id"] for result in run["results"].values()] == ["planner_1", "guide_1", "budget_1"]
+    assert run["elapsed"] < 0.35
+    print("  ✅ 能力索引测试通过")
+
+
+def test_agents_are_selected_by_load():
+    """测试负载感知选择：同能力副本分摊任务，会话亲和在负载失衡时迁移"""
+    print("🔍 测试负载感知选择...")
+    replicas = ["planner_1", "planner_2", "planner_3"]
+    requirements = {"capabilities": ["destination_recommendation"]}
+
+    def replicated(policy):
+        coordinator = TaskCoordinator(selection_policy=policy)
+        for agent_id in replicas:
+            coordinator.register_agent(agent_id, "travel_planner", ["destination_recommendation"], "sleepy")
+        return coordinator
+
+    # 旧行为总是选能力最匹配的第一个；最少未完成任务则按分配时的预留轮流分摊
+    coordinator = replicated("first")
+    assert [coordinator.assign_task({"type": "plan"}, requirements) for _ in range(3)] == ["planner_1"] * 3
+    coordinator = replicated("least_outstanding")
+    assert [coordinator.assign_task({"type": "plan"}, requirements) for _ in range(4)] == replicas + ["planner_1"]
+    assert coordinator.load.in_flight("planner_1") == 2
+
+    # 同一能力的任务分散到各副本并发执行，完成后负载清零并记录耗时
+    coordinator = replicated(None)
+    assert coordinator.selection_policy.name == "least_outstanding"
+    run = coordinator.execute_graph([{"id": f"plan_{i}", "type": "plan", "description": f"第{i}个行程",
+                                      "requirements": requirements} for i in range(3)], "replicas")
+    assert sorted(result["agent_id"] for result in run["results"].values()) == replicas
+    assert run["elapsed"] < 0.25
+    stats = coordinator.load.stats()
+    assert all(stats[agent_id]["in_flight"] == 0 and stats[agent_id]["completed"] == 1 for agent_id in replicas)
+    assert all(0.05 < stats[agent_id]["ewma_latency"] < 0.5 for agent_id in replicas)
+
+    # 两个随机候选中选负载较低的一个
+    load = AgentLoad()
+    for _ in range(3):
+        load.reserve("busy")
+    policy = PowerOfTwoChoicesPolicy(seed=0)
+    assert all(policy.select(["busy", "idle"], load) == "idle" for _ in range(10))
+    load.begin("busy")
+    load.release("busy")
+    assert load.in_flight("busy") == 2
+
+    # 会话留在原Agent上，直到其比备选Agent多出max_imbalance个以上的未完成任务
+    load = AgentLoad()
+    affinity = SessionAffinityPolicy(fallback=make_policy("least_outstanding"), max_imbalance=1)
+    assert affinity.select(replicas, load, "s1") == "planner_1"
+    load.reserve("planner_1")
+    assert affinity.select(replicas, load, "s1") == "planner_1"
+    load.reserve("planner_1")
+    assert affinity.select(replicas, load, "s1") == "planner_2"
+    assert affinity.select(replicas, load, "s2") == "planner_2"
+
+    try:
+        make_policy("round_robin")
+        assert False
+    except ValueError:
+        pass
+    print("  ✅ 负载感知选择测试通过")
+
+
+def main():
+    """主测试函数"""
+    print("=" * 60)
+    print("🎯 任务协调器测试")
+    print("=" * 60)
+    test_agents_share_profiles_and_create_state_lazily()
+    test_independent_tasks_run_concurrently()
+    test_tasks_on_one_agent_run_in_order()
+    test_timeouts_and_failures_return_partial_results()
+    test_task_graph_runs_ready_tasks_with_upstream_results()
+    test_critical_path_runs_first()
+    test_agents_are_found_by_capability()
+    test_agents_are_selected_by_load()
+    print("\n🎉 所有测试通过！")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,629 @@
+#!/usr/bin/env python3
+"""
+测试脚本：验证Agent-Camel V2记忆管理器
+"""
+import gc
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'agent-camel-v2'))
+
+from memory.context_buffer import ContextBuffer
+from memory.manager import MemoryManager
+from memory import redis_manager
+from memory.redis_manager import InMemoryRedis, RedisMemoryManager
+from memory.retrieval import RetrievalMemory
+from memory.cold_store import ColdBlockFile, TieredHistory
+from memory.message_store import MessageStore
+from memory.records import Interaction, Message
+from memory.snapshot import SnapshotReader, persist_retrieval, save_snapshot
+from memory.accounting import MemoryAccountant
+from memory.storage import SQLiteMemoryStore
+from config.settings import settings
+from memory.summarizer import ContextSummarizer, estimate_tokens
+
+
+def _message(i, content=None):
+    return {"role": "user", "content": content if content is not None else f"消息{i}"}
+
+
+def test_context_buffer_evicts_oldest():
+    """测试环形缓冲区按消息数淘汰最旧消息"""
+    print("🔍 测试环形缓冲区按消息数淘汰...")
+    buffer = ContextBuffer(max_messages=3)
+    for i in range(5):
+        buffer.append(_message(i))
+    assert len(buffer) == 3
+    assert buffer.evicted == 2
+    assert [m["content"] for m in buffer.window()] == ["消息2", "消息3", "消息4"]
+    print("  ✅ 按消息数淘汰测试通过")
+
+
+def test_context_buffer_byte_limit():
+    """测试环形缓冲区按字节数淘汰，并始终保留最新消息"""
+    print("🔍 测试环形缓冲区按字节数淘汰...")
+    # 每条消息的字节数包含角色"user"的4个字节
+    buffer = ContextBuffer(max_messages=100, max_bytes=20)
+    buffer.append(_message(0, "a" * 4))
+    buffer.append(_message(1, "b" * 4))
+    evicted = buffer.append(_message(2, "c" * 4))
+    assert [m["content"] for m in evicted] == ["aaaa"]
+    assert buffer.total_bytes == 16
+    buffer.append(_message(3, "d" * 50))
+    assert len(buffer) == 1 and buffer.total_bytes == 54
+    print("  ✅ 按字节数淘汰测试通过")
+
+
+def test_context_view_is_zero_copy_window():
+    """测试上下文视图支持切片且不复制数据"""
+    print("🔍 测试上下文视图...")
+    buffer = ContextBuffer(max_messages=4)
+    for i in range(4):
+        buffer.append(_message(i))
+    view = buffer.window(2)
+    assert view == [_message(2), _message(3)]
+    assert view[-1] is buffer.window()[3]
+    assert view[1:] == [_message(3)]
+    buffer.append(_message(4))
+    # 视图按绝对位置寻址，追加后仍指向原来的消息
+    assert view[0] == _message(2)
+    for _ in range(3):
+        buffer.append(_message(5))
+    try:
+        view[0]
+        assert False, "evicted message should not be readable"
+    except IndexError:
+        pass
+    print("  ✅ 上下文视图测试通过")
+
+
+def test_memory_manager_context_window():
+    """测试记忆管理器使用有界上下文"""
+    print("🔍 测试记忆管理器上下文...")
+    memory = MemoryManager("test_agent", max_context_messages=5)
+    for i in range(12):
+        memory.update_context("s1", _message(i))
+    context = memory.get_context("s1")
+    assert len(context) == 5
+    assert context[0]["content"] == "消息7"
+    assert len(memory.get_context("s1", last=2)) == 2
+    assert len(memory.get_context("unknown")) == 0
+    memory.compress_context("s1")
+    assert len(memory.get_context("s1")) == 5
+    print("  ✅ 记忆管理器上下文测试通过")
+
+
+def test_idle_sessions_are_evicted_with_callback():
+    """测试空闲会话按TTL淘汰并触发回调"""
+    print("🔍 测试会话空闲淘汰...")
+    now = [0.0]
+    spilled = {}
+    memory = MemoryManager("test_agent", idle_ttl=60, on_evict=lambda sid, data: spilled.update({sid: data}))
+    memory.sessions.clock = lambda: now[0]
+    memory.update_context("old", _message(0))
+    memory.store_interaction("old", _message(0), _message(1), {"action": "respond"})
+    now[0] = 30
+    memory.update_context("recent", _message(2))
+    now[0] = 90
+    memory.update_context("recent", _message(3))
+    assert "old" not in memory.contexts and "old" not in memory.interactions
+    assert "recent" in memory.contexts
+    assert spilled["old"]["context"] == [_message(0)]
+    assert len(spilled["old"]["interactions"]) == 1
+    print("  ✅ 会话空闲淘汰测试通过")
+
+
+def test_sessions_evicted_by_count_and_bytes():
+    """测试按会话数和总字节数进行LRU淘汰"""
+    print("🔍 测试会话数和字节数淘汰...")
+    memory = MemoryManager("test_agent", max_sessions=2)
+    for session_id in ("a", "b"):
+        memory.update_context(session_id, _message(0))
+    memory.get_context("a")  # 访问a，使b成为最久未使用的会话
+    memory.update_context("c", _message(1))
+    assert set(memory.contexts) == {"a", "c"}
+
+    memory = MemoryManager("test_agent", max_total_bytes=30)
+    memory.update_context("a", _message(0, "x" * 10))
+    memory.update_context("b", _message(1, "y" * 10))
+    assert memory.sessions.total_bytes == 28
+    memory.update_context("c", _message(2, "z" * 10))
+    assert set(memory.contexts) == {"b", "c"}
+    assert memory.sessions.total_bytes == 28
+    print("  ✅ 会话数和字节数淘汰测试通过")
+
+
+def test_sessions_persist_and_load_lazily():
+    """测试会话持久化以及重启后的延迟加载"""
+    print("🔍 测试持久化存储...")
+    path = os.path.join(tempfile.mkdtemp(), "memory.db")
+    memory = MemoryManager("test_agent", storage_path=path, max_context_messages=3)
+    for i in range(5):
+        memory.update_context("s1", _message(i))
+    memory.store_interaction("s1", _message(0), _message(1), {"action": "respond"})
+    memory.save_to_storage()
+    memory.store.close()
+
+    # 模拟重启：构造时不加载任何会话
+    restarted = MemoryManager("test_agent", storage_path=path, max_context_messages=3)
+    assert restarted.contexts == {} and restarted.interactions == {}
+    assert [m["content"] for m in restarted.get_context("s1")] == ["消息2", "消息3", "消息4"]
+    assert len(restarted.get_interaction_history("s1")) == 1
+    assert len(restarted.get_context("missing")) == 0
+
+    # 淘汰后再次访问会重新从存储加载
+    restarted.evict_session("s1")
+    assert len(restarted.get_interaction_history("s1")) == 1
+    restarted.store.compact()
+    assert restarted.store.load_context("test_agent", "s1", 100) == [_message(2), _message(3), _message(4)]
+
+    # 共享同一存储的Agent各自保留自己的上下文窗口
+    wide = MemoryManager("wide_agent", storage_path=path, max_context_messages=5)
+    assert wide.store is restarted.store
+    for i in range(8):
+        wide.update_context("s1", _message(i))
+        restarted.update_context("s2", _message(i))
+    restarted.store.compact()
+    assert len(restarted.store.load_context("wide_agent", "s1", 100)) == 5
+    assert len(restarted.store.load_context("test_agent", "s2", 100)) == 3
+    restarted.store.close()
+    print("  ✅ 持久化存储测试通过")
+
+
+def test_redis_backend_shares_sessions_between_workers():
+    """测试Redis后端在多个工作进程间共享会话，并批量发送写操作"""
+    print("🔍 测试Redis记忆后端...")
+    now = [0.0]
+    client = InMemoryRedis(clock=lambda: now[0])
+    worker_a = RedisMemoryManager("agent", client=client, batch_size=10,
+                                  max_context_messages=3, idle_ttl=60)
+    worker_b = RedisMemoryManager("agent", client=client, max_context_messages=3, idle_ttl=60)
+    for i in range(5):
+        worker_a.update_context("s1", _message(i))
+    worker_a.store_interaction("s1", _message(0), _message(1), {"action": "respond"})
+    assert client.round_trips == 0  # 写操作仍在管道中排队
+    worker_a.flush()
+    assert client.round_trips == 1
+    assert [m["content"] for m in worker_b.get_context("s1")] == ["消息2", "消息3", "消息4"]
+    assert worker_b.get_context("s1", last=1) == [_message(4)]
+    assert len(worker_b.get_interaction_history("s1")) == 1
+    now[0] = 61
+    assert worker_b.get_context("s1") == []
+
+    # 默认每次写入在返回前发送，另一个工作进程无需等待即可看到
+    worker_c = RedisMemoryManager("agent", client=client, idle_ttl=60)
+    trips = client.round_trips
+    worker_c.update_context("s2", _message(0))
+    worker_c.store_interaction("s2", _message(0), _message(1), {"action": "respond"})
+    worker_c.update_context("s2", _message(1))
+    assert client.round_trips == trips + 3
+    assert len(worker_b.get_context("s2")) == 2 and len(worker_b.get_interaction_history("s2")) == 1
+    # 批量模式下积压的写操作在解释器退出时刷新
+    worker_a.update_context("s3", _message(0))
+    assert worker_b.get_context("s3") == []
+    redis_manager._flush_on_shutdown()
+    assert worker_b.get_context("s3") == [_message(0)]
+    print("  ✅ Redis记忆后端测试通过")
+
+
+def test_evicted_context_is_summarized_in_background():
+    """测试移出窗口的上下文在后台被合并进滚动摘要，且每条消息只摘要一次"""
+    print("🔍 测试后台上下文摘要...")
+    seen = []
+
+    def summarize(previous, messages, budget):
+        seen.extend(m["content"] for m in messages)
+        return (previous + " " + " ".join(m["content"] for m in messages)).strip()
+
+    summarizer = ContextSummarizer(summarize, token_budget=8)
+    memory = MemoryManager("test_agent", max_context_messages=2, summarizer=summarizer)
+    for i in range(6):
+        memory.update_context("s1", _message(i))
+    summarizer.drain()
+    assert seen == ["消息0", "消息1", "消息2", "消息3"]
+    assert estimate_tokens(memory.get_summary("s1")) <= 8
+
+    context = memory.get_context("s1")
+    assert len(context) == 3
+    assert context[0]["role"] == "system" and context.summary == memory.get_summary("s1")
+    assert list(context.recent) == [_message(4), _message(5)]
+    assert context[-2:] == [_message(4), _message(5)]
+    summarizer.stop()
+    print("  ✅ 后台上下文摘要测试通过")
+
+
+def test_relevant_messages_are_retrieved():
+    """测试检索记忆把窗口之外的相关历史消息加入上下文，并可持久化"""
+    print("🔍 测试向量检索记忆...")
+    topics = ["我想去北京看故宫", "预算大概五千元", "喜欢吃四川火锅", "周末去爬山", "需要订酒店"]
+    with tempfile.TemporaryDirectory() as tmp:
+        retrieval = RetrievalMemory("test_agent", dim=128, persist_dir=tmp)
+        memory = MemoryManager("test_agent", max_context_messages=2, retrieval=retrieval)
+        for i, topic in enumerate(topics):
+            message = _message(i, topic)
+            memory.update_context("s1", message)
+            memory.store_interaction("s1", message, {"role": "assistant", "content": f"好的{i}"}, {})
+
+        context = memory.get_context("s1", query="故宫门票怎么买", top_k=1)
+        assert context.relevant[0]["content"] == "我想去北京看故宫"
+        assert list(context.recent) == [_message(3, topics[3]), _message(4, topics[4])]
+        assert context[-2:] == list(context.recent)
+
+        # 已在最近窗口中的消息不会重复出现
+        context = memory.get_context("s1", query="需要订酒店吗", top_k=1)
+        assert "需要订酒店" not in [m["content"] for m in context.relevant]
+
+        memory.evict_session("s1")
+        reloaded = RetrievalMemory("test_agent", dim=128, persist_dir=tmp)
+        assert reloaded.search("s1", "四川火锅", 1)[0][1]["input"]["content"] == "喜欢吃四川火锅"
+
+        # 仍存活的会话在保存、快照和退出时持久化，而不仅在淘汰时
+        def persisted(session_id):
+            return len(RetrievalMemory("test_agent", dim=128, persist_dir=tmp).search(session_id, "行程", 10))
+        memory.store_interaction("s2", _message(0, "去西安"), _message(1, "好的"), {})
+        assert persisted("s2") == 0
+        memory.save_to_storage()
+        assert persisted("s2") == 1
+        memory.store_interaction("s2", _message(2, "看兵马俑"), _message(3, "好的"), {})
+        save_snapshot(os.path.join(tmp, "memory.snapshot"), managers=[memory])
+        assert persisted("s2") == 2
+        memory.store_interaction("s3", _message(4, "去成都"), _message(5, "好的"), {})
+        persist_retrieval()  # 解释器退出时执行
+        assert persisted("s3") == 1
+    print("  ✅ 向量检索记忆测试通过")
+
+
+def test_old_interactions_move_to_cold_tier():
+    """测试较早的交互被压缩进冷层，且仍可随机访问"""
+    print("🔍 测试交互历史冷层...")
+    history = TieredHistory(ColdBlockFile(), hot_limit=3, block_size=4)
+    interactions = [{"input": _message(i), "output": _message(i, "回复" * 50), "plan": {}} for i in range(13)]
+    spilled = []
+    for interaction in interactions:
+        history.append(interaction)
+        spilled.extend(history.spill())
+    assert spilled == interactions[:8]
+    assert history.cold_count == 8 and len(history.hot) == 5
+    assert history == interactions
+    assert history[5] == interactions[5] and history[-1] == interactions[-1]
+    assert history[2:6] == interactions[2:6]
+    assert history.cold_bytes < sum(len(str(i).encode("utf-8")) for i in interactions[:8])
+
+    # 部分释放后，已释放的块超过一半时文件会被压缩，其余历史仍可读取
+    for path in (None, os.path.join(tempfile.mkdtemp(), "cold.blocks")):
+        shared = ColdBlockFile(path, compact_min_bytes=0)
+        released = TieredHistory(shared, hot_limit=0, block_size=4)
+        kept = TieredHistory(shared, hot_limit=0, block_size=4)
+        for interaction in interactions[:12]:
+            released.append(interaction)
+            released.spill()
+        for interaction in interactions[:4]:
+            kept.append(interaction)
+            kept.spill()
+        full_size = shared.size
+        released.release()
+        assert shared.compactions >= 1 and shared.size == shared.live_bytes < full_size
+        assert kept == interactions[:4] and kept.cold_count == 4
+        kept.release()
+        assert shared.size == 0
+        shared.close()
+
+    memory = MemoryManager("test_agent", hot_interactions=2)
+    for i in range(150):
+        memory.store_interaction("s1", _message(i), _message(i, "回复" * 50), {"action": "respond"})
+    stored = memory.get_interaction_history("s1")
+    assert len(stored) == 150 and stored[0]["input"] == _message(0)
+    assert len(stored.hot) < 2 + stored.block_size
+    # 会话字节数只统计仍在内存中的热层
+    assert memory.sessions.session_bytes("s1") < 150 * 300
+    memory.evict_session("s1")
+    print("  ✅ 交互历史冷层测试通过")
+
+
+def test_messages_are_shared_across_agents():
+    """测试相同内容的消息在多个Agent之间共享同一个不可变记录"""
+    print("🔍 测试内容寻址消息存储...")
+    store = MessageStore()
+    memories = [MemoryManager(f"agent_{i}", message_store=store) for i in range(3)]
+    for memory in memories:
+        message = {"role": "user", "content": "明天的数学课改到下午"}
+        memory.update_context("s1", message)
+        memory.store_interaction("s1", message, {"content": "收到", "role": "assistant"}, {})
+        message["content"] = "调用方仍可修改自己的字典"
+
+    records = [memory.get_context("s1")[0] for memory in memories]
+    assert all(record is records[0] for record in records)
+    assert isinstance(records[0], Message) and records[0]["content"] == "明天的数学课改到下午"
+    assert memories[0].get_interaction_history("s1")[0]["input"] is records[0]
+    # 键的顺序不影响内容哈希
+    assert store.intern({"role": "assistant", "content": "收到"}) is \
+        memories[1].get_interaction_history("s1")[0]["output"]
+    assert store.stats()["records"] == 2
+
+    try:
+        records[0]["content"] = "改写"
+        assert False, "Message应当不可修改"
+    except TypeError:
+        pass
+    copy = records[0].copy()
+    copy["content"] = "副本可以修改"
+    print("  ✅ 内容寻址消息存储测试通过")
+
+
+def test_snapshot_warm_restart_replays_log_tail():
+    """测试快照热重启：会话按需恢复，只重放快照之后的日志"""
+    print("🔍 测试快照与热重启...")
+    directory = tempfile.mkdtemp()
+    db_path = os.path.join(directory, "memory.db")
+    snapshot_path = os.path.join(directory, "memory.snapshot")
+    retrieval = RetrievalMemory("snap_agent", dim=64)
+    memory = MemoryManager("snap_agent", storage_path=db_path, max_context_messages=3, retrieval=retrieval)
+    for i in range(4):
+        memory.update_context("s1", _message(i))
+        memory.store_interaction("s1", _message(i), _message(i, f"回复{i}"), {"action": "respond"})
+    memory.update_context("s2", _message(0, "另一个会话"))
+    save_snapshot(snapshot_path, managers=[memory], background=True).join()
+
+    # 快照之后写入的日志尾部
+    memory.update_context("s1", _message(4))
+    memory.store_interaction("s1", _message(4), _message(4, "回复4"), {"action": "respond"})
+    memory.store.close()
+
+    settings.MEMORY_SNAPSHOT_PATH = snapshot_path
+    try:
+        restarted = MemoryManager("snap_agent", storage_path=db_path, max_context_messages=3,
+                                  retrieval=RetrievalMemory("snap_agent", dim=64))
+        assert restarted.contexts == {} and len(restarted._snapshot) == 2
+        assert [m["content"] for m in restarted.get_context("s1")] == ["消息2", "消息3", "消息4"]
+        history = restarted.get_interaction_history("s1")
+        assert [h["output"]["content"] for h in history] == ["回复0", "回复1", "回复2", "回复3", "回复4"]
+        assert history[0]["input"] is not None and isinstance(restarted.get_context("s1")[0], Message)
+        assert restarted.retrieval.search("s1", "回复2", 1)[0][1]["output"]["content"] == "回复2"
+
+        # 未访问的会话原样带入下一次快照
+        save_snapshot(snapshot_path, managers=[restarted])
+        SnapshotReader._shared.clear()
+        again = MemoryManager("snap_agent", storage_path=db_path, max_context_messages=3)
+        assert [m["content"] for m in again.get_context("s2")] == ["另一个会话"]
+        assert len(again.get_interaction_history("s1")) == 5
+        again.store.close()
+
+        # 快照期间的并发写入只出现一次：要么在快照中，要么在日志尾部
+        racing = MemoryManager("race_agent", storage_path=db_path)
+        racing.store_interaction("r1", _message(0), _message(0, "回复0"), {})
+        log_position = racing.store.log_position
+        writers = []
+
+        def racing_log_position():
+            position = log_position()
+            writer = threading.Thread(target=racing.store_interaction,
+                                      args=("r1", _message(1), _message(1, "回复1"), {}))
+            writer.start()
+            writer.join(0.2)
+            writers.append(writer)
+            return position
+
+        racing.store.log_position = racing_log_position
+        race_path = os.path.join(directory, "race.snapshot")
+        save_snapshot(race_path, managers=[racing])
+        writers[0].join()
+        racing.store.close()
+        settings.MEMORY_SNAPSHOT_PATH = race_path
+        SnapshotReader._shared.clear()
+        restored = MemoryManager("race_agent", storage_path=db_path)
+        assert [h["output"]["content"] for h in restored.get_interaction_history("r1")] == ["回复0", "回复1"]
+        restored.store.close()
+    finally:
+        settings.MEMORY_SNAPSHOT_PATH = None
+        SnapshotReader._shared.clear()
+    print("  ✅ 快照与热重启测试通过")
+
+
+def test_global_watermark_evicts_heaviest_sessions():
+    """测试全局高水位线：跨Agent淘汰最重的会话，并列出最重的会话"""
+    print("🔍 测试全局内存统计与高水位线...")
+    accountant = MemoryAccountant(high_watermark=None, low_watermark_ratio=0.5)
+    MemoryAccountant._shared_accountant = accountant
+    try:
+        teacher = MemoryManager("teacher", max_context_messages=100)
+        student = MemoryManager("student", max_context_messages=100)
+        teacher.update_context("lesson", _message(0, "教案" * 2000))
+        student.update_context("chat", _message(0, "你好"))
+        student.update_context("homework", _message(0, "作业" * 500))
+        assert accountant.total_bytes == teacher.sessions.total_bytes + student.sessions.total_bytes
+        top = accountant.top_sessions(2)
+        assert [(row["agent_id"], row["session_id"]) for row in top] == [("teacher", "lesson"), ("student", "homework")]
+        assert top[0]["context_messages"] == 1 and top[0]["bytes"] == top[0]["context_bytes"]
+        assert student.memory_usage()["sessions"] == 2
+
+        # 超过高水位线后，写入其他会话时淘汰最重的会话
+        accountant.high_watermark = accountant.total_bytes
+        student.update_context("chat", _message(1, "再见"))
+        assert "lesson" not in teacher.contexts and accountant.evictions == 1
+        assert "chat" in student.contexts and not accountant.over_watermark()
+        assert accountant.total_bytes == teacher.sessions.total_bytes + student.sessions.total_bytes
+
+        # 被丢弃的管理器不再计入总量，也不会让高水位线一直触发
+        assert student.sessions.total_bytes > 0
+        accountant.high_watermark = teacher.sessions.total_bytes
+        del student
+        gc.collect()
+        assert accountant.stats()["agents"] == 1
+        assert accountant.total_bytes == teacher.sessions.total_bytes
+        assert not accountant.over_watermark()
+    finally:
+        MemoryAccountant._shared_accountant = None
+    print("  ✅ 全局内存统计测试通过")
+
+
+def test_interaction_pages_and_streaming_export():
+    """测试交互历史的游标分页、时间范围过滤和JSONL流式导出"""
+    print("🔍 测试交互历史分页与导出...")
+    memory = MemoryManager("pager")
+    for i in range(7):
+        memory.store_interaction("s1", _message(i), _message(i, f"回复{i}"), {"action": "respond"})
+    memory.interactions["s1"] = [Interaction(h.input, h.output, h.plan, 1000.0 + i)
+                                 for i, h in enumerate(memory.interactions["s1"])]
+    pages, cursor = [], None
+    while True:
+        page = memory.get_interaction_page("s1", cursor=cursor, limit=3)
+        pages.append([h["output"]["content"] for h in page["interactions"]])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert pages == [["回复0", "回复1", "回复2"], ["回复3", "回复4", "回复5"], ["回复6"]]
+    page = memory.get_interaction_page("s1", limit=10, since=1002.0, until=1005.0)
+    assert [h["output"]["content"] for h in page["interactions"]] == ["回复2", "回复3", "回复4"]
+    assert page["next_cursor"] is None
+
+    # SQLite：不加载会话，按批次从存储流式读取
+    path = os.path.join(tempfile.mkdtemp(), "memory.db")
+    writer = MemoryManager("exporter", storage_path=path)
+    for session in ("a", "b"):
+        for i in range(5):
+            writer.store_interaction(session, _message(i), _message(i, f"{session}{i}"), {"action": "respond"})
+    writer.store.flush()
+    reader = MemoryManager("exporter", storage_path=path)
+    streamed = list(reader.iter_interactions(batch_size=2))
+    assert [(sid, h["output"]["content"]) for sid, h in streamed][:2] == [("a", "a0"), ("a", "a1")]
+    assert len(streamed) == 10 and reader.interactions == {}
+    export_path = os.path.join(tempfile.mkdtemp(), "export.jsonl")
+    assert reader.export_interactions(export_path, session_ids=["b"]) == 5
+    with open(export_path, encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f]
+    assert lines[0]["session_id"] == "b" and lines[0]["agent_id"] == "exporter" and "timestamp" in lines[0]
+    assert not list(reader.iter_interactions(since=lines[-1]["timestamp"] + 1))
+
+    # Redis：LRANGE分页，SCAN查找会话
+    client = InMemoryRedis()
+    redis_memory = RedisMemoryManager("redis_pager", client=client)
+    for session in ("x", "y"):
+        for i in range(5):
+            redis_memory.store_interaction(session, _message(i), _message(i, f"{session}{i}"), {"action": "respond"})
+    first = redis_memory.get_interaction_page("x", limit=2)
+    second = redis_memory.get_interaction_page("x", cursor=first["next_cursor"], limit=2)
+    assert [h["output"]["content"] for h in first["interactions"] + second["interactions"]] == ["x0", "x1", "x2", "x3"]
+    since = redis_memory.get_interaction_history("y")[3]["timestamp"]
+    later = redis_memory.get_interaction_page("y", limit=10, since=since)["interactions"]
+    assert later and later[-1]["output"]["content"] == "y4"
+    assert sorted(sid for sid, _ in redis_memory.iter_interactions(batch_size=2)) == ["x"] * 5 + ["y"] * 5
+    print("  ✅ 交互历史分页与导出测试通过")
+
+
+def test_write_behind_store_batches_off_request_path():
+    """测试写后存储：后台批量提交、读取可见、队列背压和关闭时刷新"""
+    print("🔍 测试写后批量持久化...")
+    path = os.path.join(tempfile.mkdtemp(), "memory.db")
+    store = SQLiteMemoryStore(path, group_commit_size=8, group_commit_interval=0.01,
+                              write_behind=True, queue_size=4)
+    for i in range(20):
+        store.append_context("agent", "s1", _message(i))
+    store.append_interaction("agent", "s1", {"input": _message(0), "output": _message(1), "plan": {}})
+    # 读取会先等待排队的写入
+    assert [m["content"] for m in store.load_context("agent", "s1", 3)] == ["消息17", "消息18", "消息19"]
+    stats = store.stats()
+    assert stats["write_behind"] and stats["pending_rows"] == 0 and stats["committed_rows"] == 21
+    assert stats["loss_bound_rows"] == 4 + 8 and stats["max_batch"] <= 8 and stats["failed_rows"] == 0
+
+    # 队列满时写入方阻塞，直到刷新线程跟上
+    with store._lock:
+        blocker = __import__("threading").Thread(
+            target=lambda: [store.append_context("agent", "s2", _message(i)) for i in range(10)])
+        blocker.start()
+        blocker.join(0.2)
+        assert blocker.is_alive()
+    blocker.join()
+    assert store.stats()["backpressure_waits"] >= 1
+
+    # 关闭时刷新：重新打开后数据完整
+    store.append_interaction("agent", "s2", {"input": _message(2), "output": _message(3), "plan": {}})
+    store.close()
+    reopened = SQLiteMemoryStore(path)
+    assert len(reopened.load_context("agent", "s2", 100)) == 10
+    assert len(reopened.load_interactions("agent", "s2")) == 1
+    reopened.close()
+    print("  ✅ 写后批量持久化测试通过")
+
+
+def test_idle_group_commit_is_durable():
+    """测试未满一组的写入在空闲时和正常退出时都会提交，无需调用flush()"""
+    print("🔍 测试空闲组提交...")
+
+    def count_rows(path):
+        connection = sqlite3.connect(path)
+        try:
+            return [connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                    for table in ("context", "interactions")]
+        finally:
+            connection.close()
+
+    # 进程正常退出：3条上下文和1条交互都不满一组，也从未调用flush()
+    path = os.path.join(tempfile.mkdtemp(), "memory.db")
+    script = (
+        "import sys; sys.path.insert(0, sys.argv[1])\n"
+        "from memory.manager import MemoryManager\n"
+        "memory = MemoryManager('a', storage_path=sys.argv[2])\n"
+        "for i in range(3):\n"
+        "    memory.update_context('s1', {'role': 'user', 'content': str(i)})\n"
+        "memory.store_interaction('s1', {'role': 'user', 'content': 'q'}, {'role': 'assistant', 'content': 'a'}, {})\n"
+    )
+    agent_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'agent-camel-v2')
+    subprocess.run([sys.executable, "-c", script, agent_dir, path], check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    assert count_rows(path) == [3, 1]
+
+    # 进程仍在运行：空闲的组在group_commit_interval后提交，并释放WAL写锁
+    path = os.path.join(tempfile.mkdtemp(), "memory.db")
+    store = SQLiteMemoryStore(path, group_commit_size=64, group_commit_interval=0.05)
+    for i in range(3):
+        store.append_context("agent", "s1", _message(i))
+    store.append_interaction("agent", "s1", {"input": _message(0), "output": _message(1), "plan": {}})
+    assert store.stats()["pending_rows"] == 4
+    time.sleep(0.2)
+    assert store.stats()["pending_rows"] == 0 and count_rows(path) == [3, 1]
+    # 所有组由同一个长期运行的提交线程提交，而不是每组一个线程
+    committer, threads = store._committer, threading.active_count()
+    for i in range(5):
+        store.append_context("agent", "s2", _message(i))
+        time.sleep(0.08)
+    assert store._committer is committer and threading.active_count() == threads
+    assert store.stats()["commits"] >= 6 and count_rows(path) == [8, 1]
+    store.close()
+    committer.join(1)
+    assert not committer.is_alive()
+    print("  ✅ 空闲组提交测试通过")
+
+
+def main():
+    """主测试函数"""
+    print("=" * 60)
+    print("🎯 记忆管理器测试")
+    print("=" * 60)
+    test_context_buffer_evicts_oldest()
+    test_context_buffer_byte_limit()
+    test_context_view_is_zero_copy_window()
+    test_memory_manager_context_window()
+    test_idle_sessions_are_evicted_with_callback()
+    test_sessions_evicted_by_count_and_bytes()
+    test_sessions_persist_and_load_lazily()
+    test_redis_backend_shares_sessions_between_workers()
+    test_evicted_context_is_summarized_in_background()
+    test_relevant_messages_are_retrieved()
+    test_old_interactions_move_to_cold_tier()
+    test_messages_are_shared_across_agents()
+    test_snapshot_warm_restart_replays_log_tail()
+    test_global_watermark_evicts_heaviest_sessions()
+    test_interaction_pages_and_streaming_export()
+    test_write_behind_store_batches_off_request_path()
+    test_idle_group_commit_is_durable()
+    print("\n🎉 所有测试通过！")
+
+
+if __name__ == "__main__":
+    main()
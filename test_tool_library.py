@@ -0,0 +1,482 @@
+#!/usr/bin/env python3
+"""
+测试脚本：验证Agent-Camel V2工具库
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'agent-camel-v2'))
+
+import ast
+import asyncio
+import logging
+import math
+import tempfile
+import threading
+import time
+
+from tools import calculator
+from tools.cache import ToolResultCache, key_on
+from tools.executor import ToolExecutor, ToolTimeoutError
+from tools.library import ToolLibrary
+from tools.registry import ToolRegistry, tool_factory
+from tools.search_index import SearchIndex, tokenize
+from tools.validation import ArgumentValidator, ToolArgumentError
+from typing import Any, Callable, Dict, List
+
+
+def _tool(name, description="测试工具"):
+    def tool(**parameters):
+        return {"result": f"{name}: {parameters}"}
+    tool.name = name
+    tool.description = description
+    tool.parameters = {"type": "object", "properties": {"x": {"type": "string"}}, "required": []}
+    return tool
+
+
+def worker_pid(n):
+    """CPU密集型工具：必须定义在模块级，才能在工作进程中运行"""
+    return {"sum": sum(range(n)), "pid": os.getpid()}
+worker_pid.name, worker_pid.description, worker_pid.cpu_bound = "worker_pid", "求和", True
+
+
+def test_tools_are_built_once_and_views_shared():
+    """测试工具在进程内只构建一次，工具相同的工具库共享同一个视图"""
+    print("🔍 测试共享工具注册表...")
+    registry = ToolRegistry()
+    first, second = ToolLibrary(registry), ToolLibrary(registry)
+    assert first.tools["search"] is second.tools["search"]
+    assert registry.stats()["builds"] == 2
+    assert first.view is second.view
+    assert first.get_available_tools() is second.get_available_tools()
+    assert [tool["name"] for tool in first.get_available_tools()] == ["search", "calculator"]
+    assert first.view.tool_block == ("Available tools:\n"
+                                     "- search: Search our offline documents (travel guides, school handbooks, reimbursement policies)\n"
+                                     "检索离线文档（旅行指南、学校手册、报销政策）\n"
+                                     "- calculator: Perform mathematical calculations\n执行数学计算\n")
+    assert first.get_tool_schemas()[0]["parameters"]["required"] == ["query"]
+
+    # 注册新工具会生成新的视图和版本，另一个工具库不受影响
+    version = first.version
+    first.register_tool(_tool("weather"))
+    assert first.version != version and second.version == version
+    assert first.view.names == ("search", "calculator", "weather")
+    assert list(first.view.tools) == list(first.tools.values())
+    print("  ✅ 共享工具注册表测试通过")
+
+
+def test_tool_factory_builds_once():
+    """测试tool_factory装饰的工厂函数只被调用一次"""
+    print("🔍 测试工具工厂缓存...")
+    calls = []
+
+    @tool_factory
+    def get_echo_tool():
+        calls.append(1)
+        return _tool("echo_once")
+
+    assert get_echo_tool() is get_echo_tool()
+    assert len(calls) == 1
+    assert ToolRegistry.shared().get("echo_once") is get_echo_tool()
+    library = ToolLibrary()
+    library.register_tool(get_echo_tool())
+    assert library.execute("echo_once", {"x": "1"}) == {"result": "echo_once: {'x': '1'}"}
+    print("  ✅ 工具工厂缓存测试通过")
+
+
+def test_tool_results_are_cached_per_declaration():
+    """测试声明为可缓存的工具结果被缓存，有副作用的工具总是执行"""
+    print("🔍 测试工具结果缓存...")
+    calls = []
+
+    def lookup(parameters):
+        calls.append(parameters)
+        return {"status": "success", "data": dict(parameters)}
+    lookup.name, lookup.description = "lookup", "查询"
+    lookup.cacheable, lookup.cache_ttl = True, 0.05
+    lookup.cache_key = key_on("student_id")
+
+    def pay(amount):
+        calls.append(amount)
+        return {"result": f"付款{amount}"}
+    pay.name, pay.description = "pay", "付款"
+    pay.cacheable, pay.side_effects = True, True
+
+    cache = ToolResultCache(max_entries=2)
+    library = ToolLibrary(ToolRegistry(), cache)
+    library.register_tool(lookup)
+    library.register_tool(pay)
+    first = library.execute("lookup", {"parameters": {"student_id": "S001", "note": "a"}})
+    # 键函数只看student_id，因此note不同也命中
+    assert library.execute("lookup", {"parameters": {"student_id": "S001", "note": "b"}}) is first
+    library.execute("pay", {"amount": 10})
+    library.execute("pay", {"amount": 10})
+    assert len(calls) == 3
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["tools"]["lookup"]["hit_rate"] == 0.5 and "pay" not in stats["tools"]
+
+    # TTL过期后重新执行；超过容量时淘汰最久未使用的结果
+    time.sleep(0.06)
+    library.execute("lookup", {"parameters": {"student_id": "S001"}})
+    library.execute("lookup", {"parameters": {"student_id": "S002"}})
+    library.execute("lookup", {"parameters": {"student_id": "S003"}})
+    assert len(calls) == 6 and cache.stats()["evictions"] == 1
+    assert cache.invalidate("lookup") == 2
+
+    # 包装后的工具在直接调用时（例如CAMEL Agent）同样经过缓存
+    wrapped = cache.wrap(lookup)
+    assert wrapped.name == "lookup" and cache.wrap(pay) is pay
+    wrapped(parameters={"student_id": "S009"})
+    wrapped(parameters={"student_id": "S009"})
+    assert len(calls) == 7
+    print("  ✅ 工具结果缓存测试通过")
+
+
+def test_executor_enforces_timeouts_and_concurrency_limits():
+    """测试执行引擎的超时、取消、并发上限、异步工具和进程池"""
+    print("🔍 测试工具执行引擎...")
+    executor = ToolExecutor(max_threads=4, max_processes=1, default_timeout=5)
+    try:
+        # 阻塞型工具超时：线程无法被取消，结果被丢弃，调用在返回前仍占用并发槽
+        slow = lambda: time.sleep(0.3)
+        slow.name = "slow"
+        try:
+            executor.run(slow, {}, timeout=0.05)
+            assert False, "应当超时"
+        except ToolTimeoutError:
+            pass
+        stats = executor.stats()["slow"]
+        assert stats["timeouts"] == 1 and stats["abandoned"] == 1
+        assert stats["abandoned_running"] == 1 and stats["running"] == 1
+        time.sleep(0.4)
+        stats = executor.stats()["slow"]
+        assert stats["abandoned"] == 1 and stats["abandoned_running"] == 0 and stats["running"] == 0
+
+        # 并发上限：超出上限的调用排队，不占用工作线程
+        running, peak, lock = [0], [0], threading.Lock()
+
+        def limited(i):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.03)
+            with lock:
+                running[0] -= 1
+            return i
+        limited.name, limited.max_concurrency = "limited", 1
+        futures = [executor.submit(limited, {"i": i}) for i in range(3)]
+        assert executor.stats()["limited"]["waiting"] == 2
+        assert [f.result(5) for f in futures] == [0, 1, 2] and peak[0] == 1
+        stats = executor.stats()["limited"]
+        assert stats["completed"] == 3 and stats["max_queue_seconds"] >= 0.05 and stats["running"] == 0
+
+        # 排队中的调用可以取消
+        futures = [executor.submit(limited, {"i": i}) for i in range(3)]
+        assert futures[2].cancel()
+        assert [f.result(5) for f in futures[:2]] == [0, 1]
+        assert executor.stats()["limited"]["cancelled"] == 1
+
+        # 异步工具在事件循环上运行，超时会真正取消协程
+        cancelled = threading.Event()
+
+        async def fetch(delay):
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+            return delay
+        fetch.name = "fetch"
+        assert executor.run(fetch, {"delay": 0.01}) == 0.01
+        try:
+            executor.run(fetch, {"delay": 10}, timeout=0.05)
+            assert False, "应当超时"
+        except ToolTimeoutError:
+            pass
+        assert cancelled.wait(1)
+        assert executor.stats()["fetch"]["abandoned"] == 0
+
+        # CPU密集型工具在进程池中运行；无法pickle的闭包退回线程池
+        result = executor.run(worker_pid, {"n": 1000}, timeout=60)
+        assert result["sum"] == 499500 and result["pid"] != os.getpid()
+        closure = lambda n: os.getpid()
+        closure.name, closure.cpu_bound = "closure", True
+        assert executor.run(closure, {"n": 1}) == os.getpid()
+
+        # 工具库通过执行引擎执行，也可以在事件循环中等待
+        library = ToolLibrary(ToolRegistry(), ToolResultCache(), executor)
+        library.register_tool(fetch)
+        assert asyncio.run(library.execute_async("fetch", {"delay": 0.01})) == 0.01
+        assert library.execute("fetch", {"delay": 0.01}) == 0.01
+    finally:
+        executor.shutdown()
+    print("  ✅ 工具执行引擎测试通过")
+
+
+def test_calculator_is_safe_compiled_and_vectorized():
+    """测试计算器：白名单AST、编译缓存、变量、批量求值和从文本中提取表达式"""
+    print("🔍 测试计算器表达式引擎...")
+    assert calculator.evaluate("3 × (800 + 200) ÷ 2") == 1500
+    assert calculator.evaluate("days * price + max(0, days - 5) * 10", {"days": 7, "price": 300}) == 2120
+    assert calculator.compile_expression("days * price") is calculator.compile_expression("days * price")
+    for unsafe in ["__import__('os').system('ls')", "(1).__class__", "[1, 2]", "9 ** 9 ** 9",
+                   "open('x')", "1 / 0", "days + 1", "(-8) ** 0.5"]:
+        try:
+            calculator.evaluate(unsafe)
+            assert False, unsafe
+        except calculator.CalculatorError:
+            pass
+
+    grid = calculator.evaluate_batch("days * price + 1200", {"days": [1, 2, 3], "price": [[300], [500]]})
+    assert grid.shape == (2, 3) and grid[1, 2] == 2700
+    # 批量结果与逐个标量求值一致：整数字面量按浮点计算，min/max接受多个参数
+    xs = [1, 2.5, -4]
+    for expression in ["x * 10**20", "x + 2**70", "x * 2**-1", "max(x, 1, 2)", "min(x, 3, 0) - 2**0.5"]:
+        batch = calculator.evaluate_batch(expression, {"x": xs})
+        scalar = [calculator.evaluate(expression, {"x": x}) for x in xs]
+        assert all(math.isclose(b, s) for b, s in zip(batch, scalar)), expression
+    for invalid in [("min(x)", {"x": xs}), ("x ** 2000", {"x": xs}), ("2 ** x", {"x": [1, 5000]}),
+                    ("x + 1", {"x": ["a"]})]:
+        try:
+            calculator.evaluate_batch(*invalid)
+            assert False, invalid
+        except calculator.CalculatorError:
+            pass
+
+    assert calculator.extract_expression("每天800元，一共3天：3*800+1200，对吗？") == "3*800+1200"
+    assert calculator.extract_expression("预算大概5000元") is None
+    # 日期、范围和单个运算符的数字不是计算，除非文本明确要求计算
+    for text in ("Trip 2024-5-1", "2-3 people", "page 10-12", "3/4 people",
+                 "2024-5-1出发，2-3人，一共多少钱？"):
+        assert calculator.extract_expression(text) is None, text
+    assert calculator.extract_expression("计算 100-30") == "100-30"
+    assert calculator.extract_expression("2024-5-1出发，总共多少钱？每人1200*3") == "1200*3"
+
+    library = ToolLibrary(ToolRegistry(), None, ToolExecutor(max_threads=1))
+    assert library.execute("calculator", {"expression": "3*800+1200"})["result"] == 3600
+    assert library.execute("calculator", {"expression": "d * 100", "variables": {"d": [1, 2]}})["result"] == [100.0, 200.0]
+    assert library.execute("calculator", {"expression": "x * 10**20", "variables": {"x": [1, 2]}})["result"] == [1e20, 2e20]
+    library.executor.shutdown()
+    print("  ✅ 计算器表达式引擎测试通过")
+
+def test_tool_arguments_are_validated_before_execution():
+    """测试工具参数在执行前按预编译的模式校验，错误以结构化形式反馈给模型"""
+    print("🔍 测试工具参数校验...")
+    validator = ArgumentValidator("data_distribution", {
+        "type": "object",
+        "properties": {
+            "data_id": {"type": "string"},
+            "count": {"type": "integer", "minimum": 1},
+            "mode": {"type": "string", "enum": ["email", "sms"]},
+            "recipients": {"type": "array", "items": {"type": "string"}},
+        },
+        "required": ["data_id"],
+    })
+    arguments = {"data_id": "d1", "count": 2}
+    assert validator(arguments) is arguments
+    # 模型常把数字和列表写成字符串：转换后返回副本，不修改输入
+    loose = {"data_id": 7, "count": "3", "recipients": '["t1", 2]'}
+    assert validator(loose) == {"data_id": "7", "count": 3, "recipients": ["t1", "2"]}
+    assert loose["count"] == "3"
+    # 只接收一个parameters字典的工具检查内部字典
+    assert validator({"parameters": {"data_id": "d1"}}) == {"parameters": {"data_id": "d1"}}
+    try:
+        validator({"parameters": {"count": 0, "mode": "fax", "recipients": [None]}})
+        assert False
+    except ToolArgumentError as e:
+        paths = sorted(error["path"] for error in e.errors)
+        assert paths == ["parameters.count", "parameters.data_id", "parameters.mode", "parameters.recipients[0]"], paths
+        assert e.feedback()["validation_errors"] == e.errors
+
+    registry = ToolRegistry()
+    library = ToolLibrary(registry, None, ToolExecutor(max_threads=1))
+    assert registry.stats()["validators"] == 2
+    try:
+        library.execute("calculator", {"expression": 42, "variables": "not json"})
+        assert False
+    except ToolArgumentError as e:
+        assert [error["path"] for error in e.errors] == ["variables"]
+    assert library.execute("calculator", {"expression": "2*x", "variables": '{"x": 4}'})["result"] == 8
+
+    # Agent将结构化错误反馈给模型一次，并执行修正后的调用
+    from agents.coordinator import BudgetAdvisorAgent
+    from agents.model_provider import ModelProvider, ModelProviderFactory
+
+    class RepairingProvider(ModelProvider):
+        def generate(self, prompt, **kwargs):
+            return '修正后的参数：{"expression": "6*7"}' if "rejected" in prompt else "plan"
+
+    ModelProviderFactory.register_provider("repairing", RepairingProvider)
+    agent = BudgetAdvisorAgent("validation_agent", model_provider="repairing")
+    assert agent._use_tool("calculator", {"expr": "6*7"})["result"] == 42
+    # 修正后仍然无效时，返回结构化错误而不是再次重试
+    assert agent._use_tool("search", {"query": None})["validation_errors"][0]["path"] == "query"
+    library.executor.shutdown()
+    print("  ✅ 工具参数校验测试通过")
+
+def test_execute_many_dedupes_and_batches_calls():
+    """测试批量调用：相同调用只执行一次，不同调用并发执行，原生批量入口一次接收整个列表"""
+    print("🔍 测试批量工具调用...")
+    library = ToolLibrary(ToolRegistry(), ToolResultCache(), ToolExecutor(max_threads=8))
+    executed, batches, lock = [], [], threading.Lock()
+
+    def lookup(policy_type):
+        with lock:
+            executed.append(policy_type)
+        time.sleep(0.1)
+        return f"{policy_type}政策"
+    lookup.name, lookup.description, lookup.cacheable = "lookup", "查询政策", True
+    lookup.parameters = {"type": "object", "properties": {"policy_type": {"type": "string"}}, "required": ["policy_type"]}
+
+    def grade(parameters):
+        return {"student": parameters["student_id"], "score": 90}
+
+    def grade_all(calls):
+        batches.append(len(calls))
+        return [grade(**call) for call in calls]
+    grade.name, grade.description, grade.batch = "grade", "批改", grade_all
+
+    def pay(amount):
+        with lock:
+            executed.append(f"pay {amount}")
+        return amount
+    pay.name, pay.description, pay.side_effects = "pay", "支付", True
+    for tool in (lookup, grade, pay):
+        library.register_tool(tool)
+
+    started = time.monotonic()
+    results = library.execute_many([
+        ("lookup", {"policy_type": "meal"}),
+        {"tool_name": "lookup", "parameters": {"policy_type": "hotel"}},
+        ("lookup", {"policy_type": "meal"}),
+        ("lookup", {"policy_type": "travel"}),
+    ])
+    assert time.monotonic() - started < 0.25, "distinct calls should run concurrently"
+    assert results == ["meal政策", "hotel政策", "meal政策", "travel政策"]
+    assert sorted(executed) == ["hotel", "meal", "travel"]
+    # 第二轮：全部命中缓存
+    assert library.execute_many([("lookup", {"policy_type": "travel"})]) == ["travel政策"]
+    assert len(executed) == 3
+
+    # 全班批改通过原生批量入口一次提交，结果按顺序对应
+    students = [("grade", {"parameters": {"student_id": f"s{i}"}}) for i in range(30)]
+    graded = library.execute_many(students + students[:5])
+    assert batches == [30]
+    assert [result["student"] for result in graded] == [f"s{i}" for i in range(30)] + [f"s{i}" for i in range(5)]
+
+    # 有副作用的调用即使相同也不会合并；错误可以放在结果列表中
+    results = library.execute_many([("pay", {"amount": 5}), ("pay", {"amount": 5}), ("missing", {}),
+                                    ("lookup", {})], return_exceptions=True)
+    assert results[:2] == [5, 5] and executed.count("pay 5") == 2
+    assert isinstance(results[2], ValueError) and isinstance(results[3], ToolArgumentError)
+    try:
+        library.execute_many([("lookup", {"policy_type": "meal"}), ("missing", {})])
+        assert False
+    except ValueError:
+        pass
+    library.executor.shutdown()
+    print("  ✅ 批量工具调用测试通过")
+
+
+def _example_tool_factory(name):
+    """示例依赖camel，无法直接导入：只取出其中一个工具工厂函数的源码执行"""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'agent-camel-v2', 'examples',
+                        'camel_school_system.py')
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    node = next(n for n in tree.body if isinstance(n, ast.FunctionDef) and n.name == name)
+    namespace = {"Any": Any, "Callable": Callable, "Dict": Dict, "List": List,
+                 "logger": logging.getLogger("camel_school_system"), "tool_factory": tool_factory}
+    exec(compile(ast.Module(body=[node], type_ignores=[]), path, "exec"), namespace)
+    return namespace[name]
+
+
+def test_school_grading_batch_entry_point():
+    """测试示例中作业批改工具的原生批量入口：每个调用得到独立的报告副本"""
+    print("🔍 测试作业批改批量入口...")
+    grading = _example_tool_factory("get_assignment_grading_tool")()
+    library = ToolLibrary(ToolRegistry(), None, ToolExecutor(max_threads=2))
+    library.register_tool(grading)
+    # 两位教师请求同一份作业报告：调用不同，批量入口只批改一次
+    calls = [("assignment_grading", {"parameters": {"teacher_id": teacher_id, "class_id": class_id,
+                                                    "assignment_id": "hw1"}})
+             for teacher_id, class_id in (("t1", "c1"), ("t2", "c2"), ("t2", "c1"))]
+    results = library.execute_many(calls)
+    assert [result["status"] for result in results] == ["success"] * 3
+    assert results[0]["data"] == results[2]["data"] and results[0]["data"] is not results[2]["data"]
+    results[0]["data"]["average_score"] = 0
+    assert results[2]["data"]["average_score"] == 82.5
+    # 缺少parameters的调用不会让整批失败
+    assert grading.batch([{}])[0]["data"]["assignment_id"] is None
+    library.executor.shutdown()
+    print("  ✅ 作业批改批量入口测试通过")
+
+
+def test_search_index_ranks_replaces_and_persists():
+    """测试离线检索：BM25排序、中英文查询、按ID替换、删除、段合并以及重新打开索引"""
+    print("🔍 测试离线检索索引...")
+    assert tokenize("住宿报销标准 Hotel") == ["住宿", "宿报", "报销", "销标", "标准", "hotel"]
+    path = tempfile.mkdtemp()
+    index = SearchIndex(path, flush_documents=2, merge_factor=2)
+    index.add_documents([
+        {"id": "hotel", "title": "住宿报销", "text": "出差住宿报销标准：一线城市每晚不超过600元。"},
+        {"id": "meal", "title": "餐饮报销", "text": "出差期间餐饮补贴每天100元，无需发票。"},
+        {"id": "kyoto", "title": "Kyoto guide", "text": "Kyoto temples are best visited early in the morning."},
+        {"id": "exam", "title": "考试安排", "text": "期末考试安排在一月，请提前复习。"},
+    ])
+    hits = index.search("住宿报销", k=3)
+    assert hits[0]["id"] == "hotel" and "住宿" in hits[0]["snippet"]
+    assert [hit["id"] for hit in hits] == ["hotel", "meal"]
+    assert index.search("KYOTO temples")[0]["id"] == "kyoto"
+    assert index.search("不存在的内容xyz") == []
+
+    # 按ID替换旧版本，删除立即生效
+    index.add({"id": "hotel", "title": "住宿报销", "text": "住宿标准已调整为每晚800元。"})
+    index.delete("meal")
+    assert [hit["id"] for hit in index.search("住宿 餐饮 报销")] == ["hotel"]
+    assert "800" in index.search("住宿")[0]["text"]
+    assert len(index) == 3 and index.merges >= 1
+
+    # 重新打开后内容一致
+    reopened = SearchIndex(path)
+    assert len(reopened) == 3 and reopened.search("期末考试")[0]["id"] == "exam"
+    assert reopened.search("餐饮") == []
+
+    # search工具使用共享索引，索引内容变化（添加、删除、提交）后缓存失效
+    SearchIndex._shared_index = index
+    try:
+        library = ToolLibrary(ToolRegistry(), ToolResultCache(), ToolExecutor(max_threads=2))
+        result = library.execute("search", {"query": "考试", "k": "2"})
+        assert result["hits"][0]["id"] == "exam" and "考试安排" in result["result"]
+        index.add({"id": "exam2", "title": "补考", "text": "补考考试安排在三月。"})
+        assert len(library.execute("search", {"query": "考试"})["hits"]) == 2
+        index.delete("exam2")
+        assert [hit["id"] for hit in library.execute("search", {"query": "考试"})["hits"]] == ["exam"]
+        index.delete("exam")
+        assert library.execute("search", {"query": "考试"})["hits"] == []
+        assert "未找到" in library.execute("search", {"query": "火星"})["result"]
+        library.executor.shutdown()
+    finally:
+        SearchIndex._shared_index = None
+    print("  ✅ 离线检索索引测试通过")
+
+
+def main():
+    """主测试函数"""
+    print("=" * 60)
+    print("🎯 工具库测试")
+    print("=" * 60)
+    test_tools_are_built_once_and_views_shared()
+    test_tool_factory_builds_once()
+    test_tool_results_are_cached_per_declaration()
+    test_executor_enforces_timeouts_and_concurrency_limits()
+    test_calculator_is_safe_compiled_and_vectorized()
+    test_tool_arguments_are_validated_before_execution()
+    test_execute_many_dedupes_and_batches_calls()
+    test_school_grading_batch_entry_point()
+    test_search_index_ranks_replaces_and_persists()
+    print("\n🎉 所有测试通过！")
+
+
+if __name__ == "__main__":
+    main()